@@ -0,0 +1,21 @@
+"""
+告警路由
+查看服务端告警规则的当前状态
+"""
+
+from fastapi import APIRouter
+from core.alerts import get_alert_engine
+
+router = APIRouter(prefix="/api", tags=["alerts"])
+
+@router.get("/alerts")
+async def get_alerts():
+    """
+    获取告警规则状态
+    
+    返回每条规则的当前值、状态（inactive / pending / firing）以及通知队列统计
+    """
+    return {
+        "success": True,
+        "data": get_alert_engine().get_status()
+    }
@@ -0,0 +1,23 @@
+"""
+异常检测路由
+查看基于 EWMA / z-score 的流式异常检测结果
+"""
+
+from fastapi import APIRouter, Query
+
+router = APIRouter(prefix="/api", tags=["anomalies"])
+
+@router.get("/anomalies")
+async def get_anomalies(limit: int = Query(100, ge=0, le=10000)):
+    """
+    获取异常检测结果
+    
+    - current: 最近一个采样周期被标记为异常的序列
+    - recent: 最近的异常事件（最多 limit 条）
+    """
+    # 异常检测依赖 NumPy，按需导入以缩短启动时间
+    from core.anomaly import get_anomaly_detector
+    return {
+        "success": True,
+        "data": get_anomaly_detector().get_status(limit=limit)
+    }
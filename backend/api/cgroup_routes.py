@@ -0,0 +1,36 @@
+"""
+cgroup 资源路由
+按 CPU/内存/IO 排名展示容器和 systemd 服务的资源占用
+"""
+
+from fastapi import APIRouter, Query
+from monitor.cgroup_monitor import get_cgroup_status
+
+router = APIRouter(prefix="/api", tags=["cgroups"])
+
+@router.get("/cgroups")
+def get_cgroups(
+    sort: str = Query("cpu", pattern="^(cpu|memory|io)$"),
+    limit: int = Query(10, ge=1, le=1000),
+    leaf_only: bool = False
+):
+    """
+    获取 cgroup 资源占用排名
+    
+    - sort: 排序依据，cpu / memory / io
+    - limit: 返回前 N 个 cgroup
+    - leaf_only: 只统计叶子 cgroup（容器、服务），排除 slice 等汇总节点
+    
+    接口为同步函数，由线程池执行，遍历大量 cgroup 时不会阻塞事件循环
+    """
+    try:
+        return {
+            "success": True,
+            "data": get_cgroup_status(sort=sort, limit=limit, leaf_only=leaf_only)
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"获取cgroup信息失败: {str(e)}",
+            "data": None
+        }
@@ -0,0 +1,50 @@
+"""
+历史数据导出路由
+按块流式输出 CSV / Parquet，导出长时间范围时内存占用固定
+"""
+
+import time
+from typing import Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from core.export import export_csv, export_parquet, parquet_available, resolve_series
+from core.sampler import get_sampler
+
+router = APIRouter(prefix="/api", tags=["history"])
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+@router.get("/export")
+def export_history(
+    series: str = Query(..., description="逗号分隔的序列名称，支持 glob，如 cpu.*,net_io.*"),
+    start: Optional[float] = Query(None, alias="from", description="起始 Unix 时间戳"),
+    end: Optional[float] = Query(None, alias="to", description="结束 Unix 时间戳"),
+    format: str = Query("csv", pattern="^(csv|parquet)$", description="csv 或 parquet")
+):
+    """
+    导出历史数据
+
+    输出长表（timestamp, series, value），按序列、时间排序
+    数据按块解码、编码后立即发送，不在内存中拼接完整结果；Parquet 需要安装 pyarrow
+    """
+    history = get_sampler().history
+    names = resolve_series(history, [name.strip() for name in series.split(",") if name.strip()])
+    if not names:
+        return JSONResponse(status_code=404, content={
+            "success": False, "error": f"没有匹配的序列: {series}", "data": None
+        })
+    if format == "parquet" and not parquet_available():
+        return JSONResponse(status_code=501, content={
+            "success": False, "error": "Parquet 导出需要安装 pyarrow", "data": None
+        })
+
+    if format == "parquet":
+        body = export_parquet(history, names, start, end)
+    else:
+        body = export_csv(history, names, start, end)
+    filename = f"history-{time.strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -2,7 +2,8 @@
 
 from fastapi import APIRouter
 from fastapi.responses import JSONResponse
-import psutil
+
+from monitor.providers import get_host_provider
 
 router = APIRouter(tags=["health"])
 
@@ -10,9 +11,10 @@ router = APIRouter(tags=["health"])
 async def health_check():
     """健康检查端点"""
     try:
-        # 检查系统资源是否可访问
-        psutil.cpu_percent(interval=0.1)
-        psutil.virtual_memory()
+        # 检查系统资源是否可访问（interval=None 不阻塞事件循环）
+        provider = get_host_provider()
+        provider.cpu_percent(interval=None)
+        provider.virtual_memory()
         
         return {"status": "healthy", "message": "Server monitor is running normally"}
     except Exception as e:
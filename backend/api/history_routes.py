@@ -0,0 +1,36 @@
+"""
+历史数据路由
+查询后台采样器保存的指标历史
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Query
+from core.sampler import get_sampler
+
+router = APIRouter(prefix="/api", tags=["history"])
+
+@router.get("/history/series")
+async def get_history_series():
+    """获取当前保存了历史数据的全部序列名称"""
+    return {
+        "success": True,
+        "data": get_sampler().history.series_names()
+    }
+
+@router.get("/history")
+async def get_history(
+    series: str = Query(..., description="逗号分隔的序列名称，如 cpu.usage_percent,disk_devices.sda.util_percent"),
+    start: Optional[float] = Query(None, description="起始 Unix 时间戳"),
+    end: Optional[float] = Query(None, description="结束 Unix 时间戳")
+):
+    """
+    获取指定序列的历史数据
+    
+    返回每个序列的 [时间戳, 值] 列表
+    """
+    names = [name.strip() for name in series.split(",") if name.strip()]
+    data = get_sampler().history.query_many(names, start, end)
+    return {
+        "success": True,
+        "data": {name: [list(point) for point in points] for name, points in data.items()}
+    }
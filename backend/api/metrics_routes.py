@@ -0,0 +1,32 @@
+"""
+Prometheus 指标路由
+以 OpenMetrics 文本格式暴露后台采样器的最新快照
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from core.config import settings
+from core.prometheus import CONTENT_TYPE, get_metrics_exporter
+from core.sampler import get_sampler
+from core.shared_snapshot import SLOT_METRICS, get_shared_coordinator
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    OpenMetrics 格式的监控指标
+    
+    文本在每个采样周期渲染一次，抓取只返回缓存的 bytes，不触发采集；
+    多 worker 模式下返回采样进程发布到共享内存的文本；按需模式下快照过期时先触发一次采集
+    """
+    coordinator = get_shared_coordinator()
+    if coordinator is not None:
+        payload = coordinator.read(SLOT_METRICS)
+        if payload is None:
+            return Response(content=b"# EOF\n", media_type=CONTENT_TYPE, status_code=503)
+        return Response(content=payload, media_type=CONTENT_TYPE)
+    if settings.collection_mode == "on_demand":
+        # 按需模式：抓取本身就是一次请求，必要时触发采集
+        await get_sampler().get_snapshot(settings.on_demand_max_age)
+    return Response(content=get_metrics_exporter().payload, media_type=CONTENT_TYPE)
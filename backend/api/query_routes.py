@@ -0,0 +1,54 @@
+"""
+历史查询路由
+按步长聚合或降采样后返回可以直接绘图的数据，一次请求计算多个序列
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter
+from pydantic import BaseModel, Field
+from core.sampler import get_sampler
+
+router = APIRouter(prefix="/api", tags=["history"])
+
+class SeriesQuery(BaseModel):
+    series: str = Field(..., description="序列名称，支持 glob，如 disk_devices.*.util_percent")
+    func: str = Field("avg", description="avg / min / max / last / rate / p50 / p95 / p99 / lttb")
+
+class QueryRequest(BaseModel):
+    queries: List[SeriesQuery] = Field(..., description="要计算的序列和函数")
+    start: Optional[float] = Field(None, description="起始 Unix 时间戳，默认 end 前 1 小时")
+    end: Optional[float] = Field(None, description="结束 Unix 时间戳，默认当前时间")
+    step: Optional[float] = Field(None, gt=0, description="聚合步长（秒），默认 (end - start) / max_points")
+    max_points: int = Field(1000, ge=3, le=10000, description="每个序列最多返回的点数")
+
+@router.post("/query")
+def query_history(request: QueryRequest):
+    """
+    查询历史数据
+
+    聚合函数的结果（results 中每项的 values）与 data.timestamps 中的桶一一对应，没有数据的桶为 null；
+    lttb 的结果带各自的 timestamps
+    步长不小于预聚合间隔时使用预聚合数据（source 为 rollup），否则使用原始点（source 为 raw）
+
+    接口为同步函数，由线程池执行，长时间范围的计算不会阻塞事件循环
+    """
+    # 查询引擎依赖 NumPy，首次查询时才导入，不影响启动耗时
+    from core.query import evaluate
+    try:
+        return {
+            "success": True,
+            "data": evaluate(
+                get_sampler().history,
+                [{"series": query.series, "func": query.func} for query in request.queries],
+                start=request.start,
+                end=request.end,
+                step=request.step,
+                max_points=request.max_points,
+            )
+        }
+    except ValueError as e:
+        return {
+            "success": False,
+            "error": f"查询参数无效: {str(e)}",
+            "data": None
+        }
@@ -1,105 +1,53 @@
 # FastAPI 路由定义
 
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from datetime import datetime
-import psutil
+from functools import lru_cache
+import json
 import time
 import platform
 import subprocess
-import json
-import os
-
-router = APIRouter(prefix="/api", tags=["monitoring"])
 
-# 全局变量用于存储上次的磁盘和网络数据
-last_disk_io = psutil.disk_io_counters()
-last_net_io = psutil.net_io_counters()
-last_timestamp = time.time()
+from core.config import settings
+from core.selfmetrics import timed
+from core.shared_snapshot import SLOT_STATUS, get_shared_coordinator
+from core.snapshot import to_plain
+from monitor.collectors import collect_disk_io, collect_memory, collect_network, collect_system_load
+from monitor.providers import get_host_provider
+from monitor.rates import RateCalculator
 
-# 今日流量数据存储
-traffic_data_file = "traffic_data.json"
-today_traffic = {
-    "upload_bytes": 0,
-    "download_bytes": 0,
-    "last_reset_date": None,  # UTC+8的日期字符串，格式: YYYY-MM-DD
-    "last_net_io_bytes_sent": 0,
-    "last_net_io_bytes_recv": 0
-}
-
-# 加载流量数据
-def load_traffic_data():
-    global today_traffic
-    try:
-        if os.path.exists(traffic_data_file):
-            with open(traffic_data_file, 'r', encoding='utf-8') as f:
-                saved_data = json.load(f)
-                today_traffic.update(saved_data)
-    except Exception as e:
-        print(f"加载流量数据失败: {e}")
-        # 使用默认值继续
-
-# 保存流量数据
-def save_traffic_data():
-    try:
-        with open(traffic_data_file, 'w', encoding='utf-8') as f:
-            json.dump(today_traffic, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"保存流量数据失败: {e}")
+router = APIRouter(prefix="/api", tags=["monitoring"])
 
-# 获取UTC+8的当前时间
-def get_utc8_time():
-    import pytz
-    utc8_tz = pytz.timezone('Asia/Shanghai')  # UTC+8时区
-    return datetime.now(utc8_tz)
+# 磁盘和网络速率的计算状态（导入时不读取计数器，由 lifespan 中的 init_rate_state 初始化）
+_rates = RateCalculator()
 
-# 初始化流量数据系统
-def init_traffic_system():
-    """在应用启动时初始化流量数据系统"""
-    global today_traffic, last_net_io
-    
-    # 加载现有数据
-    load_traffic_data()
-    
-    # 初始化网络计数器
-    current_net_io = psutil.net_io_counters()
-    
-    # 如果今天是第一次运行或需要重置，初始化基准值
-    current_time = get_utc8_time()
-    today_date = current_time.strftime("%Y-%m-%d")
-    
-    if today_traffic["last_reset_date"] is None or today_traffic["last_reset_date"] != today_date:
-        print(f"初始化流量系统（UTC+8 {today_date}）")
-        today_traffic["upload_bytes"] = 0
-        today_traffic["download_bytes"] = 0
-        today_traffic["last_reset_date"] = today_date
-        today_traffic["last_net_io_bytes_sent"] = current_net_io.bytes_sent if current_net_io else 0
-        today_traffic["last_net_io_bytes_recv"] = current_net_io.bytes_recv if current_net_io else 0
-        save_traffic_data()
-    
-    # 设置 last_net_io 为当前值
-    last_net_io = current_net_io
+# 今日流量账本（与后台采样器共用）
+from monitor.traffic_monitor import (
+    today_traffic,
+    load_traffic_data,
+    save_traffic_data,
+    get_utc8_time,
+    init_traffic_system,
+    check_and_reset_traffic,
+    update_today_traffic
+)
 
-# 检查是否需要重置今日流量
-def check_and_reset_traffic():
-    global today_traffic, last_net_io
-    
-    current_time = get_utc8_time()
-    today_date = current_time.strftime("%Y-%m-%d")
-    
-    # 如果是新的一天，重置流量数据
-    if today_traffic["last_reset_date"] != today_date:
-        print(f"检测到新的一天（UTC+8 {today_date}），重置今日流量")
-        today_traffic["upload_bytes"] = 0
-        today_traffic["download_bytes"] = 0
-        today_traffic["last_reset_date"] = today_date
-        today_traffic["last_net_io_bytes_sent"] = last_net_io.bytes_sent if last_net_io else 0
-        today_traffic["last_net_io_bytes_recv"] = last_net_io.bytes_recv if last_net_io else 0
-        save_traffic_data()
-    
-    return today_date
+def init_rate_state():
+    """在应用启动时记录一次磁盘/网络计数器，作为第一个请求计算速率的基准"""
+    now = time.time()
+    provider = get_host_provider()
+    disk_io = provider.disk_io_counters()
+    net_io = provider.net_io_counters()
+    if disk_io:
+        _rates.rate("disk_read_bytes", disk_io.read_bytes, now)
+        _rates.rate("disk_write_bytes", disk_io.write_bytes, now)
+    if net_io:
+        _rates.rate("net_bytes_sent", net_io.bytes_sent, now)
+        _rates.rate("net_bytes_recv", net_io.bytes_recv, now)
 
-# 获取后端版本号
+# 获取后端版本号（进程内只解析一次）
+@lru_cache(maxsize=1)
 def get_version_info():
     try:
         # 从当前文件或setup.py中获取版本信息
@@ -114,14 +62,16 @@ def get_version_info():
     return "1.0.0"  # 默认版本号
 
 # 获取网络连接数
+@timed("net_connections")
 def get_network_connections():
     try:
-        connections = psutil.net_connections()
+        connections = get_host_provider().net_connections()
         return len([conn for conn in connections if conn.status == 'ESTABLISHED'])
     except:
         return 0
 
 # 获取显卡信息
+@timed("nvidia_smi")
 def get_gpu_info():
     gpu_info = {
         "has_gpu": False,
@@ -131,6 +81,15 @@ def get_gpu_info():
         "gpu_name": ""
     }
     
+    provider = get_host_provider()
+    if not provider.live:
+        # 合成主机：取数据源的第一块 GPU
+        gpus = provider.gpus()
+        if gpus:
+            gpu_info.update(has_gpu=True, gpu_usage=gpus[0]["usage_percent"], gpu_memory_used=gpus[0]["memory_used"],
+                            gpu_memory_total=gpus[0]["memory_total"], gpu_name=gpus[0]["name"])
+        return gpu_info
+    
     try:
         # 尝试使用nvidia-smi获取NVIDIA显卡信息
         result = subprocess.run(['nvidia-smi', '--query-gpu=utilization.gpu,memory.used,memory.total,name', '--format=csv,noheader,nounits'], 
@@ -152,100 +111,112 @@ def get_gpu_info():
     
     return gpu_info
 
+# 把采样器快照转换为 /api/status 的结构（多 worker 模式下由采样进程调用），记录在这里转换为字典
+def build_status_from_snapshot(snapshot):
+    cpu = snapshot.get("cpu") or {}
+    network = to_plain(snapshot.get("network") or {})
+    network.update(snapshot.get("traffic") or {})
+    gpus = snapshot.get("gpu") or []
+    gpu = gpus[0] if gpus else {}
+    return {
+        "timestamp": datetime.fromtimestamp(snapshot.timestamp).isoformat(),
+        "cpu": {
+            "usage_percent": cpu.get("usage_percent", 0),
+            "core_count": cpu.get("core_count", 0),
+            "current_freq": cpu.get("current_freq", 0),
+            "max_freq": cpu.get("max_freq", 0)
+        },
+        "memory": to_plain(snapshot.get("memory", {})),
+        "disk_io": to_plain(snapshot.get("disk_io", {})),
+        "disk_devices": snapshot.get("disk_devices", {}),
+        "sensors": snapshot.get("sensors", {}),
+        "network": network,
+        "system_load": to_plain(snapshot.get("system_load", {})),
+        "pressure": snapshot.get("pressure", {}),
+        "anomalies": snapshot.get("anomalies") or [],
+        "uptime": (snapshot.get("uptime") or {}).get("seconds", 0),
+        "network_connections": (snapshot.get("connections") or {}).get("established", 0),
+        "gpu": {
+            "has_gpu": bool(gpus),
+            "gpu_usage": gpu.get("usage_percent", 0),
+            "gpu_memory_used": gpu.get("memory_used", 0),
+            "gpu_memory_total": gpu.get("memory_total", 0),
+            "gpu_name": gpu.get("name", "")
+        },
+        "version": get_version_info()
+    }
+
+def render_status(snapshot) -> bytes:
+    """预先序列化的 /api/status 响应体"""
+    return json.dumps(build_status_from_snapshot(snapshot), ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
 @router.get("/status")
 async def get_server_status():
     """获取完整的服务器状态信息"""
-    global last_disk_io, last_net_io, last_timestamp, today_traffic
-    
-    current_timestamp = time.time()
-    time_interval = current_timestamp - last_timestamp
-    
+    # 多 worker 模式：直接返回采样进程发布到共享内存的响应，不在本进程采集
+    coordinator = get_shared_coordinator()
+    if coordinator is not None:
+        payload = coordinator.read(SLOT_STATUS)
+        if payload is None:
+            return JSONResponse(status_code=503, content={
+                "success": False, "error": "采样进程尚未发布数据", "data": None
+            })
+        return Response(content=payload, media_type="application/json")
+    
+    # 按需模式：并发请求共享同一次采集，新鲜度窗口内复用结果
+    # 回放模式：数据只存在于录制文件中，同样由采样器快照构造
+    if settings.collection_mode == "on_demand" or settings.host_provider == "replay":
+        from core.sampler import get_sampler
+        snapshot = await get_sampler().get_snapshot(settings.on_demand_max_age)
+        return build_status_from_snapshot(snapshot)
+
     # 加载流量数据并检查是否需要重置
     load_traffic_data()
     check_and_reset_traffic()
     
     # CPU 信息 - 使用统一的系统监控数据源，确保数据一致性
+    from monitor.cpu_burst import cpu_usage_percent
+    provider = get_host_provider()
     try:
         from monitor.system_monitor import get_system_hardware_info
         system_info = get_system_hardware_info()
         cpu_info = system_info.get("cpu_info", {})
         
         cpu_info = {
-            "usage_percent": cpu_info.get("usage_percent", psutil.cpu_percent(interval=1)),
-            "core_count": cpu_info.get("total_cores", psutil.cpu_count()),
-            "current_freq": cpu_info.get("current_frequency", psutil.cpu_freq().current if psutil.cpu_freq() else 0),
-            "max_freq": cpu_info.get("max_frequency", psutil.cpu_freq().max if psutil.cpu_freq() else 0)
+            "usage_percent": cpu_info["usage_percent"] if "usage_percent" in cpu_info else cpu_usage_percent(1.0),
+            "core_count": cpu_info.get("total_cores", provider.cpu_count()),
+            "current_freq": cpu_info.get("current_frequency", provider.cpu_freq().current if provider.cpu_freq() else 0),
+            "max_freq": cpu_info.get("max_frequency", provider.cpu_freq().max if provider.cpu_freq() else 0)
         }
     except Exception as e:
         # 异常时回退到基础获取方式
-        cpu_freq = psutil.cpu_freq()
+        cpu_freq = provider.cpu_freq()
         cpu_info = {
-            "usage_percent": psutil.cpu_percent(interval=1),
-            "core_count": psutil.cpu_count(),
+            "usage_percent": cpu_usage_percent(1.0),
+            "core_count": provider.cpu_count(),
             "current_freq": cpu_freq.current if cpu_freq else 0,
             "max_freq": cpu_freq.max if cpu_freq else 0
         }
     
     # 内存信息
-    memory = psutil.virtual_memory()
-    memory_info = {
-        "total": memory.total,
-        "available": memory.available,
-        "used": memory.used,
-        "usage_percent": memory.percent,
-        "free": memory.free
-    }
+    memory_info = collect_memory().to_dict()
     
     # 磁盘 I/O 信息
-    current_disk_io = psutil.disk_io_counters()
-    if last_disk_io:
-        read_speed = (current_disk_io.read_bytes - last_disk_io.read_bytes) / time_interval
-        write_speed = (current_disk_io.write_bytes - last_disk_io.write_bytes) / time_interval
-    else:
-        read_speed = write_speed = 0
-    
-    disk_io_info = {
-        "read_bytes": current_disk_io.read_bytes,
-        "write_bytes": current_disk_io.write_bytes,
-        "read_count": current_disk_io.read_count,
-        "write_count": current_disk_io.write_count,
-        "read_speed_mb": round(read_speed / (1024 * 1024), 2),
-        "write_speed_mb": round(write_speed / (1024 * 1024), 2)
-    }
+    disk_io = collect_disk_io(_rates)
+    disk_io_info = disk_io.to_dict() if disk_io is not None else {}
     
     # 网络信息
-    current_net_io = psutil.net_io_counters()
-    if last_net_io:
-        upload_speed = (current_net_io.bytes_sent - last_net_io.bytes_sent) / time_interval
-        download_speed = (current_net_io.bytes_recv - last_net_io.bytes_recv) / time_interval
-    else:
-        upload_speed = download_speed = 0
+    network = collect_network(_rates)
     
     # 计算今日流量（基于UTC+8时间）
-    if last_net_io:
-        # 计算本次统计间隔内的流量增量
-        upload_increment = current_net_io.bytes_sent - today_traffic["last_net_io_bytes_sent"]
-        download_increment = current_net_io.bytes_recv - today_traffic["last_net_io_bytes_recv"]
-        
-        # 更新今日流量（防止重启后数据丢失）
-        today_traffic["upload_bytes"] += max(0, upload_increment)
-        today_traffic["download_bytes"] += max(0, download_increment)
-        today_traffic["last_net_io_bytes_sent"] = current_net_io.bytes_sent
-        today_traffic["last_net_io_bytes_recv"] = current_net_io.bytes_recv
-        
-        # 保存更新后的数据
-        save_traffic_data()
+    update_today_traffic(network)
     
     today_upload_gb = round(today_traffic["upload_bytes"] / (1024 * 1024 * 1024), 3)
     today_download_gb = round(today_traffic["download_bytes"] / (1024 * 1024 * 1024), 3)
     
     network_info = {
-        "bytes_sent": current_net_io.bytes_sent,
-        "bytes_recv": current_net_io.bytes_recv,
-        "packets_sent": current_net_io.packets_sent,
-        "packets_recv": current_net_io.packets_recv,
-        "upload_speed_mb": round(upload_speed / (1024 * 1024), 2),
-        "download_speed_mb": round(download_speed / (1024 * 1024), 2),
+        **network.to_dict(),
         "today_upload_gb": today_upload_gb,
         "today_download_gb": today_download_gb,
         "today_upload_bytes": today_traffic["upload_bytes"],
@@ -254,16 +225,10 @@ async def get_server_status():
     }
     
     # 系统负载信息
-    load_avg = psutil.getloadavg()
-    system_load_info = {
-        "load_1min": load_avg[0],
-        "load_5min": load_avg[1],
-        "load_15min": load_avg[2],
-        "cpu_count": psutil.cpu_count()
-    }
+    system_load_info = collect_system_load().to_dict()
     
     # 系统运行时间
-    uptime_info = int(time.time() - psutil.boot_time())
+    uptime_info = int(time.time() - provider.boot_time())
     
     # 获取网络连接数
     network_connections = get_network_connections()
@@ -274,18 +239,25 @@ async def get_server_status():
     # 获取版本信息
     version_info = get_version_info()
     
-    # 更新全局变量
-    last_disk_io = current_disk_io
-    last_net_io = current_net_io
-    last_timestamp = current_timestamp
+    # 逐设备扩展 I/O 指标、硬件传感器和 PSI（来自后台采样器的最新快照）
+    from core.sampler import get_sampler
+    latest_snapshot = get_sampler().latest or {}
+    disk_devices_info = latest_snapshot.get("disk_devices", {})
+    sensors_info = latest_snapshot.get("sensors", {})
+    pressure_info = latest_snapshot.get("pressure", {})
+    anomalies = latest_snapshot.get("anomalies") or []
     
     return {
         "timestamp": datetime.now().isoformat(),
         "cpu": cpu_info,
         "memory": memory_info,
         "disk_io": disk_io_info,
+        "disk_devices": disk_devices_info,
+        "sensors": sensors_info,
         "network": network_info,
         "system_load": system_load_info,
+        "pressure": pressure_info,
+        "anomalies": anomalies,
         "uptime": uptime_info,
         "network_connections": network_connections,
         "gpu": gpu_info,
@@ -312,10 +284,12 @@ async def get_cpu_status():
         }
     except Exception as e:
         # 异常时回退到基础获取方式
-        cpu_freq = psutil.cpu_freq()
+        from monitor.cpu_burst import cpu_usage_percent
+        provider = get_host_provider()
+        cpu_freq = provider.cpu_freq()
         return {
-            "usage_percent": psutil.cpu_percent(interval=1),
-            "core_count": psutil.cpu_count(),
+            "usage_percent": cpu_usage_percent(1.0),
+            "core_count": provider.cpu_count(),
             "current_freq": cpu_freq.current if cpu_freq else 0,
             "max_freq": cpu_freq.max if cpu_freq else 0,
             "model": "Unknown",
@@ -325,82 +299,42 @@ async def get_cpu_status():
 @router.get("/memory")
 async def get_memory_status():
     """获取内存状态信息"""
-    memory = psutil.virtual_memory()
-    memory_info = {
-        "total": memory.total,
-        "available": memory.available,
-        "used": memory.used,
-        "usage_percent": memory.percent,
-        "free": memory.free
-    }
-    return memory_info
+    return collect_memory().to_dict()
 
 @router.get("/disk")
 async def get_disk_status():
     """获取磁盘 I/O 状态信息"""
-    global last_disk_io, last_timestamp
-    
-    current_timestamp = time.time()
-    time_interval = current_timestamp - last_timestamp
-    
-    current_disk_io = psutil.disk_io_counters()
-    if last_disk_io:
-        read_speed = (current_disk_io.read_bytes - last_disk_io.read_bytes) / time_interval
-        write_speed = (current_disk_io.write_bytes - last_disk_io.write_bytes) / time_interval
-    else:
-        read_speed = write_speed = 0
-    
-    disk_info = {
-        "read_bytes": current_disk_io.read_bytes,
-        "write_bytes": current_disk_io.write_bytes,
-        "read_count": current_disk_io.read_count,
-        "write_count": current_disk_io.write_count,
-        "read_speed_mb": round(read_speed / (1024 * 1024), 2),
-        "write_speed_mb": round(write_speed / (1024 * 1024), 2)
-    }
-    
-    last_disk_io = current_disk_io
-    last_timestamp = current_timestamp
-    
-    return disk_info
+    disk_io = collect_disk_io(_rates)
+    return disk_io.to_dict() if disk_io is not None else {}
 
 @router.get("/network")
 async def get_network_status():
     """获取网络状态信息"""
-    global last_net_io, last_timestamp
-    
-    current_timestamp = time.time()
-    time_interval = current_timestamp - last_timestamp
-    
-    current_net_io = psutil.net_io_counters()
-    if last_net_io:
-        upload_speed = (current_net_io.bytes_sent - last_net_io.bytes_sent) / time_interval
-        download_speed = (current_net_io.bytes_recv - last_net_io.bytes_recv) / time_interval
-    else:
-        upload_speed = download_speed = 0
-    
-    network_info = {
-        "bytes_sent": current_net_io.bytes_sent,
-        "bytes_recv": current_net_io.bytes_recv,
-        "packets_sent": current_net_io.packets_sent,
-        "packets_recv": current_net_io.packets_recv,
-        "upload_speed_mb": round(upload_speed / (1024 * 1024), 2),
-        "download_speed_mb": round(download_speed / (1024 * 1024), 2)
+    return collect_network(_rates).to_dict()
+
+@router.get("/network/interfaces")
+def get_network_interfaces():
+    """
+    获取逐网卡信息和速率
+
+    interfaces：按 INTERFACE_INCLUDE / INTERFACE_EXCLUDE 过滤后的接口，包含地址、MTU、up/down（缓存）
+    和最近一次采样的计数器与速率；groups：INTERFACE_GROUPS 中每个接口组的速率之和
+    """
+    from core.sampler import get_sampler
+    from monitor.interfaces_monitor import get_interface_monitor
+    latest = get_sampler().latest or {}
+    counters = latest.get("interfaces") or {}
+    interfaces = [{**info, **to_plain(counters.get(info["name"], {}))}
+                  for info in get_interface_monitor().interface_info()]
+    return {
+        "success": True,
+        "data": {
+            "interfaces": interfaces,
+            "groups": latest.get("interface_groups") or {}
+        }
     }
-    
-    last_net_io = current_net_io
-    last_timestamp = current_timestamp
-    
-    return network_info
 
 @router.get("/load")
 async def get_system_load():
     """获取系统负载信息"""
-    load_avg = psutil.getloadavg()
-    system_load_info = {
-        "load_1min": load_avg[0],
-        "load_5min": load_avg[1],
-        "load_15min": load_avg[2],
-        "cpu_count": psutil.cpu_count()
-    }
-    return system_load_info
\ No newline at end of file
+    return collect_system_load().to_dict()
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+自监控路由
+查看后端自身的运行指标（采集器/路由耗时、事件循环延迟、进程资源占用），
+以及需要管理令牌的调用栈采样接口
+"""
+
+import asyncio
+import hmac
+import time
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from core.config import settings
+from core.exporters import get_push_exporters
+from core.profiler import StackSampler, get_continuous_profiler
+from core.scheduler import get_scheduler
+from core.selfmetrics import get_self_metrics
+
+router = APIRouter(prefix="/api/self", tags=["self-monitoring"])
+
+# 同一时间只允许一个按需采样
+_profile_lock = asyncio.Lock()
+
+def _check_admin(request: Request):
+    """校验管理令牌（X-Admin-Token 或 Authorization: Bearer），失败时返回错误响应"""
+    if not settings.admin_token:
+        return JSONResponse(status_code=403, content={
+            "success": False, "error": "未配置 ADMIN_TOKEN，管理接口已禁用", "data": None
+        })
+    token = request.headers.get("x-admin-token", "")
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if not hmac.compare_digest(token.encode(), settings.admin_token.encode()):
+        return JSONResponse(status_code=401, content={
+            "success": False, "error": "管理令牌无效", "data": None
+        })
+    return None
+
+@router.get("/metrics")
+async def get_self_metrics_status():
+    """
+    获取后端自监控指标
+    
+    - process: 进程 RSS、CPU 占用、线程数
+    - event_loop: 事件循环延迟和默认线程池排队任务数
+    - collectors: 每个采集器的耗时分布、失败次数、慢运行次数（耗时超过采样间隔）
+    - routes: 每个路由的请求耗时分布
+    - operations: nvidia-smi、net_connections、流量文件写入等操作的耗时分布
+    - scheduler: 自适应采样的当前间隔、原因、CPU 预算和被限流的采集器（未启用时为 null）
+    - exporters: StatsD / Graphite 推送的发送行数、丢弃行数、丢弃快照数、发送错误和积压行数
+    """
+    scheduler = get_scheduler()
+    return {
+        "success": True,
+        "data": {
+            **get_self_metrics().get_status(),
+            "scheduler": scheduler.get_status() if scheduler is not None else None,
+            "exporters": [exporter.get_status() for exporter in get_push_exporters()],
+        }
+    }
+
+@router.get("/profile")
+async def get_profile(
+    request: Request,
+    seconds: float = Query(30, gt=0, le=300, description="按需采样时长（秒）"),
+    interval: float = Query(0.01, ge=0.001, le=1.0, description="按需采样间隔（秒）"),
+    mode: str = Query("once", pattern="^(once|continuous)$"),
+    minutes: float = Query(10, gt=0, description="常驻模式下返回最近多少分钟的结果")
+):
+    """
+    调用栈采样（需要管理令牌）
+    
+    返回折叠栈文本，可直接交给 flamegraph.pl 或 speedscope：
+    - mode=once: 在 seconds 秒内按 interval 采样所有线程
+    - mode=continuous: 返回常驻采样器最近 minutes 分钟的聚合结果（需开启 PROFILER_CONTINUOUS）
+    """
+    denied = _check_admin(request)
+    if denied is not None:
+        return denied
+
+    if mode == "continuous":
+        profiler = get_continuous_profiler()
+        if profiler is None or not profiler.running:
+            return JSONResponse(status_code=409, content={
+                "success": False, "error": "常驻采样未启用（PROFILER_CONTINUOUS=true）", "data": None
+            })
+        return PlainTextResponse(profiler.collapse(since=time.time() - minutes * 60))
+
+    if _profile_lock.locked():
+        return JSONResponse(status_code=409, content={
+            "success": False, "error": "已有正在进行的采样", "data": None
+        })
+    async with _profile_lock:
+        sampler = StackSampler(interval=interval, max_stacks=settings.profiler_max_stacks)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    return PlainTextResponse(sampler.collapse(), headers={"X-Profile-Samples": str(sampler.samples)})
@@ -0,0 +1,7 @@
+# 性能基准
+
+"""
+API 性能基准
+在进程内启动 FastAPI 应用，用确定性的合成主机（monitor/providers.py）代替真实系统调用，
+测量接口延迟、吞吐量和事件循环延迟，并与保存的基线比较。
+"""
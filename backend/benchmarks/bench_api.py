@@ -0,0 +1,321 @@
+# API 负载与延迟基准
+
+"""
+API 负载与延迟基准
+在进程内启动应用（完整执行 lifespan，包括后台采样器），直接通过 ASGI 接口发请求，
+不经过网络和 HTTP 客户端库；主机数据来自确定性的合成主机（monitor/providers.py 的 SyntheticProvider），
+--host 指定主机规模和负载形态，--replay 改为回放录制的采集结果（monitor/trace.py）。
+
+每个接口按给定并发度发送固定数量的请求，报告：
+- 延迟 p50/p95/p99/max（毫秒）
+- 吞吐量（请求/秒）
+- 事件循环延迟：心跳任务按固定间隔 sleep，实际唤醒时间与预期的差值
+  （路由里的阻塞调用会直接体现在这里）
+
+流式接口用 "路径#N" 的形式指定，只读取前 N 个响应体分块后断开。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api -c 16 -n 2000 -e /api/status,/health
+    python -m benchmarks.bench_api --host '{"cpus": 64, "nics": 500, "mounts": 2000, "gpus": 64}'
+    python -m benchmarks.bench_api --replay incident.jsonl.gz --replay-speed 0
+    python -m benchmarks.bench_api --save-baseline      # 记录当前结果为基线
+    python -m benchmarks.bench_api --threshold 0.3      # 与基线比较，退化超过 30% 时返回码为 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "api.json")
+DEFAULT_ENDPOINTS = ["/api/status", "/api/system/hardware", "/health", "/metrics"]
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """已排序序列的百分位数（线性插值）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * p / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+class ASGIClient:
+    """最小的进程内 ASGI 客户端"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, path: str, method: str = "GET", body: bytes = b"",
+                      stream_chunks: int = 0) -> Tuple[int, int]:
+        """发送一个请求，返回 (状态码, 响应体字节数)；stream_chunks > 0 时读满该数量的分块即断开"""
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench"), (b"content-length", str(len(body)).encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        disconnected = asyncio.Event()
+        request_sent = False
+        status = 0
+        received = 0
+        chunks = 0
+        done = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status, received, chunks
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                received += len(message.get("body", b""))
+                chunks += 1
+                if not message.get("more_body", False) or (stream_chunks and chunks >= stream_chunks):
+                    done.set()
+
+        app_task = asyncio.ensure_future(self.app(scope, receive, send))
+        done_task = asyncio.ensure_future(done.wait())
+        await asyncio.wait({app_task, done_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not app_task.done():
+            # 流式响应：模拟客户端断开
+            disconnected.set()
+            app_task.cancel()
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            pass
+        done_task.cancel()
+        return status, received
+
+class LoopLagMonitor:
+    """事件循环延迟心跳"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+def _parse_endpoint(spec: str) -> Tuple[str, int]:
+    path, _, chunks = spec.partition("#")
+    return path, int(chunks) if chunks else 0
+
+async def bench_endpoint(client: ASGIClient, spec: str, concurrency: int, requests: int,
+                         warmup: int) -> Dict[str, Any]:
+    """按给定并发度压测单个接口"""
+    path, stream_chunks = _parse_endpoint(spec)
+    for _ in range(warmup):
+        await client.request(path, stream_chunks=stream_chunks)
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status, _ = await client.request(path, stream_chunks=stream_chunks)
+            except Exception:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            if status >= 400 or status == 0:
+                errors += 1
+
+    lag = LoopLagMonitor()
+    lag.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+    await lag.stop()
+
+    latencies.sort()
+    lags = sorted(lag.samples)
+    ms = 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * ms, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * ms, 3),
+            "p95": round(percentile(latencies, 95) * ms, 3),
+            "p99": round(percentile(latencies, 99) * ms, 3),
+            "max": round(latencies[-1] * ms, 3) if latencies else 0.0,
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(lags, 50) * ms, 3),
+            "p99": round(percentile(lags, 99) * ms, 3),
+            "max": round(lags[-1] * ms, 3) if lags else 0.0,
+        },
+    }
+
+def prepare_environment(host: Optional[Dict[str, Any]] = None, replay: Optional[str] = None,
+                        replay_speed: float = 0.0):
+    """
+    准备基准运行环境：导入应用前通过环境变量选择主机数据源（默认合成主机，replay 时回放录制文件），
+    工作目录切换到临时目录，避免写入真实的 traffic_data.json
+    """
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    if replay:
+        os.environ["HOST_PROVIDER"] = "replay"
+        os.environ["TRACE_REPLAY_PATH"] = os.path.abspath(replay)
+        os.environ["TRACE_REPLAY_SPEED"] = str(replay_speed)
+    else:
+        os.environ["HOST_PROVIDER"] = "synthetic"
+        os.environ["SYNTHETIC_HOST"] = json.dumps(host or {})
+    os.chdir(tempfile.mkdtemp(prefix="monitor-bench-"))
+
+async def run_suite(endpoints: List[str], concurrency: int, requests: int, warmup: int) -> Dict[str, Any]:
+    """启动应用并依次压测各接口"""
+    from main import app
+
+    client = ASGIClient(app)
+    results: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        # 等待采样器产生第一份快照，/metrics 等接口才有完整内容
+        from core.sampler import get_sampler
+        sampler = get_sampler()
+        for _ in range(200):
+            if sampler.latest is not None:
+                break
+            await asyncio.sleep(0.01)
+        for spec in endpoints:
+            results[spec] = await bench_endpoint(client, spec, concurrency, requests, warmup)
+    return results
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            min_delta_ms: float) -> List[str]:
+    """与基线比较，返回退化说明；p95 延迟变慢或吞吐量下降超过阈值都算退化"""
+    regressions = []
+    for spec, result in results.items():
+        base = baseline.get("results", {}).get(spec)
+        if not base:
+            continue
+        p95, base_p95 = result["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        # 亚毫秒级接口的抖动按绝对值过滤，避免误报
+        if p95 > base_p95 * (1 + threshold) and p95 - base_p95 > min_delta_ms:
+            regressions.append(f"{spec}: p95 {base_p95:.3f}ms -> {p95:.3f}ms")
+        rps, base_rps = result["throughput_rps"], base["throughput_rps"]
+        if rps < base_rps * (1 - threshold) and result["latency_ms"]["mean"] - base["latency_ms"]["mean"] > min_delta_ms:
+            regressions.append(f"{spec}: 吞吐量 {base_rps:.1f}/s -> {rps:.1f}/s")
+    return regressions
+
+def print_table(results: Dict[str, Any]):
+    header = f"{'endpoint':<28}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'lag p99':>10}{'err':>6}"
+    print(header)
+    print("-" * len(header))
+    for spec, r in results.items():
+        lat = r["latency_ms"]
+        print(f"{spec:<28}{r['throughput_rps']:>10.1f}{lat['p50']:>10.3f}{lat['p95']:>10.3f}"
+              f"{lat['p99']:>10.3f}{lat['max']:>10.3f}{r['loop_lag_ms']['p99']:>10.3f}{r['errors']:>6}")
+    print("（延迟单位：毫秒）")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="API 负载与延迟基准")
+    parser.add_argument("-e", "--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help="逗号分隔的接口路径，流式接口写作 路径#分块数")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="并发请求数")
+    parser.add_argument("-n", "--requests", type=int, default=500, help="每个接口的请求总数")
+    parser.add_argument("--warmup", type=int, default=20, help="每个接口的预热请求数")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的相对退化比例")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="低于该绝对差值的延迟变化不算退化")
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    parser.add_argument("--host", type=json.loads, default={},
+                        help='合成主机参数（JSON），如 \'{"cpus": 64, "nics": 500, "mounts": 2000, "gpus": 64}\'')
+    parser.add_argument("--replay", help="回放录制的采集结果（TRACE_RECORD_PATH 录制的文件）代替合成主机")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="回放倍速，0 表示每个采样周期前进一帧")
+    args = parser.parse_args(argv)
+
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = os.path.abspath(args.output) if args.output else None
+    endpoints = [spec.strip() for spec in args.endpoints.split(",") if spec.strip()]
+
+    prepare_environment(args.host, args.replay, args.replay_speed)
+    results = asyncio.run(run_suite(endpoints, args.concurrency, args.requests, args.warmup))
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {"concurrency": args.concurrency, "requests": args.requests, "warmup": args.warmup,
+                   "host": args.host, "replay": os.path.basename(args.replay) if args.replay else None},
+        "results": results,
+    }
+    print_table(results)
+
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存: {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("未找到基线文件，跳过比较（使用 --save-baseline 创建）")
+        return 0
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != report["config"]:
+        print(f"注意：基线参数 {baseline.get('config')} 与本次参数不同，比较结果仅供参考")
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"性能退化（阈值 {args.threshold:.0%}）：")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"与基线相比无明显退化（阈值 {args.threshold:.0%}）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# 历史数据压缩基准
+
+"""
+历史数据压缩基准
+按一台 16 核、4 块磁盘、4 块网卡的主机生成确定性的指标轨迹（2 秒采样，带毫秒级抖动），
+分别写入未压缩和压缩的 History，比较：
+- 每点字节数：编码后的数据大小、预聚合行的大小，以及 tracemalloc 统计的实际内存（含 Python 对象开销）
+- 写入耗时（每点微秒，不开启 tracemalloc 单独测量）和全量范围查询的解码耗时
+与每点 16 字节的原始数组（float64 时间戳 + float64 数值）相比的压缩比也一并输出。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_history
+    python -m benchmarks.bench_history --points 5400 --jitter-ms 3
+"""
+
+import argparse
+import gc
+import math
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.history import DEFAULT_QUANTIZE, History
+
+Generator = Callable[[int], float]
+
+# 与默认配置（history_rollup_seconds）一致
+ROLLUP_SECONDS = 60
+
+def _random_walk(rng: random.Random, start: float, step: float, low: float, high: float,
+                 digits: int) -> Generator:
+    state = {"value": start}
+
+    def generate(_):
+        value = min(high, max(low, state["value"] + rng.gauss(0, step)))
+        state["value"] = value
+        return round(value, digits)
+    return generate
+
+def _counter(rng: random.Random, rate: float, idle: float = 0.0) -> Generator:
+    """累计计数器：每个周期以 idle 概率不变，否则按 rate 附近的随机增量增长"""
+    state = {"value": float(rng.randint(10 ** 6, 10 ** 9))}
+
+    def generate(_):
+        if rng.random() >= idle:
+            state["value"] += float(int(rng.expovariate(1.0 / rate)))
+        return state["value"]
+    return generate
+
+def _bursty_rate(rng: random.Random, scale: float, busy: float) -> Generator:
+    """速率类指标（MB/s）：大部分时间为 0，偶尔出现突发"""
+    def generate(_):
+        return round(rng.expovariate(1.0 / scale), 2) if rng.random() < busy else 0.0
+    return generate
+
+def _constant(value: float) -> Generator:
+    return lambda _: value
+
+def build_host(seed: int = 42, cores: int = 16, disks: int = 4, nics: int = 4) -> Dict[str, Generator]:
+    """模拟一台主机展开后的序列（名称与采样器快照保持一致）"""
+    rng = random.Random(seed)
+    series: Dict[str, Generator] = {
+        "cpu.usage_percent": _random_walk(rng, 30, 4, 0, 100, 2),
+        "cpu.core_count": _constant(float(cores)),
+        "cpu.current_freq": _random_walk(rng, 2400, 50, 800, 3600, 0),
+        "memory.total": _constant(64 * 2.0 ** 30),
+        "memory.used": _counter(rng, 2 ** 20, idle=0.3),
+        "memory.usage_percent": _random_walk(rng, 45, 0.2, 0, 100, 1),
+        "swap.usage_percent": _constant(1.3),
+        "system_load.load_1min": _random_walk(rng, 3, 0.2, 0, 64, 2),
+        "system_load.load_5min": _random_walk(rng, 3, 0.05, 0, 64, 2),
+        "uptime.seconds": lambda tick: float(123456 + tick * 2),
+        "network.bytes_sent": _counter(rng, 2 ** 22),
+        "network.bytes_recv": _counter(rng, 2 ** 23),
+        "network.upload_speed_mb": _bursty_rate(rng, 2, 0.6),
+        "network.download_speed_mb": _bursty_rate(rng, 4, 0.6),
+    }
+    for core in range(cores):
+        series[f"cpu.per_cpu.{core}"] = _random_walk(rng, 30, 6, 0, 100, 1)
+    for disk in range(disks):
+        name = f"sd{chr(ord('a') + disk)}"
+        busy = 0.7 if disk == 0 else 0.1
+        series[f"disks.{name}.read_bytes"] = _counter(rng, 2 ** 16, idle=1 - busy)
+        series[f"disks.{name}.write_bytes"] = _counter(rng, 2 ** 18, idle=1 - busy)
+        series[f"disks.{name}.read_count"] = _counter(rng, 20, idle=1 - busy)
+        series[f"disks.{name}.write_count"] = _counter(rng, 60, idle=1 - busy)
+        series[f"disk_devices.{name}.util_percent"] = _bursty_rate(rng, 5, busy)
+        series[f"disk_devices.{name}.await_ms"] = _bursty_rate(rng, 1.5, busy)
+    for nic in range(nics):
+        name = f"eth{nic}"
+        busy = 0.9 if nic < 2 else 0.05
+        for field, rate in (("bytes_sent", 2 ** 20), ("bytes_recv", 2 ** 21),
+                            ("packets_sent", 900), ("packets_recv", 1500)):
+            series[f"interfaces.{name}.{field}"] = _counter(rng, rate, idle=1 - busy)
+        for field in ("errin", "errout", "dropin", "dropout"):
+            series[f"interfaces.{name}.{field}"] = _constant(0.0)
+    return series
+
+def generate_trace(points: int, jitter_ms: float, seed: int = 42) -> List[Tuple[float, Dict[str, float]]]:
+    host = build_host(seed)
+    rng = random.Random(seed + 1)
+    timestamp = 1_700_000_000.0
+    trace = []
+    for tick in range(points):
+        timestamp += 2.0 + rng.uniform(-jitter_ms, jitter_ms) / 1000.0
+        trace.append((timestamp, {name: generate(tick) for name, generate in host.items()}))
+    return trace
+
+def _fill(trace, compress: bool) -> History:
+    history = History(retention_seconds=10 ** 9, compress=compress, quantize=DEFAULT_QUANTIZE,
+                      rollup_seconds=ROLLUP_SECONDS)
+    for timestamp, values in trace:
+        history.append(timestamp, values)
+    return history
+
+def measure(trace, compress: bool) -> Dict[str, float]:
+    started = time.perf_counter()
+    _fill(trace, compress)
+    append_seconds = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    history = _fill(trace, compress)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    names = history.series_names()
+    started = time.perf_counter()
+    decoded = history.query_many(names)
+    query_seconds = time.perf_counter() - started
+
+    points = sum(len(values) for values in decoded.values())
+    usage = history.memory_usage()
+    return {
+        "points": points,
+        "encoded_bytes_per_point": usage["bytes"] / points,
+        "rollup_bytes_per_point": usage["rollup_bytes"] / points,
+        "retained_bytes_per_point": retained / points,
+        "append_us_per_point": append_seconds / points * 1e6,
+        "query_us_per_point": query_seconds / points * 1e6,
+        "_decoded": decoded,
+    }
+
+def verify(trace, decoded: Dict[str, List[Tuple[float, float]]]) -> Optional[str]:
+    """压缩结果与原始轨迹逐点比较（时间戳 10ms、百分比 0.01 以内）"""
+    for index, (timestamp, values) in enumerate(trace):
+        for name, value in values.items():
+            got_timestamp, got_value = decoded[name][index]
+            if abs(got_timestamp - timestamp) > 0.0051:
+                return f"{name}[{index}] 时间戳 {got_timestamp} != {timestamp}"
+            if not math.isclose(got_value, value, abs_tol=0.0051):
+                return f"{name}[{index}] 数值 {got_value} != {value}"
+    return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="历史数据压缩基准")
+    parser.add_argument("--points", type=int, default=1800, help="每个序列的点数（默认 1 小时，2 秒间隔）")
+    parser.add_argument("--jitter-ms", type=float, default=1.0, help="采样时间戳抖动（毫秒），实测采样器约 ±1ms")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    trace = generate_trace(args.points, args.jitter_ms, args.seed)
+    print(f"{len(trace[0][1])} 个序列 × {args.points} 点，抖动 ±{args.jitter_ms:g}ms")
+    plain = measure(trace, compress=False)
+    compressed = measure(trace, compress=True)
+    error = verify(trace, compressed.pop("_decoded"))
+    plain.pop("_decoded")
+
+    print(f"{'':<12}{'编码 B/点':>12}{'实际内存 B/点':>16}{'写入 us/点':>12}{'查询 us/点':>12}")
+    for label, result in (("未压缩", plain), ("压缩", compressed)):
+        print(f"{label:<12}{result['encoded_bytes_per_point']:>12.2f}{result['retained_bytes_per_point']:>16.2f}"
+              f"{result['append_us_per_point']:>12.2f}{result['query_us_per_point']:>12.2f}")
+    print(f"预聚合行（{ROLLUP_SECONDS}s）另占 {compressed['rollup_bytes_per_point']:.2f} B/点（包含在实际内存中）")
+    print(f"相对原始数组（16 B/点）压缩比: {16 / compressed['encoded_bytes_per_point']:.1f}x，"
+          f"相对未压缩 History 实际内存: {plain['retained_bytes_per_point'] / compressed['retained_bytes_per_point']:.1f}x")
+    if error:
+        print(f"解码结果不一致: {error}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# 历史查询基准
+
+"""
+历史查询基准
+用 benchmarks/bench_history.py 的模拟主机向压缩 History 写入 7 天数据（50 个序列），
+测量 core/query.py 中各类查询的耗时（中位数），包括 JSON 序列化：
+
+- 7 天范围（步长不小于预聚合间隔，使用预聚合行）：avg / p95 / rate / lttb
+- 1 小时范围（使用原始点）：首次查询（解码缓存为空）和重复查询
+
+预聚合行的数量只与时间范围有关，7 天的查询耗时基本不受 --interval 影响；
+默认 10 秒间隔只是为了缩短写入时间。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_query
+    python -m benchmarks.bench_query --days 7 --interval 2 --series 50
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.bench_history import build_host
+from core.history import DEFAULT_QUANTIZE, History
+from core.query import evaluate
+
+def build_history(days: float, interval: float, series: int, seed: int = 42) -> History:
+    host = build_host(seed)
+    names = sorted(host)[:series]
+    rng = random.Random(seed + 1)
+    history = History(retention_seconds=days * 86400 + 3600, compress=True, quantize=DEFAULT_QUANTIZE,
+                      rollup_seconds=60)
+    timestamp = 1_700_000_000.0
+    for tick in range(int(days * 86400 / interval)):
+        timestamp += interval + rng.uniform(-0.001, 0.001)
+        history.append(timestamp, {name: host[name](tick) for name in names})
+    return history
+
+def time_query(history: History, queries: List[Dict[str, str]], start: float, end: float,
+               runs: int, max_points: int = 1000) -> Dict[str, float]:
+    elapsed = []
+    size = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = evaluate(history, queries, start, end, max_points=max_points)
+        size = len(json.dumps(result))
+        elapsed.append(time.perf_counter() - started)
+    return {"ms": statistics.median(elapsed) * 1000, "kb": size / 1024, "source": result["source"],
+            "results": len(result["results"])}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="历史查询基准")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--interval", type=float, default=10, help="采样间隔（秒）")
+    parser.add_argument("--series", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    history = build_history(args.days, args.interval, args.series)
+    usage = history.memory_usage()
+    print(f"写入 {usage['series']} 个序列 × {usage['points'] // max(1, usage['series'])} 点，"
+          f"耗时 {time.perf_counter() - started:.1f}s，编码 {usage['bytes'] / 2 ** 20:.1f} MB，"
+          f"预聚合 {usage['rollup_bytes'] / 2 ** 20:.1f} MB")
+
+    names = history.series_names()
+    end = max(history.arrays(name)[0][-1] for name in names[:1])
+    week = end - args.days * 86400
+    hour = end - 3600
+    cases = [
+        ("全部 avg", [{"series": "*", "func": "avg"}], week, args.runs),
+        ("全部 p95", [{"series": "*", "func": "p95"}], week, args.runs),
+        ("计数器 rate", [{"series": "*bytes*", "func": "rate"}, {"series": "*count*", "func": "rate"}], week, args.runs),
+        ("全部 lttb", [{"series": "*", "func": "lttb"}], week, args.runs),
+        ("1h avg（冷）", [{"series": "*", "func": "avg"}], hour, 1),
+        ("1h avg（热）", [{"series": "*", "func": "avg"}], hour, args.runs),
+        ("1h lttb", [{"series": "*", "func": "lttb"}], hour, args.runs),
+    ]
+    print(f"{'查询':<14}{'范围':>8}{'来源':>8}{'序列':>6}{'耗时 ms':>10}{'JSON KB':>10}")
+    for label, queries, start, runs in cases:
+        result = time_query(history, queries, start, end, runs)
+        span = f"{(end - start) / 86400:g}d" if end - start >= 86400 else f"{(end - start) / 3600:g}h"
+        print(f"{label:<14}{span:>8}{result['source']:>8}{result['results']:>6}"
+              f"{result['ms']:>10.1f}{result['kb']:>10.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
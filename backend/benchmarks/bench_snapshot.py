@@ -0,0 +1,160 @@
+# 快照数据模型内存基准
+
+"""
+快照数据模型内存基准
+按一台模拟主机（默认 16 核、4 块磁盘、8 块网卡）生成确定性的采集结果，分别保留 N 份
+嵌套字典快照（早期采样器的结构）和 core/snapshot.py 的 Snapshot + 记录类快照，比较：
+- tracemalloc 统计的每份快照实际内存（含数值对象本身，两种结构的数值完全相同）
+- 每份快照 flatten_snapshot 展开（写入历史前的一步）的耗时
+
+只覆盖已改为记录类的部分（cpu、memory、swap、disk_io、disks、network、interfaces、system_load、uptime、
+connections）；结构不固定、仍为字典的部分（disk_devices、sensors、pressure 等）两种模型相同，不计入。
+每份快照的展开结果逐项比较，不一致时返回码为 1。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_snapshot
+    python -m benchmarks.bench_snapshot --snapshots 3600 --cores 64 --nics 64
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from core.history import flatten_snapshot
+from core.snapshot import (
+    ConnectionStats,
+    CpuStats,
+    DiskCounters,
+    DiskIOStats,
+    InterfaceStats,
+    LoadStats,
+    MemoryStats,
+    NetworkStats,
+    Snapshot,
+    SnapshotLayout,
+    SwapStats,
+    UptimeStats,
+)
+
+SECTIONS = ("cpu", "memory", "swap", "disk_io", "disks", "network", "interfaces", "system_load", "uptime", "connections")
+
+def build_host(seed: int = 42, cores: int = 16, disks: int = 4, nics: int = 8) -> Callable[[int], Snapshot]:
+    """返回 tick -> 快照 的生成函数；每次调用产生新的数值对象（与真实采集一致）"""
+    rng = random.Random(seed)
+    layout = SnapshotLayout(SECTIONS)
+    disk_names = [f"sd{chr(ord('a') + disk)}" for disk in range(disks)]
+    nic_names = [f"eth{nic}" for nic in range(nics)]
+    counters: Dict[Any, int] = {}
+
+    def counter(key, rate: int) -> int:
+        value = counters.get(key, rng.randint(10 ** 9, 10 ** 12)) + rng.randint(0, rate)
+        counters[key] = value
+        return value
+
+    def generate(tick: int) -> Snapshot:
+        values: List[Any] = [
+            CpuStats(usage_percent=round(rng.uniform(0, 100), 2), core_count=cores,
+                     current_freq=round(rng.uniform(800, 3600), 1), max_freq=3600.0,
+                     per_cpu=[round(rng.uniform(0, 100), 1) for _ in range(cores)]),
+            MemoryStats(total=64 * 2 ** 30, available=counter("available", 2 ** 20), used=counter("used", 2 ** 20),
+                        usage_percent=round(rng.uniform(40, 50), 1), free=counter("free", 2 ** 20)),
+            SwapStats(total=8 * 2 ** 30, used=counter("swap", 2 ** 10), free=counter("swap_free", 2 ** 10),
+                      usage_percent=round(rng.uniform(1, 2), 1)),
+            DiskIOStats(read_bytes=counter("read", 2 ** 20), write_bytes=counter("write", 2 ** 22),
+                        read_count=counter("reads", 300), write_count=counter("writes", 900),
+                        read_speed_mb=round(rng.uniform(0, 50), 2), write_speed_mb=round(rng.uniform(0, 200), 2)),
+            {name: DiskCounters(read_bytes=counter((name, 0), 2 ** 18), write_bytes=counter((name, 1), 2 ** 20),
+                                read_count=counter((name, 2), 100), write_count=counter((name, 3), 300),
+                                busy_time=counter((name, 4), 2000))
+             for name in disk_names},
+            NetworkStats(bytes_sent=counter("sent", 2 ** 22), bytes_recv=counter("recv", 2 ** 23),
+                         packets_sent=counter("psent", 3000), packets_recv=counter("precv", 5000),
+                         upload_speed_mb=round(rng.uniform(0, 100), 2), download_speed_mb=round(rng.uniform(0, 100), 2)),
+            {name: InterfaceStats(*(counter((name, field), 2 ** 20) for field in range(8)),
+                                  *(round(rng.uniform(0, 10 ** 6), 2) for _ in range(8)))
+             for name in nic_names},
+            LoadStats(load_1min=round(rng.uniform(0, cores), 2), load_5min=round(rng.uniform(0, cores), 2),
+                      load_15min=round(rng.uniform(0, cores), 2), cpu_count=cores),
+            UptimeStats(seconds=123456 + tick * 2, boot_time=1_700_000_000.0),
+            ConnectionStats(established=counter("established", 3)),
+        ]
+        return Snapshot(1_700_000_000.0 + tick * 2, layout, values)
+
+    return generate
+
+def _retain(make: Callable[[int], Any], count: int) -> List[Any]:
+    return [make(tick) for tick in range(count)]
+
+def measure(make: Callable[[int], Any], count: int) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    retained = _retain(make, count)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for snapshot in retained:
+        flatten_snapshot(dict(snapshot.sections()) if isinstance(snapshot, Snapshot) else
+                         {k: v for k, v in snapshot.items() if k != "timestamp"})
+    flatten_seconds = time.perf_counter() - started
+    return {
+        "bytes_per_snapshot": used / count,
+        "flatten_us": flatten_seconds / count * 1e6,
+        "_retained": retained,
+    }
+
+def verify(slotted: List[Snapshot], plain: List[Dict[str, Any]]) -> Optional[str]:
+    """两种结构展开后的序列和数值必须完全相同"""
+    for index, (snapshot, legacy) in enumerate(zip(slotted, plain)):
+        flat = flatten_snapshot(dict(snapshot.sections()))
+        expected = flatten_snapshot({k: v for k, v in legacy.items() if k != "timestamp"})
+        if flat != expected:
+            missing = sorted(set(expected) ^ set(flat))[:3] or \
+                [name for name in expected if expected[name] != flat[name]][:3]
+            return f"快照 {index} 展开结果不同: {missing}"
+        if snapshot.to_dict() != legacy:
+            return f"快照 {index} to_dict() 与嵌套字典不同"
+    return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="快照数据模型内存基准")
+    parser.add_argument("--snapshots", type=int, default=1800, help="保留的快照份数（默认 1 小时，2 秒间隔）")
+    parser.add_argument("--cores", type=int, default=16)
+    parser.add_argument("--disks", type=int, default=4)
+    parser.add_argument("--nics", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    def host():
+        return build_host(args.seed, args.cores, args.disks, args.nics)
+
+    # 两种模型使用同一个确定性生成器，嵌套字典由记录转换而来，转换后记录即被释放
+    slotted_host = host()
+    plain_host = host()
+    slotted = measure(slotted_host, args.snapshots)
+    plain = measure(lambda tick: plain_host(tick).to_dict(), args.snapshots)
+
+    verify_host = host()
+    error = verify([verify_host(tick) for tick in range(min(args.snapshots, 100))],
+                   [snapshot.to_dict() for snapshot in _retain(host(), min(args.snapshots, 100))])
+    sample = slotted["_retained"][0]
+    print(f"{args.snapshots} 份快照，每份 {len(flatten_snapshot(dict(sample.sections())))} 个数值"
+          f"（{args.cores} 核、{args.disks} 块磁盘、{args.nics} 块网卡）")
+    print(f"{'':<14}{'内存 B/份':>12}{'展开 us/份':>12}")
+    for label, result in (("嵌套字典", plain), ("Snapshot", slotted)):
+        print(f"{label:<14}{result['bytes_per_snapshot']:>12.0f}{result['flatten_us']:>12.1f}")
+    print(f"内存减少 {1 - slotted['bytes_per_snapshot'] / plain['bytes_per_snapshot']:.0%}，"
+          f"保留 {args.snapshots} 份共节省 {(plain['bytes_per_snapshot'] - slotted['bytes_per_snapshot']) * args.snapshots / 2 ** 20:.1f} MiB")
+    if error:
+        print(f"结果不一致: {error}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
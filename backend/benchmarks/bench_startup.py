@@ -0,0 +1,151 @@
+# 启动耗时基准
+
+"""
+启动耗时基准
+每次测量都启动全新的 Python 进程（工作目录为临时目录，主机数据来自合成主机 HOST_PROVIDER=synthetic）：
+- import_ms: 导入 main 模块的耗时
+- first_200_ms: 从启动 uvicorn 进程到 /api/status 第一次返回 200 的耗时
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --save-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "startup.json")
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import main
+print((time.perf_counter() - started) * 1000)
+"""
+
+SERVER_SCRIPT = """
+import sys
+import uvicorn
+uvicorn.run("main:app", host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["HOST_PROVIDER"] = "synthetic"
+    return env
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import(workdir: str) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=workdir, env=_env(),
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_first_200(workdir: str, path: str = "/api/status", timeout: float = 30.0) -> float:
+    """启动服务进程并轮询接口，返回第一次得到 200 的耗时（毫秒）"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port)], cwd=workdir, env=_env(),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                if process.poll() is not None:
+                    raise RuntimeError(f"服务进程意外退出，返回码 {process.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError(f"{timeout} 秒内未收到 200 响应")
+    finally:
+        process.terminate()
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "median": round(statistics.median(values), 1),
+        "min": round(min(values), 1),
+        "max": round(max(values), 1),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="启动耗时基准")
+    parser.add_argument("--runs", type=int, default=5, help="测量次数（取中位数）")
+    parser.add_argument("--path", default="/api/status", help="首个请求的接口路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的相对退化比例")
+    parser.add_argument("--min-delta-ms", type=float, default=30.0, help="低于该绝对差值的变化不算退化")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="monitor-startup-")
+    # 先运行一次生成字节码缓存，避免第一次测量包含编译时间
+    measure_import(workdir)
+
+    import_ms = [measure_import(workdir) for _ in range(args.runs)]
+    first_200_ms = [measure_first_200(workdir, args.path) for _ in range(args.runs)]
+    results = {"import_ms": summarize(import_ms), "first_200_ms": summarize(first_200_ms)}
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {"runs": args.runs, "path": args.path},
+        "results": results,
+    }
+
+    for name, stats in results.items():
+        print(f"{name:<14} median {stats['median']:>8.1f}  min {stats['min']:>8.1f}  max {stats['max']:>8.1f}")
+
+    baseline_path = os.path.abspath(args.baseline)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存: {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print("未找到基线文件，跳过比较（使用 --save-baseline 创建）")
+        return 0
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        current, previous = stats["median"], base["median"]
+        if current > previous * (1 + args.threshold) and current - previous > args.min_delta_ms:
+            regressions.append(f"{name}: {previous:.1f}ms -> {current:.1f}ms")
+    if regressions:
+        print(f"启动耗时退化（阈值 {args.threshold:.0%}）：")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"与基线相比无明显退化（阈值 {args.threshold:.0%}）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
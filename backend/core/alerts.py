@@ -0,0 +1,485 @@
+# 告警规则引擎
+
+"""
+服务端告警规则引擎
+在后台采样器的每个周期上增量求值，不回扫历史数据。
+
+规则语法：
+    <表达式> <比较符> <阈值> [for <持续时间>] [clear <比较符> <阈值>]
+表达式：
+    cpu.usage_percent                  当前值
+    rate(network.bytes_sent)           计数器每秒增量
+    avg(cpu.usage_percent, 5m)         窗口聚合，支持 avg / min / max / sum
+示例：
+    cpu.usage_percent > 90 for 2m clear < 80
+    rate(network.bytes_sent) > 100000000
+    avg(disk_devices.sda.util_percent, 1m) >= 95 for 30s
+
+- 每条规则每个周期只做 O(1) 的更新；表达式相同的规则共享同一个数据源
+- 窗口聚合使用滑动窗口累加和与单调队列，均摊 O(1)
+- hysteresis：条件满足并持续 for 指定时长才进入 firing，
+  之后直到 clear 条件满足（未配置时为条件不再满足）才恢复
+- 只在状态变化（firing / resolved）时发送通知，持续告警可按 repeat_interval 重复提醒
+- 通知通过有界异步队列投递到 webhook 或本地命令，队列满时丢弃最旧的通知
+"""
+
+import asyncio
+import json
+import operator
+import re
+import shlex
+import urllib.request
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from core.exceptions import ConfigError
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_NUMBER = r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_RULE_RE = re.compile(
+    rf"^\s*(?P<expr>.+?)\s*(?P<op>>=|<=|==|!=|>|<)\s*(?P<threshold>{_NUMBER})"
+    r"(?:\s+for\s+(?P<for>\d+(?:\.\d+)?[smhd]?))?"
+    rf"(?:\s+clear\s+(?P<clear_op>>=|<=|==|!=|>|<)\s*(?P<clear_threshold>{_NUMBER}))?\s*$"
+)
+_FUNC_RE = re.compile(r"^(?P<func>\w+)\(\s*(?P<series>[^,()\s]+)\s*(?:,\s*(?P<window>\d+(?:\.\d+)?[smhd]?)\s*)?\)$")
+
+def _parse_number(text: str) -> float:
+    """解析阈值，格式错误时抛出 ConfigError（而不是 ValueError）"""
+    try:
+        return float(text)
+    except ValueError:
+        raise ConfigError(f"无效的阈值: {text}") from None
+
+def parse_duration(text: str) -> float:
+    """解析 30s / 2m / 1h 形式的时长，纯数字按秒处理"""
+    text = text.strip()
+    unit = text[-1]
+    if unit in _DURATION_UNITS:
+        return float(text[:-1]) * _DURATION_UNITS[unit]
+    return float(text)
+
+class SeriesSource:
+    """当前值"""
+
+    __slots__ = ("series", "value")
+
+    def __init__(self, series: str):
+        self.series = series
+        self.value: Optional[float] = None
+
+    def update(self, flat: Dict[str, float], timestamp: float):
+        self.value = flat.get(self.series)
+
+class RateSource:
+    """计数器每秒增量（计数器重置时本周期无值）"""
+
+    __slots__ = ("series", "value", "_last")
+
+    def __init__(self, series: str):
+        self.series = series
+        self.value: Optional[float] = None
+        self._last: Optional[Tuple[float, float]] = None
+
+    def update(self, flat: Dict[str, float], timestamp: float):
+        current = flat.get(self.series)
+        if current is None:
+            self.value = None
+            return
+        last = self._last
+        self._last = (timestamp, current)
+        if last is None or timestamp <= last[0] or current < last[1]:
+            self.value = None
+        else:
+            self.value = (current - last[1]) / (timestamp - last[0])
+
+class WindowSource:
+    """
+    时间窗口聚合
+    avg/sum 维护窗口内累加和，min/max 维护单调队列，每个周期均摊 O(1)
+    采样间隔可变（自适应采样）时 avg 按时间加权：每个值的权重为它与上一个样本的时间间隔，
+    避免高频采样期间的样本在平均值中占比过高
+    """
+
+    __slots__ = ("series", "func", "window", "value", "_points", "_sum", "_weighted_sum",
+                 "_weight", "_last_timestamp", "_extremes")
+
+    def __init__(self, func: str, series: str, window: float):
+        self.series = series
+        self.func = func
+        self.window = window
+        self.value: Optional[float] = None
+        self._points: deque = deque()
+        self._sum = 0.0
+        self._weighted_sum = 0.0
+        self._weight = 0.0
+        self._last_timestamp: Optional[float] = None
+        self._extremes: deque = deque()
+
+    def update(self, flat: Dict[str, float], timestamp: float):
+        current = flat.get(self.series)
+        if current is not None:
+            last = self._last_timestamp
+            weight = min(max(timestamp - last, 0.0), self.window) if last is not None else 0.0
+            self._last_timestamp = timestamp
+            self._points.append((timestamp, current, weight))
+            self._sum += current
+            self._weighted_sum += current * weight
+            self._weight += weight
+            if self.func in ("min", "max"):
+                better = operator.le if self.func == "min" else operator.ge
+                extremes = self._extremes
+                while extremes and better(current, extremes[-1][1]):
+                    extremes.pop()
+                extremes.append((timestamp, current))
+
+        cutoff = timestamp - self.window
+        points = self._points
+        while points and points[0][0] < cutoff:
+            _, value, weight = points.popleft()
+            self._sum -= value
+            self._weighted_sum -= value * weight
+            self._weight -= weight
+        extremes = self._extremes
+        while extremes and extremes[0][0] < cutoff:
+            extremes.popleft()
+
+        if not points:
+            self.value = None
+            self._sum = self._weighted_sum = self._weight = 0.0
+        elif self.func == "avg":
+            # 窗口内只有一个样本（或时间戳相同）时退化为普通平均
+            if self._weight > 1e-9:
+                self.value = self._weighted_sum / self._weight
+            else:
+                self.value = self._sum / len(points)
+        elif self.func == "sum":
+            self.value = self._sum
+        else:
+            self.value = extremes[0][1]
+
+Source = Union[SeriesSource, RateSource, WindowSource]
+
+class AlertRule:
+    """单条告警规则及其状态"""
+
+    __slots__ = ("name", "text", "severity", "source", "op", "threshold", "for_seconds",
+                 "clear_op", "clear_threshold", "state", "pending_since", "fired_at",
+                 "last_notified", "value")
+
+    def __init__(self, name: str, text: str, source: Source, op: str, threshold: float,
+                 for_seconds: float = 0.0, clear_op: Optional[str] = None,
+                 clear_threshold: Optional[float] = None, severity: str = "warning"):
+        self.name = name
+        self.text = text
+        self.severity = severity
+        self.source = source
+        self.op = op
+        self.threshold = threshold
+        self.for_seconds = for_seconds
+        self.clear_op = clear_op
+        self.clear_threshold = clear_threshold
+        self.state = "inactive"  # inactive / pending / firing
+        self.pending_since: Optional[float] = None
+        self.fired_at: Optional[float] = None
+        self.last_notified = 0.0
+        self.value: Optional[float] = None
+
+    def _cleared(self, value: float) -> bool:
+        if self.clear_op is None:
+            return not OPERATORS[self.op](value, self.threshold)
+        return OPERATORS[self.clear_op](value, self.clear_threshold)
+
+    def evaluate(self, timestamp: float, repeat_interval: float = 0.0) -> Optional[str]:
+        """根据数据源的当前值推进状态机，需要通知时返回事件类型"""
+        value = self.source.value
+        self.value = value
+        if value is None:
+            return None
+
+        if self.state == "firing":
+            if self._cleared(value):
+                self.state = "inactive"
+                self.pending_since = None
+                self.fired_at = None
+                return "resolved"
+            if repeat_interval > 0 and timestamp - self.last_notified >= repeat_interval:
+                return "firing"
+            return None
+
+        if OPERATORS[self.op](value, self.threshold):
+            if self.pending_since is None:
+                self.pending_since = timestamp
+                self.state = "pending"
+            if timestamp - self.pending_since >= self.for_seconds:
+                self.state = "firing"
+                self.fired_at = timestamp
+                return "firing"
+        else:
+            self.state = "inactive"
+            self.pending_since = None
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "rule": self.text,
+            "severity": self.severity,
+            "state": self.state,
+            "value": self.value,
+            "pending_since": self.pending_since,
+            "fired_at": self.fired_at,
+        }
+
+class AlertNotifier:
+    """通过有界异步队列把告警事件投递到 webhook 或本地命令"""
+
+    def __init__(self, webhook_url: str = "", command: str = "", queue_size: int = 1000,
+                 timeout: float = 5.0):
+        self.webhook_url = webhook_url
+        self.command = command
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "dropped": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.webhook_url or self.command)
+
+    def enqueue(self, event: Dict[str, Any]):
+        """可在任意线程调用（采样器在线程池中通知监听器），入队转交给事件循环执行"""
+        loop = self._loop
+        if not self.enabled or loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._put(event)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._put, event)
+            except RuntimeError:
+                # 事件循环已关闭（应用退出过程中）
+                pass
+
+    def _put(self, event: Dict[str, Any]):
+        """在事件循环中执行；队列满时丢弃最旧的事件"""
+        if self._queue is None:
+            return
+        if self._queue.full():
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self.stats["dropped"] += 1
+        self._queue.put_nowait(event)
+        self.stats["queued"] += 1
+
+    def _post_webhook(self, payload: bytes):
+        request = urllib.request.Request(
+            self.webhook_url, data=payload, method="POST",
+            headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def _run_command(self, payload: bytes):
+        process = await asyncio.create_subprocess_exec(
+            *shlex.split(self.command),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            await asyncio.wait_for(process.communicate(payload), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        if process.returncode != 0:
+            raise RuntimeError(f"告警命令退出码 {process.returncode}")
+
+    async def _deliver(self, event: Dict[str, Any]):
+        payload = json.dumps(event, ensure_ascii=False).encode("utf-8")
+        if self.webhook_url:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._post_webhook, payload)
+        if self.command:
+            await self._run_command(payload)
+
+    async def _worker(self):
+        while True:
+            event = await self._queue.get()
+            try:
+                await self._deliver(event)
+                self.stats["sent"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"告警通知发送失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(maxsize=max(1, self.queue_size))
+            self._task = self._loop.create_task(self._worker())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._queue = None
+            self._loop = None
+
+class AlertEngine:
+    """告警规则引擎"""
+
+    def __init__(self, notifier: Optional[AlertNotifier] = None, repeat_interval: float = 0.0,
+                 hostname: str = ""):
+        self.notifier = notifier if notifier is not None else AlertNotifier()
+        self.repeat_interval = repeat_interval
+        self.hostname = hostname
+        self.rules: List[AlertRule] = []
+        self._sources: Dict[Tuple, Source] = {}
+
+    def _get_source(self, expr: str) -> Source:
+        expr = expr.strip()
+        match = _FUNC_RE.match(expr)
+        if match is None:
+            if not re.match(r"^[^\s()<>=!,]+$", expr):
+                raise ConfigError(f"无法解析的告警表达式: {expr}")
+            key: Tuple = ("value", expr)
+        else:
+            func, series, window = match.group("func"), match.group("series"), match.group("window")
+            if func == "rate":
+                if window:
+                    raise ConfigError(f"rate() 不接受窗口参数: {expr}")
+                key = ("rate", series)
+            elif func in ("avg", "min", "max", "sum"):
+                if not window:
+                    raise ConfigError(f"{func}() 需要窗口参数，如 {func}({series}, 5m)")
+                key = (func, series, parse_duration(window))
+            else:
+                raise ConfigError(f"不支持的告警函数: {func}")
+
+        source = self._sources.get(key)
+        if source is None:
+            if key[0] == "value":
+                source = SeriesSource(key[1])
+            elif key[0] == "rate":
+                source = RateSource(key[1])
+            else:
+                source = WindowSource(key[0], key[1], key[2])
+            self._sources[key] = source
+        return source
+
+    def add_rule(self, text: str, name: Optional[str] = None, severity: str = "warning") -> AlertRule:
+        """解析并添加一条规则，语法错误时抛出 ConfigError"""
+        match = _RULE_RE.match(text)
+        if match is None:
+            raise ConfigError(f"无法解析的告警规则: {text}")
+        rule = AlertRule(
+            name=name or text.strip(),
+            text=text.strip(),
+            source=self._get_source(match.group("expr")),
+            op=match.group("op"),
+            threshold=_parse_number(match.group("threshold")),
+            for_seconds=parse_duration(match.group("for")) if match.group("for") else 0.0,
+            clear_op=match.group("clear_op"),
+            clear_threshold=_parse_number(match.group("clear_threshold")) if match.group("clear_threshold") else None,
+            severity=severity,
+        )
+        self.rules.append(rule)
+        return rule
+
+    def load_rules(self, rules: List[Union[str, Dict[str, Any]]]):
+        """从配置加载规则，配置项可以是规则字符串或 {"rule", "name", "severity"} 字典"""
+        for item in rules:
+            try:
+                if isinstance(item, dict):
+                    self.add_rule(item["rule"], name=item.get("name"), severity=item.get("severity", "warning"))
+                else:
+                    self.add_rule(str(item))
+            except (ConfigError, KeyError) as e:
+                print(f"忽略无效的告警规则 {item!r}: {e}")
+
+    def evaluate(self, flat: Dict[str, float], timestamp: float) -> List[Dict[str, Any]]:
+        """在一个采样周期上求值所有规则，返回需要发送的事件"""
+        for source in self._sources.values():
+            source.update(flat, timestamp)
+
+        events = []
+        for rule in self.rules:
+            kind = rule.evaluate(timestamp, self.repeat_interval)
+            if kind is None:
+                continue
+            rule.last_notified = timestamp
+            events.append({
+                "status": kind,
+                "alert": rule.name,
+                "rule": rule.text,
+                "severity": rule.severity,
+                "value": rule.value,
+                "threshold": rule.threshold,
+                "host": self.hostname,
+                "timestamp": timestamp,
+            })
+        return events
+
+    def on_sample(self, snapshot: Dict[str, Any], flat: Dict[str, float]):
+        """采样器监听器"""
+        for event in self.evaluate(flat, snapshot["timestamp"]):
+            self.notifier.enqueue(event)
+
+    @property
+    def active(self) -> bool:
+        """是否有规则处于 pending / firing（自适应采样据此加快采样）"""
+        return any(rule.state != "inactive" for rule in self.rules)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "rules": [rule.to_dict() for rule in self.rules],
+            "firing": [rule.name for rule in self.rules if rule.state == "firing"],
+            "notifier": dict(self.notifier.stats),
+        }
+
+# 全局告警引擎实例（首次使用时按配置创建）
+_alert_engine: Optional[AlertEngine] = None
+
+def get_alert_engine() -> AlertEngine:
+    """获取全局告警引擎实例"""
+    global _alert_engine
+    if _alert_engine is None:
+        import socket
+        from core.config import settings
+        _alert_engine = AlertEngine(
+            notifier=AlertNotifier(
+                webhook_url=settings.alert_webhook_url,
+                command=settings.alert_command,
+                queue_size=settings.alert_queue_size,
+                timeout=settings.alert_timeout,
+            ),
+            repeat_interval=settings.alert_repeat_interval,
+            hostname=socket.gethostname(),
+        )
+        _alert_engine.load_rules(settings.alert_rules)
+    return _alert_engine
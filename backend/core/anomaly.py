@@ -0,0 +1,207 @@
+# 异常检测
+
+"""
+流式异常检测
+对采样器输出的所有数值序列维护指数加权均值/方差（EWMA），每个周期用 NumPy
+在连续数组上一次性向量化更新，z-score 超过阈值的序列被标记为异常。
+
+- 衰减系数按实际采样间隔计算（alpha = 1 - exp(-dt / tau)），采样间隔变化时半衰期不变
+- 可选季节性基线：按 bucket_seconds 把时间分桶（如 24 个小时桶），
+  每个桶维护独立的均值/方差，桶内样本足够后优先用桶基线判断
+- 累计计数器（bytes_sent 等）持续增长，不适合做 z-score，默认按名称排除
+"""
+
+import fnmatch
+import math
+import re
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_EXCLUDE = [
+    "*bytes_sent", "*bytes_recv", "*packets_sent", "*packets_recv",
+    "*.read_bytes", "*.write_bytes", "*.read_count", "*.write_count",
+    "*usage_usec", "*.total", "*core_count", "*cpu_count", "*max_freq",
+    "*today_*", "*in_flight", "*busy_time", "*.errin", "*.errout", "*.dropin", "*.dropout",
+    "uptime.*", "*.burst.samples", "*.burst.interval_ms", "*_total_usec",
+    "*.totals.*",
+]
+
+class AnomalyDetector:
+    """基于 EWMA / z-score 的向量化异常检测器"""
+
+    def __init__(self, halflife: float = 600.0, threshold: float = 4.0, warmup: int = 30,
+                 min_std: float = 1e-3, seasonal_buckets: int = 0, bucket_seconds: float = 3600.0,
+                 exclude: Optional[List[str]] = None, max_events: int = 500, capacity: int = 256):
+        self.tau = halflife / math.log(2)
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_std = min_std
+        self.seasonal_buckets = seasonal_buckets
+        self.bucket_seconds = bucket_seconds
+        patterns = DEFAULT_EXCLUDE if exclude is None else exclude
+        self._exclude_re = re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+
+        self.names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._capacity = 0
+        self._mean = self._var = self._count = None
+        self._s_mean = self._s_var = self._s_count = None
+        self._grow(capacity)
+
+        # 上一次的序列布局（快照字段顺序通常每个周期都一样，命中时免去逐个查找下标）
+        self._layout_keys: tuple = ()
+        self._layout_idx = np.empty(0, dtype=np.intp)
+        self._layout_keep = np.empty(0, dtype=bool)
+        self._last_timestamp: Optional[float] = None
+
+        self.current: List[Dict[str, Any]] = []
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+
+    def _grow(self, capacity: int):
+        """扩容状态数组（按倍数增长，保持连续存储）"""
+        old = self._capacity
+        self._capacity = capacity
+
+        def resize(array, shape, fill):
+            grown = np.full(shape, fill, dtype=np.float64)
+            if array is not None:
+                grown[..., :old] = array
+            return grown
+
+        self._mean = resize(self._mean, capacity, 0.0)
+        self._var = resize(self._var, capacity, 0.0)
+        self._count = resize(self._count, capacity, 0.0)
+        if self.seasonal_buckets:
+            shape = (self.seasonal_buckets, capacity)
+            self._s_mean = resize(self._s_mean, shape, 0.0)
+            self._s_var = resize(self._s_var, shape, 0.0)
+            self._s_count = resize(self._s_count, shape, 0.0)
+
+    def _excluded(self, name: str) -> bool:
+        return bool(self._exclude_re and self._exclude_re.match(name))
+
+    def _relayout(self, keys: tuple):
+        """快照字段发生变化时重新计算 字段 -> 状态数组下标 的映射"""
+        idx = np.empty(len(keys), dtype=np.intp)
+        keep = np.zeros(len(keys), dtype=bool)
+        for position, name in enumerate(keys):
+            index = self._index.get(name)
+            if index is None:
+                if self._excluded(name):
+                    idx[position] = 0
+                    continue
+                index = len(self.names)
+                if index >= self._capacity:
+                    self._grow(self._capacity * 2)
+                self._index[name] = index
+                self.names.append(name)
+            idx[position] = index
+            keep[position] = True
+        self._layout_keys = keys
+        self._layout_idx = idx[keep]
+        self._layout_keep = keep
+
+    def update(self, flat: Dict[str, float], timestamp: float) -> List[Dict[str, Any]]:
+        """用一个周期的数据更新所有序列，返回本周期检测到的异常"""
+        with self._lock:
+            keys = tuple(flat)
+            if keys != self._layout_keys:
+                self._relayout(keys)
+            values = np.fromiter(flat.values(), dtype=np.float64, count=len(keys))[self._layout_keep]
+            idx = self._layout_idx
+
+            if self._last_timestamp is None or timestamp <= self._last_timestamp:
+                alpha = 1.0 if self._last_timestamp is None else 0.0
+            else:
+                alpha = 1.0 - math.exp(-(timestamp - self._last_timestamp) / self.tau)
+            self._last_timestamp = timestamp
+
+            mean = self._mean[idx]
+            var = self._var[idx]
+            count = self._count[idx]
+
+            # 先用更新前的基线计算 z-score
+            std = np.sqrt(var)
+            np.maximum(std, self.min_std, out=std)
+            diff = values - mean
+            zscore = diff / std
+            ready = count >= self.warmup
+
+            if self.seasonal_buckets:
+                bucket = int(timestamp // self.bucket_seconds) % self.seasonal_buckets
+                s_mean = self._s_mean[bucket, idx]
+                s_var = self._s_var[bucket, idx]
+                s_count = self._s_count[bucket, idx]
+                s_ready = s_count >= self.warmup
+                s_std = np.maximum(np.sqrt(s_var), self.min_std)
+                s_diff = values - s_mean
+                zscore = np.where(s_ready, s_diff / s_std, zscore)
+                ready |= s_ready
+                self._update_stats(self._s_mean, self._s_var, self._s_count, (bucket, idx),
+                                   s_mean, s_var, s_count, s_diff, alpha)
+
+            self._update_stats(self._mean, self._var, self._count, idx, mean, var, count, diff, alpha)
+
+            flagged = np.flatnonzero(ready & (np.abs(zscore) > self.threshold))
+            anomalies = []
+            for position in flagged:
+                index = idx[position]
+                anomalies.append({
+                    "series": self.names[index],
+                    "value": float(values[position]),
+                    "mean": round(float(mean[position]), 4),
+                    "std": round(float(math.sqrt(var[position])), 4),
+                    "zscore": round(float(zscore[position]), 2),
+                    "timestamp": timestamp,
+                })
+            self.current = anomalies
+            self.events.extend(anomalies)
+            return anomalies
+
+    @staticmethod
+    def _update_stats(mean_array, var_array, count_array, where, mean, var, count, diff, alpha):
+        """
+        指数加权均值/方差的增量更新：mean += a*d, var = (1-a)*(var + d*a*d)
+        样本较少时 a 取 max(a, 1/(n+1))，相当于先用普通均值/方差起步，避免方差从 0 开始被低估
+        """
+        alpha = np.maximum(alpha, 1.0 / (count + 1.0))
+        increment = alpha * diff
+        mean_array[where] = mean + increment
+        var_array[where] = (1.0 - alpha) * (var + diff * increment)
+        count_array[where] = count + 1
+
+    def on_sample(self, snapshot: Dict[str, Any], flat: Dict[str, float]):
+        """采样器监听器：检测结果同时写入快照"""
+        snapshot["anomalies"] = self.update(flat, snapshot["timestamp"])
+
+    def get_status(self, limit: int = 100) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self.events)[-limit:] if limit > 0 else []
+            return {
+                "series_tracked": len(self.names),
+                "threshold": self.threshold,
+                "current": list(self.current),
+                "recent": events,
+            }
+
+# 全局异常检测实例（首次使用时按配置创建）
+_anomaly_detector: Optional[AnomalyDetector] = None
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """获取全局异常检测实例"""
+    global _anomaly_detector
+    if _anomaly_detector is None:
+        from core.config import settings
+        _anomaly_detector = AnomalyDetector(
+            halflife=settings.anomaly_halflife,
+            threshold=settings.anomaly_threshold,
+            warmup=settings.anomaly_warmup,
+            seasonal_buckets=settings.anomaly_seasonal_buckets,
+            bucket_seconds=settings.anomaly_bucket_seconds,
+            exclude=settings.anomaly_exclude,
+        )
+    return _anomaly_detector
@@ -0,0 +1,431 @@
+# 压缩时间序列
+
+"""
+Gorilla 风格的压缩时间序列
+每个序列由若干个数据块组成，最后一个块可追加，写满 chunk_points 个点后封存为不可变的 bytes。
+
+时间戳：按 resolution 取整后做二阶差分（delta-of-delta），变长编码：
+    0                        '0'
+    [-8, 7]                  '10'    + 4 位
+    [-128, 127]              '110'   + 8 位
+    [-8192, 8191]            '1110'  + 14 位
+    [-2^23, 2^23 - 1]        '11110' + 24 位
+    其他                     '11111' + 64 位
+采样间隔稳定时每个时间戳只占 1 位；采样器的调度抖动在 1ms 左右，按 10ms 取整时绝大多数时间戳只占 1 位。
+
+数值有两种编码，在块创建时选定：
+- XOR：与上一个值的 IEEE 754 位模式做异或，相同时 1 位，否则只保存有效位
+  （前导零和尾随零落在上一个窗口内时复用窗口，否则写 5 位前导零数 + 6 位有效位长度）
+- 整数：值乘以量化倍数后取整，按与时间戳相同的方式做二阶差分编码。
+  配置了量化步长的序列（如百分比按 0.01 量化）总是使用整数编码；
+  未配置时，整数（计数器、核心数等）和最多两位小数的值（采集器 round 过的速率、负载等）也使用无损的整数编码，
+  遇到当前块无法表示的值时封存当前块，按新值重新选择编码
+
+解码按块顺序进行，范围查询只解码与时间范围重叠的块。
+已封存块的 NumPy 解码结果由 DecodeCache 缓存（供 core/query.py 使用）。
+"""
+
+import math
+import struct
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+_DOUBLE = struct.Struct(">d")
+_UINT64 = struct.Struct(">Q")
+# 块序列化头：格式版本 | 编码方式 | 点数 | 时间分辨率 | 量化倍数（0 表示 XOR）| 首个时间戳 | 最后时间戳
+_CHUNK_HEADER = struct.Struct("<BBHdddd")
+_CHUNK_VERSION = 1
+
+MODE_XOR = 0
+MODE_INT = 1
+
+_MASK64 = (1 << 64) - 1
+
+# 未配置量化步长时尝试的无损整数倍数
+_LOSSLESS_SCALES = (1.0, 100.0)
+
+# 二阶差分的分桶：(前缀, 前缀位数, 数据位数)；差分为 0 时只写 1 位 "0"
+_BUCKETS = (
+    (0b10, 2, 4),
+    (0b110, 3, 8),
+    (0b1110, 4, 14),
+    (0b11110, 5, 24),
+)
+
+def _float_bits(value: float) -> int:
+    return _UINT64.unpack(_DOUBLE.pack(value))[0]
+
+def _bits_float(bits: int) -> float:
+    return _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+class BitWriter:
+    """按位写入，满 64 位后批量写入 bytearray"""
+
+    __slots__ = ("buffer", "_acc", "_bits")
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, nbits: int):
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._bits += nbits
+        if self._bits >= 64:
+            nbytes = self._bits >> 3
+            rest = self._bits & 7
+            self.buffer += (self._acc >> rest).to_bytes(nbytes, "big")
+            self._acc &= (1 << rest) - 1
+            self._bits = rest
+
+    def write_signed(self, value: int):
+        """二阶差分的变长编码"""
+        if value == 0:
+            self.write(0, 1)
+            return
+        for prefix, prefix_bits, data_bits in _BUCKETS:
+            limit = 1 << (data_bits - 1)
+            if -limit <= value < limit:
+                self.write((prefix << data_bits) | (value & ((1 << data_bits) - 1)), prefix_bits + data_bits)
+                return
+        self.write(0b11111, 5)
+        self.write(value & _MASK64, 64)
+
+    def getvalue(self) -> bytes:
+        pad = -self._bits & 7
+        tail = (self._acc << pad).to_bytes((self._bits + pad) >> 3, "big") if self._bits else b""
+        return bytes(self.buffer) + tail
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.buffer) + ((self._bits + 7) >> 3)
+
+class BitReader:
+    """按位读取：整个块转成一个大整数，按位置移位取值"""
+
+    __slots__ = ("_value", "_remaining")
+
+    def __init__(self, data: bytes):
+        self._value = int.from_bytes(data, "big")
+        self._remaining = len(data) * 8
+
+    def read(self, nbits: int) -> int:
+        self._remaining -= nbits
+        return (self._value >> self._remaining) & ((1 << nbits) - 1)
+
+    def read_bit(self) -> int:
+        self._remaining -= 1
+        return (self._value >> self._remaining) & 1
+
+    def read_signed(self) -> int:
+        if not self.read_bit():
+            return 0
+        for _, prefix_bits, data_bits in _BUCKETS:
+            if not self.read_bit():
+                value = self.read(data_bits)
+                return value - (1 << data_bits) if value >= 1 << (data_bits - 1) else value
+        value = self.read(64)
+        return value - (1 << 64) if value >= 1 << 63 else value
+
+class Chunk:
+    """一个数据块：可追加直到封存"""
+
+    __slots__ = ("mode", "scale", "resolution", "per_second", "count", "first_timestamp", "last_timestamp",
+                 "_writer", "_data", "_prev_ts", "_prev_ts_delta", "_prev_value", "_prev_value_delta",
+                 "_leading", "_trailing")
+
+    def __init__(self, mode: int, resolution: float = 0.001, scale: float = 0.0):
+        self.mode = mode
+        self.scale = scale  # 整数编码时 值 = 整数 / scale
+        self.resolution = resolution
+        self.per_second = round(1.0 / resolution)  # 时间戳以 1/per_second 秒为单位取整
+        self.count = 0
+        self.first_timestamp = 0.0
+        self.last_timestamp = 0.0
+        self._writer: Optional[BitWriter] = BitWriter()
+        self._data: Optional[bytes] = None
+        self._prev_ts = 0
+        self._prev_ts_delta = 0
+        self._prev_value = 0
+        self._prev_value_delta = 0
+        self._leading = -1
+        self._trailing = 0
+
+    @property
+    def sealed(self) -> bool:
+        return self._writer is None
+
+    def append(self, timestamp: float, value: float):
+        """追加一个点（时间戳需单调不减；整数编码的块由调用方保证值可以表示）"""
+        writer = self._writer
+        ts = round(timestamp * self.per_second)
+        if self.count == 0:
+            writer.write(ts & _MASK64, 64)
+            self.first_timestamp = ts / self.per_second
+        else:
+            delta = ts - self._prev_ts
+            writer.write_signed(delta - self._prev_ts_delta)
+            self._prev_ts_delta = delta
+        self._prev_ts = ts
+        self.last_timestamp = ts / self.per_second
+
+        if self.mode == MODE_INT:
+            current = round(value * self.scale)
+            if self.count == 0:
+                writer.write(current & _MASK64, 64)
+            else:
+                delta = current - self._prev_value
+                writer.write_signed(delta - self._prev_value_delta)
+                self._prev_value_delta = delta
+            self._prev_value = current
+        else:
+            bits = _float_bits(value)
+            if self.count == 0:
+                writer.write(bits, 64)
+            else:
+                xor = bits ^ self._prev_value
+                if xor == 0:
+                    writer.write(0, 1)
+                else:
+                    leading = min(64 - xor.bit_length(), 31)
+                    trailing = (xor & -xor).bit_length() - 1
+                    if self._leading >= 0 and leading >= self._leading and trailing >= self._trailing:
+                        # 有效位落在上一个窗口内：'10' + 窗口内的位
+                        width = 64 - self._leading - self._trailing
+                        writer.write(0b10, 2)
+                        writer.write(xor >> self._trailing, width)
+                    else:
+                        width = 64 - leading - trailing
+                        writer.write(0b11, 2)
+                        writer.write(leading, 5)
+                        writer.write(width & 63, 6)  # 64 记为 0
+                        writer.write(xor >> trailing, width)
+                        self._leading = leading
+                        self._trailing = trailing
+            self._prev_value = bits
+        self.count += 1
+
+    def seal(self):
+        """封存：编码器状态释放，只保留 bytes"""
+        if self._writer is not None:
+            self._data = self._writer.getvalue()
+            self._writer = None
+
+    @property
+    def data(self) -> bytes:
+        return self._data if self._writer is None else self._writer.getvalue()
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._data) if self._writer is None else self._writer.nbytes
+
+    def decode(self) -> Tuple[List[float], List[float]]:
+        """解码全部点，返回 (时间戳列表, 数值列表)"""
+        reader = BitReader(self.data)
+        count = self.count
+        timestamps: List[float] = []
+        values: List[float] = []
+        if not count:
+            return timestamps, values
+        per_second = self.per_second
+        read = reader.read
+        read_bit = reader.read_bit
+        read_signed = reader.read_signed
+
+        ts = read(64)
+        if ts >= 1 << 63:
+            ts -= 1 << 64
+        ts_delta = 0
+        if self.mode == MODE_INT:
+            scale = self.scale
+            current = read(64)
+            if current >= 1 << 63:
+                current -= 1 << 64
+            delta = 0
+            timestamps.append(ts / per_second)
+            values.append(current / scale)
+            for _ in range(count - 1):
+                ts_delta += read_signed()
+                ts += ts_delta
+                delta += read_signed()
+                current += delta
+                timestamps.append(ts / per_second)
+                values.append(current / scale)
+        else:
+            bits = read(64)
+            leading = trailing = 0
+            timestamps.append(ts / per_second)
+            values.append(_bits_float(bits))
+            for _ in range(count - 1):
+                ts_delta += read_signed()
+                ts += ts_delta
+                if read_bit():
+                    if read_bit():
+                        leading = read(5)
+                        width = read(6) or 64
+                        trailing = 64 - leading - width
+                    else:
+                        width = 64 - leading - trailing
+                    bits ^= read(width) << trailing
+                timestamps.append(ts / per_second)
+                values.append(_bits_float(bits))
+        return timestamps, values
+
+    def arrays(self) -> Tuple[Any, Any]:
+        """解码为 NumPy 数组 (时间戳, 值)"""
+        import numpy as np
+        timestamps, values = self.decode()
+        return np.array(timestamps, dtype=np.float64), np.array(values, dtype=np.float64)
+
+    def to_bytes(self) -> bytes:
+        """序列化（块头 + 数据），可用于写入磁盘分段"""
+        return _CHUNK_HEADER.pack(_CHUNK_VERSION, self.mode, self.count, self.resolution, self.scale,
+                                  self.first_timestamp, self.last_timestamp) + self.data
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "Chunk":
+        version, mode, count, resolution, scale, first, last = _CHUNK_HEADER.unpack_from(payload)
+        if version != _CHUNK_VERSION:
+            raise ValueError(f"不支持的数据块版本: {version}")
+        chunk = cls(mode, resolution, scale)
+        chunk.count = count
+        chunk.first_timestamp = first
+        chunk.last_timestamp = last
+        chunk._data = bytes(payload[_CHUNK_HEADER.size:])
+        chunk._writer = None
+        return chunk
+
+class CompressedSeries:
+    """按块压缩的单个序列"""
+
+    __slots__ = ("quantum", "resolution", "chunk_points", "_chunks")
+
+    def __init__(self, quantum: float = 0.0, resolution: float = 0.001, chunk_points: int = 256):
+        self.quantum = quantum  # 量化步长，0 表示不量化
+        self.resolution = resolution
+        self.chunk_points = chunk_points
+        self._chunks: Deque[Chunk] = deque()
+
+    def _int_scale(self, value: float, current: float = 0.0) -> float:
+        """
+        value 可以用整数编码时返回量化倍数，否则返回 0（改用 XOR 编码）
+        未配置量化步长时：整数用倍数 1，最多两位小数的值用倍数 100（采集器大多已 round 到两位），均无损；
+        current 为当前块的倍数，值在当前块中可以无损表示时优先沿用
+        """
+        if not math.isfinite(value):
+            return 0.0
+        if self.quantum:
+            scale = round(1.0 / self.quantum, 12)
+            return scale if abs(value * scale) < 2 ** 62 else 0.0
+        for scale in ((current,) if current else ()) + _LOSSLESS_SCALES:
+            scaled = value * scale
+            if abs(scaled) < 2 ** 53 and round(scaled) / scale == value:
+                return scale
+        return 0.0
+
+    def _new_chunk(self, value: float) -> Chunk:
+        scale = self._int_scale(value)
+        chunk = Chunk(MODE_INT, self.resolution, scale) if scale else Chunk(MODE_XOR, self.resolution)
+        self._chunks.append(chunk)
+        return chunk
+
+    def append(self, timestamp: float, value: float):
+        value = float(value)
+        chunks = self._chunks
+        chunk = chunks[-1] if chunks else None
+        if chunk is None or chunk.sealed:
+            chunk = self._new_chunk(value)
+        elif chunk.count >= self.chunk_points or timestamp < chunk.last_timestamp or (
+                chunk.mode == MODE_INT and self._int_scale(value, chunk.scale) != chunk.scale):
+            # 块已满、时间戳回退，或整数块遇到无法用整数表示的值：封存后新建
+            chunk.seal()
+            chunk = self._new_chunk(value)
+        chunk.append(timestamp, value)
+
+    def __len__(self) -> int:
+        return sum(chunk.count for chunk in self._chunks)
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        return self._chunks[0].first_timestamp if self._chunks else None
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return self._chunks[-1].last_timestamp if self._chunks else None
+
+    @property
+    def nbytes(self) -> int:
+        """压缩数据占用的字节数（不含 Python 对象开销）"""
+        return sum(chunk.nbytes for chunk in self._chunks)
+
+    def evict(self, cutoff: float):
+        """删除全部点都早于 cutoff 的数据块（块内部分过期的点由查询过滤）"""
+        chunks = self._chunks
+        while chunks and chunks[0].last_timestamp < cutoff:
+            chunks.popleft()
+
+    def chunks(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Chunk]:
+        """与 [start, end] 重叠的数据块"""
+        for chunk in list(self._chunks):
+            if start is not None and chunk.last_timestamp < start:
+                continue
+            if end is not None and chunk.first_timestamp > end:
+                break
+            yield chunk
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """返回 [start, end] 范围内的 (时间戳, 值) 列表"""
+        points: List[Tuple[float, float]] = []
+        for chunk in self.chunks(start, end):
+            timestamps, values = chunk.decode()
+            if (start is None or chunk.first_timestamp >= start) and (end is None or chunk.last_timestamp <= end):
+                points.extend(zip(timestamps, values))
+            else:
+                points.extend(
+                    point for point in zip(timestamps, values)
+                    if (start is None or point[0] >= start) and (end is None or point[0] <= end)
+                )
+        return points
+
+class DecodeCache:
+    """
+    已封存数据块 NumPy 解码结果的 LRU 缓存，按字节数限制大小（封存的块不可变，缓存无需失效）
+    预聚合的封存块（core/rollup.py）按 (块, 字段) 共用同一个缓存
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, Tuple[Any, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def arrays(self, chunk: Chunk) -> Tuple[Any, Any]:
+        """返回块的 (时间戳, 值) 数组，未封存的块直接解码"""
+        if not chunk.sealed:
+            return chunk.arrays()
+        return self.get(chunk, chunk.arrays)
+
+    def get(self, key: Any, decode: Callable[[], Tuple[Any, ...]]) -> Tuple[Any, ...]:
+        """key 对应的解码结果（NumPy 数组的元组），未缓存时调用 decode()；key 对应的数据必须不可变"""
+        if self.max_bytes <= 0:
+            return decode()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+        arrays = decode()
+        size = sum(array.nbytes for array in arrays)
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = arrays
+                self.nbytes += size
+            while self.nbytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= sum(array.nbytes for array in evicted)
+        return arrays
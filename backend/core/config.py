@@ -1,6 +1,7 @@
 # 配置管理模块
 
 import os
+import tempfile
 try:
     from pydantic_settings import BaseSettings
 except ImportError:
@@ -25,6 +26,113 @@ class Settings(BaseSettings):
     
     # 监控配置
     monitor_interval: int = 2  # 数据采集间隔（秒）
+    history_retention_seconds: int = 3600  # 内存历史数据保留时长（秒）
+    history_compression: bool = True  # 历史数据使用 delta-of-delta / XOR 压缩编码
+    history_quantize: Optional[dict] = None  # 序列 glob -> 量化步长，None 表示使用 core/history.py 中的默认规则
+    history_timestamp_resolution: float = 0.01  # 压缩历史中时间戳的精度（秒）
+    history_rollup_seconds: float = 60  # 预聚合间隔（秒），步长不小于该值的查询直接使用预聚合行；0 表示关闭，保留时长不足 360 个间隔时自动关闭
+    history_decode_cache_mb: float = 32  # 已封存数据块解码结果的缓存上限（MB）
+    gpu_interval: float = 10  # GPU 信息（nvidia-smi）的最小刷新间隔（秒）
+    connections_interval: float = 10  # 网络连接数（net_connections）的最小刷新间隔（秒）
+    
+    # 自适应采样：指标快速变化或有告警时缩短间隔，平稳时逐步拉长
+    adaptive_sampling: bool = False
+    sampling_min_interval: float = 0.25  # 最短采样间隔（秒）
+    sampling_max_interval: float = 10  # 最长采样间隔（秒）
+    sampling_change_threshold: float = 5.0  # 监视序列相邻两次采样变化超过该值（百分点）时加快采样
+    sampling_watch: Optional[list] = None  # 监视的序列（glob），None 表示使用 core/scheduler.py 中的默认规则
+    agent_cpu_budget_percent: float = 0  # 采集器 CPU 预算（单核百分比），超出时优先限流开销最大的采集器；0 表示不限制
+    
+    # CPU 高频采样（/proc/stat），每个采样周期汇总 min/mean/p95/max，捕捉被 1 秒平均掉的短时满载
+    cpu_burst_enabled: bool = True
+    cpu_burst_interval: float = 0.1  # 高频采样间隔（秒），建议 0.05~0.1
+    cpu_burst_window: float = 60  # 环形数组保留的时长（秒），应不短于最长采样间隔
+    
+    # 采集模式：background 常驻周期采样；on_demand 有请求时才采样，空闲后自动停止
+    collection_mode: str = "background"
+    on_demand_max_age: float = 2.0  # 按需模式下快照的复用窗口（秒）
+    on_demand_idle_timeout: float = 60  # 按需模式下多久没有请求后停止周期采样（秒）
+    on_demand_prime_window: float = 0.5  # 空闲后首次采集的基准间隔（秒），决定首个 CPU 使用率的统计窗口
+    
+    # 多 worker 配置（workers > 1 时只有一个 worker 运行采样器，通过共享内存发布快照）
+    workers: int = 1  # python main.py 启动的 uvicorn worker 数
+    shared_snapshot: bool = False  # 直接使用 uvicorn --workers 启动时需设为 true
+    shared_snapshot_name: str = "server-monitor"  # 共享内存名称
+    shared_snapshot_slot_size: int = 1024 * 1024  # 每个槽位（/api/status、/metrics）的容量（字节）
+    shared_snapshot_lock: str = os.path.join(tempfile.gettempdir(), "server-monitor-sampler.lock")  # 采样进程选举锁文件
+    shared_snapshot_proxy_socket: str = os.path.join(tempfile.gettempdir(), "server-monitor-sampler.sock")  # 历史、告警等接口转发到采样进程的 Unix socket
+    
+    # cgroup 采集配置
+    cgroup_root: str = "/sys/fs/cgroup"
+    cgroup_full_rescan_ticks: int = 30  # 每隔多少个采集周期完整扫描一次 cgroup 目录树
+    pressure_cgroups: Optional[list] = None  # 采集 PSI 的 cgroup（相对 cgroup_root 的路径，支持 glob），None 表示 systemd 顶层 slice
+    
+    # 文件系统采集配置（None 表示使用 monitor/filesystem_monitor.py 中的默认规则）
+    fs_exclude_types: Optional[list] = None  # 忽略的文件系统类型
+    fs_exclude_mountpoints: Optional[list] = None  # 忽略的挂载点（glob）
+    fs_statvfs_timeout: float = 2.0  # 单个挂载点 statvfs 超时（秒）
+    fs_workers: int = 8  # 并行执行 statvfs 的线程数
+    
+    # 磁盘扩展 I/O 统计配置
+    diskstats_exclude: Optional[list] = None  # 忽略的设备名（glob），None 表示忽略 loop/ram 等
+    diskstats_include_partitions: bool = False  # 是否统计分区（默认只统计整盘）
+    
+    # 网卡采集配置（None 表示使用 monitor/interfaces_monitor.py 中的默认规则）
+    interface_include: Optional[list] = None  # 单独输出的接口（glob），None 表示全部
+    interface_exclude: Optional[list] = None  # 不单独输出的接口（glob），None 表示忽略 lo、veth、cali 等
+    interface_groups: Optional[dict] = None  # 组名 -> glob 列表，输出组内全部接口的速率之和，如 {"pods": ["veth*", "cali*"]}
+    interface_info_interval: float = 60  # 接口地址、MTU、up/down 等信息的刷新间隔（秒），接口增删时立即刷新
+    
+    # 内核网络协议计数器（/proc/net/snmp、netstat、softnet_stat）采集配置
+    netstat_counters: Optional[dict] = None  # 前缀 -> 计数器名列表，如 {"TcpExt": ["ListenOverflows"]}，None 表示使用默认列表
+    netstat_per_cpu: bool = True  # 是否输出逐 CPU 的 softnet 速率
+    
+    # 硬件传感器（hwmon / thermal / RAPL）采集配置
+    sensors_sysfs_root: str = "/sys"  # sysfs 挂载点，容器中可指向宿主机的 /sys（如 /host/sys）
+    sensors_rescan_interval: float = 300  # 完整重新发现传感器的间隔（秒），热插拔在每个周期即可发现
+
+    # 主机数据源配置（monitor/providers.py、monitor/trace.py）
+    host_provider: str = "psutil"  # psutil（真实主机）、synthetic（确定性合成主机）或 replay（回放录制的采集结果）
+    synthetic_host: Optional[dict] = None  # 合成主机参数，如 {"cpus": 64, "nics": 500, "mounts": 2000, "gpus": 64, "workload": "bursty"}
+    trace_record_path: str = ""  # 非空时把每个采样周期的采集结果录制到该文件（gzip 压缩的 JSON Lines）
+    trace_replay_path: str = ""  # host_provider 为 replay 时回放的录制文件
+    trace_replay_speed: float = 1.0  # 回放倍速（1 为实时），0 表示每次采集前进一帧
+    trace_replay_loop: bool = True  # 回放到结尾后是否从头循环
+
+    # 告警配置
+    alert_rules: list = []  # 规则字符串或 {"rule", "name", "severity"}，如 "cpu.usage_percent > 90 for 2m clear < 80"
+    alert_webhook_url: str = ""  # 告警通知 webhook（POST JSON）
+    alert_command: str = ""  # 告警通知本地命令（事件 JSON 通过 stdin 传入）
+    alert_queue_size: int = 1000  # 通知队列长度，满时丢弃最旧的通知
+    alert_timeout: float = 5.0  # 单次通知超时（秒）
+    alert_repeat_interval: float = 0  # 持续告警的重复通知间隔（秒），0 表示不重复
+    
+    # 异常检测配置
+    anomaly_halflife: float = 600  # EWMA 半衰期（秒）
+    anomaly_threshold: float = 4.0  # z-score 阈值
+    anomaly_warmup: int = 30  # 序列至少积累多少个样本后才参与判断
+    anomaly_seasonal_buckets: int = 0  # 季节性基线分桶数（如 24 表示按小时），0 表示关闭
+    anomaly_bucket_seconds: float = 3600  # 每个季节性分桶的时长（秒）
+    anomaly_exclude: Optional[list] = None  # 不参与检测的序列（glob），None 表示排除累计计数器
+    
+    # 推送导出配置（host 为空表示不启用）
+    statsd_host: str = ""
+    statsd_port: int = 8125
+    statsd_mtu: int = 1432  # 单个 UDP 数据报的最大字节数
+    graphite_host: str = ""
+    graphite_port: int = 2003
+    exporter_prefix: str = "servers.{host}"  # 指标名前缀，{host} 替换为主机名
+    exporter_buffer_size: int = 100000  # 待发送行的缓冲上限，超出时丢弃最旧的行
+    exporter_flush_interval: float = 1.0  # 发送线程的最长等待间隔（秒）
+    
+    # 管理接口配置
+    admin_token: str = ""  # /api/self/profile 等管理接口的访问令牌，为空表示禁用这些接口
+    
+    # 性能分析配置
+    profiler_continuous: bool = False  # 是否常驻低频采样调用栈
+    profiler_continuous_interval: float = 0.1  # 常驻采样间隔（秒）
+    profiler_continuous_window: float = 600  # 常驻模式保留最近多少秒的聚合结果
+    profiler_max_stacks: int = 20000  # 每个时间桶最多保存的不同调用栈数量
     
     # CORS 配置
     cors_origins: list = ["*"]
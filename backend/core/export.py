@@ -0,0 +1,131 @@
+# 历史数据导出
+
+"""
+历史数据导出（CSV / Parquet）
+按序列、按数据块从 History 流式读取，每次只解码一个数据块，写出后即释放，
+导出一个月的数据也只占用固定大小的内存。
+
+输出为长表（每行一个点），按序列、时间排序：
+    timestamp, series, value
+CSV 的 timestamp 为 Unix 秒（pandas: pd.to_datetime(df.timestamp, unit="s")）；
+Parquet 的 timestamp 为毫秒精度的 UTC 时间戳，series 为字典编码，每 row_group_rows 行一个 row group。
+Parquet 需要 pyarrow（可选依赖，未安装时只能导出 CSV）。
+"""
+
+from typing import Iterator, List, Optional
+
+CSV_HEADER = b"timestamp,series,value\n"
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def resolve_series(history, patterns: List[str]) -> List[str]:
+    """展开名称和 glob，保持参数顺序并去重"""
+    names: List[str] = []
+    for pattern in patterns:
+        for name in history.match_series(pattern):
+            if name not in names:
+                names.append(name)
+    return names
+
+def export_csv(history, names: List[str], start: Optional[float] = None, end: Optional[float] = None,
+               buffer_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """逐块产生 CSV 内容，每次约 buffer_bytes 字节"""
+    yield CSV_HEADER
+    pending: List[str] = []
+    size = 0
+    for name in names:
+        label = f",{name},"
+        for timestamps, values in history.iter_arrays(name, start, end):
+            text = "".join([f"{timestamp:.3f}{label}{value!r}\n"
+                            for timestamp, value in zip(timestamps.tolist(), values.tolist())])
+            pending.append(text)
+            size += len(text)
+            if size >= buffer_bytes:
+                yield "".join(pending).encode()
+                pending.clear()
+                size = 0
+    if pending:
+        yield "".join(pending).encode()
+
+class _StreamSink:
+    """ParquetWriter 的输出目标：写入的内容暂存在内存，由生成器取走后清空"""
+
+    def __init__(self):
+        self.closed = False
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+def export_parquet(history, names: List[str], start: Optional[float] = None, end: Optional[float] = None,
+                   row_group_rows: int = 128 * 1024) -> Iterator[bytes]:
+    """逐个 row group 产生 Parquet 文件内容，需要 pyarrow"""
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("series", pa.dictionary(pa.int32(), pa.string())),
+        ("value", pa.float64()),
+    ])
+    dictionary = pa.array(names, type=pa.string())
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    timestamps_parts: List[np.ndarray] = []
+    values_parts: List[np.ndarray] = []
+    index_parts: List[np.ndarray] = []
+    rows = 0
+
+    def flush() -> bytes:
+        nonlocal rows
+        milliseconds = np.round(np.concatenate(timestamps_parts) * 1000).astype(np.int64)
+        table = pa.Table.from_arrays([
+            pa.array(milliseconds, type=pa.timestamp("ms", tz="UTC")),
+            pa.DictionaryArray.from_arrays(pa.array(np.concatenate(index_parts)), dictionary),
+            pa.array(np.concatenate(values_parts), type=pa.float64()),
+        ], schema=schema)
+        writer.write_table(table, row_group_size=rows)
+        timestamps_parts.clear()
+        values_parts.clear()
+        index_parts.clear()
+        rows = 0
+        return sink.take()
+
+    try:
+        for index, name in enumerate(names):
+            for timestamps, values in history.iter_arrays(name, start, end):
+                timestamps_parts.append(timestamps)
+                values_parts.append(values)
+                index_parts.append(np.full(len(values), index, dtype=np.int32))
+                rows += len(values)
+                if rows >= row_group_rows:
+                    yield flush()
+        if rows:
+            yield flush()
+    finally:
+        writer.close()
+    yield sink.take()
@@ -0,0 +1,311 @@
+# 推送式指标导出
+
+"""
+StatsD / Graphite 推送导出
+采样器每个周期把展开后的数值交给导出器，事件循环中只做一次入队；
+格式化和网络发送都在导出器自己的后台线程中完成。
+
+- StatsD：gauge 行（name:value|g）按 MTU 打包成 UDP 数据报批量发送
+- Graphite：plaintext 协议（name value timestamp），复用一条 TCP 长连接，断开后按退避重连
+- 待发送的行存放在有界缓冲区中，积压超过上限时丢弃最旧的行
+- NaN / ±inf 不是合法的 StatsD/Graphite 数值，格式化时跳过（计入 values_skipped）
+- 发送中途失败时只把尚未完整发出的行放回缓冲区，TCP 上不会重复发送已经发出的行
+"""
+
+import math
+import re
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+_INVALID_NAME_CHARS = re.compile(r"[^A-Za-z0-9_.\-]")
+
+def sanitize_name(name: str) -> str:
+    """指标名只保留 StatsD/Graphite 安全的字符"""
+    return _INVALID_NAME_CHARS.sub("_", name)
+
+def _format_value(value: float) -> str:
+    """数值的文本形式，调用方需先排除 NaN / ±inf"""
+    return str(int(value)) if value == int(value) else repr(value)
+
+class PartialSendError(OSError):
+    """一批行只发出了前 sent 行时抛出，其余行需要重新发送"""
+
+    def __init__(self, error: OSError, sent: int):
+        super().__init__(*error.args)
+        self.sent = sent
+
+class PushExporter(ABC):
+    """推送导出器基类：有界缓冲 + 后台发送线程，子类实现 format_lines 和 send_batch"""
+
+    kind = "push"
+
+    def __init__(self, host: str, port: int, prefix: str = "", buffer_size: int = 100000,
+                 flush_interval: float = 1.0):
+        self.host = host
+        self.port = port
+        self.prefix = sanitize_name(prefix.format(host=socket.gethostname())).strip(".")
+        self.buffer_size = max(1, buffer_size)
+        self.flush_interval = flush_interval
+        self.stats = {"lines_sent": 0, "batches_sent": 0, "lines_dropped": 0, "send_errors": 0,
+                      "snapshots_dropped": 0, "values_skipped": 0}
+
+        # 事件循环只往 _pending 里放 (时间戳, 展开后的数值)，格式化在发送线程里完成
+        # 发送线程长时间阻塞时只保留最近的快照，丢弃的数量计入 snapshots_dropped
+        self._pending: Deque[Tuple[float, Dict[str, float]]] = deque(maxlen=64)
+        self._buffer: Deque[str] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._name_cache: Dict[str, str] = {}
+
+    def on_sample(self, snapshot: Dict[str, Any], flat: Dict[str, float]):
+        """采样器监听器"""
+        pending = self._pending
+        if len(pending) == pending.maxlen:
+            self.stats["snapshots_dropped"] += 1
+        pending.append((snapshot["timestamp"], flat))
+        self._wakeup.set()
+
+    def _metric_name(self, name: str) -> str:
+        metric = self._name_cache.get(name)
+        if metric is None:
+            metric = sanitize_name(f"{self.prefix}.{name}" if self.prefix else name)
+            self._name_cache[name] = metric
+        return metric
+
+    def _finite(self, flat: Dict[str, float]) -> Iterator[Tuple[str, float]]:
+        """跳过 NaN / ±inf"""
+        skipped = 0
+        for key, value in flat.items():
+            if math.isfinite(value):
+                yield key, value
+            else:
+                skipped += 1
+        if skipped:
+            self.stats["values_skipped"] += skipped
+
+    @abstractmethod
+    def format_lines(self, timestamp: float, flat: Dict[str, float]) -> List[str]:
+        """把一个周期的数值格式化为待发送的行"""
+
+    def _buffer_lines(self, lines: List[str], front: bool = False):
+        """写入缓冲区，超出上限时丢弃最旧的行"""
+        with self._lock:
+            buffer = self._buffer
+            if front:
+                room = self.buffer_size - len(buffer)
+                if room < len(lines):
+                    self.stats["lines_dropped"] += len(lines) - max(0, room)
+                    lines = lines[len(lines) - max(0, room):]
+                buffer.extendleft(reversed(lines))
+                return
+            buffer.extend(lines)
+            overflow = len(buffer) - self.buffer_size
+            if overflow > 0:
+                self.stats["lines_dropped"] += overflow
+                for _ in range(overflow):
+                    buffer.popleft()
+
+    def _take_batch(self, max_lines: int) -> List[str]:
+        with self._lock:
+            count = min(max_lines, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    @abstractmethod
+    def send_batch(self, lines: List[str]):
+        """发送一批行，失败时抛出 OSError；已经发出前几行时抛出 PartialSendError"""
+
+    def flush(self):
+        """格式化待处理的快照并发送缓冲区中的全部行"""
+        while self._pending:
+            timestamp, flat = self._pending.popleft()
+            self._buffer_lines(self.format_lines(timestamp, flat))
+
+        while True:
+            batch = self._take_batch(1000)
+            if not batch:
+                return
+            try:
+                self.send_batch(batch)
+            except OSError as e:
+                self.stats["send_errors"] += 1
+                if self.stats["send_errors"] == 1 or self.stats["send_errors"] % 100 == 0:
+                    print(f"{self.kind} 指标推送失败: {e}")
+                # 尚未发出的行放回缓冲区头部，等待下一次发送
+                sent = getattr(e, "sent", 0)
+                self.stats["lines_sent"] += sent
+                self._buffer_lines(batch[sent:], front=True)
+                return
+            self.stats["lines_sent"] += len(batch)
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"{self.kind} 导出线程异常: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=f"{self.kind}-exporter", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        if self._thread is not None:
+            self._stopping = True
+            self._wakeup.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.close()
+
+    def close(self):
+        pass
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "type": self.kind,
+            "target": f"{self.host}:{self.port}",
+            "buffered_lines": buffered,
+            **self.stats,
+        }
+
+class StatsDExporter(PushExporter):
+    """StatsD gauge 导出（UDP，按 MTU 打包）"""
+
+    kind = "statsd"
+
+    def __init__(self, host: str, port: int = 8125, mtu: int = 1432, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.mtu = mtu
+        self._socket: Optional[socket.socket] = None
+        self._address = None
+
+    def format_lines(self, timestamp: float, flat: Dict[str, float]) -> List[str]:
+        name = self._metric_name
+        return [f"{name(key)}:{_format_value(value)}|g" for key, value in self._finite(flat)]
+
+    def send_batch(self, lines: List[str]):
+        if self._socket is None:
+            info = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_DGRAM)[0]
+            self._socket = socket.socket(info[0], socket.SOCK_DGRAM)
+            self._address = info[4]
+
+        packet: List[bytes] = []
+        size = 0
+        sent = 0  # 已经发出的数据报中包含的行数
+        try:
+            for line in lines:
+                data = line.encode("utf-8")
+                # 行之间用换行分隔，多行合并成一个不超过 MTU 的数据报
+                if packet and size + 1 + len(data) > self.mtu:
+                    self._socket.sendto(b"\n".join(packet), self._address)
+                    self.stats["batches_sent"] += 1
+                    sent += len(packet)
+                    packet, size = [], 0
+                size += len(data) + (1 if packet else 0)
+                packet.append(data)
+            if packet:
+                self._socket.sendto(b"\n".join(packet), self._address)
+                self.stats["batches_sent"] += 1
+        except OSError as e:
+            raise PartialSendError(e, sent) if sent else e
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+class GraphiteExporter(PushExporter):
+    """Graphite plaintext 导出（TCP 长连接）"""
+
+    kind = "graphite"
+
+    def __init__(self, host: str, port: int = 2003, connect_timeout: float = 5.0,
+                 max_backoff: float = 60.0, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+        self._socket: Optional[socket.socket] = None
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+
+    def format_lines(self, timestamp: float, flat: Dict[str, float]) -> List[str]:
+        name = self._metric_name
+        ts = int(timestamp)
+        return [f"{name(key)} {_format_value(value)} {ts}\n" for key, value in self._finite(flat)]
+
+    def _connect(self):
+        now = time.monotonic()
+        if now < self._next_attempt:
+            raise OSError("等待重连")
+        try:
+            self._socket = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._backoff = 0.0
+        except OSError:
+            self._backoff = min(self.max_backoff, max(1.0, self._backoff * 2))
+            self._next_attempt = now + self._backoff
+            raise
+
+    def send_batch(self, lines: List[str]):
+        if self._socket is None:
+            self._connect()
+        data = "".join(lines).encode("utf-8")
+        view = memoryview(data)
+        offset = 0
+        try:
+            while offset < len(data):
+                offset += self._socket.send(view[offset:])
+            self.stats["batches_sent"] += 1
+        except OSError as e:
+            self.close()
+            if not offset:
+                raise
+            # 连接断开时最后一行可能只发出了一部分，服务端会丢弃不完整的行，从这一行开始重发
+            sent = 0
+            position = 0
+            for line in lines:
+                position += len(line.encode("utf-8"))
+                if position > offset:
+                    break
+                sent += 1
+            raise PartialSendError(e, sent)
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+# 全局推送导出器列表（按配置创建）
+_push_exporters: Optional[List[PushExporter]] = None
+
+def get_push_exporters() -> List[PushExporter]:
+    """获取按配置启用的推送导出器"""
+    global _push_exporters
+    if _push_exporters is None:
+        from core.config import settings
+        common = {
+            "prefix": settings.exporter_prefix,
+            "buffer_size": settings.exporter_buffer_size,
+            "flush_interval": settings.exporter_flush_interval,
+        }
+        _push_exporters = []
+        if settings.statsd_host:
+            _push_exporters.append(StatsDExporter(settings.statsd_host, settings.statsd_port,
+                                                  mtu=settings.statsd_mtu, **common))
+        if settings.graphite_host:
+            _push_exporters.append(GraphiteExporter(settings.graphite_host, settings.graphite_port, **common))
+    return _push_exporters
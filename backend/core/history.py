@@ -0,0 +1,271 @@
+# 历史数据存储
+
+"""
+内存中的指标历史
+采样器每个周期把快照展开成 "cpu.usage_percent"、"disk_devices.sda.util_percent"
+这样的点分名称，逐序列保存 (时间戳, 值)。过期数据按时间而不是按点数淘汰，
+采样间隔变化时保留时长保持不变。
+
+默认使用压缩编码保存（见 benchmarks/bench_history.py），时间戳按 10ms 取整，
+百分比类序列默认按 0.01 量化，其余序列无损保存。
+arrays() / rollups() 以 NumPy 数组提供原始点和预聚合行，供查询引擎（core/query.py）使用。
+"""
+
+import fnmatch
+import itertools
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.compressed_series import CompressedSeries, DecodeCache
+from core.rollup import MIN_ROWS, RollupSeries
+from core.snapshot import Record
+
+# 默认量化规则：序列名 glob -> 量化步长
+DEFAULT_QUANTIZE = {
+    "*percent*": 0.01,
+    "cpu.per_cpu.*": 0.01,
+    "cpu.burst.*": 0.01,
+}
+
+def flatten_snapshot(snapshot: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """把嵌套快照（字典或 core/snapshot.py 的记录）展开成 点分名称 -> 数值，非数值字段（字符串、布尔值等）被忽略"""
+    flat = {}
+    stack = [(prefix, snapshot)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, Record):
+            # 记录的字段大多是数值，直接写入，不经过栈
+            for key, item in zip(value.__slots__, value._values(value)):
+                if type(item) is int or type(item) is float:
+                    flat[f"{path}.{key}" if path else key] = float(item)
+                elif item is not None:
+                    stack.append((f"{path}.{key}" if path else key, item))
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                stack.append((f"{path}.{key}" if path else str(key), item))
+        elif isinstance(value, (list, tuple)):
+            for index, item in enumerate(value):
+                stack.append((f"{path}.{index}", item))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+class History:
+    """
+    按序列保存的内存历史数据
+    compress=True 时每个序列使用 Gorilla 风格的压缩编码（core/compressed_series.py），
+    匹配 quantize 中 glob 的序列按对应步长量化（如百分比保留两位小数）；
+    rollup_seconds > 0 且保留时长不少于 MIN_ROWS 个间隔时，每个序列同时按该间隔预聚合（core/rollup.py）
+    """
+
+    def __init__(self, retention_seconds: float = 3600, compress: bool = False,
+                 quantize: Optional[Dict[str, float]] = None, chunk_points: int = 256,
+                 resolution: float = 0.01, rollup_seconds: float = 0.0,
+                 decode_cache_bytes: int = 32 * 1024 * 1024):
+        self.retention_seconds = retention_seconds
+        self.compress = compress
+        self.resolution = resolution
+        self.chunk_points = chunk_points
+        # 保留时长内的预聚合行太少时，预聚合比原始点还占内存，查询也快不了多少
+        self.rollup_seconds = rollup_seconds if rollup_seconds > 0 and \
+            retention_seconds >= MIN_ROWS * rollup_seconds else 0.0
+        self.decode_cache = DecodeCache(decode_cache_bytes)
+        self._quantize = [(re.compile(fnmatch.translate(pattern)), step)
+                          for pattern, step in (quantize or {}).items()]
+        self._series: Dict[str, Any] = {}
+        self._rollups: Dict[str, RollupSeries] = {}
+        self._cutoff = float("-inf")
+        self._lock = threading.Lock()
+
+    def _new_series(self, name: str):
+        if not self.compress:
+            return deque()
+        quantum = next((step for pattern, step in self._quantize if pattern.match(name)), 0.0)
+        return CompressedSeries(quantum=quantum, resolution=self.resolution, chunk_points=self.chunk_points)
+
+    def append(self, timestamp: float, values: Dict[str, float]):
+        """追加一个周期的全部序列值，并淘汰超出保留时长的数据"""
+        cutoff = timestamp - self.retention_seconds
+        with self._lock:
+            self._cutoff = cutoff
+            series = self._series
+            if self.compress:
+                for name, value in values.items():
+                    points = series.get(name)
+                    if points is None:
+                        points = series[name] = self._new_series(name)
+                    points.append(timestamp, value)
+                    points.evict(cutoff)
+            else:
+                for name, value in values.items():
+                    points = series.get(name)
+                    if points is None:
+                        points = series[name] = deque()
+                    points.append((timestamp, value))
+                    while points[0][0] < cutoff:
+                        points.popleft()
+
+            if self.rollup_seconds:
+                rollups = self._rollups
+                for name, value in values.items():
+                    rollup = rollups.get(name)
+                    if rollup is None:
+                        rollup = rollups[name] = RollupSeries(self.rollup_seconds)
+                    rollup.add(timestamp, value)
+                    rollup.evict(cutoff)
+
+            # 已经不再上报的序列（如被拔出的磁盘）在数据全部过期后删除
+            if len(series) > len(values):
+                for name in [n for n, points in series.items() if self._last_timestamp(points) < cutoff]:
+                    del series[name]
+                    self._rollups.pop(name, None)
+
+    def _last_timestamp(self, points) -> float:
+        if self.compress:
+            return points.last_timestamp
+        return points[-1][0]
+
+    def series_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._series)
+
+    def match_series(self, pattern: str) -> List[str]:
+        """名称或 glob 匹配到的序列"""
+        with self._lock:
+            if any(char in pattern for char in "*?["):
+                return sorted(fnmatch.filter(self._series, pattern))
+            return [pattern] if pattern in self._series else []
+
+    def query(self, name: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """返回 [start, end] 范围内的 (时间戳, 值) 列表"""
+        with self._lock:
+            points = self._series.get(name)
+            if not points:
+                return []
+            if self.compress:
+                # 数据块整块淘汰，块内已过期的点在这里过滤
+                start = self._cutoff if start is None else max(start, self._cutoff)
+                return points.query(start, end)
+            return [
+                point for point in points
+                if (start is None or point[0] >= start) and (end is None or point[0] <= end)
+            ]
+
+    def query_many(self, names: Iterable[str], start: Optional[float] = None,
+                   end: Optional[float] = None) -> Dict[str, List[Tuple[float, float]]]:
+        return {name: self.query(name, start, end) for name in names}
+
+    @staticmethod
+    def _in_range(keys, start: Optional[float], end: Optional[float]):
+        mask = keys == keys
+        if start is not None:
+            mask &= keys >= start
+        if end is not None:
+            mask &= keys <= end
+        return mask
+
+    @staticmethod
+    def _sorted(keys, *columns):
+        """时钟回拨时块之间的时间戳可能乱序，按时间戳稳定排序"""
+        import numpy as np
+        if len(keys) > 1 and (np.diff(keys) < 0).any():
+            order = np.argsort(keys, kind="stable")
+            return tuple(column[order] for column in (keys,) + columns)
+        return (keys,) + columns
+
+    def arrays(self, name: str, start: Optional[float] = None, end: Optional[float] = None):
+        """返回 [start, end] 范围内的 NumPy 数组 (时间戳, 值)，按时间戳排序"""
+        import numpy as np
+        with self._lock:
+            points = self._series.get(name)
+            if not points:
+                return np.zeros(0), np.zeros(0)
+            if not self.compress:
+                data = np.array(points, dtype=np.float64)
+                timestamps, values = data[:, 0], data[:, 1]
+                parts = None
+            else:
+                start = self._cutoff if start is None else max(start, self._cutoff)
+                chunks = list(points.chunks(start, end))
+                # 未封存的块仍在追加，在锁内解码
+                tail = [chunks.pop().arrays()] if chunks and not chunks[-1].sealed else []
+        if self.compress:
+            parts = [self.decode_cache.arrays(chunk) for chunk in chunks] + tail
+            if not parts:
+                return np.zeros(0), np.zeros(0)
+            timestamps = np.concatenate([part[0] for part in parts])
+            values = np.concatenate([part[1] for part in parts])
+        mask = self._in_range(timestamps, start, end)
+        return self._sorted(timestamps[mask], values[mask])
+
+    def iter_arrays(self, name: str, start: Optional[float] = None, end: Optional[float] = None,
+                    batch: int = 4096):
+        """
+        逐块产生 [start, end] 范围内的 NumPy 数组 (时间戳, 值)，按存储顺序
+        已封存的块在锁外逐个解码（不进入解码缓存），导出长时间范围时内存占用与总点数无关
+        """
+        import numpy as np
+        with self._lock:
+            points = self._series.get(name)
+            if not points:
+                return
+            if self.compress:
+                start = self._cutoff if start is None else max(start, self._cutoff)
+                chunks = list(points.chunks(start, end))
+                tail = chunks.pop().arrays() if chunks and not chunks[-1].sealed else None
+            else:
+                snapshot = list(points)
+        if self.compress:
+            parts = (chunk.arrays() for chunk in chunks)
+            if tail is not None:
+                parts = itertools.chain(parts, (tail,))
+        else:
+            parts = (np.array(snapshot[offset:offset + batch], dtype=np.float64).T
+                     for offset in range(0, len(snapshot), batch))
+        for timestamps, values in parts:
+            mask = self._in_range(timestamps, start, end)
+            if mask.any():
+                yield timestamps[mask], values[mask]
+
+    def rollups(self, name: str, start: Optional[float] = None, end: Optional[float] = None,
+                fields: Optional[Iterable[str]] = None):
+        """
+        第一个点在 [start, end] 内的预聚合行，(字段数, 行数) 的新数组，字段顺序见 core/rollup.py 的 FIELDS
+        fields 为需要的字段（None 表示全部），只解压这些字段，其余为 NaN；未启用预聚合时返回 None
+        """
+        if not self.rollup_seconds:
+            return None
+        import numpy as np
+        from core.rollup import FIELDS, INDEX
+        with self._lock:
+            rollup = self._rollups.get(name)
+            if rollup is None:
+                return np.zeros((len(FIELDS), 0))
+            if self.compress:
+                start = self._cutoff if start is None else max(start, self._cutoff)
+            selection = rollup.select(start, end)
+        # 封存块不可变，在锁外解压
+        rows = RollupSeries.decode(selection, start, end, fields, self.decode_cache.get)
+        if end is not None and rows.shape[1] and rows[INDEX["end"], -1] > end:
+            # end 所在的预聚合区间包含 end 之后的点，这一行改用原始点重新计算
+            edge = RollupSeries(self.rollup_seconds)
+            for timestamp, value in zip(*(column.tolist() for column in
+                                          self.arrays(name, max(rows[INDEX["timestamp"], -1], start or 0), end))):
+                edge.add(timestamp, value)
+            rows = np.concatenate((rows[:, :-1], edge.columns()), axis=1)
+        return rows
+
+    def memory_usage(self) -> Dict[str, int]:
+        """点数、编码后数据的字节数（未压缩时按每点 16 字节估算）、预聚合行和解码缓存的字节数"""
+        with self._lock:
+            points = sum(len(series) for series in self._series.values())
+            if self.compress:
+                encoded = sum(series.nbytes for series in self._series.values())
+            else:
+                encoded = points * 16
+            rollup = sum(series.nbytes for series in self._rollups.values())
+            return {"series": len(self._series), "points": points, "bytes": encoded,
+                    "rollup_bytes": rollup, "decode_cache_bytes": self.decode_cache.nbytes}
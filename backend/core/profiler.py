@@ -0,0 +1,143 @@
+# 采样式性能分析
+
+"""
+采样式性能分析器
+后台线程按固定间隔读取 sys._current_frames()，记录所有线程（除自身外）的调用栈，
+输出 flamegraph.pl / speedscope 可直接使用的折叠栈格式：
+
+    线程名;函数 (文件);函数 (文件) 次数
+
+选择线程采样而不是信号（SIGPROF）：信号处理函数只能在主线程执行，
+拿不到线程池中采集器的栈，而且会打断正在进行的系统调用。
+
+- 按需模式：/api/self/profile?seconds=30 期间临时启动一个高频采样器
+- 常驻模式：低频采样，按时间分桶保存最近 N 分钟的聚合结果，桶数和每桶栈数都有上限
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# 超过上限的新栈统一计入该条目
+_OVERFLOW_KEY = ("[other]",)
+
+class StackSampler:
+    """基于线程的调用栈采样器"""
+
+    def __init__(self, interval: float = 0.01, max_stacks: int = 20000,
+                 bucket_seconds: float = 0, max_buckets: int = 1):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.bucket_seconds = bucket_seconds
+        self.samples = 0
+
+        self._buckets: Deque[Tuple[float, Dict[tuple, int]]] = deque(maxlen=max(1, max_buckets))
+        # 代码对象 -> 标签的缓存，会持有代码对象的引用，每次采样结束和常驻模式每次换桶时清空
+        self._labels: Dict[object, str] = {}
+        self._thread_names: Dict[int, str] = {}
+        self._names_updated = 0.0
+        self._root = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(self._root):
+                filename = filename[len(self._root):]
+            else:
+                filename = os.path.basename(filename)
+            label = f"{code.co_name} ({filename})"
+            self._labels[code] = label
+        return label
+
+    def _refresh_thread_names(self, now: float):
+        if now - self._names_updated >= 1.0:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._names_updated = now
+
+    def sample(self):
+        """采集一次所有线程的调用栈"""
+        now = time.time()
+        self._refresh_thread_names(now)
+        own = threading.get_ident()
+        stacks: List[tuple] = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(self._thread_names.get(ident, f"thread-{ident}"))
+            labels.reverse()
+            stacks.append(tuple(labels))
+
+        with self._lock:
+            if not self._buckets or (self.bucket_seconds and now - self._buckets[-1][0] >= self.bucket_seconds):
+                self._buckets.append((now, {}))
+                self._labels.clear()
+            counts = self._buckets[-1][1]
+            for stack in stacks:
+                if stack not in counts and len(counts) >= self.max_stacks:
+                    stack = _OVERFLOW_KEY
+                counts[stack] = counts.get(stack, 0) + 1
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"调用栈采样失败: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._labels.clear()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def collapse(self, since: Optional[float] = None) -> str:
+        """合并 since 之后的分桶，输出折叠栈文本（按次数降序）"""
+        merged: Dict[tuple, int] = {}
+        with self._lock:
+            for started, counts in self._buckets:
+                if since is not None and started + self.bucket_seconds < since:
+                    continue
+                for stack, count in counts.items():
+                    merged[stack] = merged.get(stack, 0) + count
+        ordered = sorted(merged.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in ordered)
+
+# 常驻低频采样器（按配置启用）
+_continuous_profiler: Optional[StackSampler] = None
+
+def get_continuous_profiler() -> Optional[StackSampler]:
+    """获取常驻采样器，未启用时返回 None"""
+    global _continuous_profiler
+    from core.config import settings
+    if _continuous_profiler is None and settings.profiler_continuous:
+        bucket_seconds = 60.0
+        _continuous_profiler = StackSampler(
+            interval=settings.profiler_continuous_interval,
+            max_stacks=settings.profiler_max_stacks,
+            bucket_seconds=bucket_seconds,
+            max_buckets=max(1, int(settings.profiler_continuous_window // bucket_seconds)),
+        )
+    return _continuous_profiler
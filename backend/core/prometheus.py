@@ -0,0 +1,293 @@
+# Prometheus / OpenMetrics 导出
+
+"""
+OpenMetrics 文本格式导出
+每个采样周期由采样器监听器根据最新快照渲染一次完整的 /metrics 文本并缓存为 bytes，
+抓取请求只返回缓存内容，不触发任何采集。
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+PREFIX = "server_"
+
+_INF = float("inf")
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (_INF, -_INF):
+        # OpenMetrics 要求 +Inf / -Inf，repr 得到的 inf 会被严格的解析器拒绝
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    return ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+
+class MetricsBuilder:
+    """按指标族累积 OpenMetrics 文本"""
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self._lines: List[str] = []
+
+    def family(self, name: str, metric_type: str, help_text: str,
+               samples: Iterable[Tuple[Dict[str, Any], Any]], unit: str = ""):
+        """
+        写入一个指标族
+        samples 为 (标签字典, 值) 序列；counter 类型的样本名自动加 _total 后缀
+        """
+        full_name = self.prefix + name
+        sample_name = full_name + "_total" if metric_type == "counter" else full_name
+        lines = []
+        for labels, value in samples:
+            if value is None:
+                continue
+            if labels:
+                lines.append(f"{sample_name}{{{_format_labels(labels)}}} {_format_value(value)}")
+            else:
+                lines.append(f"{sample_name} {_format_value(value)}")
+        if not lines:
+            return
+        self._lines.append(f"# TYPE {full_name} {metric_type}")
+        if unit:
+            self._lines.append(f"# UNIT {full_name} {unit}")
+        self._lines.append(f"# HELP {full_name} {help_text}")
+        self._lines.extend(lines)
+
+    def gauge(self, name: str, help_text: str, value: Any, unit: str = ""):
+        self.family(name, "gauge", help_text, [({}, value)], unit)
+
+    def histogram(self, name: str, help_text: str, series: Iterable[Tuple[Dict[str, Any], Any]], unit: str = ""):
+        """
+        写入直方图指标族
+        series 为 (标签字典, 直方图) 序列，直方图需提供 bounds/counts/count/sum（见 core/selfmetrics.py）
+        """
+        full_name = self.prefix + name
+        lines = []
+        for labels, hist in series:
+            prefix = _format_labels(labels) + "," if labels else ""
+            cumulative = 0
+            for index, count in enumerate(hist.counts):
+                cumulative += count
+                le = repr(float(hist.bounds[index])) if index < len(hist.bounds) else "+Inf"
+                lines.append(f'{full_name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = "{" + _format_labels(labels) + "}" if labels else ""
+            lines.append(f"{full_name}_count{suffix} {hist.count}")
+            lines.append(f"{full_name}_sum{suffix} {_format_value(hist.sum)}")
+        if not lines:
+            return
+        self._lines.append(f"# TYPE {full_name} histogram")
+        if unit:
+            self._lines.append(f"# UNIT {full_name} {unit}")
+        self._lines.append(f"# HELP {full_name} {help_text}")
+        self._lines.extend(lines)
+
+    def render(self) -> bytes:
+        return ("\n".join(self._lines + ["# EOF"]) + "\n").encode("utf-8")
+
+def _per_key(section: Dict[str, Dict[str, Any]], label: str, field: str):
+    return [({label: key}, values.get(field)) for key, values in section.items()]
+
+def render_snapshot(snapshot: Dict[str, Any], extra_sections: Iterable[Callable[[MetricsBuilder], None]] = ()) -> bytes:
+    """把采样器快照渲染为 OpenMetrics 文本"""
+    b = MetricsBuilder()
+
+    cpu = snapshot.get("cpu") or {}
+    b.gauge("cpu_usage_percent", "CPU usage across all cores.", cpu.get("usage_percent"))
+    b.family("cpu_core_usage_percent", "gauge", "CPU usage per logical core.",
+             [({"core": index}, value) for index, value in enumerate(cpu.get("per_cpu") or [])])
+    b.gauge("cpu_logical_cores", "Number of logical CPU cores.", cpu.get("core_count"))
+    b.gauge("cpu_frequency_mhz", "Current CPU frequency.", cpu.get("current_freq"))
+    burst = cpu.get("burst")
+    if burst:
+        b.family("cpu_burst_usage_percent", "gauge", "CPU usage statistics over high-rate samples in the last tick.",
+                 [({"stat": stat}, value) for stat, value in burst["total"].items()])
+        b.family("cpu_burst_core_usage_percent", "gauge", "Per-core CPU usage statistics over high-rate samples.",
+                 [({"core": index, "stat": stat}, value)
+                  for index, core in enumerate(burst["per_core"]) for stat, value in core.items()])
+        b.family("cpu_burst_time_percent", "gauge", "Share of CPU time spent in steal, iowait and irq.",
+                 [({"mode": mode, "stat": stat}, value)
+                  for mode in ("steal", "iowait", "irq") for stat, value in burst[mode].items()])
+
+    memory = snapshot.get("memory") or {}
+    b.family("memory_bytes", "gauge", "Memory usage by state.",
+             [({"state": state}, memory.get(state)) for state in ("total", "available", "used", "free")])
+    b.gauge("memory_usage_percent", "Memory usage.", memory.get("usage_percent"))
+
+    memory_detail = snapshot.get("memory_detail") or {}
+    b.family("memory_detail_bytes", "gauge", "Memory breakdown from /proc/meminfo.",
+             [({"field": field}, value) for field, value in (memory_detail.get("meminfo") or {}).items()])
+    b.family("vmstat_events", "counter", "Page fault, swap, reclaim and OOM counters from /proc/vmstat.",
+             [({"event": event}, value)
+              for event, value in ((memory_detail.get("vmstat") or {}).get("totals") or {}).items()])
+    b.family("hugepages", "gauge", "Huge page pool size in pages.",
+             [({"size": size, "state": state}, value)
+              for size, pool in (memory_detail.get("hugepages") or {}).items() for state, value in pool.items()])
+    nodes = memory_detail.get("nodes") or {}
+    b.family("numa_memory_bytes", "gauge", "Memory per NUMA node.",
+             [({"node": node, "state": state}, values.get(state))
+              for node, values in nodes.items() for state in ("total", "free", "used", "file_pages", "anon_pages")])
+    b.family("numa_events", "counter", "NUMA allocation counters per node from numastat.",
+             [({"node": node, "event": event}, value)
+              for node, values in nodes.items() for event, value in (values.get("totals") or {}).items()])
+
+    swap = snapshot.get("swap") or {}
+    b.family("swap_bytes", "gauge", "Swap usage by state.",
+             [({"state": state}, swap.get(state)) for state in ("total", "used", "free")])
+    b.gauge("swap_usage_percent", "Swap usage.", swap.get("usage_percent"))
+
+    disks = snapshot.get("disks") or {}
+    b.family("disk_read_bytes", "counter", "Bytes read per disk.", _per_key(disks, "device", "read_bytes"))
+    b.family("disk_written_bytes", "counter", "Bytes written per disk.", _per_key(disks, "device", "write_bytes"))
+    b.family("disk_reads_completed", "counter", "Reads completed per disk.", _per_key(disks, "device", "read_count"))
+    b.family("disk_writes_completed", "counter", "Writes completed per disk.", _per_key(disks, "device", "write_count"))
+    b.family("disk_io_time_ms", "counter", "Milliseconds spent doing I/O per disk.", _per_key(disks, "device", "busy_time"))
+
+    devices = snapshot.get("disk_devices") or {}
+    b.family("disk_await_ms", "gauge", "Average I/O request latency per device.", _per_key(devices, "device", "await"))
+    b.family("disk_util_percent", "gauge", "Device busy time percentage.", _per_key(devices, "device", "util_percent"))
+    b.family("disk_queue_size", "gauge", "Average I/O queue size per device.", _per_key(devices, "device", "avg_queue_size"))
+
+    interfaces = snapshot.get("interfaces") or {}
+    for field, name, help_text in (
+        ("bytes_recv", "network_receive_bytes", "Bytes received per interface."),
+        ("bytes_sent", "network_transmit_bytes", "Bytes sent per interface."),
+        ("packets_recv", "network_receive_packets", "Packets received per interface."),
+        ("packets_sent", "network_transmit_packets", "Packets sent per interface."),
+        ("errin", "network_receive_errors", "Receive errors per interface."),
+        ("errout", "network_transmit_errors", "Transmit errors per interface."),
+        ("dropin", "network_receive_drops", "Dropped incoming packets per interface."),
+        ("dropout", "network_transmit_drops", "Dropped outgoing packets per interface."),
+    ):
+        b.family(name, "counter", help_text, _per_key(interfaces, "interface", field))
+
+    b.family("network_group_rate", "gauge", "Summed per-second rates of the interfaces in each interface group.",
+             [({"group": group, "counter": key[:-len("_per_sec")]}, value)
+              for group, values in (snapshot.get("interface_groups") or {}).items()
+              for key, value in values.items() if key.endswith("_per_sec")])
+    b.family("network_group_interfaces", "gauge", "Number of interfaces matched by each interface group.",
+             [({"group": group}, values.get("interfaces"))
+              for group, values in (snapshot.get("interface_groups") or {}).items()])
+
+    netstat = snapshot.get("netstat") or {}
+    b.family("netstat_events", "counter", "Kernel network protocol counters from /proc/net/snmp and /proc/net/netstat.",
+             [({"protocol": section, "counter": counter}, value)
+              for section, values in netstat.items() if section != "softnet"
+              for counter, value in (values.get("totals") or {}).items()])
+    b.gauge("tcp_established", "TCP connections in ESTABLISHED or CLOSE-WAIT state.",
+            (netstat.get("tcp") or {}).get("curr_estab"))
+    softnet = netstat.get("softnet") or {}
+    b.family("softnet_events_per_second", "gauge", "Packets processed, backlog drops and time squeezes per CPU.",
+             [({"cpu": cpu, "event": key[:-len("_per_sec")]}, value)
+              for cpu, values in (softnet.get("per_cpu") or {}).items() for key, value in values.items()])
+    b.family("softnet_events", "counter", "Packets processed, backlog drops and time squeezes across all CPUs.",
+             [({"event": event}, value) for event, value in (softnet.get("totals") or {}).items()])
+
+    load = snapshot.get("system_load") or {}
+    b.family("load_average", "gauge", "System load average.",
+             [({"period": period}, load.get(f"load_{period}")) for period in ("1min", "5min", "15min")])
+
+    pressure = snapshot.get("pressure") or {}
+    pressure_sections = [({}, pressure)] + [({"cgroup": path}, entry) for path, entry in (pressure.get("cgroups") or {}).items()]
+    pressure_rows = [(labels, resource, kind, values) for labels, section in pressure_sections
+                     for resource, values in section.items() if resource != "cgroups"
+                     for kind in ("some", "full") if f"{kind}_total_usec" in values]
+    b.family("pressure_avg_percent", "gauge", "PSI stall time share averaged by the kernel over 10s/60s/300s.",
+             [({**labels, "resource": resource, "kind": kind, "window": window}, values.get(f"{kind}_{window}"))
+              for labels, resource, kind, values in pressure_rows for window in ("avg10", "avg60", "avg300")])
+    b.family("pressure_stall_seconds", "counter", "Total PSI stall time.",
+             [({**labels, "resource": resource, "kind": kind}, values[f"{kind}_total_usec"] / 1e6)
+              for labels, resource, kind, values in pressure_rows])
+
+    uptime = snapshot.get("uptime") or {}
+    b.gauge("uptime_seconds", "Seconds since boot.", uptime.get("seconds"), unit="seconds")
+    b.gauge("boot_time_seconds", "Boot time as a Unix timestamp.", uptime.get("boot_time"), unit="seconds")
+
+    traffic = snapshot.get("traffic") or {}
+    b.family("traffic_today_bytes", "gauge", "Traffic accumulated today (UTC+8).",
+             [({"direction": "upload"}, traffic.get("today_upload_bytes")),
+              ({"direction": "download"}, traffic.get("today_download_bytes"))])
+
+    gpus = snapshot.get("gpu") or []
+    gpu_labels = [({"gpu": gpu.get("index", position), "name": gpu.get("name", "")}, gpu)
+                  for position, gpu in enumerate(gpus)]
+    b.family("gpu_usage_percent", "gauge", "GPU utilization.",
+             [(labels, gpu.get("usage_percent")) for labels, gpu in gpu_labels])
+    b.family("gpu_memory_used_mib", "gauge", "GPU memory used.",
+             [(labels, gpu.get("memory_used")) for labels, gpu in gpu_labels])
+    b.family("gpu_memory_total_mib", "gauge", "GPU memory total.",
+             [(labels, gpu.get("memory_total")) for labels, gpu in gpu_labels])
+    b.family("gpu_temperature_celsius", "gauge", "GPU temperature.",
+             [(labels, gpu.get("temperature")) for labels, gpu in gpu_labels])
+
+    sensors = snapshot.get("sensors") or {}
+    temperatures = sensors.get("temperatures") or {}
+    b.family("sensor_temperature_celsius", "gauge", "Hardware temperature sensors (hwmon and thermal zones).",
+             [({"sensor": key, "chip": sensor.get("chip", ""), "kind": sensor.get("kind", "")}, sensor.get("current"))
+              for key, sensor in temperatures.items()])
+    b.family("sensor_temperature_critical_celsius", "gauge", "Critical temperature threshold reported by the sensor.",
+             [({"sensor": key, "chip": sensor.get("chip", "")}, sensor.get("critical"))
+              for key, sensor in temperatures.items()])
+    b.family("sensor_fan_speed_rpm", "gauge", "Fan speed.",
+             [({"sensor": key, "chip": sensor.get("chip", "")}, sensor.get("rpm"))
+              for key, sensor in (sensors.get("fans") or {}).items()])
+    b.family("sensor_power_watts", "gauge", "Power draw from RAPL energy counters and hwmon power sensors.",
+             [({"domain": key, "source": sensor.get("source", "")}, sensor.get("watts"))
+              for key, sensor in (sensors.get("power") or {}).items()])
+
+    anomalies = snapshot.get("anomalies")
+    if anomalies is not None:
+        b.gauge("anomalies_current", "Series flagged as anomalous in this tick.", len(anomalies))
+        b.family("anomaly_zscore", "gauge", "Z-score of each series flagged as anomalous in this tick.",
+                 [({"series": anomaly["series"]}, anomaly["zscore"]) for anomaly in anomalies])
+
+    b.gauge("sample_timestamp_seconds", "Time of the snapshot these metrics were rendered from.",
+            snapshot.get("timestamp"), unit="seconds")
+
+    for section in extra_sections:
+        section(b)
+
+    return b.render()
+
+class MetricsExporter:
+    """采样器监听器：每个周期渲染一次 /metrics 文本"""
+
+    def __init__(self):
+        self.extra_sections: List[Callable[[MetricsBuilder], None]] = []
+        self._payload = MetricsBuilder().render()
+        self._lock = threading.Lock()
+
+    def add_section(self, section: Callable[[MetricsBuilder], None]):
+        """注册额外的指标段（如自监控指标），渲染时追加在快照指标之后"""
+        self.extra_sections.append(section)
+
+    def on_sample(self, snapshot: Dict[str, Any], flat: Dict[str, float]):
+        payload = render_snapshot(snapshot, self.extra_sections)
+        with self._lock:
+            self._payload = payload
+
+    @property
+    def payload(self) -> bytes:
+        with self._lock:
+            return self._payload
+
+# 全局指标导出实例
+_metrics_exporter: Optional[MetricsExporter] = None
+
+def get_metrics_exporter() -> MetricsExporter:
+    """获取全局指标导出实例"""
+    global _metrics_exporter
+    if _metrics_exporter is None:
+        _metrics_exporter = MetricsExporter()
+    return _metrics_exporter
@@ -0,0 +1,327 @@
+# 历史数据查询引擎
+
+"""
+历史数据查询引擎
+对 History 中的序列按固定步长分桶聚合，全部计算在连续的 NumPy 数组上完成，结果可以直接交给图表：
+
+- 步长对齐：桶的起点是 step 的整数倍（与查询起点无关），图表刷新时桶边界不会漂移；
+  聚合结果共用同一组桶时间戳（返回值的 timestamps），没有数据的桶为 null
+- 聚合函数：avg / min / max / last / rate / p50 / p95 / p99
+  rate 按计数器处理（值减小视为重置），为桶内增量之和除以对应的时间跨度（每秒）
+- lttb：不聚合，用 Largest-Triangle-Three-Buckets 把点降采样到 max_points 个，保留图形的峰谷，
+  结果带各自的 timestamps
+
+数据来源：
+步长不小于预聚合间隔（History.rollup_seconds）时，步长向上取整为预聚合间隔的整数倍，
+直接使用预聚合行（core/rollup.py），7 天的查询每个序列只需处理约一万行；
+否则解码原始点（已封存数据块的解码结果有 LRU 缓存）。
+基于预聚合行的分位数是各行分位数的分位数，lttb 以每行的 min / max 作为候选点，二者都是近似值。
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.rollup import INDEX
+
+AGGREGATIONS = ("avg", "min", "max", "last", "rate", "p50", "p95", "p99")
+FUNCTIONS = AGGREGATIONS + ("lttb",)
+PERCENTILES = {"p50": 50.0, "p95": 95.0, "p99": 99.0}
+
+# 各函数使用的预聚合字段（timestamp / end 总是包含），只解压用到的字段
+ROLLUP_FIELDS = {
+    "avg": ("sum", "count"),
+    "min": ("min",),
+    "max": ("max",),
+    "last": ("last",),
+    "rate": ("first", "last", "increase"),
+    "p50": ("p50",),
+    "p95": ("p95",),
+    "p99": ("p99",),
+    "lttb": ("min", "max", "first", "last"),
+}
+
+# 单次查询每个序列最多的桶数
+MAX_BUCKETS = 11000
+
+def _segments(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """keys 已排序，返回每段相同 key 的起止下标（结束下标包含在段内）"""
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:], len(keys)) - 1
+    return starts, ends
+
+def _segment_percentile(values: np.ndarray, keys: np.ndarray, starts: np.ndarray,
+                        ends: np.ndarray, q: float) -> np.ndarray:
+    """每段内的分位数（线性插值，与 np.percentile 的默认方式一致）"""
+    ordered = values[np.lexsort((values, keys))]
+    position = starts + (ends - starts) * (q / 100.0)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, ends)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def _increases(values: np.ndarray) -> np.ndarray:
+    """相邻点的增量，值减小视为计数器重置，此时增量为重置后的值"""
+    delta = np.diff(values)
+    reset = delta < 0
+    delta[reset] = values[1:][reset]
+    return delta
+
+def _drop_nan(timestamps: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    keep = ~np.isnan(values)
+    if keep.all():
+        return timestamps, values
+    return timestamps[keep], values[keep]
+
+def align(start: float, end: float, step: float) -> Tuple[float, int]:
+    """返回第一个桶的起点（step 的整数倍）和桶数"""
+    origin = math.floor(start / step) * step
+    return origin, int((end - origin) // step) + 1
+
+def _bucket_keys(timestamps: np.ndarray, origin: float, step: float) -> np.ndarray:
+    """桶下标，timestamps 均不早于 origin（截断即向下取整）"""
+    return ((timestamps - origin) / step).astype(np.int64)
+
+def aggregate(timestamps: np.ndarray, values: np.ndarray, origin: float, step: float,
+              buckets: int, func: str) -> np.ndarray:
+    """原始点按步长聚合，返回长度为 buckets 的数组，没有数据的桶为 NaN"""
+    out = np.full(buckets, np.nan)
+    timestamps, values = _drop_nan(timestamps, values)
+    if func == "rate":
+        if len(values) < 2:
+            return out
+        # 每个增量归入相邻两点中后一个点所在的桶
+        keys = _bucket_keys(timestamps[1:], origin, step)
+        starts, _ = _segments(keys)
+        increase = np.add.reduceat(_increases(values), starts)
+        elapsed = np.add.reduceat(np.diff(timestamps), starts)
+        valid = elapsed > 0
+        out[keys[starts][valid]] = increase[valid] / elapsed[valid]
+        return out
+
+    keys = _bucket_keys(timestamps, origin, step)
+    starts, ends = _segments(keys)
+    if not len(starts):
+        return out
+    index = keys[starts]
+    if func == "avg":
+        out[index] = np.add.reduceat(values, starts) / (ends - starts + 1)
+    elif func == "min":
+        out[index] = np.minimum.reduceat(values, starts)
+    elif func == "max":
+        out[index] = np.maximum.reduceat(values, starts)
+    elif func == "last":
+        out[index] = values[ends]
+    elif func in PERCENTILES:
+        out[index] = _segment_percentile(values, keys, starts, ends, PERCENTILES[func])
+    else:
+        raise ValueError(f"不支持的聚合函数: {func}")
+    return out
+
+def aggregate_rollup(rows: np.ndarray, origin: float, step: float, buckets: int, func: str) -> np.ndarray:
+    """预聚合行（History.rollups 的返回值）按步长（预聚合间隔的整数倍）聚合，语义与 aggregate 相同"""
+    out = np.full(buckets, np.nan)
+    if not rows.shape[1]:
+        return out
+    column = lambda field: rows[INDEX[field]]
+    keys = _bucket_keys(column("timestamp"), origin, step)
+    starts, ends = _segments(keys)
+    index = keys[starts]
+    if func == "avg":
+        out[index] = np.add.reduceat(column("sum"), starts) / np.add.reduceat(column("count"), starts)
+    elif func == "min":
+        out[index] = np.minimum.reduceat(column("min"), starts)
+    elif func == "max":
+        out[index] = np.maximum.reduceat(column("max"), starts)
+    elif func == "last":
+        out[index] = column("last")[ends]
+    elif func == "rate":
+        # 行内增量加上与上一行之间的增量，时间跨度为上一行最后一个点到本行最后一个点
+        first, last, end = column("first"), column("last"), column("end")
+        increase = column("increase").copy()
+        elapsed = end - column("timestamp")
+        if len(first) > 1:
+            boundary = first[1:] - last[:-1]
+            reset = boundary < 0
+            boundary[reset] = first[1:][reset]
+            increase[1:] += boundary
+            elapsed[1:] = end[1:] - end[:-1]
+        increase = np.add.reduceat(increase, starts)
+        elapsed = np.add.reduceat(elapsed, starts)
+        valid = elapsed > 0
+        out[index[valid]] = increase[valid] / elapsed[valid]
+    elif func in PERCENTILES:
+        out[index] = _segment_percentile(column(func), keys, starts, ends, PERCENTILES[func])
+    else:
+        raise ValueError(f"不支持的聚合函数: {func}")
+    return out
+
+def rollup_points(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """预聚合行展开成 lttb 的候选点：每行的 min 和 max，按行内的走势（first / last）决定先后"""
+    count = rows.shape[1]
+    rising = rows[INDEX["first"]] <= rows[INDEX["last"]]
+    timestamps = np.empty(count * 2)
+    values = np.empty(count * 2)
+    timestamps[0::2] = rows[INDEX["timestamp"]]
+    timestamps[1::2] = rows[INDEX["end"]]
+    values[0::2] = np.where(rising, rows[INDEX["min"]], rows[INDEX["max"]])
+    values[1::2] = np.where(rising, rows[INDEX["max"]], rows[INDEX["min"]])
+    return timestamps, values
+
+def lttb_many(series: Sequence[Tuple[np.ndarray, np.ndarray]], threshold: int) -> List[np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回每个序列选中点的下标
+    首尾两点总是保留，中间的点均分为 threshold - 2 个桶，每个桶选出与上一个选中点、
+    下一个桶平均点构成的三角形面积最大的点。
+    桶之间有先后依赖，这里按桶循环、每次同时处理全部序列，循环次数与序列数无关
+    """
+    selected: List[Optional[np.ndarray]] = [None] * len(series)
+    batch = []
+    for position, (timestamps, values) in enumerate(series):
+        if threshold >= len(values) or threshold < 3:
+            selected[position] = np.arange(len(values))
+        else:
+            batch.append(position)
+    if not batch:
+        return selected
+
+    buckets = threshold - 2
+    edges = np.empty((len(batch), buckets + 1), dtype=np.int64)
+    for row, position in enumerate(batch):
+        count = len(series[position][1])
+        edges[row] = (np.arange(buckets + 1) * ((count - 2) / buckets)).astype(np.int64) + 1
+        edges[row, -1] = count - 1
+    width = int((edges[:, 1:] - edges[:, :-1]).max())
+
+    # (桶, 序列, 桶内位置) 的候选点；下一个桶的平均点，最后一个桶之后是最后一个点
+    grid_x = np.empty((buckets, len(batch), width))
+    grid_y = np.empty((buckets, len(batch), width))
+    valid = np.empty((buckets, len(batch), width), dtype=bool)
+    next_x = np.empty((buckets, len(batch)))
+    next_y = np.empty((buckets, len(batch)))
+    first_x = np.empty(len(batch))
+    first_y = np.empty(len(batch))
+    for row, position in enumerate(batch):
+        timestamps, values = series[position]
+        x = timestamps - timestamps[0]
+        low = edges[row, :-1]
+        index = low[:, None] + np.arange(width)
+        valid[:, row] = index < edges[row, 1:, None]
+        index = np.minimum(index, len(x) - 1)
+        grid_x[:, row] = x[index]
+        grid_y[:, row] = values[index]
+        sizes = edges[row, 1:] - low
+        next_x[:-1, row] = (np.add.reduceat(x[:-1], low) / sizes)[1:]
+        next_y[:-1, row] = (np.add.reduceat(values[:-1], low) / sizes)[1:]
+        next_x[-1, row] = x[-1]
+        next_y[-1, row] = values[-1]
+        first_x[row] = x[0]
+        first_y[row] = values[0]
+
+    rows = np.arange(len(batch))
+    chosen = np.empty((buckets, len(batch)), dtype=np.int64)
+    ax, ay = first_x, first_y
+    for bucket in range(buckets):
+        px, py = grid_x[bucket], grid_y[bucket]
+        area = np.abs((ax - next_x[bucket])[:, None] * (py - ay[:, None])
+                      - (ax[:, None] - px) * (next_y[bucket] - ay)[:, None])
+        area[~valid[bucket]] = -1.0
+        best = area.argmax(axis=1)
+        chosen[bucket] = best
+        ax, ay = px[rows, best], py[rows, best]
+
+    for row, position in enumerate(batch):
+        indices = np.empty(threshold, dtype=np.int64)
+        indices[0] = 0
+        indices[1:-1] = edges[row, :-1] + chosen[:, row]
+        indices[-1] = len(series[position][1]) - 1
+        selected[position] = indices
+    return selected
+
+def lttb(timestamps: np.ndarray, values: np.ndarray, threshold: int) -> np.ndarray:
+    """单个序列的 LTTB 降采样，返回选中点的下标"""
+    return lttb_many([(timestamps, values)], threshold)[0]
+
+def _to_list(values: np.ndarray) -> List[Optional[float]]:
+    """NaN 转为 None（JSON null），图表据此断开折线"""
+    return [None if value != value else value for value in np.round(values, 4).tolist()]
+
+def evaluate(history, queries: Sequence[Dict[str, str]], start: Optional[float] = None,
+             end: Optional[float] = None, step: Optional[float] = None,
+             max_points: int = 1000) -> Dict[str, Any]:
+    """
+    执行一组查询，queries 为 [{"series": 名称或 glob, "func": 函数}]
+    同一序列的多个函数共用一次取数；参数无效时抛出 ValueError
+    """
+    end = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+    if not queries:
+        raise ValueError("queries 不能为空")
+    if end <= start:
+        raise ValueError("end 必须大于 start")
+    for query in queries:
+        if query.get("func", "avg") not in FUNCTIONS:
+            raise ValueError(f"不支持的函数: {query.get('func')}，可选 {', '.join(FUNCTIONS)}")
+    if step is None:
+        step = (end - start) / max_points
+    if step <= 0:
+        raise ValueError("step 必须大于 0")
+
+    rollup_seconds = getattr(history, "rollup_seconds", 0)
+    use_rollup = bool(rollup_seconds) and step >= rollup_seconds
+    if use_rollup:
+        step = math.ceil(step / rollup_seconds - 1e-9) * rollup_seconds
+    origin, buckets = align(start, end, step)
+    if buckets > MAX_BUCKETS:
+        raise ValueError(f"step 过小：{buckets} 个区间超过上限 {MAX_BUCKETS}")
+
+    # 展开 glob，按序列合并需要计算的函数，每个序列只取一次数据
+    plan: List[Tuple[str, str]] = []
+    for query in queries:
+        func = query.get("func", "avg")
+        for name in history.match_series(query["series"]):
+            plan.append((name, func))
+    functions: Dict[str, List[str]] = {}
+    for name, func in plan:
+        functions.setdefault(name, [])
+        if func not in functions[name]:
+            functions[name].append(func)
+
+    computed: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    candidates: List[Tuple[np.ndarray, np.ndarray]] = []
+    for name, funcs in functions.items():
+        if use_rollup:
+            rows = history.rollups(name, origin, end,
+                                   fields={field for func in funcs for field in ROLLUP_FIELDS[func]})
+        else:
+            timestamps, values = history.arrays(name, origin, end)
+        for func in funcs:
+            if func == "lttb":
+                computed[name, func] = {"candidates": len(candidates)}
+                candidates.append(rollup_points(rows) if use_rollup else _drop_nan(timestamps, values))
+            elif use_rollup:
+                computed[name, func] = {"values": _to_list(aggregate_rollup(rows, origin, step, buckets, func))}
+            else:
+                computed[name, func] = {"values": _to_list(aggregate(timestamps, values, origin, step, buckets, func))}
+
+    # 全部序列的 lttb 一起计算
+    if candidates:
+        selected = lttb_many(candidates, max_points)
+        for result in computed.values():
+            if "candidates" in result:
+                timestamps, values = candidates[result["candidates"]]
+                indices = selected[result.pop("candidates")]
+                result["timestamps"] = timestamps[indices].tolist()
+                result["values"] = _to_list(values[indices])
+
+    return {
+        "start": start,
+        "end": end,
+        "step": step,
+        "source": "rollup" if use_rollup else "raw",
+        "timestamps": np.round(origin + np.arange(buckets) * step, 3).tolist(),
+        "results": [dict(series=name, func=func, **computed[name, func]) for name, func in plan],
+    }
@@ -0,0 +1,178 @@
+# 历史数据预聚合
+
+"""
+历史数据预聚合
+History 追加数据时，每个序列同时按 rollup_seconds 对齐的区间累积一行：
+
+    timestamp / end     区间内第一个和最后一个点的时间戳
+    count / sum / min / max / first / last
+    increase            相邻点增量之和（值减小视为计数器重置，增量按重置后的值计）
+    p50 / p95 / p99     区间内的分位数（线性插值）
+
+当前区间在内存中以 Python 列表累积，区间结束后按行追加到未封存的 array('d') 中，
+满 BLOCK_ROWS 行后封存为 RollupBlock：每个字段一列，各自 zlib 压缩（约为原始大小的 1/3），
+淘汰按整块进行，查询时只解压与时间范围重叠的块中查询用到的字段（解压结果进入 History 的解码缓存）。
+步长不小于预聚合间隔的查询（如 7 天的图表）直接使用预聚合行，不解码原始点。
+保留时长不足 MIN_ROWS 个预聚合间隔时预聚合得不偿失（原始点本身就不多），History 不启用预聚合。
+"""
+
+import math
+import zlib
+from array import array
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+FIELDS = ("timestamp", "end", "count", "sum", "min", "max", "first", "last", "increase", "p50", "p95", "p99")
+INDEX = {field: index for index, field in enumerate(FIELDS)}
+
+# 每个封存块的行数
+BLOCK_ROWS = 256
+# 保留时长至少为多少个预聚合间隔时才启用预聚合
+MIN_ROWS = 360
+
+# 查询总是需要的字段：按 timestamp 选择范围，按 end 淘汰和处理边界
+_ALWAYS = (INDEX["timestamp"], INDEX["end"])
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """已排序列表的分位数（线性插值，与 np.percentile 的默认方式一致）"""
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+class RollupBlock:
+    """封存的预聚合行，每个字段一列，各自 zlib 压缩；封存后不可变"""
+
+    __slots__ = ("first", "end", "rows", "columns")
+    sealed = True
+
+    def __init__(self, data: Any):
+        # data 为 (len(FIELDS), 行数) 的 float64 数组
+        self.first = float(data[INDEX["timestamp"], 0])
+        self.end = float(data[INDEX["end"], -1])
+        self.rows = data.shape[1]
+        self.columns = tuple(zlib.compress(column.tobytes(), 1) for column in data)
+
+    def column(self, index: int) -> Tuple[Any]:
+        import numpy as np
+        return (np.frombuffer(zlib.decompress(self.columns[index]), dtype=np.float64),)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(column) for column in self.columns)
+
+class RollupSeries:
+    """一个序列的预聚合行"""
+
+    __slots__ = ("interval", "_blocks", "_open", "_cutoff", "_key", "_values", "_first_ts", "_last_ts",
+                 "_increase")
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._blocks: List[RollupBlock] = []
+        self._open = array("d")  # 未封存的行，按行连续存放
+        self._cutoff = float("-inf")
+        self._key: Optional[float] = None
+        self._values: List[float] = []
+        self._first_ts = 0.0
+        self._last_ts = 0.0
+        self._increase = 0.0
+
+    def add(self, timestamp: float, value: float):
+        if value != value:
+            return
+        key = timestamp // self.interval
+        values = self._values
+        if key != self._key:
+            if values:
+                self._push(self._row())
+                values = self._values = []
+            self._key = key
+            self._first_ts = timestamp
+            self._increase = 0.0
+        elif values:
+            delta = value - values[-1]
+            self._increase += delta if delta >= 0 else value
+        values.append(value)
+        self._last_ts = timestamp
+
+    def _row(self) -> tuple:
+        values = self._values
+        ordered = sorted(values)
+        return (self._first_ts, self._last_ts, len(values), math.fsum(values), ordered[0], ordered[-1],
+                values[0], values[-1], self._increase,
+                _percentile(ordered, 0.5), _percentile(ordered, 0.95), _percentile(ordered, 0.99))
+
+    def _push(self, row: tuple):
+        self._open.extend(row)
+        if len(self._open) >= BLOCK_ROWS * len(FIELDS):
+            import numpy as np
+            data = np.array(self._open, dtype=np.float64).reshape(-1, len(FIELDS)).T
+            self._blocks.append(RollupBlock(data))
+            self._open = array("d")
+
+    def evict(self, cutoff: float):
+        """淘汰最后一个点早于 cutoff 的整块；块内和未封存的过期行在查询时按 cutoff 过滤"""
+        self._cutoff = cutoff
+        blocks = self._blocks
+        if blocks and blocks[0].end < cutoff:
+            count = 0
+            while count < len(blocks) and blocks[count].end < cutoff:
+                count += 1
+            del blocks[:count]
+
+    def select(self, start: Optional[float] = None, end: Optional[float] = None) -> tuple:
+        """
+        取出查询需要的数据：与范围重叠的封存块，以及未封存行和当前区间部分行的副本
+        调用方需与 add() 互斥（History 在锁内调用），返回值之后可以在锁外交给 decode()
+        """
+        import numpy as np
+        blocks = [block for block in self._blocks
+                  if (start is None or block.end >= start) and (end is None or block.first <= end)]
+        tail = np.array(self._open, dtype=np.float64).reshape(-1, len(FIELDS))
+        if self._values:
+            tail = np.concatenate((tail, np.array([self._row()], dtype=np.float64)))
+        return blocks, tail.T, self._cutoff
+
+    @staticmethod
+    def decode(selection: tuple, start: Optional[float] = None, end: Optional[float] = None,
+               fields: Optional[Iterable[str]] = None,
+               cache_get: Optional[Callable[[Any, Callable[[], Tuple[Any]]], Tuple[Any]]] = None) -> Any:
+        """
+        第一个点落在 [start, end] 内的行，返回 (len(FIELDS), 行数) 的新数组
+        fields 为需要的字段（None 表示全部），其余字段为 NaN；cache_get 为解码缓存（DecodeCache.get）
+        """
+        import numpy as np
+        blocks, tail, cutoff = selection
+        indices: Sequence[int] = range(len(FIELDS)) if fields is None else \
+            sorted(set(_ALWAYS) | {INDEX[field] for field in fields})
+        total = sum(block.rows for block in blocks) + tail.shape[1]
+        rows = np.full((len(FIELDS), total), np.nan)
+        offset = 0
+        for block in blocks:
+            for index in indices:
+                if cache_get is None:
+                    column = block.column(index)[0]
+                else:
+                    column = cache_get((block, index), lambda index=index: block.column(index))[0]
+                rows[index, offset:offset + block.rows] = column
+            offset += block.rows
+        rows[:, offset:] = tail
+        timestamps = rows[INDEX["timestamp"]]
+        low = int(np.searchsorted(rows[INDEX["end"]], cutoff))
+        if start is not None:
+            low = max(low, int(np.searchsorted(timestamps, start)))
+        high = rows.shape[1] if end is None else int(np.searchsorted(timestamps, end, side="right"))
+        return rows[:, low:max(low, high)]
+
+    def columns(self, start: Optional[float] = None, end: Optional[float] = None,
+                fields: Optional[Iterable[str]] = None) -> Any:
+        """第一个点落在 [start, end] 内的行（包括当前区间的部分行），调用方需与 add() 互斥"""
+        return self.decode(self.select(start, end), start, end, fields)
+
+    @property
+    def last_timestamp(self) -> float:
+        return self._last_ts
+
+    @property
+    def nbytes(self) -> int:
+        return sum(block.nbytes for block in self._blocks) + len(self._open) * 8
@@ -0,0 +1,232 @@
+# 后台采样器
+
+"""
+后台采样器
+按 monitor_interval 周期调用已注册的采集器，生成一份快照（core/snapshot.py 的 Snapshot）：
+    timestamp + 按注册顺序排列的 "cpu"、"memory"、"disk_devices" 等采集器结果
+采集在线程池中执行，不阻塞事件循环；快照展开后写入历史数据，
+并依次通知监听器（告警、导出等模块在此接入）。发布（展开、写历史、监听器）同样在线程池中执行：
+序列数较多时每个周期要几十毫秒，放在事件循环中会直接表现为请求延迟。
+监听器因此在工作线程中调用，需要访问事件循环的监听器自行用 call_soon_threadsafe 转交。
+
+按需模式（collection_mode = "on_demand"）下不常驻采样：
+- 请求通过 get_snapshot 获取快照，新鲜度窗口内直接复用最近一次结果
+- 同一时间只有一次采集在进行，并发请求共享同一次采集的结果（single-flight）
+- 有请求到来时启动周期采样，超过 idle_timeout 没有请求后自动停止，并调用 idle_listeners
+  （CPU 高频采样线程等只为采样器服务的后台任务在此停止，下次采集时再启动）
+
+配置了调度器（core/scheduler.py）时，采样间隔由调度器按指标变化和 CPU 预算动态决定，
+历史数据、速率和告警窗口都按快照的实际时间戳计算，不假设固定间隔。
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from core.history import DEFAULT_QUANTIZE, History, flatten_snapshot
+from core.scheduler import AdaptiveScheduler
+from core.snapshot import Snapshot, SnapshotLayout
+
+Collector = Callable[[], Any]
+Listener = Callable[[Snapshot, Dict[str, float]], None]
+CollectorObserver = Callable[[str, float, bool], None]
+
+class Sampler:
+    """周期采样器"""
+
+    def __init__(self, interval: float = 2.0, history: Optional[History] = None,
+                 idle_timeout: float = 0, prime_window: float = 0.5,
+                 scheduler: Optional[AdaptiveScheduler] = None):
+        self.interval = interval
+        self.scheduler = scheduler
+        self.idle_timeout = idle_timeout
+        self.prime_window = prime_window
+        self.history = history if history is not None else History()
+        self.collectors: Dict[str, Collector] = {}
+        self.layout = SnapshotLayout(())
+        self.listeners: List[Listener] = []
+        self.idle_listeners: List[Callable[[], None]] = []
+        self.latest: Optional[Snapshot] = None
+        self.latest_flat: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.ticks = 0
+        self.collector_observer: Optional[CollectorObserver] = None
+        self.last_request = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Task] = None
+
+    def register(self, name: str, collector: Collector):
+        """注册采集器，返回值作为快照中 name 对应的部分"""
+        self.collectors[name] = collector
+        self.layout = SnapshotLayout(self.collectors)
+
+    def add_listener(self, listener: Listener):
+        """注册监听器，每个周期在线程池中以 (快照, 展开后的数值) 依次调用"""
+        self.listeners.append(listener)
+
+    def collect(self) -> Snapshot:
+        """
+        同步执行所有采集器（在线程池中运行），单个采集器失败不影响其他部分
+        被调度器限流的采集器本周期不运行，复用上一次快照中的结果
+        """
+        now = time.time()
+        snapshot = Snapshot(now, self.layout)
+        values = snapshot.values
+        observer = self.collector_observer
+        scheduler = self.scheduler
+        latest = self.latest
+        for position, (name, collector) in enumerate(self.collectors.items()):
+            if scheduler is not None and latest is not None and name in latest and not scheduler.should_run(name, now):
+                values[position] = latest[name]
+                continue
+            started = time.perf_counter()
+            cpu_started = time.thread_time()
+            failed = False
+            try:
+                values[position] = collector()
+                self.errors.pop(name, None)
+            except Exception as e:
+                failed = True
+                if name not in self.errors:
+                    print(f"采集器 {name} 执行失败: {e}")
+                self.errors[name] = str(e)
+            if scheduler is not None:
+                scheduler.record_cost(name, time.thread_time() - cpu_started)
+                scheduler.mark_run(name, now)
+            if observer is not None:
+                observer(name, time.perf_counter() - started, failed)
+        return snapshot
+
+    def publish(self, snapshot: Snapshot):
+        """发布快照：写入历史并通知监听器（在线程池中执行）"""
+        cpu_started = time.thread_time()
+        flat = flatten_snapshot(dict(snapshot.sections()))
+        self.latest = snapshot
+        self.latest_flat = flat
+        self.ticks += 1
+        self.history.append(snapshot.timestamp, flat)
+
+        for listener in self.listeners:
+            try:
+                listener(snapshot, flat)
+            except Exception as e:
+                print(f"采样监听器执行失败: {e}")
+        if self.scheduler is not None:
+            self.scheduler.record_publish_cost(time.thread_time() - cpu_started)
+
+    async def sample_once(self) -> Snapshot:
+        """执行一次采集并发布"""
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(None, self.collect)
+        await loop.run_in_executor(None, self.publish, snapshot)
+        return snapshot
+
+    async def _prime_and_sample(self) -> Snapshot:
+        """
+        空闲后的第一次采集：先采集一次作为基准（CPU 使用率、各类速率都按两次采集的差值计算），
+        等待 prime_window 后再正式采集并发布
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.collect)
+        await asyncio.sleep(self.prime_window)
+        return await self.sample_once()
+
+    async def _sample_single_flight(self, prime: bool = False) -> Snapshot:
+        """同一时间只进行一次采集，并发调用方等待同一个结果"""
+        if self._inflight is None or self._inflight.done():
+            coro = self._prime_and_sample() if prime else self.sample_once()
+            self._inflight = asyncio.get_running_loop().create_task(coro)
+        # shield：某个请求被取消时不影响其他等待者
+        return await asyncio.shield(self._inflight)
+
+    async def get_snapshot(self, max_age: float) -> Snapshot:
+        """
+        按需获取快照：max_age 秒内的快照直接复用，否则触发（或等待进行中的）一次采集，
+        同时确保周期采样在运行，直到 idle_timeout 内没有新的请求
+        """
+        self.last_request = asyncio.get_running_loop().time()
+        latest = self.latest
+        if latest is not None and time.time() - latest.timestamp <= max_age:
+            return latest
+        idle = not self.running
+        snapshot = await self._sample_single_flight(prime=idle)
+        if idle:
+            self.start(delay_first=True)
+        return snapshot
+
+    def next_interval(self) -> float:
+        """到下一次采样的间隔：有调度器时按最近一次快照动态计算，否则为固定间隔"""
+        if self.scheduler is None or self.latest is None:
+            return self.interval
+        return self.scheduler.next_interval(self.latest_flat, self.latest.timestamp)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self, delay_first: bool = False):
+        loop = asyncio.get_running_loop()
+        if delay_first:
+            await asyncio.sleep(self.interval)
+        while True:
+            if self.idle_timeout and loop.time() - self.last_request > self.idle_timeout:
+                print(f"{self.idle_timeout:g} 秒内没有请求，停止周期采样")
+                for listener in self.idle_listeners:
+                    try:
+                        listener()
+                    except Exception as e:
+                        print(f"空闲回调执行失败: {e}")
+                return
+            started = loop.time()
+            try:
+                await self._sample_single_flight()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"采样失败: {e}")
+            elapsed = loop.time() - started
+            await asyncio.sleep(max(0.0, self.next_interval() - elapsed))
+
+    def start(self, delay_first: bool = False):
+        """在当前事件循环中启动后台采样任务"""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run(delay_first))
+
+    async def stop(self):
+        """停止后台采样任务（以及进行中的按需采集）"""
+        for task in (self._task, self._inflight):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._inflight = None
+
+# 全局采样器实例（首次使用时创建并注册默认采集器）
+_sampler: Optional[Sampler] = None
+
+def get_sampler() -> Sampler:
+    """获取全局采样器实例"""
+    global _sampler
+    if _sampler is None:
+        from core.config import settings
+        from core.scheduler import get_scheduler
+        from monitor.collectors import register_default_collectors
+        _sampler = Sampler(
+            interval=settings.monitor_interval,
+            history=History(
+                retention_seconds=settings.history_retention_seconds,
+                compress=settings.history_compression,
+                quantize=settings.history_quantize if settings.history_quantize is not None else DEFAULT_QUANTIZE,
+                resolution=settings.history_timestamp_resolution,
+                rollup_seconds=settings.history_rollup_seconds,
+                decode_cache_bytes=int(settings.history_decode_cache_mb * 1024 * 1024),
+            ),
+            idle_timeout=settings.on_demand_idle_timeout if settings.collection_mode == "on_demand" else 0,
+            prime_window=settings.on_demand_prime_window,
+            scheduler=get_scheduler(),
+        )
+        register_default_collectors(_sampler)
+    return _sampler
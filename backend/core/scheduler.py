@@ -0,0 +1,235 @@
+# 自适应采样调度
+
+"""
+自适应采样调度器
+固定的采样间隔在故障期间太慢、在空闲时又浪费资源。调度器在每个周期结束后决定下一次采样的间隔：
+
+- 监视的序列（默认为各类使用率百分比）在相邻两次采样间变化超过阈值，
+  或有告警处于 pending / firing、存在异常检测结果时，间隔先回到基准间隔以内再减半，直到 min_interval
+- 连续若干个周期变化很小时，间隔按 backoff 倍数增大，直到 max_interval
+
+CPU 预算（agent_cpu_budget_percent，单核百分比）：
+采样器用 thread_time 记录每个采集器实际消耗的 CPU 时间（指数滑动平均），
+当全部采集器在当前间隔下的 CPU 占用超过预算时，按开销从大到小依次限流——
+被限流的采集器以更长的周期运行，期间复用上一次结果（与 CachedCollector 相同）；
+如果把全部采集器都限流仍超出预算，则直接拉长采样间隔。
+"""
+
+import fnmatch
+import re
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+# 默认监视的序列：百分比类指标，变化量按百分点计算
+DEFAULT_WATCH = [
+    "cpu.usage_percent",
+    "memory.usage_percent",
+    "swap.usage_percent",
+    "disk_devices.*.util_percent",
+    "pressure.cpu.some_stall_percent",
+    "pressure.memory.some_stall_percent",
+    "pressure.io.some_stall_percent",
+]
+
+UrgencyCheck = Callable[[], bool]
+
+class AdaptiveScheduler:
+    """根据指标变化、告警状态和 CPU 预算计算采样间隔"""
+
+    def __init__(self, base_interval: float = 2.0, min_interval: float = 0.25,
+                 max_interval: float = 10.0, adaptive: bool = True,
+                 change_threshold: float = 5.0, watch: Optional[List[str]] = None,
+                 flat_ticks: int = 3, backoff: float = 1.5, cpu_budget_percent: float = 0.0,
+                 cost_smoothing: float = 0.3):
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.adaptive = adaptive
+        self.change_threshold = change_threshold
+        self.flat_ticks = flat_ticks
+        self.backoff = backoff
+        self.cpu_budget = cpu_budget_percent / 100.0  # 每秒允许消耗的 CPU 秒数
+        self.cost_smoothing = cost_smoothing
+
+        self.interval = base_interval  # 由活跃度决定的间隔
+        self.effective_interval = base_interval  # 应用 CPU 预算后的实际间隔
+        self.reason = "base"
+        self.costs: Dict[str, float] = {}  # 采集器 -> 每次运行的 CPU 秒数（滑动平均）
+        self.publish_cost = 0.0
+        self.throttle_period = 0.0  # 被限流采集器的运行周期，0 表示未限流
+        self.throttled: List[str] = []
+        self.last_change = 0.0
+        self.urgency_checks: List[UrgencyCheck] = []
+
+        patterns = watch if watch is not None else DEFAULT_WATCH
+        self._watch_re = re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+        self._watch_keys: FrozenSet[str] = frozenset()
+        self._watched: List[str] = []
+        self._previous: Dict[str, float] = {}
+        self._flat_count = 0
+        self._last_run: Dict[str, float] = {}
+
+    def add_urgency_check(self, check: UrgencyCheck):
+        """注册紧急状态判断（如告警处于 firing），返回 True 时按最短间隔采样"""
+        self.urgency_checks.append(check)
+
+    def _smooth(self, previous: Optional[float], value: float) -> float:
+        if previous is None:
+            return value
+        return previous + self.cost_smoothing * (value - previous)
+
+    def record_cost(self, name: str, cpu_seconds: float):
+        """记录采集器一次实际运行的 CPU 时间（复用缓存结果的周期不记录）"""
+        self.costs[name] = self._smooth(self.costs.get(name), cpu_seconds)
+
+    def record_publish_cost(self, cpu_seconds: float):
+        """记录一次发布（写历史 + 监听器）的 CPU 时间，这部分无法限流"""
+        self.publish_cost = self._smooth(self.publish_cost or None, cpu_seconds)
+
+    def should_run(self, name: str, now: float) -> bool:
+        """被限流的采集器在 throttle_period 内只运行一次"""
+        if not self.throttle_period or name not in self.throttled:
+            return True
+        return now - self._last_run.get(name, 0.0) >= self.throttle_period
+
+    def mark_run(self, name: str, now: float):
+        self._last_run[name] = now
+
+    def _change(self, flat: Dict[str, float]) -> float:
+        """监视序列相邻两次采样的最大变化量"""
+        if self._watch_re is None:
+            return 0.0
+        # 序列名集合变化（如网卡/磁盘替换，数量可能不变）时重新匹配；比较集合在 C 层完成，比逐个正则匹配便宜
+        if flat.keys() != self._watch_keys:
+            self._watch_keys = frozenset(flat)
+            self._watched = [name for name in flat if self._watch_re.match(name)]
+        previous = self._previous
+        change = 0.0
+        current = {}
+        for name in self._watched:
+            value = flat.get(name)
+            if value is None:
+                continue
+            current[name] = value
+            last = previous.get(name)
+            if last is not None and abs(value - last) > change:
+                change = abs(value - last)
+        self._previous = current
+        return change
+
+    def _urgent(self) -> bool:
+        for check in self.urgency_checks:
+            try:
+                if check():
+                    return True
+            except Exception as e:
+                print(f"采样紧急状态判断失败: {e}")
+        return False
+
+    def _apply_budget(self, interval: float) -> float:
+        """
+        按开销从大到小限流采集器，使 CPU 占用不超过预算；返回实际采样间隔
+        未限流的采集器每个周期运行，被限流的采集器共享剩余预算，以同一个更长的周期运行
+        """
+        self.throttled = []
+        self.throttle_period = 0.0
+        if self.cpu_budget <= 0 or not self.costs:
+            return interval
+        budget = self.cpu_budget
+        ordered = sorted(self.costs.items(), key=lambda item: item[1], reverse=True)
+        remaining = sum(cost for _, cost in ordered) + self.publish_cost
+        if remaining / interval <= budget:
+            return interval
+
+        full_cost = remaining
+        throttled_cost = 0.0
+        # 至少保留开销最小的采集器每周期运行，否则不如直接拉长间隔
+        for name, cost in ordered[:-1]:
+            self.throttled.append(name)
+            throttled_cost += cost
+            remaining -= cost
+            spare = budget - remaining / interval
+            if spare > 0:
+                self.throttle_period = max(interval, throttled_cost / spare)
+                return interval
+        self.throttled = []
+        return max(interval, full_cost / budget)
+
+    def next_interval(self, flat: Dict[str, float], timestamp: float) -> float:
+        """每个周期发布后调用，返回到下一次采样的间隔"""
+        if self.adaptive:
+            change = self._change(flat)
+            if self._urgent():
+                self.interval = max(self.min_interval, min(self.interval, self.base_interval) / 2)
+                self._flat_count = 0
+                self.reason = "alert"
+            elif change >= self.change_threshold:
+                self.interval = max(self.min_interval, min(self.interval, self.base_interval) / 2)
+                self._flat_count = 0
+                self.last_change = timestamp
+                self.reason = "change"
+            elif change < self.change_threshold / 4:
+                self._flat_count += 1
+                if self._flat_count >= self.flat_ticks:
+                    self.interval = min(self.max_interval, self.interval * self.backoff)
+                    self.reason = "flat"
+            else:
+                self._flat_count = 0
+                self.reason = "steady"
+        else:
+            self.reason = "base"
+        self.effective_interval = self._apply_budget(self.interval)
+        if self.effective_interval > self.interval:
+            self.reason = "budget"
+        return self.effective_interval
+
+    def get_status(self) -> Dict[str, object]:
+        full_cost = sum(self.costs.values()) + self.publish_cost
+        interval = self.effective_interval
+        if self.throttle_period:
+            throttled = sum(self.costs[name] for name in self.throttled)
+            usage = (full_cost - throttled) / interval + throttled / self.throttle_period
+        else:
+            usage = full_cost / interval
+        return {
+            "adaptive": self.adaptive,
+            "interval": round(interval, 3),
+            "reason": self.reason,
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "cpu_budget_percent": round(self.cpu_budget * 100, 3),
+            "estimated_cpu_percent": round(usage * 100, 3),
+            "throttled": list(self.throttled),
+            "throttle_period": round(self.throttle_period, 3),
+            "collector_cpu_ms": {name: round(cost * 1000, 3) for name, cost in
+                                 sorted(self.costs.items(), key=lambda item: item[1], reverse=True)},
+            "publish_cpu_ms": round(self.publish_cost * 1000, 3),
+        }
+
+    def metrics_section(self, b):
+        """/metrics 中的调度器指标段（MetricsExporter.add_section）"""
+        status = self.get_status()
+        b.gauge("self_sampling_interval_seconds", "Current sampling interval chosen by the scheduler.",
+                status["interval"], unit="seconds")
+        b.gauge("self_sampling_estimated_cpu_ratio", "Estimated collector CPU usage as a fraction of one core.",
+                status["estimated_cpu_percent"] / 100.0, unit="ratio")
+        b.family("self_collector_throttled", "gauge", "Collectors throttled to stay within the CPU budget.",
+                 [({"collector": name}, 1 if name in self.throttled else 0) for name in list(self.costs)])
+
+# 全局调度器（未启用自适应采样和 CPU 预算时为 None）
+_scheduler: Optional[AdaptiveScheduler] = None
+
+def get_scheduler() -> Optional[AdaptiveScheduler]:
+    """获取全局调度器，未启用时返回 None"""
+    global _scheduler
+    from core.config import settings
+    if _scheduler is None and (settings.adaptive_sampling or settings.agent_cpu_budget_percent > 0):
+        _scheduler = AdaptiveScheduler(
+            base_interval=settings.monitor_interval,
+            min_interval=settings.sampling_min_interval,
+            max_interval=settings.sampling_max_interval,
+            adaptive=settings.adaptive_sampling,
+            change_threshold=settings.sampling_change_threshold,
+            watch=settings.sampling_watch,
+            cpu_budget_percent=settings.agent_cpu_budget_percent,
+        )
+    return _scheduler
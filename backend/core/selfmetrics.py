@@ -0,0 +1,300 @@
+# 自监控指标
+
+"""
+后端自身的运行指标
+- 每个采集器、每个路由、以及少数耗时操作（nvidia-smi、net_connections、流量文件写入等）的耗时直方图
+- 采集器失败次数和慢运行次数（耗时超过采样间隔）
+- 事件循环延迟：心跳任务按固定间隔 sleep，记录实际唤醒时间与预期的差值
+- 默认线程池的排队任务数（线程池由本模块创建并设置为事件循环的默认线程池），以及进程自身的 RSS / CPU
+
+直方图的桶在创建时一次性分配，observe 只做一次二分查找和几次整数累加。
+"""
+
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import psutil
+
+# 耗时直方图的桶上限（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+class Histogram:
+    """固定桶直方图"""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """按桶估算分位数（返回所在桶的上限，不超过观测到的最大值）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """毫秒单位的摘要"""
+        ms = 1000.0
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * ms, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * ms, 3),
+            "p95_ms": round(self.quantile(0.95) * ms, 3),
+            "p99_ms": round(self.quantile(0.99) * ms, 3),
+            "max_ms": round(self.max * ms, 3),
+        }
+
+class CountingExecutor(ThreadPoolExecutor):
+    """记录已提交但尚未开始执行的任务数的线程池"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending = 0
+        self._pending_lock = threading.Lock()
+
+    def _started(self):
+        with self._pending_lock:
+            self.pending -= 1
+
+    def submit(self, fn, /, *args, **kwargs):
+        def run():
+            self._started()
+            return fn(*args, **kwargs)
+
+        with self._pending_lock:
+            self.pending += 1
+        try:
+            future = super().submit(run)
+        except BaseException:
+            self._started()
+            raise
+        # 开始执行前被取消（如关闭时 cancel_futures）的任务不会进入 run
+        future.add_done_callback(lambda f: f.cancelled() and self._started())
+        return future
+
+class SelfMetrics:
+    """后端自监控指标"""
+
+    def __init__(self, slow_threshold: float = 2.0, heartbeat_interval: float = 0.5):
+        self.slow_threshold = slow_threshold
+        self.heartbeat_interval = heartbeat_interval
+        self.started_at = time.time()
+
+        self.collectors: Dict[str, Histogram] = {}
+        self.collector_errors: Dict[str, int] = {}
+        self.collector_slow_runs: Dict[str, int] = {}
+        self.routes: Dict[str, Histogram] = {}
+        self.route_errors: Dict[str, int] = {}
+        self.operations: Dict[str, Histogram] = {}
+
+        self.loop_lag = Histogram()
+        self.loop_lag_last = 0.0
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._executor: Optional[CountingExecutor] = None
+
+        self._process = psutil.Process(os.getpid())
+        self._process.cpu_percent(None)
+        self._lock = threading.Lock()
+
+    def _histogram(self, table: Dict[str, Histogram], name: str) -> Histogram:
+        histogram = table.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(name, Histogram())
+        return histogram
+
+    def observe_collector(self, name: str, seconds: float, failed: bool):
+        """采样器回调：记录单个采集器的耗时和结果"""
+        self._histogram(self.collectors, name).observe(seconds)
+        if failed:
+            self.collector_errors[name] = self.collector_errors.get(name, 0) + 1
+        if seconds > self.slow_threshold:
+            self.collector_slow_runs[name] = self.collector_slow_runs.get(name, 0) + 1
+
+    def observe_route(self, route: str, seconds: float, status: int):
+        self._histogram(self.routes, route).observe(seconds)
+        if status >= 500:
+            self.route_errors[route] = self.route_errors.get(route, 0) + 1
+
+    def observe_operation(self, name: str, seconds: float):
+        self._histogram(self.operations, name).observe(seconds)
+
+    async def _run_heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.heartbeat_interval
+            await asyncio.sleep(self.heartbeat_interval)
+            lag = max(0.0, loop.time() - expected)
+            self.loop_lag_last = lag
+            self.loop_lag.observe(lag)
+
+    def start(self):
+        """在当前事件循环中启动心跳任务，并把可统计排队数的线程池设置为默认线程池"""
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = CountingExecutor(thread_name_prefix="asyncio")
+            loop.set_default_executor(self._executor)
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = loop.create_task(self._run_heartbeat())
+
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+
+    def executor_queue_depth(self) -> int:
+        """默认线程池中等待执行的任务数（尚未启动时为 0）"""
+        return self._executor.pending if self._executor is not None else 0
+
+    def process_info(self) -> Dict[str, Any]:
+        """进程自身的资源占用"""
+        try:
+            with self._process.oneshot():
+                memory = self._process.memory_info()
+                cpu_times = self._process.cpu_times()
+                return {
+                    "rss_bytes": memory.rss,
+                    "vms_bytes": memory.vms,
+                    "cpu_percent": self._process.cpu_percent(None),
+                    "cpu_seconds": round(cpu_times.user + cpu_times.system, 3),
+                    "threads": self._process.num_threads(),
+                    "uptime_seconds": round(time.time() - self.started_at, 1),
+                }
+        except psutil.Error as e:
+            return {"error": str(e)}
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "process": self.process_info(),
+            "event_loop": {
+                "lag_ms": round(self.loop_lag_last * 1000, 3),
+                "lag": self.loop_lag.summary(),
+                "executor_queue_depth": self.executor_queue_depth(),
+            },
+            "collectors": {
+                name: {
+                    **histogram.summary(),
+                    "errors": self.collector_errors.get(name, 0),
+                    "slow_runs": self.collector_slow_runs.get(name, 0),
+                }
+                for name, histogram in list(self.collectors.items())
+            },
+            "routes": {
+                name: {**histogram.summary(), "errors": self.route_errors.get(name, 0)}
+                for name, histogram in list(self.routes.items())
+            },
+            "operations": {name: histogram.summary() for name, histogram in list(self.operations.items())},
+        }
+
+    def metrics_section(self, b):
+        """/metrics 中的自监控指标段（MetricsExporter.add_section）"""
+        b.histogram("self_collector_duration_seconds", "Time spent in each sampler collector.",
+                    [({"collector": name}, h) for name, h in list(self.collectors.items())], unit="seconds")
+        b.family("self_collector_errors", "counter", "Collector failures.",
+                 [({"collector": name}, count) for name, count in list(self.collector_errors.items())])
+        b.family("self_collector_slow_runs", "counter", "Collector runs slower than the sampling interval.",
+                 [({"collector": name}, count) for name, count in list(self.collector_slow_runs.items())])
+        b.histogram("self_route_duration_seconds", "HTTP request duration per route.",
+                    [({"route": name}, h) for name, h in list(self.routes.items())], unit="seconds")
+        b.histogram("self_operation_duration_seconds", "Duration of instrumented blocking operations.",
+                    [({"operation": name}, h) for name, h in list(self.operations.items())], unit="seconds")
+        b.histogram("self_event_loop_lag_seconds", "Event loop wake-up delay measured by a heartbeat task.",
+                    [({}, self.loop_lag)], unit="seconds")
+        b.gauge("self_executor_queue_depth", "Tasks waiting in the default thread pool.",
+                self.executor_queue_depth())
+        process = self.process_info()
+        b.gauge("self_resident_memory_bytes", "Resident memory of the backend process.",
+                process.get("rss_bytes"), unit="bytes")
+        b.family("self_cpu_seconds", "counter", "CPU time consumed by the backend process.",
+                 [({}, process.get("cpu_seconds"))], unit="seconds")
+        b.gauge("self_threads", "Threads in the backend process.", process.get("threads"))
+
+class SelfMetricsMiddleware:
+    """按路由模板统计请求耗时（纯 ASGI 中间件，耗时包含响应序列化和发送）"""
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[Any, str] = {}
+
+    def _route_name(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        name = self._route_paths.get(endpoint)
+        if name is None:
+            name = next((route.path for route in getattr(scope.get("router"), "routes", [])
+                         if getattr(route, "endpoint", None) is endpoint), "unmatched")
+            self._route_paths[endpoint] = name
+        return name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            get_self_metrics().observe_route(self._route_name(scope), time.perf_counter() - started, status)
+
+def timed(name: str) -> Callable:
+    """装饰器：把函数耗时计入 operations 直方图"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                get_self_metrics().observe_operation(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+# 全局自监控实例
+_self_metrics: Optional[SelfMetrics] = None
+
+def get_self_metrics() -> SelfMetrics:
+    """获取全局自监控实例"""
+    global _self_metrics
+    if _self_metrics is None:
+        from core.config import settings
+        _self_metrics = SelfMetrics(slow_threshold=settings.monitor_interval)
+    return _self_metrics
@@ -0,0 +1,332 @@
+# 多进程共享快照
+
+"""
+多 worker 部署下的共享快照
+uvicorn 以多个 worker 运行时，只有一个进程（通过文件锁选举）运行采样器，
+每个周期把预先序列化好的 /api/status JSON 和 /metrics 文本写入一块共享内存；
+所有 worker 直接从共享内存返回这些字节，不重复采集，也不会争写 traffic_data.json。
+历史、告警等依赖采样器内存状态的接口由其余 worker 转发给采样进程（core/worker_proxy.py）。
+
+共享内存布局（固定）：
+    文件头 64 字节：magic "SMON" | 布局版本 u32 | 槽位数 u32 | 每个槽位的数据容量 u32
+    每个槽位：64 字节槽头（seq u64 | 数据长度 u64 | 发布时间 f64）+ 数据区
+
+每个槽位用 seqlock 保护：写入前 seq 加 1（变为奇数），写完再加 1（变回偶数）；
+读取方在 seq 为偶数且前后两次读到的 seq 相同时才认为数据完整，否则重试，读写双方都不加锁。
+采样进程退出后，其他 worker 会在下一次选举中接管，读取方发现数据过期后重新连接共享内存。
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，无法选举唯一的采样进程，只能单 worker 运行
+    fcntl = None
+
+MAGIC = b"SMON"
+LAYOUT_VERSION = 1
+HEADER = struct.Struct("<4sIII")
+HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct("<QQd")
+SLOT_HEADER_SIZE = 64
+
+SLOT_STATUS = 0
+SLOT_METRICS = 1
+SLOT_COUNT = 2
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """连接已存在的共享内存，且不向 resource_tracker 登记（否则本进程退出时会删除它）"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+
+    def skip_shared_memory(resource_name, rtype):
+        if rtype != "shared_memory":
+            register(resource_name, rtype)
+
+    resource_tracker.register = skip_shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class SharedSnapshot:
+    """基于 seqlock 的共享内存快照"""
+
+    def __init__(self, name: str, slot_size: int = 1024 * 1024, slots: int = SLOT_COUNT):
+        self.name = name
+        self.slot_size = slot_size
+        self.slots = slots
+        self.size = HEADER_SIZE + slots * (SLOT_HEADER_SIZE + slot_size)
+        self.owner = False
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._buf: Optional[memoryview] = None
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * (SLOT_HEADER_SIZE + self.slot_size)
+
+    def create(self):
+        """采样进程创建（或复用同样布局的）共享内存"""
+        try:
+            segment = shared_memory.SharedMemory(name=self.name, create=True, size=self.size)
+        except FileExistsError:
+            segment = _attach(self.name)
+            if segment.size < self.size or bytes(segment.buf[:4]) != MAGIC or \
+                    HEADER.unpack_from(segment.buf)[1:] != (LAYOUT_VERSION, self.slots, self.slot_size):
+                # 布局不一致（如配置改变后重启），删除后重建
+                segment.close()
+                segment.unlink()
+                segment = shared_memory.SharedMemory(name=self.name, create=True, size=self.size)
+        self._segment = segment
+        self._buf = segment.buf
+        # 上一个采样进程可能在 write() 中途退出，留下奇数 seq 和不完整的数据，复用前清零所有槽头
+        for slot in range(self.slots):
+            SLOT_HEADER.pack_into(self._buf, self._slot_offset(slot), 0, 0, 0.0)
+        HEADER.pack_into(self._buf, 0, MAGIC, LAYOUT_VERSION, self.slots, self.slot_size)
+        self.owner = True
+
+    def attach(self) -> bool:
+        """读取方连接共享内存，不存在或布局不一致时返回 False"""
+        self.close()
+        try:
+            segment = _attach(self.name)
+        except FileNotFoundError:
+            return False
+        magic, version, slots, slot_size = HEADER.unpack_from(segment.buf)
+        if magic != MAGIC or version != LAYOUT_VERSION or slots != self.slots or slot_size != self.slot_size:
+            segment.close()
+            return False
+        self._segment = segment
+        self._buf = segment.buf
+        return True
+
+    @property
+    def attached(self) -> bool:
+        return self._buf is not None
+
+    def write(self, slot: int, data: bytes, timestamp: Optional[float] = None) -> bool:
+        """写入一个槽位（只能由单个写入方调用），数据超出容量时返回 False"""
+        if self._buf is None or len(data) > self.slot_size:
+            return False
+        offset = self._slot_offset(slot)
+        seq = SLOT_HEADER.unpack_from(self._buf, offset)[0]
+        # seq 变为奇数：读取方会等待或重试
+        struct.pack_into("<Q", self._buf, offset, seq + 1)
+        start = offset + SLOT_HEADER_SIZE
+        self._buf[start:start + len(data)] = data
+        SLOT_HEADER.pack_into(self._buf, offset, seq + 1, len(data),
+                              time.time() if timestamp is None else timestamp)
+        struct.pack_into("<Q", self._buf, offset, seq + 2)
+        return True
+
+    def read(self, slot: int, retries: int = 100) -> Tuple[Optional[bytes], float]:
+        """读取一个槽位，返回 (数据, 发布时间)；尚未发布或多次重试仍不一致时返回 (None, 0)"""
+        buf = self._buf
+        if buf is None:
+            return None, 0.0
+        offset = self._slot_offset(slot)
+        start = offset + SLOT_HEADER_SIZE
+        for _ in range(retries):
+            seq, length, timestamp = SLOT_HEADER.unpack_from(buf, offset)
+            if seq & 1 or length > self.slot_size:
+                continue
+            data = bytes(buf[start:start + length])
+            if struct.unpack_from("<Q", buf, offset)[0] == seq:
+                return (data, timestamp) if seq else (None, 0.0)
+        return None, 0.0
+
+    def close(self):
+        if self._segment is not None:
+            self._buf = None
+            try:
+                self._segment.close()
+            except BufferError:
+                pass
+            self._segment = None
+
+    def unlink(self):
+        if self.owner and self._segment is not None:
+            segment = self._segment
+            self.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+            self.owner = False
+
+class SamplerElection:
+    """用文件锁选出唯一的采样进程；持锁进程退出时锁由内核自动释放"""
+
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+class SharedSnapshotPublisher:
+    """采样器监听器：把预先序列化的响应写入共享内存"""
+
+    def __init__(self, snapshot: SharedSnapshot, render_status: Callable[[Dict[str, Any]], bytes],
+                 render_metrics: Callable[[], bytes]):
+        self.snapshot = snapshot
+        self.render_status = render_status
+        self.render_metrics = render_metrics
+        self._overflow_reported = set()
+
+    def _write(self, slot: int, data: bytes, timestamp: float):
+        if not self.snapshot.write(slot, data, timestamp) and slot not in self._overflow_reported:
+            self._overflow_reported.add(slot)
+            print(f"共享快照槽位 {slot} 容量不足（{len(data)} > {self.snapshot.slot_size} 字节），已跳过")
+
+    def on_sample(self, snapshot: Dict[str, Any], flat: Dict[str, float]):
+        timestamp = snapshot["timestamp"]
+        self._write(SLOT_STATUS, self.render_status(snapshot), timestamp)
+        self._write(SLOT_METRICS, self.render_metrics(), timestamp)
+
+class SharedSamplerCoordinator:
+    """
+    多 worker 协调：每个 worker 都运行一个选举任务，
+    抢到锁的 worker 启动采样器并发布快照，其余 worker 只读取共享内存
+    """
+
+    def __init__(self, name: str, slot_size: int, lock_path: str, interval: float,
+                 retry_interval: float = 2.0, proxy_socket: str = ""):
+        self.snapshot = SharedSnapshot(name, slot_size)
+        self.election = SamplerElection(lock_path)
+        self.proxy_socket = proxy_socket
+        self.app = None
+        self._proxy_server = None
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.is_sampler = False
+        self.renderers: Optional[Tuple[Callable[[Dict[str, Any]], bytes], Callable[[], bytes]]] = None
+        self._stop_collection: Optional[Callable[[], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_attach = 0.0
+
+    async def _run(self, start_collection):
+        while True:
+            if self.election.try_acquire():
+                self.snapshot.create()
+                publisher = SharedSnapshotPublisher(self.snapshot, *self.renderers)
+                self._stop_collection = await start_collection(publisher)
+                # 其余 worker 把历史、告警等接口转发到这里（Windows 没有选举锁，每个 worker 各自采样，不需要转发）
+                if fcntl is not None and self.app is not None and self.proxy_socket:
+                    from core.worker_proxy import WorkerProxyServer
+                    self._proxy_server = WorkerProxyServer(self.app, self.proxy_socket)
+                    await self._proxy_server.start()
+                self.is_sampler = True
+                print(f"worker {os.getpid()} 成为采样进程")
+                return
+            await asyncio.sleep(self.retry_interval)
+
+    def start(self, start_collection: Callable[[SharedSnapshotPublisher], Awaitable[Callable[[], Awaitable[None]]]],
+              render_status: Callable[[Dict[str, Any]], bytes], render_metrics: Callable[[], bytes], app=None):
+        """
+        启动选举任务；当选后调用 start_collection(publisher)，其返回值为停止采集的协程函数
+        传入 app 时当选进程同时在 proxy_socket 上响应其余 worker 转发的请求
+        """
+        self.renderers = (render_status, render_metrics)
+        self.app = app
+        self._task = asyncio.get_running_loop().create_task(self._run(start_collection))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._proxy_server is not None:
+            await self._proxy_server.stop()
+            self._proxy_server = None
+        if self._stop_collection is not None:
+            await self._stop_collection()
+            self._stop_collection = None
+        if self.is_sampler:
+            self.snapshot.unlink()
+            self.election.release()
+            self.is_sampler = False
+        self.snapshot.close()
+
+    def read(self, slot: int) -> Optional[bytes]:
+        """读取最新发布的数据；数据缺失或过期时（采样进程可能已切换）重新连接共享内存"""
+        data, timestamp = self.snapshot.read(slot)
+        stale = data is None or time.time() - timestamp > max(3 * self.interval, 5.0)
+        if stale and not self.snapshot.owner:
+            now = time.monotonic()
+            if now - self._last_attach >= 1.0:
+                self._last_attach = now
+                if self.snapshot.attach():
+                    data, timestamp = self.snapshot.read(slot)
+        return data
+
+# 全局协调器（仅在多 worker 模式下创建）
+_coordinator: Optional[SharedSamplerCoordinator] = None
+
+def shared_mode_supported() -> bool:
+    """是否能选举唯一的采样进程（依赖 fcntl 文件锁）"""
+    return fcntl is not None
+
+_unsupported_warned = False
+
+def shared_mode_enabled() -> bool:
+    """
+    是否启用多 worker 共享快照
+    没有 fcntl 时每个进程都会当选并写同一块共享内存，破坏单写者的前提，因此不启用（每个进程独立采样）
+    """
+    global _unsupported_warned
+    from core.config import settings
+    if not (settings.shared_snapshot or settings.workers > 1):
+        return False
+    if not shared_mode_supported():
+        if not _unsupported_warned:
+            _unsupported_warned = True
+            print("警告: 当前平台没有 fcntl，不支持多 worker 共享快照，请使用单 worker 运行")
+        return False
+    return True
+
+def get_shared_coordinator() -> Optional[SharedSamplerCoordinator]:
+    """获取多 worker 协调器，单进程模式下返回 None"""
+    global _coordinator
+    if _coordinator is None and shared_mode_enabled():
+        from core.config import settings
+        _coordinator = SharedSamplerCoordinator(
+            name=settings.shared_snapshot_name,
+            slot_size=settings.shared_snapshot_slot_size,
+            lock_path=settings.shared_snapshot_lock,
+            # 自适应采样时发布间隔最长可达 sampling_max_interval，过期判断按最长间隔计算
+            interval=max(settings.monitor_interval, settings.sampling_max_interval)
+            if settings.adaptive_sampling else settings.monitor_interval,
+            proxy_socket=settings.shared_snapshot_proxy_socket,
+        )
+    return _coordinator
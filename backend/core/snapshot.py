@@ -0,0 +1,188 @@
+# 快照数据模型
+
+"""
+采样器快照的数据模型
+结构固定的采集结果（CPU、内存、交换区、磁盘 I/O、网络、负载、运行时间、连接数、逐磁盘/逐网卡计数器）
+使用带 __slots__ 的记录类，字段顺序固定，每个实例不再携带自己的键哈希表；整份快照（Snapshot）
+只保存时间戳和按采集器注册顺序排列的值列表，采集器名称 -> 下标的映射（SnapshotLayout）
+由同一组采集器产生的全部快照共享。保留大量快照时的内存对比见 benchmarks/bench_snapshot.py。
+
+记录和快照都提供 get / [] / in / keys / items 只读映射接口，展开（flatten_snapshot）、Prometheus 渲染等
+内部代码无需区分；只在 JSON 边界（API 响应、共享内存）通过 to_plain / to_dict 转换为字典。
+结构不固定的部分（逐设备 I/O 扩展指标、传感器、PSI 等）仍然是字典。
+"""
+
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class Record:
+    """固定字段的记录基类，子类只声明 __slots__（即字段顺序）；值为 None 的字段视为不存在"""
+
+    __slots__ = ()
+    _values = staticmethod(lambda record: ())
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 一次取出全部字段值（元组），items() / 展开时不逐个 getattr
+        getter = attrgetter(*cls.__slots__)
+        cls._values = staticmethod(getter if len(cls.__slots__) > 1 else lambda record: (getter(record),))
+
+    def __init__(self, *args, **kwargs):
+        fields = self.__slots__
+        if len(args) > len(fields):
+            raise TypeError(f"{type(self).__name__} 最多 {len(fields)} 个字段，传入了 {len(args)} 个")
+        for name, value in zip(fields, args):
+            setattr(self, name, value)
+        for name in fields[len(args):]:
+            setattr(self, name, kwargs.pop(name, None))
+        if kwargs:
+            raise TypeError(f"{type(self).__name__} 没有字段: {', '.join(kwargs)}")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def keys(self) -> List[str]:
+        return [name for name, value in zip(self.__slots__, self._values(self)) if value is not None]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, value) for name, value in zip(self.__slots__, self._values(self)) if value is not None]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: to_plain(value) for name, value in self.items()}
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and self._values(self) == other._values(other)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={value!r}' for name, value in self.items())})"
+
+class CpuStats(Record):
+    """CPU 使用率；burst 为高频采样的本周期汇总（未启用时为 None）"""
+    __slots__ = ("usage_percent", "core_count", "current_freq", "max_freq", "per_cpu", "burst")
+
+class MemoryStats(Record):
+    __slots__ = ("total", "available", "used", "usage_percent", "free")
+
+class SwapStats(Record):
+    __slots__ = ("total", "used", "free", "usage_percent")
+
+class DiskIOStats(Record):
+    __slots__ = ("read_bytes", "write_bytes", "read_count", "write_count", "read_speed_mb", "write_speed_mb")
+
+class DiskCounters(Record):
+    """逐磁盘累计计数器"""
+    __slots__ = ("read_bytes", "write_bytes", "read_count", "write_count", "busy_time")
+
+class NetworkStats(Record):
+    __slots__ = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv", "upload_speed_mb", "download_speed_mb")
+
+class InterfaceStats(Record):
+    """逐网卡累计计数器和每秒速率（字段顺序与 monitor/interfaces_monitor.py 的 COLUMNS 一致）"""
+    __slots__ = ("bytes_recv", "packets_recv", "errin", "dropin", "bytes_sent", "packets_sent", "errout", "dropout",
+                 "bytes_recv_per_sec", "packets_recv_per_sec", "errin_per_sec", "dropin_per_sec",
+                 "bytes_sent_per_sec", "packets_sent_per_sec", "errout_per_sec", "dropout_per_sec")
+
+class LoadStats(Record):
+    __slots__ = ("load_1min", "load_5min", "load_15min", "cpu_count")
+
+class UptimeStats(Record):
+    __slots__ = ("seconds", "boot_time")
+
+class ConnectionStats(Record):
+    __slots__ = ("established",)
+
+class SnapshotLayout:
+    """采集器名称 -> 值列表下标，同一组采集器产生的快照共享一个实例"""
+
+    __slots__ = ("names", "index")
+
+    def __init__(self, names: Iterable[str]):
+        self.names = tuple(names)
+        self.index = {name: position for position, name in enumerate(self.names)}
+
+class Snapshot:
+    """
+    一次采样的结果：timestamp + 按 layout 顺序排列的各采集器结果（失败的采集器为 None）
+    发布后监听器追加的部分（如 anomalies）不在 layout 中，保存在 extra
+    """
+
+    __slots__ = ("timestamp", "layout", "values", "extra")
+
+    def __init__(self, timestamp: float, layout: SnapshotLayout, values: Optional[List[Any]] = None):
+        self.timestamp = timestamp
+        self.layout = layout
+        self.values = values if values is not None else [None] * len(layout.names)
+        self.extra: Optional[Dict[str, Any]] = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        position = self.layout.index.get(key)
+        if position is not None:
+            value = self.values[position]
+        elif key == "timestamp":
+            value = self.timestamp
+        else:
+            value = self.extra.get(key) if self.extra else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any):
+        position = self.layout.index.get(key)
+        if position is not None:
+            self.values[position] = value
+        elif key == "timestamp":
+            self.timestamp = value
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def sections(self) -> List[Tuple[str, Any]]:
+        """各采集器（及监听器追加部分）的 (名称, 结果)，不含 timestamp 和失败的采集器"""
+        result = [(name, value) for name, value in zip(self.layout.names, self.values) if value is not None]
+        if self.extra:
+            result.extend(self.extra.items())
+        return result
+
+    def keys(self) -> List[str]:
+        return ["timestamp"] + [name for name, _ in self.sections()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [("timestamp", self.timestamp)] + self.sections()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为嵌套字典（与早期快照字典的结构相同）"""
+        return {name: to_plain(value) for name, value in self.items()}
+
+def to_plain(value: Any) -> Any:
+    """把记录/快照（包括嵌套在字典和列表中的）转换为字典，用于 JSON 序列化"""
+    if isinstance(value, (Record, Snapshot)):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_plain(item) for item in value]
+    return value
@@ -0,0 +1,200 @@
+# 多 worker 请求转发
+
+"""
+多 worker 部署下依赖采样器状态的接口转发
+历史、查询、导出、告警、异常检测、逐网卡速率等接口读取的是采样进程内存中的数据，
+磁盘/网络/cgroup 速率也只有在同一个进程中连续计算才一致。
+采样进程在一个 Unix socket 上提供这些接口，其余 worker 收到请求后原样转发过去，
+响应分块流式返回（导出大范围历史时内存占用固定）。
+
+帧格式（长度前缀均为 u32 小端）：
+    请求：长度 + JSON {"method", "path", "query_string", "headers"} | 长度 + 请求体
+    响应：长度 + JSON {"status", "headers"} | 若干个 长度 + 数据块 | 长度 0 表示结束
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+from typing import Any, Dict, Optional
+
+LENGTH = struct.Struct("<I")
+PROXY_HEADER = b"x-sampler-proxy"
+
+# 需要由采样进程响应的接口
+SAMPLER_ROUTES = frozenset({
+    "/api/history", "/api/history/series", "/api/query", "/api/export",
+    "/api/alerts", "/api/anomalies",
+    "/api/cpu", "/api/disk", "/api/network", "/api/network/interfaces", "/api/cgroups",
+})
+
+def proxy_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    return await reader.readexactly(length) if length else b""
+
+def _write_frame(writer: asyncio.StreamWriter, data: bytes):
+    writer.write(LENGTH.pack(len(data)))
+    if data:
+        writer.write(data)
+
+class WorkerProxyServer:
+    """采样进程一侧：在 Unix socket 上接收转发的请求，交给本进程的 ASGI 应用处理"""
+
+    def __init__(self, app, path: str):
+        self.app = app
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        # 只有持有选举锁的进程会走到这里，残留的 socket 文件可以直接删除
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(await _read_frame(reader))
+            body = await _read_frame(reader)
+            await self._dispatch(request, body, writer)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Dict[str, Any], body: bytes, writer: asyncio.StreamWriter):
+        path = request["path"]
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in request["headers"]]
+        headers.append((PROXY_HEADER, b"1"))
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": request["method"], "scheme": "http",
+            "path": path, "raw_path": path.encode("utf-8"),
+            "query_string": request["query_string"].encode("latin-1"),
+            "root_path": "", "headers": headers, "client": None, "server": None, "state": {},
+        }
+        finished = asyncio.Event()
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                _write_frame(writer, json.dumps({
+                    "status": message["status"],
+                    "headers": [(name.decode("latin-1"), value.decode("latin-1"))
+                                for name, value in message.get("headers", [])],
+                }).encode("utf-8"))
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                if chunk:
+                    _write_frame(writer, chunk)
+                if not message.get("more_body", False):
+                    _write_frame(writer, b"")
+                    finished.set()
+                await writer.drain()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            finished.set()
+
+class WorkerProxyMiddleware:
+    """
+    其余 worker 一侧：SAMPLER_ROUTES 中的请求转发给采样进程（纯 ASGI 中间件）
+    采样进程尚未选出或无法连接时返回 503，而不是返回本进程中为空的数据
+    """
+
+    def __init__(self, app, connect_timeout: float = 5.0):
+        self.app = app
+        self.connect_timeout = connect_timeout
+
+    def _should_forward(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"] not in SAMPLER_ROUTES:
+            return False
+        if any(name == PROXY_HEADER for name, _ in scope.get("headers", [])):
+            return False
+        from core.shared_snapshot import get_shared_coordinator
+        coordinator = get_shared_coordinator()
+        return coordinator is not None and not coordinator.is_sampler and proxy_supported()
+
+    async def __call__(self, scope, receive, send):
+        if not self._should_forward(scope):
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        from core.config import settings
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(settings.shared_snapshot_proxy_socket), self.connect_timeout)
+        except (OSError, asyncio.TimeoutError):
+            await self._unavailable(send)
+            return
+
+        try:
+            _write_frame(writer, json.dumps({
+                "method": scope["method"], "path": scope["path"],
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "headers": [(name.decode("latin-1"), value.decode("latin-1"))
+                            for name, value in scope.get("headers", [])],
+            }).encode("utf-8"))
+            _write_frame(writer, body)
+            await writer.drain()
+            try:
+                start = json.loads(await _read_frame(reader))
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                await self._unavailable(send)
+                return
+            await send({
+                "type": "http.response.start", "status": start["status"],
+                "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in start["headers"]],
+            })
+            while True:
+                try:
+                    chunk = await _read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    # 采样进程中途退出：响应已经开始，只能截断
+                    chunk = b""
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(chunk)})
+                if not chunk:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _unavailable(send):
+        content = json.dumps({"success": False, "error": "该接口只由采样进程提供，采样进程暂不可用",
+                              "data": None}, ensure_ascii=False).encode("utf-8")
+        await send({"type": "http.response.start", "status": 503, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())]})
+        await send({"type": "http.response.body", "body": content})
@@ -5,25 +5,165 @@ FastAPI + psutil 实现系统资源监控
 重构版本：使用模块化架构
 """
 
-import uvicorn
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 # 导入自定义模块
 from core.config import settings
-from api.routes import router as monitoring_router, init_traffic_system
+from api.routes import router as monitoring_router, init_traffic_system, init_rate_state, render_status
 from api.health import router as health_router
 from api.system_routes import router as system_router
+from api.cgroup_routes import router as cgroup_router
+from api.history_routes import router as history_router
+from api.query_routes import router as query_router
+from api.export_routes import router as export_router
+from api.alert_routes import router as alert_router
+from api.anomaly_routes import router as anomaly_router
+from api.metrics_routes import router as metrics_router
+from api.self_routes import router as self_router
+from core.sampler import get_sampler
+from core.alerts import get_alert_engine
+from core.prometheus import get_metrics_exporter
+from core.exporters import get_push_exporters
+from core.selfmetrics import get_self_metrics, SelfMetricsMiddleware
+from core.profiler import get_continuous_profiler
+from core.shared_snapshot import get_shared_coordinator
+from core.worker_proxy import WorkerProxyMiddleware
+from monitor.trace import get_trace_recorder
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+def _load_anomaly_detector():
+    # 异常检测依赖 NumPy，导入耗时较长，不放在启动的关键路径上
+    from core.anomaly import get_anomaly_detector
+    return get_anomaly_detector()
+
+def _start_cpu_burst_sampler():
+    # /proc/stat 高频采样同样依赖 NumPy，在线程池中加载并启动
+    from monitor.cpu_burst import get_cpu_burst_sampler
+    return get_cpu_burst_sampler()
+
+def _stop_cpu_burst_sampler():
+    # 只在已经加载过高频采样模块时停止，避免关闭时才导入 NumPy
+    import sys
+    cpu_burst = sys.modules.get("monitor.cpu_burst")
+    if cpu_burst is not None:
+        cpu_burst.stop_cpu_burst_sampler()
+
+class _AnomalyListener:
+    """
+    异常检测监听器的占位：启动时同步注册在其他监听器之前，检测器在线程池中加载完成后才开始检测，
+    这样告警、/metrics、共享快照等监听器看到的都是本周期的 anomalies
+    """
+
+    def __init__(self):
+        self.detector = None
+
+    def __call__(self, snapshot, flat):
+        if self.detector is not None:
+            self.detector.on_sample(snapshot, flat)
+
+async def _attach_anomaly_detector(sampler, listener: _AnomalyListener):
+    """启动完成后在线程池中加载异常检测器，再接入采样器"""
+    detector = await asyncio.get_running_loop().run_in_executor(None, _load_anomaly_detector)
+    listener.detector = detector
+    if sampler.scheduler is not None:
+        sampler.scheduler.add_urgency_check(lambda: bool(detector.current))
+
+async def start_collection(publisher=None):
+    """
+    启动采样相关的全部组件，返回停止它们的协程函数
+    单进程模式下在启动时直接调用；多 worker 模式下只在当选的采样进程中调用
+    """
     # 应用启动时初始化流量系统
     init_traffic_system()
     print("流量监控系统已初始化")
+    # 记录磁盘/网络计数器基准，第一个 /api/status 请求即可返回有效速率
+    init_rate_state()
+    on_demand = settings.collection_mode == "on_demand" and publisher is None
+    # 启动后台采样器
+    sampler = get_sampler()
+    # CPU 高频采样：每个采样周期汇总一次，捕捉短时满载（不等待加载完成）
+    # 按需模式下不常驻，由采集器在第一次采集时启动，采样器空闲时停止
+    burst_future = None
+    if on_demand:
+        sampler.idle_listeners.append(_stop_cpu_burst_sampler)
+    else:
+        burst_future = asyncio.get_running_loop().run_in_executor(None, _start_cpu_burst_sampler)
+    sampler.collector_observer = get_self_metrics().observe_collector
+    # 异常检测最先执行，结果写入快照后再通知其余监听器
+    anomaly_listener = _AnomalyListener()
+    sampler.add_listener(anomaly_listener)
+    anomaly_task = asyncio.create_task(_attach_anomaly_detector(sampler, anomaly_listener))
+    # 告警规则在每个采样周期上求值
+    alert_engine = get_alert_engine()
+    sampler.add_listener(alert_engine.on_sample)
+    alert_engine.notifier.start()
+    # 自适应采样：有告警处于 pending / firing 时按最短间隔采样
+    if sampler.scheduler is not None:
+        sampler.scheduler.add_urgency_check(lambda: alert_engine.active)
+        get_metrics_exporter().add_section(sampler.scheduler.metrics_section)
+    # /metrics 文本每个周期渲染一次
+    sampler.add_listener(get_metrics_exporter().on_sample)
+    # StatsD / Graphite 推送在各自的后台线程中发送
+    for exporter in get_push_exporters():
+        sampler.add_listener(exporter.on_sample)
+        exporter.start()
+    # 采集结果录制（TRACE_RECORD_PATH），之后可用 HOST_PROVIDER=replay 回放
+    recorder = get_trace_recorder()
+    if recorder is not None:
+        sampler.add_listener(recorder.on_sample)
+    # 多 worker 模式：最后把预先序列化的响应发布到共享内存
+    if publisher is not None:
+        sampler.add_listener(publisher.on_sample)
+    if on_demand:
+        print("按需采集模式：收到请求时才开始采样")
+    else:
+        sampler.start()
+
+    async def stop_collection():
+        anomaly_task.cancel()
+        await sampler.stop()
+        if burst_future is not None:
+            await burst_future
+        _stop_cpu_burst_sampler()
+        await alert_engine.notifier.stop()
+        for exporter in get_push_exporters():
+            exporter.stop()
+        if recorder is not None:
+            recorder.close()
+
+    return stop_collection
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 自监控：事件循环延迟（每个 worker 各自统计）
+    self_metrics = get_self_metrics()
+    self_metrics.start()
+    get_metrics_exporter().add_section(self_metrics.metrics_section)
+    # 常驻调用栈采样（按配置启用）
+    continuous_profiler = get_continuous_profiler()
+    if continuous_profiler is not None:
+        continuous_profiler.start()
+
+    coordinator = get_shared_coordinator()
+    stop_collection = None
+    if coordinator is not None:
+        # 多 worker 模式：选举出一个 worker 运行采样器，其余 worker 读取共享内存
+        coordinator.start(start_collection, render_status,
+                          lambda: get_metrics_exporter().payload, app=app)
+    else:
+        stop_collection = await start_collection()
     yield
     # 应用关闭时的清理逻辑
     print("服务器监控系统正在关闭...")
+    if coordinator is not None:
+        await coordinator.stop()
+    else:
+        await stop_collection()
+    await self_metrics.stop()
+    if continuous_profiler is not None:
+        continuous_profiler.stop()
 
 # 创建FastAPI应用实例
 app = FastAPI(
@@ -42,18 +182,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 多 worker 模式：依赖采样器状态的接口转发给采样进程
+app.add_middleware(WorkerProxyMiddleware)
+
+# 按路由统计请求耗时
+app.add_middleware(SelfMetricsMiddleware)
+
 # 注册路由
 app.include_router(monitoring_router)
 app.include_router(health_router)
 app.include_router(system_router)
+app.include_router(cgroup_router)
+app.include_router(history_router)
+app.include_router(query_router)
+app.include_router(export_router)
+app.include_router(alert_router)
+app.include_router(anomaly_router)
+app.include_router(metrics_router)
+app.include_router(self_router)
 
 # 启动应用
 if __name__ == "__main__":
-    # 启动FastAPI服务
+    import uvicorn
+    from core.shared_snapshot import shared_mode_supported
+    workers = settings.workers
+    if workers > 1 and not shared_mode_supported():
+        print(f"警告: 当前平台不支持多 worker 共享快照，忽略 WORKERS={workers}，以单 worker 运行")
+        workers = 1
+    # 启动FastAPI服务（多 worker 时不能使用热重载）
     uvicorn.run(
         "main:app",
         host=settings.host,
         port=settings.port,
-        reload=True,
+        reload=workers <= 1,
+        workers=workers,
         log_level="info"
     )
\ No newline at end of file
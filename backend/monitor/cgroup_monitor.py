@@ -0,0 +1,315 @@
+# cgroup v2 监控模块
+
+"""
+cgroup v2 容器/服务资源采集
+遍历 /sys/fs/cgroup 下的每个 cgroup，读取 cpu.stat、memory.current、memory.stat、
+io.stat 以及 *.pressure 文件，并按 cgroup 计算 CPU/IO/缺页速率。
+
+为了在有数千个 cgroup 的主机上每个周期都能跑完，采集是增量的：
+- 目录结构：kernfs 不会在创建子 cgroup 时更新父目录 mtime，所以用每个 cgroup
+  的 cgroup.stat 中的 nr_descendants 判断子树是否变化，只重新扫描变化的分支，
+  并每隔 full_rescan_ticks 个周期做一次完整扫描兜底
+- 统计文件：cpu.stat 和 memory.current 每个周期都读；memory.stat、io.stat 和
+  pressure 只在该 cgroup 的 CPU 时间或内存占用发生变化时重新读取，空闲 cgroup
+  复用上一次的值；IO/缺页速率也只在重新读取时计算（覆盖上次读取以来的整段时间），
+  其余周期沿用上一次的速率，避免出现 0/s 之后的尖峰
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from monitor.pressure_monitor import parse_pressure
+from monitor.rates import RateCalculator
+
+DEFAULT_CGROUP_ROOT = "/sys/fs/cgroup"
+
+# 可用于排序的字段
+SORT_KEYS = {
+    "cpu": "cpu_percent",
+    "memory": "memory_current",
+    "io": "io_bytes_per_sec",
+}
+
+PRESSURE_RESOURCES = ("cpu", "memory", "io")
+
+def _read_text(path: str) -> Optional[str]:
+    """读取小文件，文件不存在或 cgroup 已被删除时返回 None"""
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except (OSError, ValueError):
+        return None
+
+def _parse_flat_keyed(text: str) -> Dict[str, int]:
+    """解析 "key value" 每行一项的格式（cpu.stat、memory.stat、cgroup.stat）"""
+    result = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2:
+            try:
+                result[parts[0]] = int(parts[1])
+            except ValueError:
+                continue
+    return result
+
+def _parse_io_stat(text: str) -> Dict[str, int]:
+    """解析 io.stat 并把所有设备的计数累加"""
+    totals = {"rbytes": 0, "wbytes": 0, "rios": 0, "wios": 0}
+    for line in text.splitlines():
+        for field in line.split()[1:]:
+            key, _, value = field.partition("=")
+            if key in totals:
+                try:
+                    totals[key] += int(value)
+                except ValueError:
+                    continue
+    return totals
+
+class _CgroupNode:
+    """单个 cgroup 的缓存状态"""
+
+    __slots__ = ("path", "children", "nr_descendants", "usage_usec",
+                 "memory_current", "memory_max", "memory_stat", "io_stat",
+                 "pressure", "detail_tick", "detail_rates")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.children: List[str] = []
+        self.nr_descendants = -1
+        self.usage_usec = -1
+        self.memory_current = 0
+        self.memory_max = 0
+        self.memory_stat: Dict[str, int] = {}
+        self.io_stat: Dict[str, int] = {}
+        self.pressure: Dict[str, Dict[str, float]] = {}
+        self.detail_tick = -1
+        self.detail_rates: Dict[str, float] = {}
+
+class CgroupMonitor:
+    """cgroup v2 监控类"""
+
+    def __init__(self, root: str = DEFAULT_CGROUP_ROOT, full_rescan_ticks: int = 30,
+                 detail_refresh_ticks: int = 15):
+        self.root = self._resolve_root(root)
+        self.full_rescan_ticks = max(1, full_rescan_ticks)
+        self.detail_refresh_ticks = max(1, detail_refresh_ticks)
+        self.nodes: Dict[str, _CgroupNode] = {}
+        self.rates = RateCalculator()
+        self.tick = 0
+        self.last_timestamp = 0.0
+        self.last_result: List[Dict[str, Any]] = []
+        # 最近一次采集的开销统计，便于观察增量扫描是否生效
+        self.stats = {"cgroups": 0, "rescanned_dirs": 0, "detail_reads": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _resolve_root(root: str) -> str:
+        """兼容混合模式：v2 层级挂载在 <root>/unified 下"""
+        if not os.path.exists(os.path.join(root, "cgroup.controllers")):
+            unified = os.path.join(root, "unified")
+            if os.path.exists(os.path.join(unified, "cgroup.controllers")):
+                return unified
+        return root
+
+    def is_available(self) -> bool:
+        """当前主机是否挂载了 cgroup v2"""
+        return os.path.exists(os.path.join(self.root, "cgroup.controllers"))
+
+    def _abs(self, path: str) -> str:
+        return self.root + path if path != "/" else self.root
+
+    def _list_children(self, path: str) -> List[str]:
+        try:
+            with os.scandir(self._abs(path)) as entries:
+                return [
+                    (path.rstrip("/") + "/" + entry.name)
+                    for entry in entries
+                    if entry.is_dir(follow_symlinks=False)
+                ]
+        except OSError:
+            return []
+
+    def _refresh_tree(self, full: bool):
+        """增量刷新 cgroup 目录树，只重新扫描 nr_descendants 发生变化的分支"""
+        rescanned = 0
+        seen = set()
+        stack = ["/"]
+
+        while stack:
+            path = stack.pop()
+            node = self.nodes.get(path)
+            if node is None:
+                node = self.nodes[path] = _CgroupNode(path)
+
+            cgroup_stat = _read_text(self._abs(path) + "/cgroup.stat")
+            if cgroup_stat is None and path != "/":
+                # cgroup 已被删除
+                continue
+            nr_descendants = _parse_flat_keyed(cgroup_stat or "").get("nr_descendants", -1)
+
+            if full or nr_descendants != node.nr_descendants or nr_descendants < 0:
+                node.children = self._list_children(path)
+                node.nr_descendants = nr_descendants
+                rescanned += 1
+                seen.add(path)
+                stack.extend(node.children)
+            else:
+                # 子树未变化：直接沿用缓存的整棵子树
+                self._mark_subtree(path, seen)
+
+        for path in [p for p in self.nodes if p not in seen]:
+            del self.nodes[path]
+        self.rates.prune(lambda key: key[0] in self.nodes)
+        self.stats["rescanned_dirs"] = rescanned
+
+    def _mark_subtree(self, path: str, seen: set):
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            node = self.nodes.get(current)
+            if node is None:
+                continue
+            seen.add(current)
+            stack.extend(node.children)
+
+    def _read_node(self, node: _CgroupNode, timestamp: float) -> Optional[Dict[str, Any]]:
+        """读取单个 cgroup 的统计并计算速率"""
+        base = self._abs(node.path)
+        cpu_text = _read_text(base + "/cpu.stat")
+        if cpu_text is None:
+            return None
+        cpu_stat = _parse_flat_keyed(cpu_text)
+        usage_usec = cpu_stat.get("usage_usec", 0)
+
+        memory_text = _read_text(base + "/memory.current")
+        memory_current = int(memory_text) if memory_text and memory_text.strip().isdigit() else 0
+
+        rate = self.rates.rate
+        key = node.path
+        changed = usage_usec != node.usage_usec or memory_current != node.memory_current
+        stale = self.tick - node.detail_tick >= self.detail_refresh_ticks
+        if changed or stale:
+            self.stats["detail_reads"] += 1
+            node.detail_tick = self.tick
+            node.memory_stat = _parse_flat_keyed(_read_text(base + "/memory.stat") or "")
+            node.io_stat = _parse_io_stat(_read_text(base + "/io.stat") or "")
+            max_text = (_read_text(base + "/memory.max") or "").strip()
+            node.memory_max = int(max_text) if max_text.isdigit() else 0
+            node.pressure = {
+                resource: parse_pressure(_read_text(f"{base}/{resource}.pressure") or "")
+                for resource in PRESSURE_RESOURCES
+            }
+            io_stat = node.io_stat
+            memory_stat = node.memory_stat
+            node.detail_rates = {
+                field: rate((key, field), source.get(field, 0), timestamp)
+                for source, fields in ((io_stat, ("rbytes", "wbytes", "rios", "wios")),
+                                       (memory_stat, ("pgfault", "pgmajfault")))
+                for field in fields
+            }
+        node.usage_usec = usage_usec
+        node.memory_current = memory_current
+
+        cpu_usage_rate = rate((key, "usage_usec"), usage_usec, timestamp)
+        throttled_rate = rate((key, "throttled_usec"), cpu_stat.get("throttled_usec", 0), timestamp)
+        detail_rates = node.detail_rates
+        read_bps = detail_rates.get("rbytes", 0.0)
+        write_bps = detail_rates.get("wbytes", 0.0)
+        read_iops = detail_rates.get("rios", 0.0)
+        write_iops = detail_rates.get("wios", 0.0)
+        memory_stat = node.memory_stat
+
+        return {
+            "path": node.path,
+            "is_leaf": not node.children,
+            "cpu_percent": round(cpu_usage_rate / 1e4, 2),  # usec/s -> 单核百分比
+            "cpu_usage_usec": usage_usec,
+            "cpu_throttled_percent": round(throttled_rate / 1e4, 2),
+            "nr_throttled": cpu_stat.get("nr_throttled", 0),
+            "memory_current": memory_current,
+            "memory_max": node.memory_max,
+            "memory_anon": memory_stat.get("anon", 0),
+            "memory_file": memory_stat.get("file", 0),
+            "memory_shmem": memory_stat.get("shmem", 0),
+            "pgfault_per_sec": round(detail_rates.get("pgfault", 0.0), 2),
+            "pgmajfault_per_sec": round(detail_rates.get("pgmajfault", 0.0), 2),
+            "io_read_bytes_per_sec": round(read_bps, 2),
+            "io_write_bytes_per_sec": round(write_bps, 2),
+            "io_bytes_per_sec": round(read_bps + write_bps, 2),
+            "io_read_iops": round(read_iops, 2),
+            "io_write_iops": round(write_iops, 2),
+            "pressure": {
+                resource: {
+                    "some_avg10": values.get("some_avg10", 0.0),
+                    "full_avg10": values.get("full_avg10", 0.0),
+                }
+                for resource, values in node.pressure.items() if values
+            },
+        }
+
+    def collect(self, min_interval: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        采集所有 cgroup 的统计
+        距离上一次采集不足 min_interval 秒时直接返回上一次结果，
+        避免并发请求把速率计算的时间窗口切得过碎
+        """
+        with self._lock:
+            now = time.time()
+            if self.last_result and now - self.last_timestamp < min_interval:
+                return self.last_result
+            if not self.is_available():
+                return []
+
+            self.stats["detail_reads"] = 0
+            self._refresh_tree(full=self.tick % self.full_rescan_ticks == 0)
+
+            result = []
+            for path, node in self.nodes.items():
+                if path == "/":
+                    # 根 cgroup 即整机数据，不参与排名
+                    continue
+                data = self._read_node(node, now)
+                if data is not None:
+                    result.append(data)
+
+            self.tick += 1
+            self.stats["cgroups"] = len(result)
+            self.last_timestamp = now
+            self.last_result = result
+            return result
+
+    def get_top(self, sort: str = "cpu", limit: int = 10, leaf_only: bool = False) -> Dict[str, Any]:
+        """按 CPU/内存/IO 排序返回前 N 个 cgroup"""
+        sort_field = SORT_KEYS.get(sort, SORT_KEYS["cpu"])
+        cgroups = self.collect()
+        if leaf_only:
+            cgroups = [cg for cg in cgroups if cg["is_leaf"]]
+        top = sorted(cgroups, key=lambda cg: cg[sort_field], reverse=True)[:max(0, limit)]
+        return {
+            "available": self.is_available(),
+            "root": self.root,
+            "sort": sort if sort in SORT_KEYS else "cpu",
+            "total_cgroups": len(cgroups),
+            "cgroups": top,
+            "collector": dict(self.stats),
+        }
+
+# 全局 cgroup 监控实例（首次使用时创建）
+_cgroup_monitor: Optional[CgroupMonitor] = None
+
+def get_cgroup_monitor() -> CgroupMonitor:
+    """获取全局 cgroup 监控实例"""
+    global _cgroup_monitor
+    if _cgroup_monitor is None:
+        from core.config import settings
+        _cgroup_monitor = CgroupMonitor(
+            root=settings.cgroup_root,
+            full_rescan_ticks=settings.cgroup_full_rescan_ticks,
+        )
+    return _cgroup_monitor
+
+def get_cgroup_status(sort: str = "cpu", limit: int = 10, leaf_only: bool = False) -> Dict[str, Any]:
+    """获取 cgroup 排名（便捷函数）"""
+    return get_cgroup_monitor().get_top(sort=sort, limit=limit, leaf_only=leaf_only)
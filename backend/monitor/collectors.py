@@ -0,0 +1,210 @@
+# 采样器默认采集器
+
+"""
+后台采样器使用的默认采集器
+每个采集器都是无参数、非阻塞的函数，返回结构与 /api/status 中对应部分保持一致；
+结构固定的部分返回 core/snapshot.py 中的记录（CpuStats、MemoryStats 等），接口层调用同样的函数后再 to_dict()。
+速率统一由 RateCalculator 按两次采样的实际时间间隔计算。
+主机数据来自 monitor/providers.py 的数据源（默认 psutil），直接读取 /proc、/sys 的采集器只在真实主机上注册。
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from core.snapshot import (
+    ConnectionStats,
+    CpuStats,
+    DiskCounters,
+    DiskIOStats,
+    LoadStats,
+    MemoryStats,
+    NetworkStats,
+    SwapStats,
+    UptimeStats,
+)
+
+from monitor.diskstats_monitor import get_disk_device_stats
+from monitor.interfaces_monitor import get_interface_groups, get_interface_stats
+from monitor.netstat_monitor import get_netstat_stats
+from monitor.numa_monitor import get_numa_stats
+from monitor.pressure_monitor import get_pressure_stats
+from monitor.providers import get_host_provider
+from monitor.rates import CpuUsageCalculator, RateCalculator
+from monitor.sensors_monitor import get_sensor_stats
+from monitor.traffic_monitor import collect_traffic
+
+_rates = RateCalculator()
+# 高频采样不可用时按 cpu_times() 差值计算 CPU 利用率（采集在线程池中执行，不能依赖按线程保存基准的 cpu_percent）
+_cpu_usage = CpuUsageCalculator()
+
+def collect_cpu() -> CpuStats:
+    """
+    CPU 使用率（非阻塞，统计的是距上一次调用以来的平均值）
+    高频采样可用时使用其汇总结果，并在 burst 中附带本周期的 min/mean/p95/max 和 steal/iowait/irq
+    """
+    from monitor.cpu_burst import get_cpu_burst_sampler
+    provider = get_host_provider()
+    cpu_freq = provider.cpu_freq()
+    burst_sampler = get_cpu_burst_sampler()
+    burst = burst_sampler.summarize() if burst_sampler is not None else None
+    if burst is not None:
+        usage_percent = burst["total"]["mean"]
+        per_cpu = [core["mean"] for core in burst["per_core"]]
+    else:
+        usage_percent = _cpu_usage.percent()
+        per_cpu = _cpu_usage.percent(percpu=True)
+    return CpuStats(
+        usage_percent=usage_percent,
+        core_count=provider.cpu_count(),
+        current_freq=cpu_freq.current if cpu_freq else 0,
+        max_freq=cpu_freq.max if cpu_freq else 0,
+        per_cpu=per_cpu,
+        burst=burst
+    )
+
+def collect_memory() -> MemoryStats:
+    memory = get_host_provider().virtual_memory()
+    return MemoryStats(
+        total=memory.total,
+        available=memory.available,
+        used=memory.used,
+        usage_percent=memory.percent,
+        free=memory.free
+    )
+
+def collect_swap() -> SwapStats:
+    swap = get_host_provider().swap_memory()
+    return SwapStats(
+        total=swap.total,
+        used=swap.used,
+        free=swap.free,
+        usage_percent=swap.percent
+    )
+
+def collect_disk_io(rates: RateCalculator = _rates) -> Optional[DiskIOStats]:
+    """整机磁盘 I/O；rates 为速率计算状态，接口层传入自己的实例，不影响采样器的速率"""
+    disk_io = get_host_provider().disk_io_counters()
+    if disk_io is None:
+        return None
+    now = time.time()
+    read_speed = rates.rate("disk_read_bytes", disk_io.read_bytes, now)
+    write_speed = rates.rate("disk_write_bytes", disk_io.write_bytes, now)
+    return DiskIOStats(
+        read_bytes=disk_io.read_bytes,
+        write_bytes=disk_io.write_bytes,
+        read_count=disk_io.read_count,
+        write_count=disk_io.write_count,
+        read_speed_mb=round(read_speed / (1024 * 1024), 2),
+        write_speed_mb=round(write_speed / (1024 * 1024), 2)
+    )
+
+def collect_network(rates: RateCalculator = _rates) -> NetworkStats:
+    """整机网络计数器和上传/下载速率；rates 同 collect_disk_io"""
+    net_io = get_host_provider().net_io_counters()
+    now = time.time()
+    upload_speed = rates.rate("net_bytes_sent", net_io.bytes_sent, now)
+    download_speed = rates.rate("net_bytes_recv", net_io.bytes_recv, now)
+    return NetworkStats(
+        bytes_sent=net_io.bytes_sent,
+        bytes_recv=net_io.bytes_recv,
+        packets_sent=net_io.packets_sent,
+        packets_recv=net_io.packets_recv,
+        upload_speed_mb=round(upload_speed / (1024 * 1024), 2),
+        download_speed_mb=round(download_speed / (1024 * 1024), 2)
+    )
+
+def collect_disks() -> Dict[str, DiskCounters]:
+    """逐磁盘累计计数器"""
+    return {
+        name: DiskCounters(
+            read_bytes=counters.read_bytes,
+            write_bytes=counters.write_bytes,
+            read_count=counters.read_count,
+            write_count=counters.write_count,
+            busy_time=getattr(counters, "busy_time", 0)
+        )
+        for name, counters in (get_host_provider().disk_io_counters(perdisk=True) or {}).items()
+    }
+
+def collect_uptime() -> UptimeStats:
+    boot_time = get_host_provider().boot_time()
+    return UptimeStats(
+        seconds=int(time.time() - boot_time),
+        boot_time=boot_time
+    )
+
+class CachedCollector:
+    """为开销较大的采集器（如 nvidia-smi）加上最小刷新间隔，间隔内复用上一次结果"""
+
+    def __init__(self, collector, min_interval: float):
+        self.collector = collector
+        self.min_interval = min_interval
+        self._value: Any = None
+        self._updated_at = 0.0
+
+    def __call__(self) -> Any:
+        now = time.time()
+        if self._value is None or now - self._updated_at >= self.min_interval:
+            self._value = self.collector()
+            self._updated_at = now
+        return self._value
+
+def collect_gpu() -> List[Dict[str, Any]]:
+    from monitor.system_monitor import get_system_monitor
+    return get_system_monitor().get_gpu_info()
+
+def collect_connections() -> ConnectionStats:
+    """已建立的 TCP/UDP 连接数（遍历全部连接，开销较大，注册时加最小刷新间隔）"""
+    try:
+        connections = get_host_provider().net_connections()
+    except (psutil.AccessDenied, OSError):
+        return ConnectionStats(established=0)
+    return ConnectionStats(established=sum(1 for conn in connections if conn.status == "ESTABLISHED"))
+
+def collect_system_load() -> LoadStats:
+    provider = get_host_provider()
+    load_avg = provider.getloadavg()
+    return LoadStats(
+        load_1min=load_avg[0],
+        load_5min=load_avg[1],
+        load_15min=load_avg[2],
+        cpu_count=provider.cpu_count()
+    )
+
+def register_default_collectors(sampler):
+    """
+    向采样器注册默认采集器
+    数据源不是真实主机（如合成主机）时不注册直接读取 /proc、/sys 的采集器；
+    回放模式下全部采集器由录制文件替代（monitor/trace.py）
+    """
+    from core.config import settings
+    if settings.host_provider == "replay":
+        from monitor.trace import get_trace_replayer
+        get_trace_replayer().install(sampler)
+        return
+    live = get_host_provider().live
+    sampler.register("cpu", collect_cpu)
+    sampler.register("memory", collect_memory)
+    sampler.register("swap", collect_swap)
+    if live:
+        sampler.register("memory_detail", get_numa_stats)
+    sampler.register("disk_io", collect_disk_io)
+    if live:
+        sampler.register("disk_devices", get_disk_device_stats)
+    sampler.register("disks", collect_disks)
+    if live:
+        sampler.register("sensors", get_sensor_stats)
+    sampler.register("network", collect_network)
+    sampler.register("interfaces", get_interface_stats)
+    sampler.register("interface_groups", get_interface_groups)
+    if live:
+        sampler.register("netstat", get_netstat_stats)
+    sampler.register("traffic", collect_traffic)
+    sampler.register("system_load", collect_system_load)
+    if live:
+        sampler.register("pressure", get_pressure_stats)
+    sampler.register("uptime", collect_uptime)
+    sampler.register("connections", CachedCollector(collect_connections, settings.connections_interval))
+    sampler.register("gpu", CachedCollector(collect_gpu, settings.gpu_interval))
@@ -0,0 +1,247 @@
+# CPU 突发采样模块
+
+"""
+CPU 高频采样
+cpu_percent(interval=1) 得到的是 1 秒平均值，200ms 级别的满载突发会被平均掉。
+这里由后台线程以 50~100ms 的间隔读取 /proc/stat，把每次的利用率写入预先分配的环形数组，
+采样器每个周期汇总上一个周期内的全部样本：
+
+- total / per_core：利用率的 min / mean / p95 / max（百分比）
+- steal / iowait / irq（含 softirq）：占总 CPU 时间的百分比（mean / max）
+
+高频路径只有一次 pread、一次 np.fromstring 和几次写入预分配数组的向量运算，不产生逐字段的 Python 对象。
+/proc/stat 不存在（非 Linux）或主机数据源不是真实主机时不可用，调用方回退到按 cpu_times() 差值计算的利用率。
+按需采集模式下线程随采样器启动，采样器空闲停止时一起停止。
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from monitor.procfs import CachedFile
+from monitor.rates import CpuUsageCalculator
+
+PROC_STAT_PATH = "/proc/stat"
+
+# /proc/stat cpu 行的字段下标（guest / guest_nice 已计入 user / nice，不参与求和）
+FIELD_IDLE = 3
+FIELD_IOWAIT = 4
+FIELD_IRQ = 5
+FIELD_SOFTIRQ = 6
+FIELD_STEAL = 7
+TIME_FIELDS = 8
+
+_CPU_LABEL_RE = re.compile(rb"cpu\d*")
+
+def parse_proc_stat_cpu(data: bytes) -> np.ndarray:
+    """解析 /proc/stat 开头的 cpu 行，返回 (1 + 核心数, 字段数) 的 int64 数组，第 0 行为总计"""
+    end = data.find(b"\nintr")
+    block = data[:end] if end >= 0 else data
+    lines = block.count(b"\n") + 1
+    values = np.fromstring(_CPU_LABEL_RE.sub(b"", block), dtype=np.int64, sep=" ")
+    return values.reshape(lines, -1)
+
+class CPUBurstSampler:
+    """/proc/stat 高频采样器，样本保存在预分配的环形数组中"""
+
+    def __init__(self, interval: float = 0.1, window: float = 60.0, path: str = PROC_STAT_PATH):
+        self.interval = interval
+        self.capacity = max(16, int(window / interval) + 1)
+        self.path = path
+        self._file = CachedFile(path, size=16384)
+
+        self._previous: Optional[np.ndarray] = None
+        self._delta: Optional[np.ndarray] = None
+        self._total: Optional[np.ndarray] = None
+        self._idle: Optional[np.ndarray] = None
+        self._busy: Optional[np.ndarray] = None  # (capacity, 1 + 核心数) 利用率
+        self._breakdown = np.zeros((self.capacity, 3), dtype=np.float32)  # steal / iowait / irq
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._written = 0  # 累计写入的样本数，对 capacity 取模得到写入位置
+        self._consumed = 0  # summarize 已经汇总到的样本序号
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_available(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _allocate(self, counters: np.ndarray):
+        """首次采样或 CPU 热插拔（行数变化）时重新分配数组"""
+        self._previous = counters
+        self._delta = np.empty((counters.shape[0], TIME_FIELDS), dtype=np.int64)
+        self._total = np.empty(counters.shape[0], dtype=np.int64)
+        self._idle = np.empty(counters.shape[0], dtype=np.int64)
+        self._busy = np.zeros((self.capacity, counters.shape[0]), dtype=np.float32)
+        self._written = self._consumed = 0
+
+    def sample(self):
+        """读取一次 /proc/stat，与上一次读数相减后写入环形数组"""
+        counters = parse_proc_stat_cpu(self._file.read())
+        now = time.time()
+        with self._lock:
+            previous = self._previous
+            if previous is None or previous.shape != counters.shape:
+                self._allocate(counters)
+                return
+            delta = self._delta
+            np.subtract(counters[:, :TIME_FIELDS], previous[:, :TIME_FIELDS], out=delta)
+            self._previous = counters
+            total = delta.sum(axis=1, out=self._total)
+            if total[0] <= 0:
+                return
+            np.maximum(total, 1, out=total)
+            idle = np.add(delta[:, FIELD_IDLE], delta[:, FIELD_IOWAIT], out=self._idle)
+
+            row = self._written % self.capacity
+            busy = self._busy[row]
+            np.subtract(total, idle, out=busy, casting="unsafe")
+            np.divide(busy, total, out=busy, casting="unsafe")
+            busy *= 100.0
+            np.clip(busy, 0.0, 100.0, out=busy)
+            scale = 100.0 / total[0]
+            breakdown = self._breakdown[row]
+            breakdown[0] = delta[0, FIELD_STEAL] * scale
+            breakdown[1] = delta[0, FIELD_IOWAIT] * scale
+            breakdown[2] = (delta[0, FIELD_IRQ] + delta[0, FIELD_SOFTIRQ]) * scale
+            self._times[row] = now
+            self._written += 1
+
+    def _rows(self, start: int) -> np.ndarray:
+        """序号 start 之后（仍在环形数组中）的样本所在行"""
+        start = max(start, self._written - self.capacity)
+        return np.arange(start, self._written) % self.capacity
+
+    @staticmethod
+    def _stats(values: np.ndarray) -> Dict[str, Any]:
+        """按列计算 min / mean / p95 / max，values 为 (样本数, 列数)"""
+        return {
+            "min": np.round(values.min(axis=0), 2).tolist(),
+            "mean": np.round(values.mean(axis=0), 2).tolist(),
+            "p95": np.round(np.percentile(values, 95, axis=0), 2).tolist(),
+            "max": np.round(values.max(axis=0), 2).tolist(),
+        }
+
+    def _summary(self, rows: np.ndarray) -> Dict[str, Any]:
+        busy = self._busy[rows].astype(np.float64)
+        breakdown = self._breakdown[rows].astype(np.float64)
+        stats = self._stats(busy)
+        means = breakdown.mean(axis=0)
+        maxes = breakdown.max(axis=0)
+        return {
+            "samples": len(rows),
+            "interval_ms": round(self.interval * 1000),
+            "total": {key: values[0] for key, values in stats.items()},
+            "per_core": [
+                {key: values[core] for key, values in stats.items()}
+                for core in range(1, busy.shape[1])
+            ],
+            "steal": {"mean": round(float(means[0]), 2), "max": round(float(maxes[0]), 2)},
+            "iowait": {"mean": round(float(means[1]), 2), "max": round(float(maxes[1]), 2)},
+            "irq": {"mean": round(float(means[2]), 2), "max": round(float(maxes[2]), 2)},
+        }
+
+    def summarize(self) -> Optional[Dict[str, Any]]:
+        """汇总上一次调用以来的全部样本（采样器每个周期调用一次），没有新样本时返回 None"""
+        with self._lock:
+            if self._busy is None or self._written == self._consumed:
+                return None
+            rows = self._rows(self._consumed)
+            self._consumed = self._written
+            return self._summary(rows)
+
+    def usage_percent(self, seconds: float = 1.0) -> Optional[float]:
+        """最近 seconds 秒的平均总利用率"""
+        with self._lock:
+            if self._busy is None or not self._written:
+                return None
+            rows = self._rows(0)
+            recent = rows[self._times[rows] >= time.time() - seconds]
+            rows = recent if len(recent) else rows[-1:]
+            return round(float(self._busy[rows, 0].mean(dtype=np.float64)), 1)
+
+    def per_core_percent(self, seconds: float = 1.0) -> Optional[List[float]]:
+        """最近 seconds 秒每个核心的平均利用率"""
+        with self._lock:
+            if self._busy is None or not self._written:
+                return None
+            rows = self._rows(0)
+            recent = rows[self._times[rows] >= time.time() - seconds]
+            rows = recent if len(recent) else rows[-1:]
+            return np.round(self._busy[rows, 1:].mean(axis=0, dtype=np.float64), 1).tolist()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"CPU 高频采样失败: {e}")
+                self._stop.wait(1.0)
+
+    def start(self):
+        if self._thread is None and self.is_available():
+            self._stop.clear()
+            with self._lock:
+                # 重新启动时丢弃停止前的基准，否则第一个样本是整个停止期间的平均值
+                self._previous = None
+            self.sample()
+            self._thread = threading.Thread(target=self._run, name="cpu-burst-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+# 全局高频采样器实例
+_cpu_burst_sampler: Optional[CPUBurstSampler] = None
+
+def get_cpu_burst_sampler(start: bool = True) -> Optional[CPUBurstSampler]:
+    """
+    获取全局 CPU 高频采样器，未启用、不可用或未在运行时返回 None
+    start 为 True 时（采样器采集、后台模式启动时）按需创建并启动采样线程；
+    接口层只读取已有的样本，不启动线程
+    """
+    global _cpu_burst_sampler
+    from core.config import settings
+    from monitor.providers import get_host_provider
+    if not settings.cpu_burst_enabled or not get_host_provider().live:
+        return None
+    if _cpu_burst_sampler is None:
+        if not start:
+            return None
+        _cpu_burst_sampler = CPUBurstSampler(interval=settings.cpu_burst_interval,
+                                             window=settings.cpu_burst_window)
+    if start and not _cpu_burst_sampler.running:
+        _cpu_burst_sampler.start()
+    return _cpu_burst_sampler if _cpu_burst_sampler.running else None
+
+def stop_cpu_burst_sampler():
+    """停止高频采样线程（按需模式下采样器空闲时调用），下次采集时重新启动"""
+    if _cpu_burst_sampler is not None:
+        _cpu_burst_sampler.stop()
+
+# 高频采样不可用时的回退：进程级的 cpu_times() 基准，与调用线程无关
+_fallback_usage = CpuUsageCalculator()
+
+def cpu_usage_percent(seconds: float = 1.0) -> float:
+    """最近 seconds 秒的 CPU 平均利用率，替代阻塞的 psutil.cpu_percent(interval=1)"""
+    sampler = get_cpu_burst_sampler(start=False)
+    usage = sampler.usage_percent(seconds) if sampler is not None else None
+    return usage if usage is not None else _fallback_usage.percent(seconds)
+
+def per_cpu_usage_percent(seconds: float = 1.0) -> List[float]:
+    """最近 seconds 秒每个核心的平均利用率，替代阻塞的 psutil.cpu_percent(interval=1, percpu=True)"""
+    sampler = get_cpu_burst_sampler(start=False)
+    usage = sampler.per_core_percent(seconds) if sampler is not None else None
+    return usage if usage is not None else _fallback_usage.percent(seconds, percpu=True)
@@ -1,6 +1,6 @@
 # CPU 监控模块
 
-import psutil
+from monitor.providers import get_host_provider
 import time
 from typing import Dict, Any
 
@@ -8,25 +8,26 @@ class CPUMonitor:
     """CPU 监控类"""
     
     def __init__(self):
-        self.last_cpu_times = psutil.cpu_times()
+        self.last_cpu_times = get_host_provider().cpu_times()
         self.last_timestamp = time.time()
     
     def get_cpu_info(self) -> Dict[str, Any]:
         """获取 CPU 信息"""
         
-        # CPU 使用率
-        usage_percent = psutil.cpu_percent(interval=1)
+        # CPU 使用率（取高频采样最近 1 秒的平均值，不阻塞）
+        from monitor.cpu_burst import cpu_usage_percent
+        usage_percent = cpu_usage_percent(1.0)
         
         # CPU 核心数
-        core_count = psutil.cpu_count()
+        core_count = get_host_provider().cpu_count()
         
         # CPU 频率
-        cpu_freq = psutil.cpu_freq()
+        cpu_freq = get_host_provider().cpu_freq()
         current_freq = cpu_freq.current if cpu_freq else 0
         max_freq = cpu_freq.max if cpu_freq else 0
         
         # CPU 时间统计
-        cpu_times = psutil.cpu_times()
+        cpu_times = get_host_provider().cpu_times()
         
         return {
             "usage_percent": usage_percent,
@@ -42,10 +43,11 @@ class CPUMonitor:
         """获取详细的 CPU 使用情况"""
         
         # 每个核心的使用率
-        per_cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
+        from monitor.cpu_burst import per_cpu_usage_percent
+        per_cpu_percent = per_cpu_usage_percent(1.0)
         
         # CPU 负载
-        load_avg = psutil.getloadavg()
+        load_avg = get_host_provider().getloadavg()
         
         return {
             "per_cpu_percent": per_cpu_percent,
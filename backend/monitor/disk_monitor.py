@@ -1,40 +1,20 @@
 # 磁盘监控模块
 
-import psutil
+from monitor.providers import get_host_provider
 import time
 from typing import Dict, Any, List
+from monitor.filesystem_monitor import get_filesystem_usage
 
 class DiskMonitor:
     """磁盘监控类"""
     
     def __init__(self):
-        self.last_disk_io = psutil.disk_io_counters()
+        self.last_disk_io = get_host_provider().disk_io_counters()
         self.last_timestamp = time.time()
     
     def get_disk_usage(self) -> List[Dict[str, Any]]:
-        """获取磁盘使用情况"""
-        
-        disk_partitions = psutil.disk_partitions()
-        disk_info = []
-        
-        for partition in disk_partitions:
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                
-                disk_info.append({
-                    "device": partition.device,
-                    "mountpoint": partition.mountpoint,
-                    "fstype": partition.fstype,
-                    "total": usage.total,
-                    "used": usage.used,
-                    "free": usage.free,
-                    "percent": usage.percent
-                })
-            except PermissionError:
-                # 跳过没有权限访问的分区
-                continue
-        
-        return disk_info
+        """获取磁盘使用情况（并行、带超时，包含 inode 使用量）"""
+        return get_filesystem_usage()
     
     def get_disk_io(self) -> Dict[str, Any]:
         """获取磁盘 I/O 信息"""
@@ -42,7 +22,7 @@ class DiskMonitor:
         current_timestamp = time.time()
         time_interval = current_timestamp - self.last_timestamp
         
-        current_disk_io = psutil.disk_io_counters()
+        current_disk_io = get_host_provider().disk_io_counters()
         
         if self.last_disk_io and time_interval > 0:
             read_speed = (current_disk_io.read_bytes - self.last_disk_io.read_bytes) / time_interval
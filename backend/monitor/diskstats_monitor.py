@@ -0,0 +1,141 @@
+# 磁盘扩展 I/O 统计模块
+
+"""
+基于 /proc/diskstats 的逐设备扩展 I/O 指标（与 iostat -x 的口径一致）
+- r/s、w/s、rkB/s、wkB/s、rrqm/s、wrqm/s
+- r_await / w_await / await：每个请求的平均耗时（毫秒，含排队时间）
+- svctm：每个请求的平均服务时间（io_ticks / 请求数）
+- %util：设备忙碌时间占比
+- aqu-sz：平均队列长度（time_in_queue / 采样间隔）
+- in_flight：当前正在处理的请求数
+"""
+
+import fnmatch
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from monitor.rates import RateCalculator
+
+DISKSTATS_PATH = "/proc/diskstats"
+SECTOR_SIZE = 512
+
+DEFAULT_EXCLUDE_DEVICES = ["loop*", "ram*", "zram*", "fd*", "sr*"]
+
+# /proc/diskstats 中设备名之后的字段下标
+FIELD_READS = 0
+FIELD_READS_MERGED = 1
+FIELD_SECTORS_READ = 2
+FIELD_READ_MS = 3
+FIELD_WRITES = 4
+FIELD_WRITES_MERGED = 5
+FIELD_SECTORS_WRITTEN = 6
+FIELD_WRITE_MS = 7
+FIELD_IN_FLIGHT = 8
+FIELD_IO_MS = 9
+FIELD_WEIGHTED_MS = 10
+
+def parse_diskstats(text: str) -> Dict[str, List[int]]:
+    """解析 /proc/diskstats，返回 设备名 -> 计数器列表"""
+    devices = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 14:
+            continue
+        try:
+            devices[parts[2]] = [int(value) for value in parts[3:14]]
+        except ValueError:
+            continue
+    return devices
+
+class DiskStatsMonitor:
+    """逐设备磁盘扩展 I/O 监控类"""
+
+    def __init__(self, path: str = DISKSTATS_PATH, sys_block_path: str = "/sys/class/block",
+                 exclude: Optional[List[str]] = None, include_partitions: bool = False):
+        self.path = path
+        self.sys_block_path = sys_block_path
+        patterns = DEFAULT_EXCLUDE_DEVICES if exclude is None else exclude
+        self._exclude_re = re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+        self.include_partitions = include_partitions
+        self.rates = RateCalculator()
+        # 设备名 -> 是否纳入统计（分区判断需要访问 sysfs，只做一次）
+        self._device_filter: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _wanted(self, name: str) -> bool:
+        wanted = self._device_filter.get(name)
+        if wanted is None:
+            wanted = not (self._exclude_re and self._exclude_re.match(name))
+            if wanted and not self.include_partitions:
+                wanted = not os.path.exists(os.path.join(self.sys_block_path, name, "partition"))
+            self._device_filter[name] = wanted
+        return wanted
+
+    def get_device_stats(self, timestamp: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """获取每个设备的扩展 I/O 指标"""
+        try:
+            with open(self.path, "r") as f:
+                text = f.read()
+        except OSError:
+            return {}
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            devices = parse_diskstats(text)
+            result = {}
+            rate = self.rates.rate
+            for name, counters in devices.items():
+                if not self._wanted(name):
+                    continue
+
+                reads = rate((name, "reads"), counters[FIELD_READS], timestamp)
+                writes = rate((name, "writes"), counters[FIELD_WRITES], timestamp)
+                read_ms = rate((name, "read_ms"), counters[FIELD_READ_MS], timestamp)
+                write_ms = rate((name, "write_ms"), counters[FIELD_WRITE_MS], timestamp)
+                io_ms = rate((name, "io_ms"), counters[FIELD_IO_MS], timestamp)
+                weighted_ms = rate((name, "weighted_ms"), counters[FIELD_WEIGHTED_MS], timestamp)
+                ios = reads + writes
+
+                result[name] = {
+                    "reads_per_sec": round(reads, 2),
+                    "writes_per_sec": round(writes, 2),
+                    "read_kb_per_sec": round(rate((name, "sectors_read"), counters[FIELD_SECTORS_READ], timestamp) * SECTOR_SIZE / 1024, 2),
+                    "write_kb_per_sec": round(rate((name, "sectors_written"), counters[FIELD_SECTORS_WRITTEN], timestamp) * SECTOR_SIZE / 1024, 2),
+                    "read_merged_per_sec": round(rate((name, "reads_merged"), counters[FIELD_READS_MERGED], timestamp), 2),
+                    "write_merged_per_sec": round(rate((name, "writes_merged"), counters[FIELD_WRITES_MERGED], timestamp), 2),
+                    "r_await": round(read_ms / reads, 2) if reads else 0.0,
+                    "w_await": round(write_ms / writes, 2) if writes else 0.0,
+                    "await": round((read_ms + write_ms) / ios, 2) if ios else 0.0,
+                    "svctm": round(io_ms / ios, 2) if ios else 0.0,
+                    "util_percent": round(min(io_ms / 10, 100.0), 2),  # ms/s -> 百分比
+                    "avg_queue_size": round(weighted_ms / 1000, 2),
+                    "in_flight": counters[FIELD_IN_FLIGHT],
+                }
+
+            self.rates.prune(lambda key: key[0] in devices)
+            return result
+
+# 全局磁盘扩展统计实例（首次使用时创建）
+_diskstats_monitor: Optional[DiskStatsMonitor] = None
+
+def get_diskstats_monitor() -> DiskStatsMonitor:
+    """获取全局磁盘扩展统计实例"""
+    global _diskstats_monitor
+    if _diskstats_monitor is None:
+        from core.config import settings
+        _diskstats_monitor = DiskStatsMonitor(
+            exclude=settings.diskstats_exclude,
+            include_partitions=settings.diskstats_include_partitions,
+        )
+    return _diskstats_monitor
+
+def get_disk_device_stats() -> Dict[str, Dict[str, Any]]:
+    """获取逐设备扩展 I/O 指标（便捷函数）"""
+    return get_diskstats_monitor().get_device_stats()
@@ -0,0 +1,291 @@
+# 文件系统使用量监控模块
+
+"""
+挂载表感知的文件系统使用量采集
+- 挂载表只在 /proc/self/mountinfo 发生变化时重新解析（poll 到 POLLPRI/POLLERR），
+  非 Linux 平台或主机数据源不是真实主机时（monitor/providers.py）退化为按 TTL 缓存数据源的 disk_partitions()
+- 同一设备（major:minor）的多个挂载点（bind mount 等）只统计一次
+- 伪文件系统和容器运行时挂载点按可配置的类型/路径规则过滤
+- statvfs 在线程池中并行执行，每个挂载点有超时；卡住的 NFS/CIFS 挂载在超时的周期标记为 timeout，
+  之后仍未返回的周期标记为 stale（沿用最近一次的使用量）；在它返回之前不会重复提交，
+  即使挂载点暂时从挂载表中消失也不会，避免每个周期都多占一个线程池线程
+- 同时报告字节和 inode 使用量
+"""
+
+import fnmatch
+import os
+import re
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from monitor.providers import get_host_provider
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+
+DEFAULT_EXCLUDE_TYPES = [
+    "autofs", "binfmt_misc", "bpf", "cgroup", "cgroup2", "configfs", "debugfs",
+    "devpts", "devtmpfs", "efivarfs", "fusectl", "hugetlbfs", "mqueue", "nsfs",
+    "overlay", "proc", "pstore", "ramfs", "rpc_pipefs", "securityfs", "squashfs",
+    "sysfs", "tmpfs", "tracefs",
+]
+
+DEFAULT_EXCLUDE_MOUNTPOINTS = [
+    "/proc/*", "/sys/*", "/dev/*", "/run/*",
+    "/var/lib/docker/*", "/var/lib/containerd/*", "/var/lib/kubelet/*", "/snap/*",
+]
+
+_OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+def _unescape(value: str) -> str:
+    """mountinfo 中空格等字符以 \\040 形式转义"""
+    return _OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), value)
+
+def parse_mountinfo(text: str) -> List[Dict[str, str]]:
+    """
+    解析 /proc/self/mountinfo
+    每行格式：id parent major:minor root mountpoint options [optional...] - fstype source super_options
+    """
+    mounts = []
+    for line in text.splitlines():
+        left, sep, right = line.partition(" - ")
+        if not sep:
+            continue
+        fields = left.split()
+        tail = right.split()
+        if len(fields) < 5 or len(tail) < 2:
+            continue
+        mounts.append({
+            "device_id": fields[2],
+            "mountpoint": _unescape(fields[4]),
+            "fstype": tail[0],
+            "device": _unescape(tail[1]),
+        })
+    return mounts
+
+def _disk_usage(mountpoint: str) -> Dict[str, Any]:
+    """数据源的 disk_usage，不提供 inode 信息（Windows 没有 statvfs，或数据源不是真实主机）"""
+    usage = get_host_provider().disk_usage(mountpoint)
+    return {
+        "total": usage.total, "used": usage.used, "free": usage.free,
+        "percent": usage.percent,
+        "inodes_total": 0, "inodes_used": 0, "inodes_free": 0, "inodes_percent": 0.0,
+    }
+
+def _statvfs(mountpoint: str) -> Dict[str, Any]:
+    """在工作线程中执行的 statvfs 调用，计算方式与 psutil.disk_usage 一致"""
+    if not hasattr(os, "statvfs"):
+        return _disk_usage(mountpoint)
+
+    st = os.statvfs(mountpoint)
+    total = st.f_blocks * st.f_frsize
+    free = st.f_bavail * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    usable = used + free
+    inodes_total = st.f_files
+    inodes_free = st.f_ffree
+    inodes_used = inodes_total - inodes_free
+    return {
+        "total": total,
+        "used": used,
+        "free": free,
+        "percent": round(used / usable * 100, 1) if usable else 0.0,
+        "inodes_total": inodes_total,
+        "inodes_used": inodes_used,
+        "inodes_free": inodes_free,
+        "inodes_percent": round(inodes_used / inodes_total * 100, 1) if inodes_total else 0.0,
+    }
+
+class FilesystemMonitor:
+    """文件系统使用量监控类"""
+
+    def __init__(self, exclude_types: Optional[List[str]] = None,
+                 exclude_mountpoints: Optional[List[str]] = None,
+                 statvfs_timeout: float = 2.0, workers: int = 8,
+                 mountinfo_path: str = MOUNTINFO_PATH, partitions_ttl: float = 60.0):
+        self.exclude_types = set(DEFAULT_EXCLUDE_TYPES if exclude_types is None else exclude_types)
+        patterns = DEFAULT_EXCLUDE_MOUNTPOINTS if exclude_mountpoints is None else exclude_mountpoints
+        self._exclude_re = re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+        self.statvfs_timeout = statvfs_timeout
+        self.mountinfo_path = mountinfo_path
+        self.partitions_ttl = partitions_ttl
+        # 数据源不是真实主机时挂载表和使用量都来自数据源
+        self._live = get_host_provider().live
+        self._usage_function = _statvfs if self._live else _disk_usage
+
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="statvfs")
+        self._lock = threading.Lock()
+        self._mounts: List[Dict[str, str]] = []
+        self._mounts_loaded_at = 0.0
+        self._mountinfo = None
+        self._poller = None
+        # mountpoint -> 尚未返回的 statvfs future（卡住的挂载不会重复提交）
+        self._pending: Dict[str, Any] = {}
+        # mountpoint -> 最近一次成功的使用量
+        self._last_usage: Dict[str, Dict[str, Any]] = {}
+        self.mount_table_reloads = 0
+
+    def _open_mountinfo(self) -> bool:
+        if self._mountinfo is not None:
+            return True
+        if not self._live or not hasattr(select, "poll") or not os.path.exists(self.mountinfo_path):
+            return False
+        try:
+            self._mountinfo = open(self.mountinfo_path, "r")
+            self._poller = select.poll()
+            self._poller.register(self._mountinfo.fileno(), select.POLLPRI | select.POLLERR)
+            return True
+        except OSError:
+            self._mountinfo = None
+            self._poller = None
+            return False
+
+    def _mount_table_changed(self) -> bool:
+        """挂载表变化时内核会在 mountinfo 的 fd 上置 POLLPRI/POLLERR，直到重新读取"""
+        if not self._mounts_loaded_at:
+            return True
+        if self._poller is not None:
+            return bool(self._poller.poll(0))
+        return time.time() - self._mounts_loaded_at >= self.partitions_ttl
+
+    def _load_mounts(self) -> List[Dict[str, str]]:
+        if self._open_mountinfo():
+            self._mountinfo.seek(0)
+            return parse_mountinfo(self._mountinfo.read())
+        return [
+            {
+                "device_id": partition.device,
+                "mountpoint": partition.mountpoint,
+                "fstype": partition.fstype,
+                "device": partition.device,
+            }
+            for partition in get_host_provider().disk_partitions()
+        ]
+
+    def _is_excluded(self, mount: Dict[str, str]) -> bool:
+        if mount["fstype"] in self.exclude_types:
+            return True
+        return bool(self._exclude_re and self._exclude_re.match(mount["mountpoint"]))
+
+    def get_mounts(self) -> List[Dict[str, str]]:
+        """获取过滤、去重后的挂载点列表（挂载表未变化时直接返回缓存）"""
+        if not self._mount_table_changed():
+            return self._mounts
+
+        seen_devices = {}
+        for mount in self._load_mounts():
+            if self._is_excluded(mount):
+                continue
+            existing = seen_devices.get(mount["device_id"])
+            # 同一设备的多个挂载点保留路径最短的那个
+            if existing is None or len(mount["mountpoint"]) < len(existing["mountpoint"]):
+                seen_devices[mount["device_id"]] = mount
+
+        self._mounts = list(seen_devices.values())
+        self._mounts_loaded_at = time.time()
+        self.mount_table_reloads += 1
+
+        mountpoints = {mount["mountpoint"] for mount in self._mounts}
+        for mountpoint in [mp for mp in self._last_usage if mp not in mountpoints]:
+            del self._last_usage[mountpoint]
+        self._prune_pending(mountpoints)
+        return self._mounts
+
+    def _prune_pending(self, mountpoints):
+        """丢弃已卸载挂载点上已经返回的调用；仍在运行的保留，挂载点重新出现时不会再提交一次"""
+        for mountpoint in [mp for mp, future in self._pending.items()
+                           if mp not in mountpoints and future.done()]:
+            del self._pending[mountpoint]
+
+    def get_usage(self) -> List[Dict[str, Any]]:
+        """并行获取所有挂载点的使用量"""
+        with self._lock:
+            mounts = self.get_mounts()
+
+            submitted = {}
+            fresh = set()
+            for mount in mounts:
+                mountpoint = mount["mountpoint"]
+                future = self._pending.get(mountpoint)
+                if future is None:
+                    future = self._executor.submit(self._usage_function, mountpoint)
+                    self._pending[mountpoint] = future
+                    fresh.add(future)
+                submitted[mountpoint] = future
+
+            # 只等待本周期新提交的调用，之前已经超时的挂载不再占用等待时间
+            if fresh:
+                wait(fresh, timeout=self.statvfs_timeout)
+            self._prune_pending(submitted)
+
+            result = []
+            for mount in mounts:
+                mountpoint = mount["mountpoint"]
+                future = submitted[mountpoint]
+                status = "ok"
+                if future.done():
+                    del self._pending[mountpoint]
+                    try:
+                        self._last_usage[mountpoint] = future.result()
+                    except PermissionError:
+                        # 跳过没有权限访问的分区
+                        self._last_usage.pop(mountpoint, None)
+                        continue
+                    except OSError:
+                        self._last_usage.pop(mountpoint, None)
+                        status = "error"
+                elif future in fresh:
+                    status = "timeout"
+                else:
+                    # 上一个周期提交的调用仍未返回（如 NFS 服务端无响应），本周期没有重新提交
+                    status = "stale"
+
+                usage = self._last_usage.get(mountpoint)
+                if usage is None:
+                    if status == "ok":
+                        continue
+                    usage = {
+                        "total": 0, "used": 0, "free": 0, "percent": 0.0,
+                        "inodes_total": 0, "inodes_used": 0, "inodes_free": 0, "inodes_percent": 0.0,
+                    }
+
+                record = {
+                    "device": mount["device"],
+                    "mountpoint": mountpoint,
+                    "fstype": mount["fstype"],
+                    "status": status,
+                }
+                record.update(usage)
+                result.append(record)
+
+            return result
+
+    def close(self):
+        """释放 mountinfo 句柄和线程池"""
+        if self._mountinfo is not None:
+            self._mountinfo.close()
+            self._mountinfo = None
+            self._poller = None
+        self._executor.shutdown(wait=False)
+
+# 全局文件系统监控实例（首次使用时创建）
+_filesystem_monitor: Optional[FilesystemMonitor] = None
+
+def get_filesystem_monitor() -> FilesystemMonitor:
+    """获取全局文件系统监控实例"""
+    global _filesystem_monitor
+    if _filesystem_monitor is None:
+        from core.config import settings
+        _filesystem_monitor = FilesystemMonitor(
+            exclude_types=settings.fs_exclude_types,
+            exclude_mountpoints=settings.fs_exclude_mountpoints,
+            statvfs_timeout=settings.fs_statvfs_timeout,
+            workers=settings.fs_workers,
+        )
+    return _filesystem_monitor
+
+def get_filesystem_usage() -> List[Dict[str, Any]]:
+    """获取文件系统使用量（便捷函数）"""
+    return get_filesystem_monitor().get_usage()
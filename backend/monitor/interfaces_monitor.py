@@ -0,0 +1,243 @@
+# 网卡监控模块
+
+"""
+逐网卡计数器与速率
+Kubernetes 节点上可能有上千个 veth / cali 接口，逐个接口调用 psutil、逐个计算速率既慢，输出也无法使用。这里：
+
+- 每个周期读取一次 /proc/net/dev（CachedFile），一次 split 和一次 np.fromstring 解析全部接口，
+  得到 (接口数, 8) 的计数器矩阵，速率对整个矩阵一次向量化计算（计数器回绕/重置和新出现的接口速率为 0）
+- include / exclude glob 决定哪些接口单独输出，判断结果按接口名缓存
+- 接口组（如 {"uplinks": ["eth*", "bond*"], "pods": ["veth*", "cali*"]}）匹配全部接口（不受 include / exclude 影响），
+  输出组内接口的速率之和，大量容器接口只占一组序列
+- 接口名列表不变时复用上一次的下标数组；地址、MTU、速率、up/down 等静态信息只在接口名列表变化或
+  每隔 info_interval 秒刷新，并且只查询单独输出的接口
+
+非 Linux 系统或主机数据源不是真实主机时（monitor/providers.py）改用数据源的 net_io_counters(pernic=True)，之后的计算相同。
+"""
+
+import fnmatch
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.snapshot import InterfaceStats
+from monitor.procfs import CachedFile
+
+NET_DEV_PATH = "/proc/net/dev"
+
+# 默认不单独输出的接口（回环、虚拟网桥、容器 veth 等），可以用接口组汇总
+DEFAULT_EXCLUDE_INTERFACES = ["lo", "virbr*", "docker*", "veth*", "cali*", "lxc*"]
+
+# 输出字段（与 psutil.net_io_counters 的字段名、InterfaceStats 的字段顺序一致）和 /proc/net/dev 中接口名之后的列号
+COLUMNS = (
+    ("bytes_recv", 0), ("packets_recv", 1), ("errin", 2), ("dropin", 3),
+    ("bytes_sent", 8), ("packets_sent", 9), ("errout", 10), ("dropout", 11),
+)
+NET_DEV_FIELDS = 16
+
+def _glob_re(patterns: Optional[List[str]]):
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+
+def parse_net_dev(data: bytes):
+    """
+    解析 /proc/net/dev，返回 (接口名列表, (接口数, len(COLUMNS)) 的 float64 计数器矩阵，列顺序同 COLUMNS)
+    数值转换是主要开销，只转换用到的 8 列：先按列切出 token，再一次 np.fromstring
+    """
+    import numpy as np
+    start = data.find(b"\n", data.find(b"\n") + 1) + 1
+    # 接口名中不会出现冒号和空白，把冒号换成空格后每行正好 1 + NET_DEV_FIELDS 个 token
+    tokens = data[start:].replace(b":", b" ").split()
+    stride = NET_DEV_FIELDS + 1
+    names = [name.decode("utf-8", "replace") for name in tokens[0::stride]]
+    selected: List[bytes] = []
+    for _, column in COLUMNS:
+        selected += tokens[1 + column::stride]
+    values = np.fromstring(b" ".join(selected), dtype=np.float64, sep=" ")
+    return names, values.reshape(len(COLUMNS), len(names)).T
+
+class InterfaceMonitor:
+    """逐网卡计数器、速率和接口组监控类"""
+
+    def __init__(self, path: str = NET_DEV_PATH, include: Optional[List[str]] = None,
+                 exclude: Optional[List[str]] = None, groups: Optional[Dict[str, List[str]]] = None,
+                 info_interval: float = 60):
+        self.path = path
+        self._include_re = _glob_re(include)
+        self._exclude_re = _glob_re(DEFAULT_EXCLUDE_INTERFACES if exclude is None else exclude)
+        self.groups = {name: _glob_re(patterns) for name, patterns in (groups or {}).items()}
+        self.info_interval = info_interval
+        from monitor.providers import get_host_provider
+        live = get_host_provider().live
+        self._file = CachedFile(path, size=65536) if live and os.path.exists(path) else None
+        # 接口名 -> 是否单独输出
+        self._wanted: Dict[str, bool] = {}
+        # 以下按接口名列表缓存，列表变化时重建
+        self._names: Tuple[str, ...] = ()
+        self._selected: Any = None  # 单独输出的接口下标
+        self._group_rows: Dict[str, Any] = {}
+        self._previous: Any = None
+        self._previous_names: Tuple[str, ...] = ()
+        self._previous_timestamp = 0.0
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._info_names: Optional[Tuple[str, ...]] = None
+        self._info_updated = 0.0
+        self.last_groups: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def wanted(self, name: str) -> bool:
+        """接口是否单独输出（include 为空表示全部，exclude 优先）"""
+        wanted = self._wanted.get(name)
+        if wanted is None:
+            wanted = (self._include_re is None or bool(self._include_re.match(name))) and \
+                not (self._exclude_re and self._exclude_re.match(name))
+            self._wanted[name] = wanted
+        return wanted
+
+    def _read(self):
+        if self._file is not None:
+            return parse_net_dev(self._file.read())
+        import numpy as np
+        from monitor.providers import get_host_provider
+        counters = get_host_provider().net_io_counters(pernic=True)
+        values = np.array([[getattr(item, field) for field, _ in COLUMNS] for item in counters.values()],
+                          dtype=np.float64).reshape(len(counters), len(COLUMNS))
+        return list(counters), values
+
+    def _rebuild(self, names: Tuple[str, ...]):
+        """接口名列表变化：重新计算单独输出的接口和各组包含的接口"""
+        import numpy as np
+        self._names = names
+        self._selected = np.array([row for row, name in enumerate(names) if self.wanted(name)], dtype=np.intp)
+        self._group_rows = {
+            group: np.array([row for row, name in enumerate(names) if pattern and pattern.match(name)], dtype=np.intp)
+            for group, pattern in self.groups.items()
+        }
+        if len(self._wanted) > 4 * max(len(names), 256):
+            # 接口频繁创建/删除（如容器 veth）时避免缓存无限增长
+            self._wanted = {}
+
+    def _rates(self, names: Tuple[str, ...], values, timestamp: float):
+        """对整个计数器矩阵计算每秒速率，返回同形状的矩阵"""
+        import numpy as np
+        previous = self._previous
+        interval = timestamp - self._previous_timestamp
+        if previous is None or interval <= 0:
+            return np.zeros_like(values)
+        if names == self._previous_names:
+            aligned = previous
+            known = None
+        else:
+            index = {name: row for row, name in enumerate(self._previous_names)}
+            rows = np.array([index.get(name, -1) for name in names], dtype=np.intp)
+            known = rows >= 0
+            aligned = previous[np.where(known, rows, 0)]
+        delta = values - aligned
+        # 回绕/重置（差值为负）和新出现的接口速率为 0
+        np.maximum(delta, 0, out=delta)
+        if known is not None:
+            delta[~known] = 0
+        return delta / interval
+
+    def collect(self, timestamp: Optional[float] = None) -> Dict[str, InterfaceStats]:
+        """
+        采集全部接口，返回单独输出的接口 -> InterfaceStats（累计计数器, <计数器>_per_sec 速率），
+        同时更新 last_groups（组名 -> {interfaces: 接口数, <计数器>_per_sec: 组内速率之和}）
+        """
+        import numpy as np
+        names_list, values = self._read()
+        if timestamp is None:
+            timestamp = time.time()
+        names = tuple(names_list)
+        with self._lock:
+            if names != self._names:
+                self._rebuild(names)
+            rates = self._rates(names, values, timestamp)
+            self._previous = values
+            self._previous_names = names
+            self._previous_timestamp = timestamp
+
+            result = {}
+            selected = self._selected
+            if len(selected):
+                counters = values[selected].astype(np.int64).tolist()
+                per_second = rates[selected].round(2).tolist()
+                for row, counter_row, rate_row in zip(selected.tolist(), counters, per_second):
+                    result[names[row]] = InterfaceStats(*counter_row, *rate_row)
+
+            groups = {}
+            for group, rows in self._group_rows.items():
+                sums = rates[rows].sum(axis=0).round(2).tolist() if len(rows) else [0.0] * values.shape[1]
+                entry: Dict[str, Any] = {"interfaces": len(rows)}
+                for column, (field, _) in enumerate(COLUMNS):
+                    entry[f"{field}_per_sec"] = sums[column]
+                groups[group] = entry
+            self.last_groups = groups
+            return result
+
+    def get_groups(self) -> Dict[str, Dict[str, Any]]:
+        """最近一次 collect() 计算的接口组速率"""
+        return self.last_groups
+
+    def interface_info(self) -> List[Dict[str, Any]]:
+        """
+        单独输出的接口的地址、MTU、速率、up/down（缓存，接口名列表变化或超过 info_interval 时刷新）
+        """
+        with self._lock:
+            names = self._names
+            now = time.time()
+            if names == self._info_names and now - self._info_updated < self.info_interval:
+                return list(self._info.values())
+        from monitor.providers import get_host_provider
+        provider = get_host_provider()
+        stats = provider.net_if_stats()
+        wanted = [name for name in (names or stats) if self.wanted(name)]
+        addresses = provider.net_if_addrs()
+        info = {}
+        for name in wanted:
+            stat = stats.get(name)
+            info[name] = {
+                "name": name,
+                "is_up": stat.isup if stat else False,
+                "speed": stat.speed if stat else 0,
+                "mtu": stat.mtu if stat else 0,
+                "addresses": [
+                    {
+                        "family": getattr(address.family, "name", str(address.family)),
+                        "address": address.address,
+                        "netmask": address.netmask,
+                        "broadcast": address.broadcast
+                    }
+                    for address in addresses.get(name, [])
+                ]
+            }
+        with self._lock:
+            self._info = info
+            self._info_names = names
+            self._info_updated = now
+        return list(info.values())
+
+# 全局网卡监控实例（首次使用时创建）
+_interface_monitor: Optional[InterfaceMonitor] = None
+
+def get_interface_monitor() -> InterfaceMonitor:
+    """获取全局网卡监控实例"""
+    global _interface_monitor
+    if _interface_monitor is None:
+        from core.config import settings
+        _interface_monitor = InterfaceMonitor(
+            include=settings.interface_include,
+            exclude=settings.interface_exclude,
+            groups=settings.interface_groups,
+            info_interval=settings.interface_info_interval,
+        )
+    return _interface_monitor
+
+def get_interface_stats() -> Dict[str, InterfaceStats]:
+    """获取逐网卡计数器和速率（便捷函数）"""
+    return get_interface_monitor().collect()
+
+def get_interface_groups() -> Dict[str, Dict[str, Any]]:
+    """获取接口组速率（便捷函数，需在 get_interface_stats 之后调用）"""
+    return get_interface_monitor().get_groups()
@@ -1,6 +1,6 @@
 # 内存监控模块
 
-import psutil
+from monitor.providers import get_host_provider
 from typing import Dict, Any
 
 class MemoryMonitor:
@@ -10,10 +10,10 @@ class MemoryMonitor:
         """获取内存信息"""
         
         # 虚拟内存
-        virtual_memory = psutil.virtual_memory()
+        virtual_memory = get_host_provider().virtual_memory()
         
         # 交换内存
-        swap_memory = psutil.swap_memory()
+        swap_memory = get_host_provider().swap_memory()
         
         # 内存详细信息
         memory_info = {
@@ -39,8 +39,8 @@ class MemoryMonitor:
     def get_memory_usage_summary(self) -> Dict[str, Any]:
         """获取内存使用摘要"""
         
-        virtual_memory = psutil.virtual_memory()
-        swap_memory = psutil.swap_memory()
+        virtual_memory = get_host_provider().virtual_memory()
+        swap_memory = get_host_provider().swap_memory()
         
         return {
             "total_memory_gb": round(virtual_memory.total / (1024**3), 2),
@@ -0,0 +1,222 @@
+# 内核网络协议计数器模块
+
+"""
+内核网络协议计数器（/proc/net/snmp、/proc/net/netstat、/proc/net/softnet_stat）
+字节/包总数解释不了延迟，这里采集真正有用的计数器并换算为每秒速率：
+
+- Tcp：重传（RetransSegs）、主动/被动建连、建连失败、RST、当前连接数（CurrEstab，瞬时值）
+- TcpExt：全连接队列溢出（ListenOverflows / ListenDrops）、超时、快速/慢启动/SYN 重传、backlog 丢包、
+  内存压力下的中止和裁剪
+- Udp：NoPorts、InErrors、接收/发送缓冲区满丢包（RcvbufErrors / SndbufErrors）
+- Ip / Icmp：丢弃、无路由、重组失败、错误和不可达
+- softnet_stat：逐 CPU 的已处理包数、backlog 满丢包（dropped）、NAPI 预算耗尽（time_squeeze）
+
+snmp / netstat 的格式是 "前缀: 字段名..." 和 "前缀: 值..." 成对出现。首次读取时解析表头，
+为需要的计数器记下 (行号, 列号)，之后每个周期只切分用到的值行、只转换用到的列，表头不再解析；
+文件通过 monitor/procfs.py 的 CachedFile 保持打开，每个周期一次 pread。
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from monitor.procfs import CachedFile
+from monitor.rates import RateCalculator
+
+DEFAULT_PROC_NET = "/proc/net"
+
+# 前缀 -> 计数器；名称不在内核输出中时忽略（不同内核版本的字段不同）
+DEFAULT_COUNTERS: Dict[str, List[str]] = {
+    "Ip": ["InReceives", "InHdrErrors", "InAddrErrors", "InDiscards", "OutRequests", "OutDiscards",
+           "OutNoRoutes", "ReasmFails", "FragFails"],
+    "Icmp": ["InMsgs", "InErrors", "InDestUnreachs", "OutMsgs", "OutDestUnreachs"],
+    "Tcp": ["ActiveOpens", "PassiveOpens", "AttemptFails", "EstabResets", "CurrEstab", "InSegs", "OutSegs",
+            "RetransSegs", "InErrs", "OutRsts", "InCsumErrors"],
+    "Udp": ["InDatagrams", "NoPorts", "InErrors", "OutDatagrams", "RcvbufErrors", "SndbufErrors", "InCsumErrors"],
+    "TcpExt": ["ListenOverflows", "ListenDrops", "TCPTimeouts", "TCPLostRetransmit", "TCPFastRetrans",
+               "TCPSlowStartRetrans", "TCPSynRetrans", "TCPBacklogDrop", "TCPRcvQDrop", "TCPReqQFullDrop",
+               "SyncookiesSent", "SyncookiesFailed", "TCPAbortOnData", "TCPAbortOnMemory", "TCPAbortOnTimeout",
+               "TCPMemoryPressures", "PruneCalled", "TCPOFOQueue", "TW"],
+    "IpExt": ["InNoRoutes", "InCsumErrors", "InOctets", "OutOctets"],
+}
+
+# 瞬时值（不换算速率）
+GAUGES = {("Tcp", "CurrEstab")}
+
+# softnet_stat 的列：已处理、backlog 满丢弃、NAPI 预算/时间耗尽；5.10 起第 13 列为 CPU 编号
+SOFTNET_FIELDS = (("processed", 0), ("dropped", 1), ("time_squeeze", 2))
+SOFTNET_CPU_COLUMN = 12
+
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+def snake_case(name: str) -> str:
+    """RetransSegs -> retrans_segs，TCPLostRetransmit -> tcp_lost_retransmit，TcpExt -> tcp_ext"""
+    return _CAMEL_RE.sub("_", name).lower()
+
+# 一个值行的读取计划：(行号, 前缀, [(列号, 计数器名)])
+_LinePlan = Tuple[int, bytes, List[Tuple[int, str]]]
+
+def build_layout(data: bytes, counters: Dict[str, List[str]]) -> List[_LinePlan]:
+    """解析 snmp / netstat 的表头，返回需要读取的值行和列"""
+    lines = data.split(b"\n")
+    layout = []
+    for index in range(0, len(lines) - 1, 2):
+        header, values = lines[index], lines[index + 1]
+        prefix, _, names = header.partition(b":")
+        wanted = counters.get(prefix.decode("ascii", "replace"))
+        if not wanted or not values.startswith(prefix + b":"):
+            continue
+        columns = {name: column for column, name in enumerate(names.decode("ascii", "replace").split(), start=1)}
+        selected = [(columns[name], name) for name in wanted if name in columns]
+        if selected:
+            layout.append((index + 1, prefix + b":", selected))
+    return layout
+
+def read_layout(data: bytes, layout: List[_LinePlan]) -> Optional[Dict[str, Dict[str, int]]]:
+    """按读取计划取出计数器，返回 前缀 -> 计数器名 -> 值；行结构与计划不符时返回 None"""
+    lines = data.split(b"\n")
+    result: Dict[str, Dict[str, int]] = {}
+    for line_index, prefix, columns in layout:
+        if line_index >= len(lines) or not lines[line_index].startswith(prefix):
+            return None
+        fields = lines[line_index].split()
+        result[prefix[:-1].decode()] = {name: int(fields[column]) for column, name in columns}
+    return result
+
+def parse_softnet(data: bytes) -> List[Tuple[int, List[int]]]:
+    """解析 softnet_stat，返回 [(CPU 编号, [processed, dropped, time_squeeze])]，旧内核按行号作为 CPU 编号"""
+    rows = []
+    for index, line in enumerate(data.split(b"\n")):
+        fields = line.split()
+        if len(fields) <= SOFTNET_FIELDS[-1][1]:
+            continue
+        cpu = int(fields[SOFTNET_CPU_COLUMN], 16) if len(fields) > SOFTNET_CPU_COLUMN else index
+        rows.append((cpu, [int(fields[column], 16) for _, column in SOFTNET_FIELDS]))
+    return rows
+
+class NetstatMonitor:
+    """内核网络协议计数器监控类"""
+
+    def __init__(self, root: str = DEFAULT_PROC_NET, counters: Optional[Dict[str, List[str]]] = None,
+                 per_cpu: bool = True):
+        self.root = root
+        self.counters = DEFAULT_COUNTERS if counters is None else counters
+        self.per_cpu = per_cpu
+        self.rates = RateCalculator()
+        self._files = {
+            name: CachedFile(os.path.join(root, name), size=16384)
+            for name in ("snmp", "netstat", "softnet_stat")
+            if os.path.exists(os.path.join(root, name))
+        }
+        self._layouts: Dict[str, List[_LinePlan]] = {}
+        self._keys: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return bool(self._files)
+
+    def _read_counters(self, name: str) -> Dict[str, Dict[str, int]]:
+        data = self._files[name].read()
+        layout = self._layouts.get(name)
+        values = read_layout(data, layout) if layout is not None else None
+        if values is None:
+            layout = self._layouts[name] = build_layout(data, self.counters)
+            values = read_layout(data, layout) or {}
+        return values
+
+    def _key(self, prefix: str, counter: str) -> Tuple[str, str]:
+        """(前缀, 计数器) -> (小节名, 字段名)，转换结果缓存"""
+        key = self._keys.get((prefix, counter))
+        if key is None:
+            key = self._keys[(prefix, counter)] = (snake_case(prefix), snake_case(counter))
+        return key
+
+    def get_netstat_stats(self, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """
+        读取协议计数器，返回 小节（ip / icmp / tcp / udp / tcp_ext / ip_ext / softnet）->
+        {<计数器>_per_sec: 速率, totals: {<计数器>: 累计值}}；tcp.curr_estab 为瞬时值，
+        tcp.retransmit_percent 为重传段占发送段的比例，softnet.per_cpu 为逐 CPU 的速率
+        """
+        if not self._files:
+            return {}
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            result: Dict[str, Any] = {}
+            rate = self.rates.rate
+            for name in ("snmp", "netstat"):
+                if name not in self._files:
+                    continue
+                try:
+                    values = self._read_counters(name)
+                except (OSError, ValueError, IndexError):
+                    continue
+                for prefix, counters in values.items():
+                    section_values: Dict[str, Any] = {}
+                    totals = {}
+                    for counter, value in counters.items():
+                        section, field = self._key(prefix, counter)
+                        if (prefix, counter) in GAUGES:
+                            section_values[field] = value
+                            continue
+                        totals[field] = value
+                        section_values[f"{field}_per_sec"] = round(rate((section, field), value, timestamp), 2)
+                    section_values["totals"] = totals
+                    result[section] = section_values
+
+            tcp = result.get("tcp")
+            if tcp and "out_segs_per_sec" in tcp and "retrans_segs_per_sec" in tcp:
+                out_segs = tcp["out_segs_per_sec"]
+                tcp["retransmit_percent"] = round(tcp["retrans_segs_per_sec"] / out_segs * 100, 2) if out_segs else 0.0
+
+            if "softnet_stat" in self._files:
+                try:
+                    rows = parse_softnet(self._files["softnet_stat"].read())
+                except (OSError, ValueError):
+                    rows = []
+                if rows:
+                    result["softnet"] = self._softnet(rows, timestamp)
+            return result
+
+    def _softnet(self, rows: List[Tuple[int, List[int]]], timestamp: float) -> Dict[str, Any]:
+        rate = self.rates.rate
+        sums = [0] * len(SOFTNET_FIELDS)
+        sum_rates = [0.0] * len(SOFTNET_FIELDS)
+        per_cpu = {}
+        for cpu, values in rows:
+            entry = {}
+            for position, (field, _) in enumerate(SOFTNET_FIELDS):
+                value = values[position]
+                per_second = rate(("softnet", cpu, field), value, timestamp)
+                sums[position] += value
+                sum_rates[position] += per_second
+                entry[f"{field}_per_sec"] = round(per_second, 2)
+            per_cpu[str(cpu)] = entry
+        result: Dict[str, Any] = {
+            f"{field}_per_sec": round(sum_rates[position], 2) for position, (field, _) in enumerate(SOFTNET_FIELDS)
+        }
+        result["totals"] = {field: sums[position] for position, (field, _) in enumerate(SOFTNET_FIELDS)}
+        if self.per_cpu:
+            result["per_cpu"] = per_cpu
+        # CPU 热插拔后清理已下线 CPU 的基准
+        if len(self.rates) > len(self._keys) + len(per_cpu) * len(SOFTNET_FIELDS):
+            cpus = {cpu for cpu, _ in rows}
+            self.rates.prune(lambda key: key[0] != "softnet" or key[1] in cpus)
+        return result
+
+# 全局协议计数器监控实例（首次使用时创建）
+_netstat_monitor: Optional[NetstatMonitor] = None
+
+def get_netstat_monitor() -> NetstatMonitor:
+    """获取全局协议计数器监控实例"""
+    global _netstat_monitor
+    if _netstat_monitor is None:
+        from core.config import settings
+        _netstat_monitor = NetstatMonitor(counters=settings.netstat_counters, per_cpu=settings.netstat_per_cpu)
+    return _netstat_monitor
+
+def get_netstat_stats() -> Dict[str, Any]:
+    """获取内核网络协议计数器（便捷函数）"""
+    return get_netstat_monitor().get_netstat_stats()
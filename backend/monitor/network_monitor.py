@@ -1,6 +1,6 @@
 # 网络监控模块
 
-import psutil
+from monitor.providers import get_host_provider
 import time
 from typing import Dict, Any, List
 
@@ -8,9 +8,9 @@ class NetworkMonitor:
     """网络监控类"""
     
     def __init__(self):
-        self.last_net_io = psutil.net_io_counters()
+        self.last_net_io = get_host_provider().net_io_counters()
         self.last_timestamp = time.time()
-        self.start_net_io = psutil.net_io_counters()  # 启动时的网络数据
+        self.start_net_io = get_host_provider().net_io_counters()  # 启动时的网络数据
     
     def get_network_io(self) -> Dict[str, Any]:
         """获取网络 I/O 信息"""
@@ -18,7 +18,7 @@ class NetworkMonitor:
         current_timestamp = time.time()
         time_interval = current_timestamp - self.last_timestamp
         
-        current_net_io = psutil.net_io_counters()
+        current_net_io = get_host_provider().net_io_counters()
         
         if self.last_net_io and time_interval > 0:
             upload_speed = (current_net_io.bytes_sent - self.last_net_io.bytes_sent) / time_interval
@@ -48,40 +48,14 @@ class NetworkMonitor:
         return network_info
     
     def get_network_interfaces(self) -> List[Dict[str, Any]]:
-        """获取网络接口信息"""
-        
-        interfaces = psutil.net_if_addrs()
-        interface_stats = psutil.net_if_stats()
-        
-        interface_info = []
-        
-        for interface_name, addresses in interfaces.items():
-            stats = interface_stats.get(interface_name, {})
-            
-            interface_data = {
-                "name": interface_name,
-                "is_up": stats.get("isup", False),
-                "speed": stats.get("speed", 0),
-                "mtu": stats.get("mtu", 0),
-                "addresses": []
-            }
-            
-            for address in addresses:
-                interface_data["addresses"].append({
-                    "family": address.family.name,
-                    "address": address.address,
-                    "netmask": address.netmask,
-                    "broadcast": address.broadcast
-                })
-            
-            interface_info.append(interface_data)
-        
-        return interface_info
+        """获取网络接口信息（按 INTERFACE_INCLUDE / INTERFACE_EXCLUDE 过滤，结果缓存）"""
+        from monitor.interfaces_monitor import get_interface_monitor
+        return get_interface_monitor().interface_info()
     
     def get_network_connections(self) -> List[Dict[str, Any]]:
         """获取网络连接信息"""
         
-        connections = psutil.net_connections(kind='inet')
+        connections = get_host_provider().net_connections(kind='inet')
         connection_info = []
         
         for conn in connections:
@@ -0,0 +1,288 @@
+# NUMA 与内存详情监控模块
+
+"""
+NUMA 节点和内存详情采集
+psutil 只给出整机的内存/交换总量，这里补充：
+
+- /proc/meminfo：脏页、回写、slab（可回收/不可回收）、透明大页、页表、提交量等（字节）
+- /proc/vmstat：缺页、主缺页、换入/换出、kswapd 和直接回收的扫描/回收页数、直接回收停顿、OOM kill 的每秒速率
+- /sys/kernel/mm/hugepages/hugepages-*：每种大页尺寸的总数/空闲/预留/超额
+- /sys/devices/system/node/node*：每个 NUMA 节点的 meminfo（总量/空闲/已用、文件页、匿名页、脏页、slab）、
+  numastat（numa_hit / numa_miss / numa_foreign / local_node / other_node 的速率）和节点上的大页
+
+所有文件通过 monitor/procfs.py 的 CachedFile 保持打开。meminfo / vmstat 的行顺序固定，
+首次读取时为需要的字段记下 (行号, 列号)，之后每个周期只切分这些行；行内容与记录不符时重新建立。
+节点列表只在 node/online 内容变化（内存热插拔）时重新发现。
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from monitor.procfs import CachedFile
+from monitor.rates import RateCalculator
+
+DEFAULT_PROC_ROOT = "/proc"
+DEFAULT_SYSFS_ROOT = "/sys"
+
+# /proc/meminfo 字段 -> 输出名称
+MEMINFO_FIELDS = {
+    "Cached": "cached", "Buffers": "buffers", "Active": "active", "Inactive": "inactive",
+    "Dirty": "dirty", "Writeback": "writeback", "Shmem": "shmem", "Mapped": "mapped",
+    "Slab": "slab", "SReclaimable": "slab_reclaimable", "SUnreclaim": "slab_unreclaimable",
+    "AnonPages": "anon_pages", "AnonHugePages": "anon_huge_pages", "PageTables": "page_tables",
+    "CommitLimit": "commit_limit", "Committed_AS": "committed_as", "Hugetlb": "hugetlb",
+}
+
+# 节点 meminfo 字段 -> 输出名称
+NODE_MEMINFO_FIELDS = {
+    "MemTotal": "total", "MemFree": "free", "MemUsed": "used", "FilePages": "file_pages",
+    "AnonPages": "anon_pages", "Dirty": "dirty", "Writeback": "writeback", "Slab": "slab",
+}
+
+# /proc/vmstat 中换算为速率的计数器；allocstall_* 按区域分开计数，合计为 allocstall
+VMSTAT_COUNTERS = (
+    "pgfault", "pgmajfault", "pswpin", "pswpout", "pgscan_kswapd", "pgscan_direct",
+    "pgsteal_kswapd", "pgsteal_direct", "oom_kill", "compact_stall",
+    "allocstall_dma", "allocstall_dma32", "allocstall_normal", "allocstall_movable", "allocstall_device",
+    "thp_fault_alloc", "thp_fault_fallback",
+)
+
+NUMASTAT_COUNTERS = ("numa_hit", "numa_miss", "numa_foreign", "interleave_hit", "local_node", "other_node")
+
+HUGEPAGE_FIELDS = (("nr_hugepages", "total"), ("free_hugepages", "free"),
+                   ("resv_hugepages", "reserved"), ("surplus_hugepages", "surplus"))
+
+class KeyedLayout:
+    """
+    "名称 值 [kB]" 格式文件（meminfo、vmstat、numastat，节点 meminfo 带 "Node N " 前缀）的读取计划
+    记下需要的字段所在的行和列，之后每次只切分这些行
+    """
+
+    __slots__ = ("wanted", "_plan")
+
+    def __init__(self, wanted):
+        self.wanted = set(wanted)
+        self._plan: Optional[List[Tuple[int, int, bytes, str, int]]] = None
+
+    def _build(self, lines: List[bytes]):
+        plan = []
+        for index, line in enumerate(lines):
+            tokens = line.split()
+            position = next((i for i, token in enumerate(tokens) if token.endswith(b":")), 0)
+            if position + 1 >= len(tokens):
+                continue
+            name = tokens[position].rstrip(b":").decode("ascii", "replace")
+            if name in self.wanted:
+                scale = 1024 if len(tokens) > position + 2 and tokens[position + 2] == b"kB" else 1
+                plan.append((index, position, tokens[position], name, scale))
+        self._plan = plan
+
+    def read(self, data: bytes) -> Dict[str, int]:
+        lines = data.split(b"\n")
+        for attempt in range(2):
+            if self._plan is None or attempt:
+                self._build(lines)
+            result = {}
+            for index, position, token, name, scale in self._plan:
+                tokens = lines[index].split() if index < len(lines) else ()
+                if len(tokens) <= position + 1 or tokens[position] != token:
+                    break
+                result[name] = int(tokens[position + 1]) * scale
+            else:
+                return result
+        return result
+
+class _Node:
+    """一个 NUMA 节点的已打开文件"""
+
+    __slots__ = ("node_id", "meminfo", "numastat", "hugepages", "meminfo_layout", "numastat_layout")
+
+    def __init__(self, node_id: str, meminfo: CachedFile, numastat: Optional[CachedFile],
+                 hugepages: Dict[str, Dict[str, CachedFile]]):
+        self.node_id = node_id
+        self.meminfo = meminfo
+        self.numastat = numastat
+        self.hugepages = hugepages
+        self.meminfo_layout = KeyedLayout(NODE_MEMINFO_FIELDS)
+        self.numastat_layout = KeyedLayout(NUMASTAT_COUNTERS)
+
+def _open_hugepages(directory: str, fields) -> Dict[str, Dict[str, CachedFile]]:
+    """大页目录（hugepages-2048kB 等）-> 字段 -> 文件，键为尺寸（如 2048kB）"""
+    pools = {}
+    try:
+        entries = sorted(os.listdir(directory))
+    except OSError:
+        return pools
+    for entry in entries:
+        if not entry.startswith("hugepages-"):
+            continue
+        files = {
+            name: CachedFile(os.path.join(directory, entry, filename), size=64)
+            for filename, name in fields
+            if os.path.exists(os.path.join(directory, entry, filename))
+        }
+        if files:
+            pools[entry[len("hugepages-"):]] = files
+    return pools
+
+def _read_hugepages(pools: Dict[str, Dict[str, CachedFile]]) -> Dict[str, Dict[str, int]]:
+    result = {}
+    for size, files in pools.items():
+        values = {}
+        for name, file in files.items():
+            try:
+                values[name] = int(file.read())
+            except (OSError, ValueError):
+                continue
+        if values:
+            result[size] = values
+    return result
+
+class NumaMonitor:
+    """NUMA 节点、大页和内存详情监控类"""
+
+    def __init__(self, proc_root: str = DEFAULT_PROC_ROOT, sysfs_root: str = DEFAULT_SYSFS_ROOT):
+        self.proc_root = proc_root
+        self.sysfs_root = sysfs_root
+        self.rates = RateCalculator()
+        self._meminfo = CachedFile(os.path.join(proc_root, "meminfo"), size=8192)
+        self._vmstat = CachedFile(os.path.join(proc_root, "vmstat"), size=16384)
+        self._meminfo_layout = KeyedLayout(MEMINFO_FIELDS)
+        self._vmstat_layout = KeyedLayout(VMSTAT_COUNTERS)
+        self._hugepages = _open_hugepages(os.path.join(sysfs_root, "kernel", "mm", "hugepages"), HUGEPAGE_FIELDS)
+        self._node_dir = os.path.join(sysfs_root, "devices", "system", "node")
+        self._online = CachedFile(os.path.join(self._node_dir, "online"), size=256)
+        self._online_text: Optional[bytes] = None
+        self._nodes: List[_Node] = []
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return os.path.exists(os.path.join(self.proc_root, "meminfo"))
+
+    def _discover_nodes(self):
+        for node in self._nodes:
+            node.meminfo.close()
+            if node.numastat is not None:
+                node.numastat.close()
+            for files in node.hugepages.values():
+                for file in files.values():
+                    file.close()
+        nodes = []
+        try:
+            entries = os.listdir(self._node_dir)
+        except OSError:
+            entries = []
+        for entry in sorted((e for e in entries if e.startswith("node") and e[4:].isdigit()), key=lambda e: int(e[4:])):
+            directory = os.path.join(self._node_dir, entry)
+            if not os.path.exists(os.path.join(directory, "meminfo")):
+                continue
+            numastat = os.path.join(directory, "numastat")
+            nodes.append(_Node(
+                entry[4:],
+                CachedFile(os.path.join(directory, "meminfo"), size=8192),
+                CachedFile(numastat, size=512) if os.path.exists(numastat) else None,
+                # 节点级大页没有 resv_hugepages
+                _open_hugepages(os.path.join(directory, "hugepages"), HUGEPAGE_FIELDS),
+            ))
+        self._nodes = nodes
+        node_ids = {node.node_id for node in nodes}
+        self.rates.prune(lambda key: key[0] != "node" or key[1] in node_ids)
+
+    def _check_nodes(self):
+        """node/online 内容变化时重新发现节点（没有该文件的系统只发现一次）"""
+        try:
+            online = self._online.read()
+        except OSError:
+            online = b""
+        if online != self._online_text:
+            self._online_text = online
+            self._discover_nodes()
+
+    def _node_stats(self, node: _Node, timestamp: float) -> Optional[Dict[str, Any]]:
+        try:
+            meminfo = node.meminfo_layout.read(node.meminfo.read())
+        except (OSError, ValueError):
+            return None
+        result: Dict[str, Any] = {NODE_MEMINFO_FIELDS[name]: value for name, value in meminfo.items()}
+        total = result.get("total")
+        if total:
+            result["usage_percent"] = round(result.get("used", total - result.get("free", 0)) / total * 100, 2)
+        if node.numastat is not None:
+            try:
+                numastat = node.numastat_layout.read(node.numastat.read())
+            except (OSError, ValueError):
+                numastat = {}
+            for name, value in numastat.items():
+                result[f"{name}_per_sec"] = round(self.rates.rate(("node", node.node_id, name), value, timestamp), 2)
+            if numastat:
+                result["totals"] = numastat
+        hugepages = _read_hugepages(node.hugepages)
+        if hugepages:
+            result["hugepages"] = hugepages
+        return result
+
+    def get_numa_stats(self, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """
+        返回：
+        meminfo：脏页、回写、slab 等（字节）
+        vmstat：<计数器>_per_sec 速率、allocstall_per_sec（各区域合计），totals 中为累计值
+        hugepages：尺寸 -> {total, free, reserved, surplus}（页数）
+        nodes：节点编号 -> {total, free, used, usage_percent, file_pages, ..., numa_hit_per_sec, ..., hugepages}
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            result: Dict[str, Any] = {}
+            try:
+                meminfo = self._meminfo_layout.read(self._meminfo.read())
+                result["meminfo"] = {MEMINFO_FIELDS[name]: value for name, value in meminfo.items()}
+            except (OSError, ValueError):
+                pass
+
+            try:
+                vmstat = self._vmstat_layout.read(self._vmstat.read())
+            except (OSError, ValueError):
+                vmstat = {}
+            if vmstat:
+                rate = self.rates.rate
+                section: Dict[str, Any] = {}
+                allocstall = 0.0
+                for name, value in vmstat.items():
+                    per_second = rate(("vmstat", name), value, timestamp)
+                    if name.startswith("allocstall_"):
+                        allocstall += per_second
+                    else:
+                        section[f"{name}_per_sec"] = round(per_second, 2)
+                section["allocstall_per_sec"] = round(allocstall, 2)
+                section["totals"] = vmstat
+                result["vmstat"] = section
+
+            hugepages = _read_hugepages(self._hugepages)
+            if hugepages:
+                result["hugepages"] = hugepages
+
+            self._check_nodes()
+            nodes = {}
+            for node in self._nodes:
+                stats = self._node_stats(node, timestamp)
+                if stats is not None:
+                    nodes[node.node_id] = stats
+            if nodes:
+                result["nodes"] = nodes
+            return result
+
+# 全局 NUMA 监控实例（首次使用时创建）
+_numa_monitor: Optional[NumaMonitor] = None
+
+def get_numa_monitor() -> NumaMonitor:
+    """获取全局 NUMA 监控实例"""
+    global _numa_monitor
+    if _numa_monitor is None:
+        _numa_monitor = NumaMonitor()
+    return _numa_monitor
+
+def get_numa_stats() -> Dict[str, Any]:
+    """获取 NUMA 节点和内存详情（便捷函数）"""
+    return get_numa_monitor().get_numa_stats()
@@ -0,0 +1,168 @@
+# PSI 压力监控模块
+
+"""
+Pressure Stall Information（PSI）采集
+/proc/pressure/{cpu,memory,io}（以及较新内核的 irq）记录任务因资源不足而停顿的时间占比：
+
+    some avg10=0.00 avg60=0.00 avg300=0.00 total=0
+    full avg10=0.00 avg60=0.00 avg300=0.00 total=0
+
+some 表示至少一个任务在等待，full 表示所有非空闲任务同时在等待。avg10/60/300 是内核计算的滑动平均（百分比），
+total 是累计停顿时间（微秒），经 RateCalculator 换算为上一个采样周期内的停顿占比（stall_percent），
+比 avg10 更贴近采样周期本身。
+
+CPU 使用率和内存使用率只说明资源用了多少，PSI 说明任务是否真的在排队，是开销最低的饱和度指标：
+每个周期只有几次 pread（文件通过 monitor/procfs.py 的 CachedFile 保持打开）。
+指定的 cgroup（支持 glob）同样读取其 cpu.pressure / memory.pressure / io.pressure。
+"""
+
+import glob
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from monitor.procfs import CachedFile
+from monitor.rates import RateCalculator
+
+DEFAULT_PRESSURE_ROOT = "/proc/pressure"
+DEFAULT_CGROUP_ROOT = "/sys/fs/cgroup"
+
+PRESSURE_RESOURCES = ("cpu", "memory", "io", "irq")
+
+# 默认跟踪的 cgroup：systemd 的顶层 slice，不存在时忽略
+DEFAULT_PRESSURE_CGROUPS = ["system.slice", "user.slice", "machine.slice", "kubepods.slice"]
+
+def parse_pressure(text: str) -> Dict[str, float]:
+    """
+    解析 PSI 格式：
+    some avg10=0.00 avg60=0.00 avg300=0.00 total=0
+    full avg10=0.00 avg60=0.00 avg300=0.00 total=0
+    返回 {"some_avg10": ..., "some_total": ..., "full_avg10": ...}
+    """
+    result = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        kind = parts[0]
+        for field in parts[1:]:
+            key, _, value = field.partition("=")
+            try:
+                result[f"{kind}_{key}"] = float(value)
+            except ValueError:
+                continue
+    return result
+
+class PressureMonitor:
+    """系统和 cgroup 级别的 PSI 监控类"""
+
+    def __init__(self, root: str = DEFAULT_PRESSURE_ROOT, cgroup_root: str = DEFAULT_CGROUP_ROOT,
+                 cgroups: Optional[List[str]] = None, rescan_interval: float = 60):
+        self.root = root
+        self.cgroup_root = cgroup_root
+        self.cgroup_patterns = DEFAULT_PRESSURE_CGROUPS if cgroups is None else cgroups
+        self.rescan_interval = rescan_interval
+        self.rates = RateCalculator()
+        self._files: Dict[str, CachedFile] = {
+            resource: CachedFile(os.path.join(root, resource), size=256)
+            for resource in PRESSURE_RESOURCES
+            if os.path.exists(os.path.join(root, resource))
+        }
+        # cgroup 路径 -> 资源 -> 文件，glob 每 rescan_interval 秒重新展开一次
+        self._cgroup_files: Dict[str, Dict[str, CachedFile]] = {}
+        self._resolved_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        return bool(self._files)
+
+    def _resolve_cgroups(self, now: float):
+        found: Dict[str, Dict[str, CachedFile]] = {}
+        for pattern in self.cgroup_patterns:
+            for directory in sorted(glob.glob(os.path.join(self.cgroup_root, pattern))):
+                path = os.path.relpath(directory, self.cgroup_root)
+                if path in found:
+                    continue
+                files = self._cgroup_files.get(path) or {
+                    resource: CachedFile(os.path.join(directory, f"{resource}.pressure"), size=256)
+                    for resource in PRESSURE_RESOURCES
+                    if os.path.exists(os.path.join(directory, f"{resource}.pressure"))
+                }
+                if files:
+                    found[path] = files
+        for path, files in self._cgroup_files.items():
+            if path not in found:
+                for file in files.values():
+                    file.close()
+        self._cgroup_files = found
+        self._resolved_at = now
+        self.rates.prune(lambda key: key[0] == "" or key[0] in found)
+
+    def _read(self, owner: str, resource: str, file: CachedFile, timestamp: float) -> Optional[Dict[str, float]]:
+        try:
+            values = parse_pressure(file.read().decode("ascii", "replace"))
+        except OSError:
+            return None
+        result = {}
+        for kind in ("some", "full"):
+            total = values.get(f"{kind}_total")
+            if total is None:
+                continue
+            for window in ("avg10", "avg60", "avg300"):
+                result[f"{kind}_{window}"] = values.get(f"{kind}_{window}", 0.0)
+            result[f"{kind}_total_usec"] = total
+            # 微秒/秒 -> 停顿时间占比（百分比）
+            stall = self.rates.rate((owner, resource, kind), total, timestamp) / 1e4
+            result[f"{kind}_stall_percent"] = round(min(stall, 100.0), 2)
+        return result
+
+    def get_pressure_stats(self, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """
+        读取 PSI，返回 资源 -> {some_avg10, some_avg60, some_avg300, some_total_usec, some_stall_percent, full_*}，
+        cgroups 中为每个匹配的 cgroup 的同样结构；内核不支持 PSI 时返回空字典
+        """
+        if not self._files:
+            return {}
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            if timestamp - self._resolved_at >= self.rescan_interval:
+                self._resolve_cgroups(timestamp)
+            result: Dict[str, Any] = {}
+            for resource, file in self._files.items():
+                values = self._read("", resource, file, timestamp)
+                if values:
+                    result[resource] = values
+            cgroups = {}
+            for path, files in self._cgroup_files.items():
+                entry = {}
+                for resource, file in files.items():
+                    values = self._read(path, resource, file, timestamp)
+                    if values:
+                        entry[resource] = values
+                    elif values is None:
+                        # cgroup 已被删除：下个周期重新展开 glob
+                        self._resolved_at = 0.0
+                if entry:
+                    cgroups[path] = entry
+            if cgroups:
+                result["cgroups"] = cgroups
+            return result
+
+# 全局 PSI 监控实例（首次使用时创建）
+_pressure_monitor: Optional[PressureMonitor] = None
+
+def get_pressure_monitor() -> PressureMonitor:
+    """获取全局 PSI 监控实例"""
+    global _pressure_monitor
+    if _pressure_monitor is None:
+        from core.config import settings
+        from monitor.cgroup_monitor import CgroupMonitor
+        _pressure_monitor = PressureMonitor(cgroup_root=CgroupMonitor._resolve_root(settings.cgroup_root),
+                                            cgroups=settings.pressure_cgroups)
+    return _pressure_monitor
+
+def get_pressure_stats() -> Dict[str, Any]:
+    """获取 PSI 压力指标（便捷函数）"""
+    return get_pressure_monitor().get_pressure_stats()
@@ -0,0 +1,61 @@
+# procfs / sysfs 读取工具
+
+"""
+频繁读取的 /proc、/sys 文件的低开销读取
+文件只打开一次，之后每次用 os.pread 从偏移 0 读取（procfs 每次 pread 都会重新生成内容），
+省去每个周期 open/close 的系统调用和文件对象分配。
+读取失败（文件被删除、设备热插拔等）时关闭并在下一次读取时重新打开。
+"""
+
+import os
+import threading
+from typing import Optional
+
+class CachedFile:
+    """保持打开的 procfs / sysfs 文件"""
+
+    __slots__ = ("path", "size", "_fd", "_lock")
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.size = size
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def read(self) -> bytes:
+        """读取整个文件内容，失败时抛出 OSError"""
+        with self._lock:
+            for attempt in range(2):
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDONLY)
+                try:
+                    data = os.pread(self._fd, self.size, 0)
+                except OSError:
+                    self._close()
+                    if attempt:
+                        raise
+                    continue
+                # 读满缓冲区说明文件可能更长，扩大缓冲区后重读
+                while len(data) >= self.size:
+                    self.size *= 2
+                    data = os.pread(self._fd, self.size, 0)
+                return data
+        raise OSError(f"无法读取 {self.path}")
+
+    def read_text(self) -> str:
+        return self.read().decode("utf-8", "replace")
+
+    def _close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def __del__(self):
+        self._close()
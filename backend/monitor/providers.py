@@ -0,0 +1,470 @@
+# 主机数据源
+
+"""
+主机数据源（provider）
+采集器、接口和各监控模块不直接调用 psutil，而是通过 get_host_provider() 取得的数据源读取主机数据，
+数据源的方法与 psutil 同名、同参数、返回同样字段名的结果：
+
+- PsutilProvider：真实主机，调用时转发给 psutil（默认）
+- SyntheticProvider：确定性的合成主机，CPU、磁盘、网卡、挂载点、连接、进程、GPU 的数量和负载形态可配置，
+  用于在普通开发机上对 500 块网卡、2000 个挂载点、64 块 GPU 这样的主机做基准和压测
+
+只有 live 的数据源代表运行本进程的主机；非 live 时直接读取 /proc、/sys 的采集器
+（内存细分、逐设备 I/O、传感器、网络协议计数器、PSI、CPU 高频采样）不启用，否则会混入真实主机的数据。
+采集结果的录制与回放见 monitor/trace.py。
+"""
+
+import math
+import random
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+# 与 psutil（Linux）相同字段名的结果类型
+scpufreq = namedtuple("scpufreq", "current min max")
+scputimes = namedtuple("scputimes", "user nice system idle iowait irq softirq steal guest guest_nice")
+svmem = namedtuple("svmem", "total available percent used free active inactive buffers cached shared slab")
+sswap = namedtuple("sswap", "total used free percent sin sout")
+sdiskio = namedtuple("sdiskio", "read_count write_count read_bytes write_bytes read_time write_time "
+                                "read_merged_count write_merged_count busy_time")
+sdiskpart = namedtuple("sdiskpart", "device mountpoint fstype opts")
+sdiskusage = namedtuple("sdiskusage", "total used free percent")
+snetio = namedtuple("snetio", "bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout")
+addr = namedtuple("addr", "ip port")
+sconn = namedtuple("sconn", "fd family type laddr raddr status pid")
+snicaddr = namedtuple("snicaddr", "family address netmask broadcast ptp")
+snicstats = namedtuple("snicstats", "isup duplex speed mtu flags")
+
+class HostProvider(ABC):
+    """
+    主机数据源基类，方法签名与 psutil 一致；gpus() 返回 SystemMonitor.get_gpu_info() 的结构
+    全部方法都是抽象方法，缺少实现的数据源在创建时即报错，而不是在某个采集器第一次调用时
+    """
+
+    name = "base"
+    # 是否代表运行本进程的主机（直接读取 /proc、/sys 的采集器只在 live 时启用）
+    live = False
+
+    @abstractmethod
+    def cpu_percent(self, interval: Optional[float] = None, percpu: bool = False):
+        raise NotImplementedError
+
+    @abstractmethod
+    def cpu_count(self, logical: bool = True) -> Optional[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def cpu_freq(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def cpu_times(self, percpu: bool = False):
+        raise NotImplementedError
+
+    @abstractmethod
+    def virtual_memory(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def swap_memory(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def disk_io_counters(self, perdisk: bool = False, nowrap: bool = True):
+        raise NotImplementedError
+
+    @abstractmethod
+    def disk_partitions(self, all: bool = False):
+        raise NotImplementedError
+
+    @abstractmethod
+    def disk_usage(self, path: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def net_io_counters(self, pernic: bool = False, nowrap: bool = True):
+        raise NotImplementedError
+
+    @abstractmethod
+    def net_connections(self, kind: str = "inet"):
+        raise NotImplementedError
+
+    @abstractmethod
+    def net_if_addrs(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def net_if_stats(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def getloadavg(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def boot_time(self) -> float:
+        raise NotImplementedError
+
+    @abstractmethod
+    def pids(self) -> List[int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def gpus(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+class PsutilProvider(HostProvider):
+    """真实主机：每次调用时转发给 psutil 模块（不缓存函数引用，便于测试替换 psutil）"""
+
+    name = "psutil"
+    live = True
+
+    def cpu_percent(self, interval=None, percpu=False):
+        return psutil.cpu_percent(interval=interval, percpu=percpu)
+
+    def cpu_count(self, logical=True):
+        return psutil.cpu_count(logical=logical)
+
+    def cpu_freq(self):
+        return psutil.cpu_freq()
+
+    def cpu_times(self, percpu=False):
+        return psutil.cpu_times(percpu=percpu)
+
+    def virtual_memory(self):
+        return psutil.virtual_memory()
+
+    def swap_memory(self):
+        return psutil.swap_memory()
+
+    def disk_io_counters(self, perdisk=False, nowrap=True):
+        return psutil.disk_io_counters(perdisk=perdisk, nowrap=nowrap)
+
+    def disk_partitions(self, all=False):
+        return psutil.disk_partitions(all=all)
+
+    def disk_usage(self, path):
+        return psutil.disk_usage(path)
+
+    def net_io_counters(self, pernic=False, nowrap=True):
+        return psutil.net_io_counters(pernic=pernic, nowrap=nowrap)
+
+    def net_connections(self, kind="inet"):
+        return psutil.net_connections(kind=kind)
+
+    def net_if_addrs(self):
+        return psutil.net_if_addrs()
+
+    def net_if_stats(self):
+        return psutil.net_if_stats()
+
+    def getloadavg(self):
+        return psutil.getloadavg()
+
+    def boot_time(self):
+        return psutil.boot_time()
+
+    def pids(self):
+        return psutil.pids()
+
+    def gpus(self):
+        # nvidia-smi / wmic 查询在 SystemMonitor 中
+        from monitor.system_monitor import get_system_monitor
+        return get_system_monitor().get_gpu_info()
+
+# 合成主机的负载形态
+WORKLOADS = ("steady", "diurnal", "bursty", "ramp")
+
+# 实体类型编号（参与确定性噪声的种子）
+_CPU, _DISK, _NIC, _GPU, _MEMORY, _MOUNT, _SOCKET = range(7)
+_MASK = (1 << 64) - 1
+_GiB = 1024 ** 3
+
+# 连接状态分布：约 70% ESTABLISHED
+_SOCKET_STATUSES = ("ESTABLISHED",) * 14 + ("TIME_WAIT", "TIME_WAIT", "LISTEN", "CLOSE_WAIT", "SYN_SENT", "FIN_WAIT2")
+
+def _noise(*values: int) -> float:
+    """整数参数的确定性伪随机数 [0, 1)（splitmix64 混合），不依赖 hash() 的随机化"""
+    x = 0x9E3779B97F4A7C15
+    for value in values:
+        x = ((x ^ (value & _MASK)) * 0xBF58476D1CE4E5B9) & _MASK
+        x ^= x >> 31
+        x = (x * 0x94D049BB133111EB) & _MASK
+        x ^= x >> 29
+    return (x >> 11) / float(1 << 53)
+
+class SyntheticProvider(HostProvider):
+    """
+    确定性合成主机
+    每个 CPU 核心、磁盘、网卡、GPU 的负载 level(t) ∈ [0, 1] 由负载形态、按 seed 生成的相位和权重，
+    以及按秒取整的小幅噪声决定；同样的参数和时钟得到完全相同的数据。
+    计数器（CPU 时间、磁盘/网卡字节数等）按时钟对 速率 × level 积分，只增不减，速率计算得到与负载一致的值。
+
+    workload：steady 恒定负载；diurnal 以 period 秒为周期的正弦（模拟昼夜）；
+    bursty 每 10 秒随机一段满载或空闲；ramp 在 period 内从空闲线性升到满载后重新开始
+    clock 默认 time.time，测试中可传入可控的时钟
+    """
+
+    name = "synthetic"
+    live = False
+
+    def __init__(self, cpus: int = 8, disks: int = 4, nics: int = 4, mounts: int = 8, sockets: int = 64,
+                 processes: int = 200, gpus: int = 0, memory_gb: float = 16.0, workload: str = "diurnal",
+                 period: float = 3600.0, seed: int = 42, clock: Optional[Callable[[], float]] = None):
+        if workload not in WORKLOADS:
+            raise ValueError(f"未知的负载形态: {workload}，可选 {', '.join(WORKLOADS)}")
+        self.cpus = max(1, int(cpus))
+        self.workload = workload
+        self.period = float(period)
+        self.seed = int(seed)
+        self.clock = clock or time.time
+        self.memory_total = int(memory_gb * _GiB)
+        self.started = self.clock()
+        self.boot = float(int(self.started) - 3 * 86400)
+
+        rng = random.Random(self.seed)
+        counts = {_CPU: self.cpus, _DISK: disks, _NIC: nics, _GPU: gpus, _MEMORY: 1}
+        # 每个实体的相位偏移和权重，使各核心/磁盘/网卡的负载错开
+        self._phase = {kind: [rng.uniform(0, self.period) for _ in range(count)] for kind, count in counts.items()}
+        self._weight = {kind: [rng.uniform(0.3, 1.0) for _ in range(count)] for kind, count in counts.items()}
+
+        self.disk_names = [f"nvme{index}n1" for index in range(disks)]
+        self.nic_names = [f"eth{index}" for index in range(nics)]
+        self.mountpoints = [f"/data/{index:04d}" for index in range(mounts)]
+        self._mount_index = {mountpoint: index for index, mountpoint in enumerate(self.mountpoints)}
+        self._pids = [1] + [1000 + index * 7 for index in range(max(0, processes - 1))]
+        self.sockets = sockets
+        self.gpu_count = gpus
+
+        # (实体类型, 下标) -> [上次积分的时间, [各计数器的值]]
+        self._counters: Dict[Any, List[Any]] = {}
+        self._jitter_second: Optional[int] = None
+        self._jitter_cache: Dict[Any, float] = {}
+        # (30 秒窗口, 连接表)
+        self._connections: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def _shape(self, t: float) -> float:
+        if self.workload == "steady":
+            return 0.35
+        if self.workload == "diurnal":
+            return 0.15 + 0.7 * (0.5 - 0.5 * math.cos(2 * math.pi * (t % self.period) / self.period))
+        if self.workload == "ramp":
+            return 0.05 + 0.9 * (t % self.period) / self.period
+        # bursty：每 10 秒一个窗口，约 20% 的窗口满载
+        return 0.95 if _noise(self.seed, int(t // 10)) < 0.2 else 0.1
+
+    def level(self, kind: int, index: int, t: float) -> float:
+        """实体在时刻 t 的负载 [0, 1]"""
+        phase = self._phase[kind][index] if self.workload != "bursty" else 0.0
+        value = self._shape(t + phase) * self._weight[kind][index]
+        value += 0.05 * (self._jitter(kind, index, int(t)) - 0.5)
+        return min(1.0, max(0.0, value))
+
+    def _jitter(self, kind: int, index: int, second: int) -> float:
+        """按秒变化的噪声，同一秒内的多次调用（接口、采集器）复用计算结果"""
+        if second != self._jitter_second:
+            self._jitter_second = second
+            self._jitter_cache = {}
+        cache = self._jitter_cache
+        value = cache.get((kind, index))
+        if value is None:
+            value = cache[(kind, index)] = _noise(self.seed, kind, index, second)
+        return value
+
+    def _advance(self, kind: int, index: int, t: float, rates: Callable[[float], List[float]]) -> List[float]:
+        """
+        把实体的计数器积分到时刻 t，rates(level) 返回各计数器的每秒增量
+        首次调用时计数器从按 seed 生成的起始值开始（模拟已运行一段时间的主机）
+        """
+        with self._lock:
+            state = self._counters.get((kind, index))
+            if state is None:
+                start = [value * 86400 * (1 + _noise(self.seed, kind, index, column))
+                         for column, value in enumerate(rates(0.5))]
+                state = self._counters[(kind, index)] = [t, start]
+            elapsed = t - state[0]
+            if elapsed > 0:
+                increments = rates(self.level(kind, index, state[0] + elapsed / 2))
+                state[1] = [value + rate * elapsed for value, rate in zip(state[1], increments)]
+                state[0] = t
+            return state[1]
+
+    # ---- CPU ----
+
+    def cpu_percent(self, interval=None, percpu=False):
+        # 不阻塞，interval 被忽略
+        now = self.clock()
+        per_cpu = [round(self.level(_CPU, core, now) * 100, 1) for core in range(self.cpus)]
+        if percpu:
+            return per_cpu
+        return round(sum(per_cpu) / len(per_cpu), 1)
+
+    def cpu_count(self, logical=True):
+        return self.cpus if logical else max(1, self.cpus // 2)
+
+    def cpu_freq(self):
+        now = self.clock()
+        load = sum(self.level(_CPU, core, now) for core in range(self.cpus)) / self.cpus
+        return scpufreq(round(1200.0 + 2400.0 * load, 1), 800.0, 3600.0)
+
+    def cpu_times(self, percpu=False):
+        now = self.clock()
+        cores = []
+        for core in range(self.cpus):
+            user, system, idle, iowait, steal = self._advance(
+                _CPU, core, now, lambda load: [0.7 * load, 0.25 * load, 1.0 - load, 0.04 * load, 0.01 * load])
+            cores.append(scputimes(user, 0.0, system, idle, iowait, 0.0, 0.0, steal, 0.0, 0.0))
+        if percpu:
+            return cores
+        return scputimes(*(sum(column) for column in zip(*cores)))
+
+    def getloadavg(self):
+        now = self.clock()
+
+        def load(t):
+            return round(sum(self.level(_CPU, core, t) for core in range(self.cpus)), 2)
+
+        return (load(now), load(now - 300), load(now - 900))
+
+    # ---- 内存 ----
+
+    def virtual_memory(self):
+        total = self.memory_total
+        used = int(total * (0.2 + 0.6 * self.level(_MEMORY, 0, self.clock())))
+        cached = int((total - used) * 0.6)
+        free = total - used - cached
+        available = free + cached
+        return svmem(total, available, round((total - available) / total * 100, 1), used, free,
+                     int(used * 0.8), cached, int(total * 0.02), cached, int(total * 0.01), int(total * 0.03))
+
+    def swap_memory(self):
+        total = self.memory_total // 4
+        used = int(total * 0.1 * self.level(_MEMORY, 0, self.clock()))
+        return sswap(total, used, total - used, round(used / total * 100, 1) if total else 0.0, 0, 0)
+
+    # ---- 磁盘 ----
+
+    @staticmethod
+    def _disk_rates(load: float) -> List[float]:
+        # 次数、字节数、耗时（毫秒）、合并次数、busy_time（毫秒）
+        return [200 * load, 800 * load, 64 * 1024 ** 2 * load, 256 * 1024 ** 2 * load,
+                150 * load, 600 * load, 20 * load, 80 * load, 1000 * load]
+
+    def disk_io_counters(self, perdisk=False, nowrap=True):
+        if not self.disk_names:
+            return {} if perdisk else None
+        now = self.clock()
+        disks = {name: sdiskio(*(int(value) for value in self._advance(_DISK, index, now, self._disk_rates)))
+                 for index, name in enumerate(self.disk_names)}
+        if perdisk:
+            return disks
+        return sdiskio(*(sum(column) for column in zip(*disks.values())))
+
+    def disk_partitions(self, all=False):
+        return [sdiskpart(f"/dev/mapper/vol{index:04d}", mountpoint, "xfs", "rw,relatime")
+                for index, mountpoint in enumerate(self.mountpoints)]
+
+    def disk_usage(self, path):
+        index = self._mount_index.get(path)
+        if index is None:
+            raise FileNotFoundError(2, "No such file or directory", path)
+        total = (1 + int(_noise(self.seed, _MOUNT, index, 0) * 16)) * 256 * _GiB
+        # 起始使用率 10%~80%，随运行时间缓慢增长（每个 period 增长约 2%）
+        fill = 0.1 + 0.7 * _noise(self.seed, _MOUNT, index, 1) + 0.02 * (self.clock() - self.started) / self.period
+        used = int(total * min(fill, 0.99))
+        return sdiskusage(total, used, total - used, round(used / total * 100, 1))
+
+    # ---- 网络 ----
+
+    @staticmethod
+    def _nic_rates(load: float) -> List[float]:
+        # 与 snetio 字段顺序一致；错误和丢包只在高负载时出现
+        return [40 * 1024 ** 2 * load, 100 * 1024 ** 2 * load, 30000 * load, 70000 * load,
+                0.01 * load ** 4, 0.01 * load ** 4, 2 * load ** 4, 1 * load ** 4]
+
+    def net_io_counters(self, pernic=False, nowrap=True):
+        now = self.clock()
+        nics = {name: snetio(*(int(value) for value in self._advance(_NIC, index, now, self._nic_rates)))
+                for index, name in enumerate(self.nic_names)}
+        if pernic:
+            return nics
+        return snetio(*(sum(column) for column in zip(*nics.values()))) if nics else snetio(0, 0, 0, 0, 0, 0, 0, 0)
+
+    def net_connections(self, kind="inet"):
+        # 每个连接的状态每 30 秒变化一次，同一窗口内复用同一份连接表
+        window = int(self.clock() // 30)
+        cached = self._connections
+        if cached is not None and cached[0] == window:
+            return list(cached[1])
+        pids = self._pids
+        connections = []
+        for index in range(self.sockets):
+            status = _SOCKET_STATUSES[int(_noise(self.seed, _SOCKET, index, window) * len(_SOCKET_STATUSES))]
+            remote = addr(f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}", 443) \
+                if status != "LISTEN" else ()
+            connections.append(sconn(-1, socket.AF_INET, socket.SOCK_STREAM,
+                                     addr("10.255.0.1", 1024 + index % 60000), remote, status,
+                                     pids[index % len(pids)] if pids else None))
+        self._connections = (window, connections)
+        return list(connections)
+
+    def net_if_addrs(self):
+        return {name: [snicaddr(socket.AF_INET, f"10.{index >> 8 & 255}.{index & 255}.2", "255.255.255.0", None, None)]
+                for index, name in enumerate(self.nic_names)}
+
+    def net_if_stats(self):
+        return {name: snicstats(True, 2, 25000, 9000, "up,broadcast,running,multicast") for name in self.nic_names}
+
+    # ---- 其他 ----
+
+    def boot_time(self):
+        return self.boot
+
+    def pids(self):
+        return list(self._pids)
+
+    def gpus(self):
+        now = self.clock()
+        result = []
+        for index in range(self.gpu_count):
+            load = self.level(_GPU, index, now)
+            result.append({
+                "vendor": "NVIDIA",
+                "index": index,
+                "name": "Synthetic GPU 80GB",
+                "memory_total": 81920.0,
+                "memory_used": round(81920.0 * (0.1 + 0.85 * load), 1),
+                "usage_percent": round(load * 100, 1),
+                "temperature": round(35.0 + 50.0 * load, 1)
+            })
+        return result
+
+# 全局主机数据源（首次使用时按配置创建）
+_host_provider: Optional[HostProvider] = None
+
+def create_host_provider(kind: str, options: Optional[Dict[str, Any]] = None) -> HostProvider:
+    """按名称创建数据源；回放（replay）替换的是采样器的采集器，主机数据仍来自 psutil"""
+    if kind in ("psutil", "replay"):
+        return PsutilProvider()
+    if kind == "synthetic":
+        return SyntheticProvider(**(options or {}))
+    raise ValueError(f"未知的主机数据源: {kind}，可选 psutil、synthetic、replay")
+
+def get_host_provider() -> HostProvider:
+    """获取全局主机数据源（HOST_PROVIDER / SYNTHETIC_HOST 配置）"""
+    global _host_provider
+    if _host_provider is None:
+        from core.config import settings
+        _host_provider = create_host_provider(settings.host_provider, settings.synthetic_host)
+    return _host_provider
+
+def set_host_provider(provider: Optional[HostProvider]):
+    """替换全局主机数据源（基准和测试使用），None 表示下次使用时按配置重新创建"""
+    global _host_provider
+    _host_provider = provider
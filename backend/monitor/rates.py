@@ -0,0 +1,131 @@
+# 计数器速率计算模块
+
+"""
+通用计数器速率引擎
+各采集器把单调递增的累计计数器交给这里，按 key 记住上一次的值和时间戳，
+返回每秒增量。计数器回绕或重置（新值小于旧值）时本次返回 0，避免出现负速率。
+CPU 利用率同样按 cpu_times() 的两次读数相减计算（CpuUsageCalculator）。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple, Union
+
+class RateCalculator:
+    """按 key 维护上一次计数器值的速率计算器"""
+
+    __slots__ = ("_last",)
+
+    def __init__(self):
+        # key -> (value, timestamp)
+        self._last: Dict[Hashable, Tuple[float, float]] = {}
+
+    def rate(self, key: Hashable, value: float, timestamp: Optional[float] = None) -> float:
+        """记录新的计数器值并返回相对上一次的每秒速率（首次出现返回 0）"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        last = self._last.get(key)
+        self._last[key] = (value, timestamp)
+
+        if last is None:
+            return 0.0
+
+        last_value, last_timestamp = last
+        interval = timestamp - last_timestamp
+        if interval <= 0 or value < last_value:
+            return 0.0
+        return (value - last_value) / interval
+
+    def forget(self, key: Hashable):
+        """删除某个 key 的历史值"""
+        self._last.pop(key, None)
+
+    def prune(self, keep: Callable[[Hashable], bool]):
+        """只保留 keep(key) 为真的 key，清理已经消失的对象（如被删除的 cgroup、拔出的磁盘）"""
+        for key in [k for k in self._last if not keep(k)]:
+            del self._last[key]
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+def _busy_total(times) -> Tuple[float, float]:
+    """cpu_times() 读数的 (忙碌时间, 总时间)，与 psutil.cpu_percent 相同：guest 已计入 user，idle 含 iowait"""
+    total = sum(times) - getattr(times, "guest", 0.0) - getattr(times, "guest_nice", 0.0)
+    idle = times.idle + getattr(times, "iowait", 0.0)
+    return total - idle, total
+
+def _percent(current, baseline, last: float) -> float:
+    busy, total = _busy_total(current)
+    if baseline is not None:
+        base_busy, base_total = _busy_total(baseline)
+        busy, total = busy - base_busy, total - base_total
+    if total <= 0:
+        # 两次读数之间时钟节拍还没有前进，沿用上一次的结果
+        return last
+    return round(min(100.0, max(0.0, busy / total * 100.0)), 1)
+
+class CpuUsageCalculator:
+    """
+    按 cpu_times() 差值计算的 CPU 利用率（非阻塞，线程安全）
+    psutil.cpu_percent(interval=None) 的基准按线程保存，在线程池中调用时统计窗口取决于由哪个线程执行，
+    每个新线程的第一次调用还会返回 0.0；这里的基准保存在实例中，与调用线程无关。
+
+    percent(seconds=0) 统计距上一次调用以来的平均值（采样器每个周期调用一次）；
+    seconds > 0 时使用至少 seconds 秒前的最近一次读数作为基准（没有时取最早的读数），
+    没有任何读数时返回开机以来的平均值。
+    """
+
+    def __init__(self, provider: Optional[Callable[[], Any]] = None, keep_seconds: float = 60.0):
+        # provider 为返回主机数据源的函数，默认 monitor.providers.get_host_provider
+        self._provider = provider
+        self.keep_seconds = keep_seconds
+        # percpu -> [(monotonic 时间, 读数)]，按时间递增
+        self._readings: Dict[bool, Deque[Tuple[float, Any]]] = {False: deque(), True: deque()}
+        self._last: Dict[bool, Any] = {False: 0.0, True: []}
+        self._lock = threading.Lock()
+
+    def _read(self, percpu: bool):
+        if self._provider is None:
+            from monitor.providers import get_host_provider
+            return get_host_provider().cpu_times(percpu=percpu)
+        return self._provider().cpu_times(percpu=percpu)
+
+    def percent(self, seconds: float = 0, percpu: bool = False) -> Union[float, List[float]]:
+        current = self._read(percpu)
+        now = time.monotonic()
+        with self._lock:
+            readings = self._readings[percpu]
+            baseline = None
+            if readings:
+                if seconds <= 0:
+                    baseline = readings[-1][1]
+                else:
+                    baseline = readings[0][1]
+                    for timestamp, reading in readings:
+                        if now - timestamp < seconds:
+                            break
+                        baseline = reading
+            if percpu:
+                last = self._last[True]
+                if baseline is not None and len(baseline) != len(current):
+                    # CPU 热插拔：丢弃旧基准
+                    baseline = None
+                    readings.clear()
+                result = [_percent(core, None if baseline is None else baseline[index],
+                                   last[index] if index < len(last) else 0.0)
+                          for index, core in enumerate(current)]
+            else:
+                result = _percent(current, baseline, self._last[False])
+            self._last[percpu] = result
+            # seconds 为 0 时只需要最近一次读数；否则每 0.1 秒最多记录一次，
+            # 保留 keep_seconds 内的读数和一个更早的读数
+            if seconds <= 0:
+                readings.clear()
+                readings.append((now, current))
+            elif not readings or now - readings[-1][0] >= 0.1:
+                readings.append((now, current))
+                while len(readings) > 1 and now - readings[1][0] >= self.keep_seconds:
+                    readings.popleft()
+            return result
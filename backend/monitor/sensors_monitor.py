@@ -0,0 +1,334 @@
+# 硬件传感器监控模块
+
+"""
+硬件传感器采集（hwmon / thermal / RAPL）
+- /sys/class/hwmon/*：温度（temp*_input）、风扇转速（fan*_input）、功率（power*_input / power*_average）
+  和能量计数器（energy*_input），按芯片名称识别 CPU 封装/核心温度（coretemp、k10temp 等）和 NVMe 温度
+- /sys/class/thermal/thermal_zone*：各温区温度
+- /sys/class/powercap/intel-rapl*：RAPL 能量计数器（微焦），经 RateCalculator 换算为瓦特，
+  计数器按 max_energy_range_uj 回绕时先展开再计算速率
+
+传感器文件在发现时打开一次（monitor/procfs.py 的 CachedFile），之后每个周期只做一次 pread。
+发现结果会缓存：每个周期只列一次三个 class 目录，条目变化（热插拔、驱动加载）或传感器文件消失时才重新发现，
+另外每隔 rescan_interval 秒完整发现一次兜底（同一设备下新增的传感器文件不会改变 class 目录）。
+单个传感器偶发的读取错误（风扇、温度驱动返回 EIO 等）只跳过该传感器本周期的读数，不触发重新发现；
+能量计数器的回绕展开状态按 (分类, key, 路径) 在重新发现后延续，回绕过的计数器不会出现 0 W 的周期。
+所有路径都相对于 root（默认 /sys），可以指向伪造的 sysfs 目录树做测试。
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from monitor.procfs import CachedFile
+from monitor.rates import RateCalculator
+
+DEFAULT_SYSFS_ROOT = "/sys"
+
+# 温度来源 -> 分类；CPU 温度芯片的 label 中含 "core" 的视为核心温度，其余视为封装温度
+CPU_CHIPS = {"coretemp", "k10temp", "zenpower", "cpu_thermal", "cpu-thermal", "soc_thermal"}
+NVME_CHIPS = {"nvme"}
+CPU_ZONES = {"x86_pkg_temp", "cpu-thermal", "cpu_thermal", "soc_thermal"}
+
+_SENSOR_FILE_RE = re.compile(r"^(temp|fan|power|energy)(\d+)_(input|average)$")
+_SLUG_RE = re.compile(r"[^0-9a-z]+")
+
+def _slug(text: str) -> str:
+    """转换为可用作序列名称一段的小写标识"""
+    return _SLUG_RE.sub("_", text.lower()).strip("_") or "unknown"
+
+def _read_text(path: str) -> Optional[str]:
+    """读取只在发现时读取一次的属性文件（名称、标签、阈值），失败时返回 None"""
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+def _read_number(path: str) -> Optional[float]:
+    text = _read_text(path)
+    try:
+        return float(text) if text is not None else None
+    except ValueError:
+        return None
+
+class _Sensor:
+    """一个每周期读取的传感器文件"""
+
+    __slots__ = ("file", "section", "key", "scale", "info", "max_range", "_offset", "_last_raw")
+
+    def __init__(self, path: str, section: str, key: str, scale: float, info: Dict[str, Any],
+                 max_range: float = 0.0):
+        self.file = CachedFile(path, size=64)
+        self.section = section  # temperatures / fans / power / energy
+        self.key = key
+        self.scale = scale
+        self.info = info  # 发现时确定的静态字段（chip、label、kind、high、critical 等）
+        self.max_range = max_range  # 能量计数器的回绕上限（微焦），0 表示未知
+        self._offset = 0.0
+        self._last_raw: Optional[float] = None
+
+    def read(self) -> float:
+        return float(self.file.read())
+
+    def carry_over(self, previous: "_Sensor"):
+        """沿用重新发现前同一传感器的回绕展开状态"""
+        self._offset = previous._offset
+        self._last_raw = previous._last_raw
+
+    def unwrap(self, raw: float) -> float:
+        """展开按 max_range 回绕的能量计数器；上限未知时原样返回（回绕那次速率为 0）"""
+        if self._last_raw is not None and raw < self._last_raw and self.max_range:
+            self._offset += self.max_range
+        self._last_raw = raw
+        return raw + self._offset
+
+class SensorsMonitor:
+    """hwmon / thermal / RAPL 传感器监控类"""
+
+    def __init__(self, root: str = DEFAULT_SYSFS_ROOT, rescan_interval: float = 300):
+        self.root = root
+        self.rescan_interval = rescan_interval
+        self.rates = RateCalculator()
+        self._sensors: List[_Sensor] = []
+        self._listing: Optional[Tuple[Tuple[str, ...], ...]] = None
+        self._discovered_at = 0.0
+        self._dirty = True
+        # 发现次数和跳过的传感器（如普通用户无权读取的 RAPL energy_uj），便于确认缓存是否生效
+        self.stats = {"discoveries": 0, "sensors": 0, "unreadable": 0, "read_errors": 0}
+        self._lock = threading.Lock()
+
+    def _class_dir(self, name: str) -> str:
+        return os.path.join(self.root, "class", name)
+
+    def _list_classes(self) -> Tuple[Tuple[str, ...], ...]:
+        listing = []
+        for name in ("hwmon", "thermal", "powercap"):
+            try:
+                listing.append(tuple(sorted(os.listdir(self._class_dir(name)))))
+            except OSError:
+                listing.append(())
+        return tuple(listing)
+
+    def is_available(self) -> bool:
+        return any(self._list_classes())
+
+    # ---------- 发现 ----------
+
+    def _add(self, sensors: List[_Sensor], sensor: _Sensor):
+        """首次读取成功的传感器才保留（无权限、驱动返回错误的文件直接跳过）"""
+        keys = {existing.key for existing in sensors if existing.section == sensor.section}
+        if sensor.key in keys:
+            sensor.key = next(f"{sensor.key}_{index}" for index in range(2, len(keys) + 2)
+                              if f"{sensor.key}_{index}" not in keys)
+        try:
+            sensor.read()
+        except (OSError, ValueError):
+            sensor.file.close()
+            self.stats["unreadable"] += 1
+            return
+        sensors.append(sensor)
+
+    def _discover_hwmon(self, sensors: List[_Sensor], entries: Tuple[str, ...]):
+        base = self._class_dir("hwmon")
+        chips = []
+        for entry in entries:
+            directory = os.path.join(base, entry)
+            # 旧内核的属性文件在 device/ 子目录下
+            if not os.path.exists(os.path.join(directory, "name")) and \
+                    os.path.exists(os.path.join(directory, "device", "name")):
+                directory = os.path.join(directory, "device")
+            name = _read_text(os.path.join(directory, "name"))
+            if name is None:
+                continue
+            device = os.path.realpath(os.path.join(base, entry, "device"))
+            chips.append((name, os.path.basename(device) if os.path.exists(device) else "", directory))
+
+        names = [name for name, _, _ in chips]
+        for index, (name, device, directory) in enumerate(chips):
+            if name in NVME_CHIPS and device:
+                chip = _slug(device)
+            elif names.count(name) > 1:
+                chip = _slug(f"{name}_{device}") if device else f"{_slug(name)}{names[:index].count(name)}"
+            else:
+                chip = _slug(name)
+            try:
+                files = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            present = set(files)
+            for filename in files:
+                match = _SENSOR_FILE_RE.match(filename)
+                if not match:
+                    continue
+                kind, number, suffix = match.groups()
+                # 同时有 power*_input 和 power*_average 时只读取 input
+                if suffix == "average" and f"{kind}{number}_input" in present:
+                    continue
+                prefix = os.path.join(directory, f"{kind}{number}_")
+                label = _read_text(prefix + "label") or f"{kind}{number}"
+                key = f"{chip}_{_slug(label)}"
+                info: Dict[str, Any] = {"chip": name, "label": label}
+                path = os.path.join(directory, filename)
+                if kind == "temp":
+                    info["kind"] = self._temperature_kind(name, label)
+                    if name in NVME_CHIPS and device:
+                        info["device"] = device
+                    for field, suffix_name in (("high", "max"), ("critical", "crit")):
+                        value = _read_number(prefix + suffix_name)
+                        if value is not None:
+                            info[field] = value / 1000
+                    self._add(sensors, _Sensor(path, "temperatures", key, 0.001, info))
+                elif kind == "fan":
+                    self._add(sensors, _Sensor(path, "fans", key, 1.0, info))
+                elif kind == "power":
+                    info["source"] = "hwmon"
+                    self._add(sensors, _Sensor(path, "power", key, 1e-6, info))
+                else:
+                    info["source"] = "hwmon"
+                    self._add(sensors, _Sensor(path, "energy", key, 1e-6, info))
+
+    @staticmethod
+    def _temperature_kind(chip: str, label: str) -> str:
+        if chip in CPU_CHIPS:
+            return "cpu_core" if "core" in label.lower() else "cpu_package"
+        if chip in NVME_CHIPS:
+            return "nvme"
+        return "other"
+
+    def _discover_thermal(self, sensors: List[_Sensor], entries: Tuple[str, ...]):
+        base = self._class_dir("thermal")
+        zones = []
+        for entry in entries:
+            if not entry.startswith("thermal_zone"):
+                continue
+            zone_type = _read_text(os.path.join(base, entry, "type"))
+            if zone_type is not None:
+                zones.append((entry, zone_type))
+        types = [zone_type for _, zone_type in zones]
+        for entry, zone_type in zones:
+            key = f"zone_{_slug(zone_type)}"
+            if types.count(zone_type) > 1:
+                key += entry[len("thermal_zone"):]
+            info = {"chip": "thermal", "label": zone_type,
+                    "kind": "cpu_package" if zone_type in CPU_ZONES else "zone"}
+            self._add(sensors, _Sensor(os.path.join(base, entry, "temp"), "temperatures", key, 0.001, info))
+
+    def _discover_rapl(self, sensors: List[_Sensor], entries: Tuple[str, ...]):
+        base = self._class_dir("powercap")
+        zone_names = {}
+        for entry in entries:
+            name = _read_text(os.path.join(base, entry, "name"))
+            if name is not None:
+                zone_names[entry] = name
+        for entry, name in sorted(zone_names.items()):
+            path = os.path.join(base, entry, "energy_uj")
+            if not os.path.exists(path):
+                continue
+            # 子区域（intel-rapl:0:0 的 core、dram 等）加上所属封装的名称
+            parent, _, _ = entry.rpartition(":")
+            key = _slug(name)
+            if parent in zone_names and parent.count(":"):
+                key = f"{_slug(zone_names[parent])}_{key}"
+            if entry.startswith("intel-rapl-mmio"):
+                key = f"mmio_{key}"
+            info = {"chip": entry.partition(":")[0], "label": name, "source": "rapl"}
+            max_range = _read_number(os.path.join(base, entry, "max_energy_range_uj")) or 0.0
+            self._add(sensors, _Sensor(path, "energy", key, 1e-6, info, max_range))
+
+    def _discover(self, listing: Tuple[Tuple[str, ...], ...], now: float):
+        previous = {(sensor.section, sensor.key, sensor.file.path): sensor for sensor in self._sensors}
+        for sensor in self._sensors:
+            sensor.file.close()
+        sensors: List[_Sensor] = []
+        self.stats["unreadable"] = 0
+        hwmon, thermal, powercap = listing
+        self._discover_hwmon(sensors, hwmon)
+        self._discover_thermal(sensors, thermal)
+        self._discover_rapl(sensors, powercap)
+        for sensor in sensors:
+            old = previous.get((sensor.section, sensor.key, sensor.file.path))
+            if old is not None:
+                sensor.carry_over(old)
+        self._sensors = sensors
+        self._listing = listing
+        self._discovered_at = now
+        self._dirty = False
+        self.stats["discoveries"] += 1
+        self.stats["sensors"] = len(sensors)
+        keys = {(sensor.section, sensor.key) for sensor in sensors}
+        self.rates.prune(lambda key: key in keys)
+
+    # ---------- 采集 ----------
+
+    def get_sensor_stats(self, timestamp: Optional[float] = None) -> Dict[str, Any]:
+        """
+        读取全部传感器，返回：
+        temperatures：key -> {chip, label, kind, current, high, critical}（摄氏度）
+        fans：key -> {chip, label, rpm}
+        power：key -> {chip, label, source, watts}（RAPL 和 hwmon 能量计数器为上一周期的平均功率）
+        cpu_package_celsius / cpu_core_max_celsius / nvme_max_celsius：对应分类的最高温度，没有时为 None
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            listing = self._list_classes()
+            if self._dirty or listing != self._listing or timestamp - self._discovered_at >= self.rescan_interval:
+                self._discover(listing, timestamp)
+
+            temperatures: Dict[str, Dict[str, Any]] = {}
+            fans: Dict[str, Dict[str, Any]] = {}
+            power: Dict[str, Dict[str, Any]] = {}
+            for sensor in self._sensors:
+                try:
+                    raw = sensor.read()
+                except FileNotFoundError:
+                    # 传感器文件消失（设备被移除）：跳过本次读数，下个周期重新发现
+                    self._dirty = True
+                    continue
+                except (OSError, ValueError):
+                    # 驱动暂时返回错误：只跳过这个传感器本周期的读数
+                    self.stats["read_errors"] += 1
+                    continue
+                if sensor.section == "temperatures":
+                    temperatures[sensor.key] = {**sensor.info, "current": round(raw * sensor.scale, 1)}
+                elif sensor.section == "fans":
+                    fans[sensor.key] = {**sensor.info, "rpm": raw}
+                elif sensor.section == "power":
+                    power[sensor.key] = {**sensor.info, "watts": round(raw * sensor.scale, 2)}
+                else:
+                    energy = sensor.unwrap(raw)
+                    watts = self.rates.rate((sensor.section, sensor.key), energy, timestamp) * sensor.scale
+                    power[sensor.key] = {**sensor.info, "watts": round(watts, 2)}
+
+            return {
+                "temperatures": temperatures,
+                "fans": fans,
+                "power": power,
+                "cpu_package_celsius": self._max_of(temperatures, "cpu_package"),
+                "cpu_core_max_celsius": self._max_of(temperatures, "cpu_core"),
+                "nvme_max_celsius": self._max_of(temperatures, "nvme"),
+            }
+
+    @staticmethod
+    def _max_of(temperatures: Dict[str, Dict[str, Any]], kind: str) -> Optional[float]:
+        values = [sensor["current"] for sensor in temperatures.values() if sensor["kind"] == kind]
+        return max(values) if values else None
+
+# 全局传感器监控实例（首次使用时创建）
+_sensors_monitor: Optional[SensorsMonitor] = None
+
+def get_sensors_monitor() -> SensorsMonitor:
+    """获取全局传感器监控实例"""
+    global _sensors_monitor
+    if _sensors_monitor is None:
+        from core.config import settings
+        _sensors_monitor = SensorsMonitor(root=settings.sensors_sysfs_root,
+                                          rescan_interval=settings.sensors_rescan_interval)
+    return _sensors_monitor
+
+def get_sensor_stats() -> Dict[str, Any]:
+    """获取硬件传感器读数（便捷函数）"""
+    return get_sensors_monitor().get_sensor_stats()
@@ -3,12 +3,15 @@
 支持跨平台（Windows/Linux/MacOS）获取系统硬件信息
 """
 
-import psutil
 import platform
 import subprocess
 import re
+import time
 from typing import Dict, List, Optional
 import sys
+from monitor.filesystem_monitor import get_filesystem_usage
+from core.selfmetrics import timed
+from monitor.providers import get_host_provider
 
 class SystemMonitor:
     """系统硬件信息监控类"""
@@ -108,10 +111,12 @@ class SystemMonitor:
     
     def get_cpu_info(self) -> Dict:
         """获取CPU详细信息"""
+        from monitor.cpu_burst import cpu_usage_percent
+        provider = get_host_provider()
         cpu_info = {
-            "physical_cores": psutil.cpu_count(logical=False),
-            "total_cores": psutil.cpu_count(logical=True),
-            "usage_percent": psutil.cpu_percent(interval=1),
+            "physical_cores": provider.cpu_count(logical=False),
+            "total_cores": provider.cpu_count(logical=True),
+            "usage_percent": cpu_usage_percent(1.0),
             "current_frequency": 0.0,
             "max_frequency": 0.0,
             "model": "Unknown",
@@ -119,7 +124,7 @@ class SystemMonitor:
         }
         
         # 获取CPU频率
-        cpu_freq = psutil.cpu_freq()
+        cpu_freq = provider.cpu_freq()
         if cpu_freq:
             cpu_info["current_frequency"] = cpu_freq.current
             cpu_info["max_frequency"] = cpu_freq.max
@@ -180,8 +185,9 @@ class SystemMonitor:
     
     def get_memory_info(self) -> Dict:
         """获取内存详细信息"""
-        memory = psutil.virtual_memory()
-        swap = psutil.swap_memory()
+        provider = get_host_provider()
+        memory = provider.virtual_memory()
+        swap = provider.swap_memory()
         
         return {
             "total": memory.total,
@@ -199,30 +205,20 @@ class SystemMonitor:
         """获取磁盘分区信息"""
         disk_info = []
         
-        # 获取所有磁盘分区
-        partitions = psutil.disk_partitions()
-        
-        for partition in partitions:
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                
-                disk_info.append({
-                    "device": partition.device,
-                    "mountpoint": partition.mountpoint,
-                    "fstype": partition.fstype,
-                    "total": usage.total,
-                    "used": usage.used,
-                    "free": usage.free,
-                    "usage_percent": usage.percent
-                })
-            except PermissionError:
-                # 有些分区可能没有权限访问
-                continue
+        # 挂载表缓存、按设备去重、并行 statvfs 均由文件系统采集器处理
+        for usage in get_filesystem_usage():
+            disk = dict(usage)
+            disk["usage_percent"] = disk.pop("percent")
+            disk_info.append(disk)
         
         return disk_info
     
+    @timed("nvidia_smi")
     def get_gpu_info(self) -> List[Dict]:
-        """获取GPU信息"""
+        """获取GPU信息（数据源不是真实主机时使用数据源提供的 GPU）"""
+        provider = get_host_provider()
+        if not provider.live:
+            return provider.gpus()
         gpu_info = []
         system = platform.system()
         
@@ -290,11 +286,13 @@ class SystemMonitor:
         }
         
         # 获取网络接口统计
-        net_io = psutil.net_io_counters(pernic=True)
+        from monitor.interfaces_monitor import get_interface_monitor
+        interface_monitor = get_interface_monitor()
+        net_io = get_host_provider().net_io_counters(pernic=True)
         
         for interface, stats in net_io.items():
-            # 跳过虚拟和内部接口
-            if interface.startswith(('lo', 'virbr', 'docker', 'veth')):
+            # 跳过虚拟和内部接口（INTERFACE_INCLUDE / INTERFACE_EXCLUDE）
+            if not interface_monitor.wanted(interface):
                 continue
                 
             network_info["interfaces"].append({
@@ -351,8 +349,8 @@ class SystemMonitor:
     
     def get_system_uptime(self) -> Dict:
         """获取系统运行时间"""
-        boot_time = psutil.boot_time()
-        uptime_seconds = int(psutil.time.time() - boot_time)
+        boot_time = get_host_provider().boot_time()
+        uptime_seconds = int(time.time() - boot_time)
         
         # 转换为可读格式
         days = uptime_seconds // 86400
@@ -368,9 +366,16 @@ class SystemMonitor:
             "readable": f"{days}天{hours}小时{minutes}分钟{seconds}秒"
         }
 
-# 全局系统监控实例
-system_monitor = SystemMonitor()
+# 全局系统监控实例（首次使用时创建）
+_system_monitor: Optional[SystemMonitor] = None
+
+def get_system_monitor() -> SystemMonitor:
+    """获取全局系统监控实例"""
+    global _system_monitor
+    if _system_monitor is None:
+        _system_monitor = SystemMonitor()
+    return _system_monitor
 
 def get_system_hardware_info() -> Dict:
     """获取系统硬件信息（对外接口）"""
-    return system_monitor.get_system_info()
\ No newline at end of file
+    return get_system_monitor().get_system_info()
\ No newline at end of file
@@ -0,0 +1,213 @@
+# 采集结果录制与回放模块
+
+"""
+采集结果的录制与回放
+录制（TraceRecorder）作为采样器监听器，把每个周期各采集器的结果写入 gzip 压缩的 JSON Lines 文件：
+
+    {"format": "server-monitor-trace", "version": 1, "sections": [...], "started": 时间戳}   录制头
+    [时间戳, {"cpu": {...}, "memory": {...}, ...}]                                        每个周期一帧
+
+每帧只写入与上一帧不同的采集器（GPU、连接数等有最小刷新间隔的采集器大多数帧不变），
+每隔 flush_every 帧刷新一次压缩流，进程异常退出时最多丢失这些帧。追加到已有文件时再写一个录制头，
+读取时遇到录制头即开始新的一段。
+
+回放（TraceReplayer）替换采样器的全部采集器：采样器每个周期取录制时间轴上
+起点 + 已播放的墙钟时间 × speed 处的最新一帧（speed 为 0 时每个周期前进一帧），播放到结尾后可从头循环。
+回放的是采集器的输出，历史、/metrics、告警、异常检测和 /api/status 都基于回放数据；
+记录类结果回放为字典，展开和渲染的结果相同。
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core.snapshot import Record
+
+TRACE_FORMAT = "server-monitor-trace"
+TRACE_VERSION = 1
+
+def _encode(value: Any) -> Any:
+    """json.dumps 的 default：记录类转换为字典"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_encode, ensure_ascii=False, separators=(",", ":"))
+
+class TraceRecorder:
+    """采样器监听器：把每个周期的采集结果追加到录制文件"""
+
+    def __init__(self, path: str, flush_every: int = 30):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.frames = 0
+        # 采集器名 -> 上一帧写入的 JSON 文本
+        self._last: Dict[str, str] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _open(self, sections: List[str], timestamp: float):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = gzip.open(self.path, "at", encoding="utf-8")
+        self._file.write(_dumps({"format": TRACE_FORMAT, "version": TRACE_VERSION,
+                                 "sections": sections, "started": timestamp}) + "\n")
+
+    def on_sample(self, snapshot, flat: Dict[str, float]):
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._open(list(snapshot.layout.names), snapshot.timestamp)
+                changed = []
+                for name, value in zip(snapshot.layout.names, snapshot.values):
+                    if value is None:
+                        continue
+                    text = _dumps(value)
+                    if self._last.get(name) != text:
+                        self._last[name] = text
+                        changed.append(f"{_dumps(name)}:{text}")
+                self._file.write(f"[{snapshot.timestamp!r},{{{','.join(changed)}}}]\n")
+                self.frames += 1
+                if self.frames % self.flush_every == 0:
+                    self._file.flush()
+            except (OSError, TypeError, ValueError) as e:
+                print(f"录制采集结果失败: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._last = {}
+
+def read_header(path: str) -> Dict[str, Any]:
+    """读取录制头（第一行）"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "null")
+    if not isinstance(header, dict) or header.get("format") != TRACE_FORMAT:
+        raise ValueError(f"不是采集结果录制文件: {path}")
+    if header.get("version") != TRACE_VERSION:
+        raise ValueError(f"不支持的录制文件版本: {header.get('version')}")
+    return header
+
+def read_trace(path: str) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    """
+    逐帧读取录制文件，产生 (时间戳, 采集器名 -> 结果)，未变化的采集器沿用之前的结果
+    文件末尾不完整（录制仍在进行或进程异常退出）时读到最后一个完整的帧为止
+    """
+    state: Dict[str, Any] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    frame = json.loads(line)
+                except ValueError:
+                    break
+                if isinstance(frame, dict):
+                    # 新的一段录制
+                    state = {}
+                    continue
+                timestamp, changed = frame
+                state.update(changed)
+                yield timestamp, dict(state)
+        except (EOFError, OSError):
+            return
+
+class TraceReplayer:
+    """按录制时间轴回放采集结果，install() 后作为采样器的采集器"""
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = True,
+                 clock: Optional[Callable[[], float]] = None):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.clock = clock or time.time
+        self.sections: List[str] = list(read_header(path).get("sections") or [])
+        self.loops = 0
+        self._frames: Optional[Iterator[Tuple[float, Dict[str, Any]]]] = None
+        self._current: Dict[str, Any] = {}
+        self._next: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._trace_start = 0.0
+        self._wall_start = 0.0
+        self._finished = False
+        self._served: set = set()
+        self._lock = threading.Lock()
+
+    def _restart(self, now: float):
+        self._frames = read_trace(self.path)
+        first = next(self._frames, None)
+        if first is None:
+            raise ValueError(f"录制文件中没有完整的帧: {self.path}")
+        self._trace_start, self._current = first
+        self._wall_start = now
+        self._next = next(self._frames, None)
+        self._finished = False
+
+    def _advance(self):
+        """推进到当前墙钟时间对应的帧（speed 为 0 时推进一帧）"""
+        now = self.clock()
+        if self._frames is None or (self._finished and self.loop):
+            if self._frames is not None:
+                self.loops += 1
+            self._restart(now)
+            return
+        if self.speed <= 0:
+            if self._next is not None:
+                self._current = self._next[1]
+                self._next = next(self._frames, None)
+        else:
+            position = self._trace_start + (now - self._wall_start) * self.speed
+            while self._next is not None and self._next[0] <= position:
+                self._current = self._next[1]
+                self._next = next(self._frames, None)
+        # 已经是最后一帧：本次使用它，下一次从头开始（loop 时）
+        self._finished = self._next is None
+
+    def collect(self, name: str) -> Any:
+        """
+        采集器 name 在当前帧中的结果
+        同一个采集器在本帧中已经取过（即进入了下一个采样周期）时先推进帧，
+        因此不依赖采集器的调用顺序，被调度器跳过的采集器也不影响推进
+        """
+        with self._lock:
+            if self._frames is None or name in self._served:
+                self._advance()
+                self._served = set()
+            self._served.add(name)
+            return self._current.get(name)
+
+    def install(self, sampler):
+        """用录制的采集器替换采样器的全部采集器"""
+        sampler.collectors.clear()
+        for name in self.sections:
+            sampler.register(name, lambda name=name: self.collect(name))
+
+# 全局录制/回放实例（首次使用时按配置创建）
+_trace_recorder: Optional[TraceRecorder] = None
+_trace_replayer: Optional[TraceReplayer] = None
+
+def get_trace_recorder() -> Optional[TraceRecorder]:
+    """获取全局录制实例，未配置 TRACE_RECORD_PATH 时返回 None"""
+    global _trace_recorder
+    from core.config import settings
+    if not settings.trace_record_path:
+        return None
+    if _trace_recorder is None:
+        _trace_recorder = TraceRecorder(settings.trace_record_path)
+    return _trace_recorder
+
+def get_trace_replayer() -> TraceReplayer:
+    """获取全局回放实例（TRACE_REPLAY_PATH / TRACE_REPLAY_SPEED / TRACE_REPLAY_LOOP）"""
+    global _trace_replayer
+    if _trace_replayer is None:
+        from core.config import settings
+        if not settings.trace_replay_path:
+            raise ValueError("host_provider 为 replay 时必须设置 trace_replay_path")
+        _trace_replayer = TraceReplayer(settings.trace_replay_path, speed=settings.trace_replay_speed,
+                                        loop=settings.trace_replay_loop)
+    return _trace_replayer
@@ -0,0 +1,128 @@
+# 今日流量统计模块
+
+"""
+今日流量账本（基于 UTC+8 日期）
+/api/status 和后台采样器共用同一份账本，更新时加锁，避免并发请求重复累加增量。
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+from core.selfmetrics import timed
+from monitor.providers import get_host_provider
+
+# 今日流量数据存储
+traffic_data_file = "traffic_data.json"
+today_traffic = {
+    "upload_bytes": 0,
+    "download_bytes": 0,
+    "last_reset_date": None,  # UTC+8的日期字符串，格式: YYYY-MM-DD
+    "last_net_io_bytes_sent": 0,
+    "last_net_io_bytes_recv": 0
+}
+
+_traffic_lock = threading.RLock()
+
+# UTC+8（Asia/Shanghai 没有夏令时，固定偏移与 pytz 时区结果一致）
+UTC8 = timezone(timedelta(hours=8), "Asia/Shanghai")
+
+# 加载流量数据
+def load_traffic_data():
+    try:
+        if os.path.exists(traffic_data_file):
+            with open(traffic_data_file, 'r', encoding='utf-8') as f:
+                saved_data = json.load(f)
+                with _traffic_lock:
+                    today_traffic.update(saved_data)
+    except Exception as e:
+        print(f"加载流量数据失败: {e}")
+        # 使用默认值继续
+
+# 保存流量数据
+@timed("traffic_save")
+def save_traffic_data():
+    try:
+        with _traffic_lock:
+            with open(traffic_data_file, 'w', encoding='utf-8') as f:
+                json.dump(today_traffic, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"保存流量数据失败: {e}")
+
+# 获取UTC+8的当前时间
+def get_utc8_time():
+    return datetime.now(UTC8)
+
+# 初始化流量数据系统
+def init_traffic_system():
+    """在应用启动时初始化流量数据系统"""
+    # 加载现有数据
+    load_traffic_data()
+
+    # 初始化网络计数器
+    current_net_io = get_host_provider().net_io_counters()
+
+    # 如果今天是第一次运行或需要重置，初始化基准值
+    current_time = get_utc8_time()
+    today_date = current_time.strftime("%Y-%m-%d")
+
+    with _traffic_lock:
+        if today_traffic["last_reset_date"] is None or today_traffic["last_reset_date"] != today_date:
+            print(f"初始化流量系统（UTC+8 {today_date}）")
+            today_traffic["upload_bytes"] = 0
+            today_traffic["download_bytes"] = 0
+            today_traffic["last_reset_date"] = today_date
+            today_traffic["last_net_io_bytes_sent"] = current_net_io.bytes_sent if current_net_io else 0
+            today_traffic["last_net_io_bytes_recv"] = current_net_io.bytes_recv if current_net_io else 0
+            save_traffic_data()
+
+# 检查是否需要重置今日流量
+def check_and_reset_traffic():
+    current_time = get_utc8_time()
+    today_date = current_time.strftime("%Y-%m-%d")
+
+    # 如果是新的一天，重置流量数据（基准值保留上一次统计时的计数器）
+    with _traffic_lock:
+        if today_traffic["last_reset_date"] != today_date:
+            print(f"检测到新的一天（UTC+8 {today_date}），重置今日流量")
+            today_traffic["upload_bytes"] = 0
+            today_traffic["download_bytes"] = 0
+            today_traffic["last_reset_date"] = today_date
+            save_traffic_data()
+
+    return today_date
+
+# 把网络计数器的增量计入今日流量
+def update_today_traffic(current_net_io):
+    with _traffic_lock:
+        # 计算本次统计间隔内的流量增量
+        upload_increment = current_net_io.bytes_sent - today_traffic["last_net_io_bytes_sent"]
+        download_increment = current_net_io.bytes_recv - today_traffic["last_net_io_bytes_recv"]
+
+        # 更新今日流量（防止重启后数据丢失）
+        today_traffic["upload_bytes"] += max(0, upload_increment)
+        today_traffic["download_bytes"] += max(0, download_increment)
+        today_traffic["last_net_io_bytes_sent"] = current_net_io.bytes_sent
+        today_traffic["last_net_io_bytes_recv"] = current_net_io.bytes_recv
+
+        # 保存更新后的数据
+        save_traffic_data()
+
+def get_traffic_summary() -> Dict[str, Any]:
+    """今日流量摘要，字段与 /api/status 的 network 部分一致"""
+    with _traffic_lock:
+        return {
+            "today_upload_gb": round(today_traffic["upload_bytes"] / (1024 * 1024 * 1024), 3),
+            "today_download_gb": round(today_traffic["download_bytes"] / (1024 * 1024 * 1024), 3),
+            "today_upload_bytes": today_traffic["upload_bytes"],
+            "today_download_bytes": today_traffic["download_bytes"],
+            "traffic_reset_date": today_traffic["last_reset_date"]
+        }
+
+def collect_traffic() -> Dict[str, Any]:
+    """后台采样器使用的流量采集器：重置检查 + 记账"""
+    check_and_reset_traffic()
+    update_today_traffic(get_host_provider().net_io_counters())
+    return get_traffic_summary()
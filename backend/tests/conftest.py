@@ -0,0 +1,6 @@
+# pytest 配置：测试从 backend 目录导入 core、monitor、api 等模块
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
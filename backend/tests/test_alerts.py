@@ -0,0 +1,191 @@
+# 告警规则引擎测试（本地 HTTP 服务作为 webhook 接收端）
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.alerts import AlertEngine, AlertNotifier, parse_duration
+from core.exceptions import ConfigError
+
+@pytest.fixture
+def webhook():
+    """在本地随机端口上接收 webhook，收到的 JSON 保存在 server.events 中"""
+    events = []
+    received = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            events.append(json.loads(self.rfile.read(length)))
+            status = 500 if events[-1].get("alert") == "broken" else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            received.set()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.events = events
+    server.received = received
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/alerts"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_parse_duration():
+    assert parse_duration("30s") == 30
+    assert parse_duration("2m") == 120
+    assert parse_duration("1h") == 3600
+    assert parse_duration("15") == 15
+
+def test_invalid_rules_raise_config_error():
+    engine = AlertEngine()
+    for text in ("cpu.usage_percent", "avg(cpu.usage_percent) > 1", "rate(x, 5m) > 1", "median(x, 1m) > 1"):
+        with pytest.raises(ConfigError):
+            engine.add_rule(text)
+    for text in ("cpu.usage_percent > 1.2.3", "cpu.usage_percent > 90 clear < .", "cpu.usage_percent > 1e"):
+        with pytest.raises(ConfigError):
+            engine.add_rule(text)
+    engine.load_rules(["not a rule", {"name": "missing rule key"}, "cpu.usage_percent > 1.2.3",
+                       "cpu.usage_percent > 90 clear < ."])
+    assert engine.rules == []
+
+def test_number_formats():
+    engine = AlertEngine()
+    for text, threshold in (("x > 90", 90), ("x > -1.5", -1.5), ("x > .5", 0.5), ("x > 5.", 5), ("x > 1e8", 1e8),
+                            ("x > 2.5E-3", 2.5e-3)):
+        assert engine.add_rule(text).threshold == threshold
+    assert engine.add_rule("x > 90 clear < 8e1").clear_threshold == 80
+
+def test_for_duration_and_clear_hysteresis():
+    engine = AlertEngine()
+    rule = engine.add_rule("cpu.usage_percent > 90 for 2s clear < 80")
+
+    assert engine.evaluate({"cpu.usage_percent": 95}, 100.0) == []
+    assert rule.state == "pending"
+    assert engine.active
+    [event] = engine.evaluate({"cpu.usage_percent": 95}, 102.0)
+    assert event["status"] == "firing"
+    assert event["value"] == 95
+    # 低于阈值但未达到 clear 条件时保持 firing
+    assert engine.evaluate({"cpu.usage_percent": 85}, 103.0) == []
+    assert rule.state == "firing"
+    [event] = engine.evaluate({"cpu.usage_percent": 70}, 104.0)
+    assert event["status"] == "resolved"
+    assert not engine.active
+
+def test_pending_resets_when_condition_breaks():
+    engine = AlertEngine()
+    rule = engine.add_rule("memory.usage_percent >= 95 for 10s")
+    engine.evaluate({"memory.usage_percent": 99}, 0.0)
+    engine.evaluate({"memory.usage_percent": 50}, 5.0)
+    assert rule.state == "inactive"
+    assert engine.evaluate({"memory.usage_percent": 99}, 12.0) == []
+    assert rule.state == "pending"
+
+def test_rate_and_window_sources_are_shared():
+    engine = AlertEngine()
+    fast = engine.add_rule("rate(network.bytes_sent) > 1000")
+    slow = engine.add_rule("rate(network.bytes_sent) > 5000")
+    average = engine.add_rule("avg(cpu.usage_percent, 3s) > 50")
+    assert fast.source is slow.source
+
+    engine.evaluate({"network.bytes_sent": 0, "cpu.usage_percent": 90}, 0.0)
+    engine.evaluate({"network.bytes_sent": 4000, "cpu.usage_percent": 30}, 2.0)
+    assert fast.value == 2000
+    assert fast.state == "firing"
+    assert slow.state == "inactive"
+    # avg 按时间加权：第一个样本权重为 0
+    assert average.value == pytest.approx(30.0)
+    engine.evaluate({"network.bytes_sent": 4000, "cpu.usage_percent": 60}, 3.0)
+    assert average.value == pytest.approx((30 * 2 + 60 * 1) / 3)
+    assert fast.value == 0
+    assert fast.state == "inactive"
+
+def test_repeat_interval():
+    engine = AlertEngine(repeat_interval=60)
+    engine.add_rule("load.load_1min > 4")
+    assert [e["status"] for e in engine.evaluate({"load.load_1min": 8}, 0.0)] == ["firing"]
+    assert engine.evaluate({"load.load_1min": 8}, 30.0) == []
+    assert [e["status"] for e in engine.evaluate({"load.load_1min": 8}, 60.0)] == ["firing"]
+
+def test_webhook_delivery(webhook):
+    async def scenario():
+        notifier = AlertNotifier(webhook_url=webhook.url, timeout=2.0)
+        engine = AlertEngine(notifier=notifier, hostname="test-host")
+        engine.add_rule("cpu.usage_percent > 90", name="cpu_high", severity="critical")
+        notifier.start()
+        engine.on_sample({"timestamp": 100.0}, {"cpu.usage_percent": 97})
+        engine.on_sample({"timestamp": 101.0}, {"cpu.usage_percent": 40})
+        await asyncio.wait_for(notifier._queue.join(), 5.0)
+        await notifier.stop()
+        return notifier.stats
+
+    stats = asyncio.run(scenario())
+    assert [event["status"] for event in webhook.events] == ["firing", "resolved"]
+    firing = webhook.events[0]
+    assert firing["alert"] == "cpu_high"
+    assert firing["severity"] == "critical"
+    assert firing["host"] == "test-host"
+    assert firing["value"] == 97
+    assert stats["sent"] == 2 and stats["failed"] == 0
+
+def test_events_from_worker_thread_are_delivered(webhook):
+    async def scenario():
+        notifier = AlertNotifier(webhook_url=webhook.url, timeout=2.0)
+        engine = AlertEngine(notifier=notifier)
+        engine.add_rule("cpu.usage_percent > 90")
+        notifier.start()
+        # 采样器在线程池中通知监听器
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, engine.on_sample, {"timestamp": 1.0}, {"cpu.usage_percent": 99})
+        await asyncio.sleep(0)
+        await asyncio.wait_for(notifier._queue.join(), 5.0)
+        await notifier.stop()
+        return notifier.stats
+
+    stats = asyncio.run(scenario())
+    assert [event["status"] for event in webhook.events] == ["firing"]
+    assert stats["queued"] == 1 and stats["sent"] == 1
+
+def test_webhook_failure_is_counted(webhook):
+    async def scenario():
+        notifier = AlertNotifier(webhook_url=webhook.url, timeout=2.0)
+        notifier.start()
+        notifier.enqueue({"alert": "broken", "status": "firing"})
+        await asyncio.wait_for(notifier._queue.join(), 5.0)
+        await notifier.stop()
+        return notifier.stats
+
+    stats = asyncio.run(scenario())
+    assert webhook.received.is_set()
+    assert stats["failed"] == 1 and stats["sent"] == 0
+
+def test_full_queue_drops_oldest(webhook):
+    async def scenario():
+        notifier = AlertNotifier(webhook_url=webhook.url, queue_size=2, timeout=2.0)
+        notifier.start()
+        # 工作协程尚未运行，连续入队 3 个事件时最旧的一个被丢弃
+        for index in range(3):
+            notifier.enqueue({"alert": f"a{index}", "status": "firing"})
+        await asyncio.wait_for(notifier._queue.join(), 5.0)
+        await notifier.stop()
+        return notifier.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["dropped"] == 1
+    assert [event["alert"] for event in webhook.events] == ["a1", "a2"]
+
+def test_disabled_notifier_ignores_events():
+    notifier = AlertNotifier()
+    assert not notifier.enabled
+    notifier.start()
+    notifier.enqueue({"alert": "x"})
+    assert notifier.stats["queued"] == 0
@@ -0,0 +1,153 @@
+# cgroup v2 采集测试（临时 cgroup 目录树）
+
+import os
+
+import pytest
+
+import monitor.cgroup_monitor as cgroup_monitor
+from monitor.cgroup_monitor import CgroupMonitor
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"{text}\n")
+
+def _cgroup(path, usage_usec=0, memory_current=0, nr_descendants=0, rbytes=0, wbytes=0):
+    _write(path / "cgroup.stat", f"nr_descendants {nr_descendants}\nnr_dying_descendants 0")
+    _write(path / "cpu.stat", f"usage_usec {usage_usec}\nthrottled_usec 0\nnr_throttled 0")
+    _write(path / "memory.current", memory_current)
+    _write(path / "memory.max", "max")
+    _write(path / "memory.stat", "anon 1024\nfile 2048\nshmem 0\npgfault 10\npgmajfault 0")
+    _write(path / "io.stat", f"8:0 rbytes={rbytes} wbytes={wbytes} rios=0 wios=0 dbytes=0 dios=0")
+    _write(path / "cpu.pressure", "some avg10=1.50 avg60=0.00 avg300=0.00 total=0\n"
+                                  "full avg10=0.50 avg60=0.00 avg300=0.00 total=0")
+
+class _Clock:
+    """替换模块内的 time，让速率按固定的时间间隔计算"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cgroup_monitor, "time", clock)
+    return clock
+
+@pytest.fixture
+def cgroupfs(tmp_path):
+    root = tmp_path / "cgroup"
+    _write(root / "cgroup.controllers", "cpu io memory pids")
+    _cgroup(root, nr_descendants=3)
+    _cgroup(root / "system.slice", nr_descendants=2)
+    _cgroup(root / "system.slice" / "nginx.service", usage_usec=1_000_000, memory_current=100 << 20)
+    _cgroup(root / "system.slice" / "postgres.service", usage_usec=5_000_000, memory_current=400 << 20)
+    return root
+
+def test_collects_rates_and_details(cgroupfs, clock):
+    monitor = CgroupMonitor(root=str(cgroupfs))
+    assert monitor.is_available()
+    first = {cg["path"]: cg for cg in monitor.collect(min_interval=0)}
+    assert set(first) == {"/system.slice", "/system.slice/nginx.service", "/system.slice/postgres.service"}
+    assert first["/system.slice/nginx.service"]["cpu_percent"] == 0.0
+
+    nginx = cgroupfs / "system.slice" / "nginx.service"
+    _cgroup(nginx, usage_usec=1_500_000, memory_current=100 << 20, rbytes=4096, wbytes=0)
+    clock.now += 2.0
+    second = {cg["path"]: cg for cg in monitor.collect(min_interval=0)}
+
+    service = second["/system.slice/nginx.service"]
+    # 2 秒内用了 0.5 秒 CPU
+    assert service["cpu_percent"] == 25.0
+    assert service["is_leaf"]
+    assert not second["/system.slice"]["is_leaf"]
+    assert service["memory_current"] == 100 << 20
+    assert service["memory_max"] == 0
+    assert service["memory_anon"] == 1024
+    assert service["pressure"]["cpu"] == {"some_avg10": 1.5, "full_avg10": 0.5}
+    assert second["/system.slice/postgres.service"]["cpu_percent"] == 0.0
+
+def test_skips_detail_reads_for_idle_cgroups(cgroupfs, clock):
+    monitor = CgroupMonitor(root=str(cgroupfs))
+    monitor.collect(min_interval=0)
+    assert monitor.stats["detail_reads"] == 3
+
+    nginx = cgroupfs / "system.slice" / "nginx.service"
+    _cgroup(nginx, usage_usec=2_000_000, memory_current=100 << 20, wbytes=8192)
+    clock.now += 1.0
+    result = {cg["path"]: cg for cg in monitor.collect(min_interval=0)}
+    # 只有 CPU 时间变化的 cgroup 重新读取 io.stat 等文件
+    assert monitor.stats["detail_reads"] == 1
+    assert result["/system.slice/nginx.service"]["io_write_bytes_per_sec"] == 8192.0
+
+def test_rescans_only_changed_branches(cgroupfs, clock):
+    monitor = CgroupMonitor(root=str(cgroupfs), full_rescan_ticks=100)
+    monitor.collect(min_interval=0)
+    assert monitor.stats["rescanned_dirs"] == 4
+
+    clock.now += 1.0
+    monitor.collect(min_interval=0)
+    # nr_descendants 没变：只读根目录的 cgroup.stat，沿用缓存的整棵子树
+    assert monitor.stats["rescanned_dirs"] == 0
+
+    _cgroup(cgroupfs, nr_descendants=4)
+    _cgroup(cgroupfs / "system.slice", nr_descendants=3)
+    _cgroup(cgroupfs / "system.slice" / "redis.service", usage_usec=10)
+    clock.now += 1.0
+    paths = {cg["path"] for cg in monitor.collect(min_interval=0)}
+    assert "/system.slice/redis.service" in paths
+    assert monitor.stats["cgroups"] == 4
+
+def test_removed_cgroup_disappears(cgroupfs, clock):
+    monitor = CgroupMonitor(root=str(cgroupfs), full_rescan_ticks=100)
+    monitor.collect(min_interval=0)
+
+    postgres = cgroupfs / "system.slice" / "postgres.service"
+    for name in os.listdir(postgres):
+        os.unlink(postgres / name)
+    os.rmdir(postgres)
+    _cgroup(cgroupfs, nr_descendants=2)
+    _cgroup(cgroupfs / "system.slice", nr_descendants=1)
+    clock.now += 1.0
+    paths = {cg["path"] for cg in monitor.collect(min_interval=0)}
+    assert paths == {"/system.slice", "/system.slice/nginx.service"}
+    assert all(key[0] in monitor.nodes for key in monitor.rates._last)
+
+def test_get_top_sorts_and_filters_leaves(cgroupfs, clock):
+    monitor = CgroupMonitor(root=str(cgroupfs))
+    top = monitor.get_top(sort="memory", limit=2, leaf_only=True)
+    assert top["available"]
+    assert top["total_cgroups"] == 2
+    assert [cg["path"] for cg in top["cgroups"]] == [
+        "/system.slice/postgres.service", "/system.slice/nginx.service"]
+
+    top = monitor.get_top(sort="bogus", limit=1)
+    assert top["sort"] == "cpu"
+    assert len(top["cgroups"]) == 1
+
+def test_unavailable_without_controllers(tmp_path, clock):
+    monitor = CgroupMonitor(root=str(tmp_path))
+    assert not monitor.is_available()
+    assert monitor.collect(min_interval=0) == []
+
+def test_cached_ticks_carry_io_rate_forward(cgroupfs, clock):
+    monitor = CgroupMonitor(root=str(cgroupfs))
+    nginx = cgroupfs / "system.slice" / "nginx.service"
+    path = "/system.slice/nginx.service"
+
+    def collect():
+        clock.now += 1.0
+        return {cg["path"]: cg for cg in monitor.collect(min_interval=0)}[path]
+
+    monitor.collect(min_interval=0)
+    _cgroup(nginx, usage_usec=1_100_000, memory_current=100 << 20, rbytes=1000)
+    assert collect()["io_read_bytes_per_sec"] == 1000.0
+    # CPU 和内存都没变：不重新读取 io.stat，沿用上一次的速率而不是报告 0
+    _cgroup(nginx, usage_usec=1_100_000, memory_current=100 << 20, rbytes=3000)
+    assert collect()["io_read_bytes_per_sec"] == 1000.0
+    # 重新读取时速率覆盖上次读取以来的 2 秒，不出现尖峰
+    _cgroup(nginx, usage_usec=1_200_000, memory_current=100 << 20, rbytes=3000)
+    assert collect()["io_read_bytes_per_sec"] == 1000.0
@@ -0,0 +1,150 @@
+# StatsD / Graphite 推送导出测试（本地 UDP / TCP 监听）
+
+import math
+import socket
+import threading
+
+import pytest
+
+from core.exporters import GraphiteExporter, PartialSendError, PushExporter, StatsDExporter
+
+def _snapshot(timestamp):
+    return {"timestamp": timestamp}
+
+@pytest.fixture
+def udp_listener():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(2.0)
+    yield sock
+    sock.close()
+
+def _receive_all(sock):
+    packets = []
+    sock.settimeout(0.2)
+    try:
+        while True:
+            packets.append(sock.recv(65535))
+    except socket.timeout:
+        return packets
+
+def test_statsd_batches_gauges_by_mtu(udp_listener):
+    port = udp_listener.getsockname()[1]
+    exporter = StatsDExporter("127.0.0.1", port, mtu=64, prefix="servers.test")
+    flat = {f"cpu.per_cpu.{index}": float(index) + 0.5 for index in range(10)}
+    exporter.on_sample(_snapshot(1000.0), flat)
+    exporter.flush()
+    exporter.close()
+
+    packets = _receive_all(udp_listener)
+    assert len(packets) > 1
+    assert all(len(packet) <= 64 for packet in packets)
+    lines = b"\n".join(packets).decode().split("\n")
+    assert lines == [f"servers.test.cpu.per_cpu.{index}:{index}.5|g" for index in range(10)]
+    assert exporter.stats["lines_sent"] == 10
+    assert exporter.stats["batches_sent"] == len(packets)
+
+def test_statsd_skips_non_finite_values(udp_listener):
+    port = udp_listener.getsockname()[1]
+    exporter = StatsDExporter("127.0.0.1", port, prefix="")
+    exporter.on_sample(_snapshot(1000.0), {"a": 1.0, "b": math.nan, "c": math.inf, "d": -math.inf, "e": 2})
+    exporter.on_sample(_snapshot(1002.0), {"a": 3.0})
+    exporter.flush()
+    exporter.close()
+
+    lines = b"\n".join(_receive_all(udp_listener)).decode().split("\n")
+    # 非有限值不会中断 flush，后面的快照照常发送
+    assert lines == ["a:1|g", "e:2|g", "a:3|g"]
+    assert exporter.stats["values_skipped"] == 3
+
+class _GraphiteServer:
+    """本地 TCP 监听，收集收到的全部字节"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(1)
+        self.port = self.sock.getsockname()[1]
+        self.data = b""
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        conn, _ = self.sock.accept()
+        with conn:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    return
+                self.data += chunk
+
+    def wait(self):
+        self._thread.join(2.0)
+        self.sock.close()
+
+def test_graphite_plaintext_lines():
+    server = _GraphiteServer()
+    exporter = GraphiteExporter("127.0.0.1", server.port, prefix="servers.{host}")
+    prefix = exporter.prefix
+    exporter.on_sample(_snapshot(1700000000.7), {"memory.usage_percent": 41.25, "net io/bytes": 12, "x": math.nan})
+    exporter.flush()
+    exporter.close()
+    server.wait()
+
+    assert server.data.decode() == (
+        f"{prefix}.memory.usage_percent 41.25 1700000000\n"
+        f"{prefix}.net_io_bytes 12 1700000000\n"
+    )
+    assert exporter.stats["lines_sent"] == 2
+    assert exporter.stats["batches_sent"] == 1
+
+class _BrokenSocket:
+    """接受前 limit 个字节后连接断开"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.received = b""
+
+    def send(self, data):
+        room = self.limit - len(self.received)
+        if room <= 0:
+            raise ConnectionResetError("connection reset")
+        chunk = bytes(data[:min(room, 7)])
+        self.received += chunk
+        return len(chunk)
+
+    def close(self):
+        pass
+
+def test_graphite_partial_send_requeues_only_unsent_lines():
+    exporter = GraphiteExporter("127.0.0.1", 1, prefix="")
+    lines = [f"m{index} {index} 100\n" for index in range(5)]  # 每行 9 字节
+    broken = _BrokenSocket(limit=22)  # 两行完整，第三行只发出一部分
+    exporter._socket = broken
+    with pytest.raises(PartialSendError) as error:
+        exporter.send_batch(lines)
+    assert error.value.sent == 2
+
+    exporter._buffer_lines(lines)
+    exporter._socket = _BrokenSocket(limit=22)
+    exporter.flush()
+    assert exporter.stats["lines_sent"] == 2
+    assert list(exporter._buffer) == lines[2:]
+
+def test_pending_overflow_is_counted():
+    exporter = StatsDExporter("127.0.0.1", 1)
+    for tick in range(70):
+        exporter.on_sample(_snapshot(float(tick)), {"a": 1.0})
+    assert exporter.stats["snapshots_dropped"] == 6
+    assert exporter.get_status()["snapshots_dropped"] == 6
+
+def test_push_exporter_is_abstract():
+    with pytest.raises(TypeError):
+        PushExporter("127.0.0.1", 1)
+
+    class Incomplete(PushExporter):
+        def format_lines(self, timestamp, flat):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete("127.0.0.1", 1)
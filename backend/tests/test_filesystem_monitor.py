@@ -0,0 +1,84 @@
+# 文件系统使用量采集测试（临时 mountinfo 文件，statvfs 由可阻塞的函数代替）
+
+import threading
+
+import pytest
+
+from monitor.filesystem_monitor import FilesystemMonitor
+
+MOUNTINFO = """\
+22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw
+23 22 0:5 / /proc rw - proc proc rw
+24 22 0:40 / /mnt/nfs rw - nfs4 server:/export rw
+25 22 8:1 /data /srv/data rw - ext4 /dev/sda1 rw
+"""
+
+def _usage(total):
+    return {
+        "total": total, "used": total // 2, "free": total // 2, "percent": 50.0,
+        "inodes_total": 0, "inodes_used": 0, "inodes_free": 0, "inodes_percent": 0.0,
+    }
+
+@pytest.fixture
+def hung_nfs(tmp_path):
+    """/mnt/nfs 上的调用一直阻塞，直到 release 被置位"""
+    path = tmp_path / "mountinfo"
+    path.write_text(MOUNTINFO)
+    release = threading.Event()
+    calls = []
+
+    def usage(mountpoint):
+        calls.append(mountpoint)
+        if mountpoint == "/mnt/nfs":
+            release.wait(5.0)
+        return _usage(100)
+
+    monitor = FilesystemMonitor(statvfs_timeout=0.1, workers=4, mountinfo_path=str(path))
+    monitor._live = True
+    monitor._usage_function = usage
+    yield monitor, release, calls
+    release.set()
+    monitor.close()
+
+def test_filters_and_dedups_mounts(hung_nfs):
+    monitor, release, _ = hung_nfs
+    release.set()
+    mountpoints = [mount["mountpoint"] for mount in monitor.get_mounts()]
+    # /proc 按类型过滤，/srv/data 与 / 是同一设备
+    assert sorted(mountpoints) == ["/", "/mnt/nfs"]
+
+def test_hung_mount_is_not_resubmitted(hung_nfs):
+    monitor, release, calls = hung_nfs
+    first = {record["mountpoint"]: record for record in monitor.get_usage()}
+    assert first["/"]["status"] == "ok"
+    assert first["/mnt/nfs"]["status"] == "timeout"
+
+    second = {record["mountpoint"]: record for record in monitor.get_usage()}
+    third = {record["mountpoint"]: record for record in monitor.get_usage()}
+    assert second["/mnt/nfs"]["status"] == "stale"
+    assert third["/mnt/nfs"]["status"] == "stale"
+    assert calls.count("/mnt/nfs") == 1
+    assert calls.count("/") == 3
+
+    release.set()
+    monitor._pending["/mnt/nfs"].result(timeout=5.0)
+    recovered = {record["mountpoint"]: record for record in monitor.get_usage()}
+    assert recovered["/mnt/nfs"]["status"] == "ok"
+    assert recovered["/mnt/nfs"]["total"] == 100
+
+def test_hung_mount_kept_pending_across_unmount(hung_nfs, tmp_path):
+    monitor, release, calls = hung_nfs
+    monitor.get_usage()
+
+    # NFS 被强制卸载后重新挂载：仍在运行的调用不丢弃，重新出现时也不再提交
+    mountinfo = tmp_path / "mountinfo"
+    mountinfo.write_text(MOUNTINFO.replace("24 22 0:40 / /mnt/nfs rw - nfs4 server:/export rw\n", ""))
+    monitor._mounts_loaded_at = 0.0
+    assert "/mnt/nfs" not in {record["mountpoint"] for record in monitor.get_usage()}
+    assert "/mnt/nfs" in monitor._pending
+
+    mountinfo.write_text(MOUNTINFO)
+    monitor._mounts_loaded_at = 0.0
+    records = {record["mountpoint"]: record for record in monitor.get_usage()}
+    assert records["/mnt/nfs"]["status"] == "stale"
+    assert calls.count("/mnt/nfs") == 1
@@ -0,0 +1,26 @@
+# OpenMetrics 文本渲染测试
+
+import math
+
+from core.prometheus import MetricsBuilder
+
+def test_non_finite_values_use_openmetrics_spelling():
+    b = MetricsBuilder(prefix="")
+    b.family("ratio", "gauge", "Ratio.", [({"case": "nan"}, math.nan), ({"case": "pos"}, math.inf),
+                                          ({"case": "neg"}, -math.inf), ({"case": "finite"}, 0.25)])
+    lines = b.render().decode().splitlines()
+    assert 'ratio{case="nan"} NaN' in lines
+    assert 'ratio{case="pos"} +Inf' in lines
+    assert 'ratio{case="neg"} -Inf' in lines
+    assert 'ratio{case="finite"} 0.25' in lines
+    assert lines[-1] == "# EOF"
+
+def test_ints_bools_and_missing_values():
+    b = MetricsBuilder(prefix="")
+    b.gauge("count", "Count.", 3)
+    b.gauge("up", "Up.", True)
+    b.gauge("missing", "Missing.", None)
+    text = b.render().decode()
+    assert "count 3\n" in text
+    assert "up 1\n" in text
+    assert "missing" not in text
@@ -0,0 +1,101 @@
+# 硬件传感器采集测试（临时 sysfs 目录树）
+
+import os
+
+import pytest
+
+from monitor.sensors_monitor import SensorsMonitor
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"{text}\n")
+
+@pytest.fixture
+def sysfs(tmp_path):
+    root = tmp_path / "sys"
+    hwmon = root / "class" / "hwmon"
+    _write(hwmon / "hwmon0" / "name", "coretemp")
+    _write(hwmon / "hwmon0" / "temp1_input", 52000)
+    _write(hwmon / "hwmon0" / "temp1_label", "Package id 0")
+    _write(hwmon / "hwmon0" / "temp1_max", 80000)
+    _write(hwmon / "hwmon0" / "temp1_crit", 100000)
+    _write(hwmon / "hwmon0" / "temp2_input", 61000)
+    _write(hwmon / "hwmon0" / "temp2_label", "Core 0")
+    _write(hwmon / "hwmon1" / "name", "nct6775")
+    _write(hwmon / "hwmon1" / "fan1_input", 1200)
+    _write(hwmon / "hwmon2" / "name", "nvme")
+    _write(hwmon / "hwmon2" / "temp1_input", 38000)
+    os.makedirs(root / "devices" / "nvme0")
+    os.symlink(root / "devices" / "nvme0", hwmon / "hwmon2" / "device")
+    _write(root / "class" / "thermal" / "thermal_zone0" / "type", "x86_pkg_temp")
+    _write(root / "class" / "thermal" / "thermal_zone0" / "temp", 53000)
+    rapl = root / "class" / "powercap" / "intel-rapl:0"
+    _write(rapl / "name", "package-0")
+    _write(rapl / "energy_uj", 1_000_000)
+    _write(rapl / "max_energy_range_uj", 10_000_000)
+    return root
+
+def test_discovers_and_classifies_sensors(sysfs):
+    monitor = SensorsMonitor(root=str(sysfs))
+    stats = monitor.get_sensor_stats(timestamp=100.0)
+
+    temperatures = stats["temperatures"]
+    assert temperatures["coretemp_package_id_0"]["current"] == 52.0
+    assert temperatures["coretemp_package_id_0"]["kind"] == "cpu_package"
+    assert temperatures["coretemp_package_id_0"]["high"] == 80.0
+    assert temperatures["coretemp_package_id_0"]["critical"] == 100.0
+    assert temperatures["coretemp_core_0"]["kind"] == "cpu_core"
+    assert temperatures["nvme0_temp1"]["kind"] == "nvme"
+    assert temperatures["zone_x86_pkg_temp"]["kind"] == "cpu_package"
+    assert stats["fans"]["nct6775_fan1"]["rpm"] == 1200
+    assert stats["cpu_package_celsius"] == 53.0
+    assert stats["cpu_core_max_celsius"] == 61.0
+    assert stats["nvme_max_celsius"] == 38.0
+    # 能量计数器第一次读数只作为基准
+    assert stats["power"]["package_0"]["watts"] == 0.0
+
+def test_rapl_energy_rate_in_watts(sysfs):
+    monitor = SensorsMonitor(root=str(sysfs))
+    monitor.get_sensor_stats(timestamp=100.0)
+    _write(sysfs / "class" / "powercap" / "intel-rapl:0" / "energy_uj", 3_500_000)
+    # 2s 内从 1 J 增加到 3.5 J：1.25 W
+    assert monitor.get_sensor_stats(timestamp=102.0)["power"]["package_0"]["watts"] == 1.25
+
+def test_wrapped_counter_survives_rediscovery(sysfs):
+    energy = sysfs / "class" / "powercap" / "intel-rapl:0" / "energy_uj"
+    # rescan_interval=0：每个周期都重新发现
+    monitor = SensorsMonitor(root=str(sysfs), rescan_interval=0)
+    monitor.get_sensor_stats(timestamp=100.0)
+    _write(energy, 500_000)  # 回绕：+9.5 J
+    assert monitor.get_sensor_stats(timestamp=101.0)["power"]["package_0"]["watts"] == 9.5
+    _write(energy, 2_500_000)  # +2 J，未回绕
+    assert monitor.get_sensor_stats(timestamp=102.0)["power"]["package_0"]["watts"] == 2.0
+    assert monitor.stats["discoveries"] == 3
+
+def test_transient_read_error_skips_sensor_without_rediscovery(sysfs):
+    fan = sysfs / "class" / "hwmon" / "hwmon1" / "fan1_input"
+    monitor = SensorsMonitor(root=str(sysfs))
+    monitor.get_sensor_stats(timestamp=100.0)
+    assert monitor.stats["discoveries"] == 1
+
+    _write(fan, "garbage")
+    stats = monitor.get_sensor_stats(timestamp=101.0)
+    assert "nct6775_fan1" not in stats["fans"]
+    assert stats["temperatures"]["coretemp_core_0"]["current"] == 61.0
+    assert monitor.stats["read_errors"] == 1
+
+    _write(fan, 1300)
+    stats = monitor.get_sensor_stats(timestamp=102.0)
+    assert stats["fans"]["nct6775_fan1"]["rpm"] == 1300
+    assert monitor.stats["discoveries"] == 1
+
+def test_hotplug_triggers_rediscovery(sysfs):
+    monitor = SensorsMonitor(root=str(sysfs))
+    monitor.get_sensor_stats(timestamp=100.0)
+    _write(sysfs / "class" / "hwmon" / "hwmon3" / "name", "k10temp")
+    _write(sysfs / "class" / "hwmon" / "hwmon3" / "temp1_input", 70000)
+    _write(sysfs / "class" / "hwmon" / "hwmon3" / "temp1_label", "Tctl")
+    stats = monitor.get_sensor_stats(timestamp=101.0)
+    assert stats["temperatures"]["k10temp_tctl"]["current"] == 70.0
+    assert monitor.stats["discoveries"] == 2